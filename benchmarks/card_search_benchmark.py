@@ -0,0 +1,211 @@
+"""
+Benchmark of the card search of the /api/card-popularity and /api/decklist-builder/card-search endpoints with the
+CardSearchIndex against the linear scan of filter_cards_legacy.
+
+Every request parses CardPopularityParams, filters all synthetic cards and sorts them by popularity, i.e. all work of
+the endpoints except rendering and the cached BigQuery lookups. The builder requests replay typing a card name one
+keystroke at a time.
+
+Usage:
+    python -m benchmarks.card_search_benchmark --num-cards 4000
+"""
+import argparse
+import random
+import re
+import statistics
+import time
+
+from op_tcg.backend.models.cards import ExtendedCardData, OPTcgColor, OPTcgAttribute, OPTcgCardCatagory, \
+    OPTcgCardRarity, CardCurrency
+from op_tcg.backend.models.input import MetaFormat
+from op_tcg.frontend.api.models import CardPopularityParams
+from op_tcg.frontend.utils.card_search import CardSearchIndex
+
+NAMES = ["Monkey.D.Luffy", "Roronoa Zoro", "Nami", "Charlotte Katakuri", "Trafalgar Law", "Yamato", "Sanji",
+         "Portgas.D.Ace", "Boa Hancock", "Donquixote Doflamingo", "Kaido", "Shanks", "Uta", "Enel", "Crocodile"]
+TYPES = ["Straw Hat Crew", "Big Mom Pirates", "Heart Pirates", "Land of Wano", "Animal Kingdom Pirates", "Navy",
+         "Whitebeard Pirates", "Baroque Works", "Supernovas", "Donquixote Pirates", "Sky Island", "FILM"]
+ABILITY_SENTENCES = ["[Rush]", "[Blocker]", "[Banish]", "[Trigger] Draw 1 card.", "[Double Attack]",
+                     "[On Play] K.O. up to 1 of your opponent's Characters with a cost of 3 or less.",
+                     "[When Attacking] Give up to 1 rested DON!! card to your Leader or 1 of your Characters.",
+                     "[Activate: Main] [Once Per Turn] Look at 5 cards from the top of your deck.",
+                     "[Counter] Up to 1 of your Leader or Character cards gains +2000 power during this battle."]
+
+BUILDER_TYPED_SEARCHES = ["katakuri", "luffy op0", "straw hat", "doflamingo"]
+CARD_POPULARITY_QUERIES = [
+    {},
+    {"card_colors": ["Red", "Green"]},
+    {"card_colors": ["Blue"], "card_counter": "2000", "max_cost": "4"},
+    {"card_abilities": ["Blocker", "Rush"], "filter_operator": "OR"},
+    {"ability_text": "draw 1", "card_types": ["Straw Hat Crew", "Navy"]},
+    {"search_term": "pirates", "card_rarity": ["Super Rare", "Secret Rare"], "min_price": "5"},
+]
+
+
+def create_cards(num_cards: int, rng: random.Random) -> list[ExtendedCardData]:
+    meta_formats = MetaFormat.to_list(only_after_release=False)
+    cards = []
+    for i in range(num_cards):
+        meta_format = rng.choice(meta_formats)
+        cards.append(ExtendedCardData.from_default({
+            "id": f"{meta_format}-{i:04d}",
+            "name": rng.choice(NAMES),
+            "colors": rng.sample(OPTcgColor.to_list(), rng.choice([1, 1, 1, 2])),
+            "attributes": rng.sample(OPTcgAttribute.to_list(), rng.randint(0, 1)),
+            "types": rng.sample(TYPES, rng.randint(1, 2)),
+            "ability": " ".join(rng.sample(ABILITY_SENTENCES, rng.randint(0, 3))),
+            "card_category": rng.choice(OPTcgCardCatagory.to_list()),
+            "rarity": rng.choice(OPTcgCardRarity.to_list()),
+            "cost": rng.randint(0, 10),
+            "power": rng.randrange(0, 13000, 1000),
+            "counter": rng.choice([None, 0, 1000, 2000]),
+            "meta_format": meta_format,
+            "release_set_name": f"Release set {meta_format}",
+            "latest_eur_price": round(rng.expovariate(1 / 5), 2),
+            "latest_usd_price": round(rng.expovariate(1 / 5), 2),
+        }))
+    return cards
+
+
+def filter_cards_legacy(cards_data: list, params: CardPopularityParams) -> list:
+    """Filter cards based on the provided parameters by scanning all cards.
+    
+    Args:
+        cards_data: List of card data objects
+        params: CardPopularityParams object containing filter criteria
+        
+    Returns:
+        Filtered list of cards
+    """
+    filtered_cards = []
+    
+    for card in cards_data:
+        # Skip if card is from a newer meta format
+        if card.meta_format and MetaFormat.to_list(only_after_release=False).index(card.meta_format) > MetaFormat.to_list(only_after_release=False).index(params.meta_format):
+            continue
+            
+        # Filter by release meta format
+        if params.release_meta_format and card.meta_format != params.release_meta_format:
+            continue
+
+        # Filter by search term — split on whitespace and ";" so "OP09 Luffy" works
+        if params.search_term:
+            searchable = card.get_searchable_string().lower()
+            search_terms = [t for t in re.split(r'[;\s]+', params.search_term.lower()) if t]
+            if not all(term in searchable for term in search_terms):
+                continue
+            
+        # Filter by colors
+        if not any(color in params.card_colors for color in card.colors):
+            continue
+            
+        # Filter by attributes
+        if params.card_attributes and not any(attr in params.card_attributes for attr in card.attributes):
+            continue
+            
+        # Filter by card category
+        if params.card_category and card.card_category not in params.card_category:
+            continue
+            
+        # Filter by card rarity
+        if params.card_rarity and card.rarity not in params.card_rarity:
+            continue
+
+        # Filter by counter
+        if params.card_counter == 0 and card.counter not in [None, 0]:
+            continue
+
+        elif params.card_counter not in [0, None] and card.counter != params.card_counter:
+            continue
+
+        # Filter by card types
+        if params.card_types and not any(t in params.card_types for t in card.types):
+            continue
+            
+        # Filter by cost range
+        if card.cost is not None and not (params.min_cost <= card.cost <= params.max_cost):
+            continue
+            
+        # Filter by power range
+        if card.power is not None and not (params.min_power * 1000 <= card.power <= params.max_power * 1000):
+            continue
+            
+        # Filter by price range
+        if params.currency == CardCurrency.EURO and card.latest_eur_price:
+            if not (params.min_price <= card.latest_eur_price <= params.max_price):
+                continue
+        elif params.currency == CardCurrency.US_DOLLAR and card.latest_usd_price:
+            if not (params.min_price <= card.latest_usd_price <= params.max_price):
+                continue
+                
+        # Filter by abilities
+        if params.card_abilities or params.ability_text:
+            if params.filter_operator == "OR":
+                if not (any(ability in card.ability for ability in (params.card_abilities or [])) or 
+                       (params.ability_text and params.ability_text.lower() in card.ability.lower())):
+                    continue
+            else:  # AND
+                if not (all(ability in card.ability for ability in (params.card_abilities or [])) and 
+                       (not params.ability_text or params.ability_text.lower() in card.ability.lower())):
+                    continue
+        
+        filtered_cards.append(card)
+    
+    return filtered_cards
+
+
+def create_requests() -> list[tuple[str, dict]]:
+    requests = [("card-popularity", query) for query in CARD_POPULARITY_QUERIES]
+    for search in BUILDER_TYPED_SEARCHES:
+        requests.extend(("builder", {"search_term": search[:n], "card_category": OPTcgCardCatagory.to_list()})
+                        for n in range(1, len(search) + 1))
+    return requests
+
+
+def handle_request(filter_fn, query: dict, card_popularity: dict[str, float], limit: int | None) -> list[str]:
+    params = CardPopularityParams(**query)
+    cards = filter_fn(params)
+    cards.sort(key=lambda card: card_popularity.get(card.id, 0), reverse=True)
+    return [card.id for card in cards[:limit]]
+
+
+def _percentile(values: list[float], percentile: float) -> float:
+    return statistics.quantiles(values, n=100)[int(percentile) - 1] if len(values) > 1 else values[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num-cards", type=int, default=4_000)
+    parser.add_argument("--repeats", type=int, default=3, help="Number of times every request is replayed")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    cards = create_cards(args.num_cards, rng)
+    card_popularity = {card.id: rng.random() for card in cards if rng.random() < 0.3}
+    start = time.perf_counter()
+    index = CardSearchIndex({card.id: card for card in cards})
+    print(f"index of {len(index):,} cards built in {time.perf_counter() - start:.2f}s")
+
+    filter_fns = {"legacy": lambda params: filter_cards_legacy(cards, params), "index": index.filter}
+    endpoint2latencies = {(endpoint, name): [] for endpoint in ["card-popularity", "builder"] for name in filter_fns}
+    for _ in range(args.repeats):
+        for endpoint, query in create_requests():
+            limit = 24 if endpoint == "builder" else None
+            results = {}
+            for name, filter_fn in filter_fns.items():
+                start = time.perf_counter()
+                results[name] = handle_request(filter_fn, query, card_popularity, limit)
+                endpoint2latencies[(endpoint, name)].append(time.perf_counter() - start)
+            assert results["index"] == results["legacy"], f"Index result differs from the legacy scan for {query}"
+
+    for endpoint in ["card-popularity", "builder"]:
+        legacy, indexed = endpoint2latencies[(endpoint, "legacy")], endpoint2latencies[(endpoint, "index")]
+        print(f"{endpoint} ({len(indexed)} requests): "
+              f"legacy p50 {_percentile(legacy, 50) * 1000:.1f}ms p95 {_percentile(legacy, 95) * 1000:.1f}ms, "
+              f"index p50 {_percentile(indexed, 50) * 1000:.1f}ms p95 {_percentile(indexed, 95) * 1000:.1f}ms "
+              f"(x{statistics.median(legacy) / statistics.median(indexed):.0f})")
+
+
+if __name__ == "__main__":
+    main()
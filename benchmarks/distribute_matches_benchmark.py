@@ -0,0 +1,146 @@
+"""
+Benchmark of the indexed distribute_matches against the pool scanning reference implementation.
+
+Usage:
+    python -m benchmarks.distribute_matches_benchmark --num-matches 100000 --num-legacy-matches 3000
+"""
+import argparse
+import copy
+import random
+import time
+from collections import Counter
+from uuid import uuid4
+
+from op_tcg.backend.etl.transform import distribute_matches, opposite_result, pick_random_match
+from op_tcg.backend.models.matches import MatchResult
+from op_tcg.backend.models.transform import Transform2BQMatch
+
+
+def create_match_pool(num_matches: int, num_leaders: int = 60, seed: int = 42) -> list[Transform2BQMatch]:
+    """Creates num_matches matches incl. their reverse match, as produced by limitless_matches2transform_matches"""
+    rnd = random.Random(seed)
+    leader_ids = [f"OP{i // 20 + 1:02d}-{i % 20 + 1:03d}" for i in range(num_leaders)]
+    weights = [1 / (i + 1) for i in range(num_leaders)]
+    match_pool: list[Transform2BQMatch] = []
+    for _ in range(num_matches):
+        leader_id, opponent_id = rnd.choices(leader_ids, weights=weights, k=2)
+        result = rnd.choices([MatchResult.WIN, MatchResult.LOSE, MatchResult.DRAW], weights=[49, 49, 2])[0]
+        match_pool.append(Transform2BQMatch(id=uuid4().hex, leader_id=leader_id, opponent_id=opponent_id, result=result))
+        match_pool.append(Transform2BQMatch(id=uuid4().hex, leader_id=opponent_id, opponent_id=leader_id,
+                                            result=opposite_result(result)))
+    return match_pool
+
+
+def distribute_matches_legacy(match_pool: list[Transform2BQMatch]) -> list[Transform2BQMatch]:
+    """Reference implementation of distribute_matches, which scans the whole match pool for every pick"""
+    leader_ids = list(set(match.leader_id for match in match_pool))
+    result_transform_bq_match = []
+    last_results: dict[str, MatchResult | None] = {leader_id: None for leader_id in leader_ids}
+
+    def add_to_result_list(match_to_add: Transform2BQMatch, matches: list[Transform2BQMatch]) -> list[
+        Transform2BQMatch]:
+        result_transform_bq_match.append(match_to_add)
+        last_results[match_to_add.leader_id] = match_to_add.result
+        return [match for match in matches if match.id != match_to_add.id]
+
+    while match_pool:
+        # shuffle leader_ids for each iteration
+        leader_ids_iteration = copy.deepcopy(leader_ids)
+        while len(leader_ids_iteration) > 0:
+            # pick a random leader_id
+            chosen_leader_id: list[str] = random.choice(leader_ids_iteration)
+            if len([match for match in match_pool if match.leader_id == chosen_leader_id]) == 0:
+                # leader has no more matches left
+                leader_ids_iteration.remove(chosen_leader_id)
+                leader_ids.remove(chosen_leader_id)
+
+            chosen_match = pick_random_match(match_pool, chosen_leader_id,
+                                             exclude_result=last_results[chosen_leader_id])
+            if chosen_match:
+                match_pool = add_to_result_list(chosen_match, match_pool)
+                leader_ids_iteration.remove(chosen_match.leader_id)
+                # Find and append the reverse match
+                tmp_reverse_match = Transform2BQMatch(
+                    id="reverse_match",
+                    leader_id=chosen_match.opponent_id,
+                    opponent_id=chosen_match.leader_id,
+                    result=opposite_result(chosen_match.result)
+                )
+                first_found_reverse_match = next((match for match in match_pool if
+                                                  match.leader_id == tmp_reverse_match.leader_id and
+                                                  match.opponent_id == tmp_reverse_match.opponent_id and
+                                                  match.result == tmp_reverse_match.result),
+                                                 None)
+                # A reverse match should always exist
+                if first_found_reverse_match == None:
+                    raise ValueError("Could not find a reverse match")
+
+                # modify id of reverse match
+                first_found_reverse_match.id = chosen_match.id
+                first_found_reverse_match.is_reverse = True
+                match_pool = add_to_result_list(first_found_reverse_match, match_pool)
+                try:
+                    leader_ids_iteration.remove(chosen_match.opponent_id)
+                except ValueError:
+                    pass
+            else:
+                # if no match exist with different result, we switch the result for the next iteration
+                if last_results[chosen_leader_id] != MatchResult.DRAW:
+                    last_results[chosen_leader_id] = opposite_result(last_results[chosen_leader_id])
+                else:
+                    last_results[chosen_leader_id] = MatchResult.LOSE
+
+    return result_transform_bq_match
+
+
+def check_distribution(match_pool: list[Transform2BQMatch], distributed_matches: list[Transform2BQMatch]) -> None:
+    def to_counter(matches):
+        return Counter((m.leader_id, m.opponent_id, m.result) for m in matches)
+
+    assert to_counter(match_pool) == to_counter(distributed_matches), "Matches got lost or duplicated"
+    for match, reverse_match in zip(distributed_matches[::2], distributed_matches[1::2]):
+        assert match.id == reverse_match.id and reverse_match.is_reverse and not match.is_reverse
+        assert reverse_match.leader_id == match.opponent_id and reverse_match.result == opposite_result(match.result)
+
+
+def alternation_rate(distributed_matches: list[Transform2BQMatch]) -> float:
+    """Share of picked (not reverse) matches whose result differs from the previous match of the same leader"""
+    last_results, alternations, total = {}, 0, 0
+    for match in distributed_matches:
+        if not match.is_reverse and match.leader_id in last_results:
+            total += 1
+            alternations += last_results[match.leader_id] != match.result
+        last_results[match.leader_id] = match.result
+    return alternations / max(total, 1)
+
+
+def _timed(fn, match_pool: list[Transform2BQMatch]) -> tuple[float, list[Transform2BQMatch]]:
+    start = time.perf_counter()
+    distributed_matches = fn(match_pool)
+    return time.perf_counter() - start, distributed_matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num-matches", type=int, default=100_000)
+    parser.add_argument("--num-legacy-matches", type=int, default=3_000,
+                        help="Size of the match pool used to compare with the legacy implementation")
+    args = parser.parse_args()
+
+    match_pool = create_match_pool(args.num_legacy_matches)
+    legacy_seconds, legacy_matches = _timed(distribute_matches_legacy, copy.deepcopy(match_pool))
+    seconds, matches = _timed(lambda pool: distribute_matches(pool, seed=0), copy.deepcopy(match_pool))
+    check_distribution(match_pool, legacy_matches)
+    check_distribution(match_pool, matches)
+    print(f"{args.num_legacy_matches:,} matches: legacy {legacy_seconds:.2f}s "
+          f"(alternation {alternation_rate(legacy_matches):.1%}), indexed {seconds:.3f}s "
+          f"(alternation {alternation_rate(matches):.1%}), speedup x{legacy_seconds / seconds:.0f}")
+
+    match_pool = create_match_pool(args.num_matches)
+    seconds, matches = _timed(lambda pool: distribute_matches(pool, seed=0), copy.deepcopy(match_pool))
+    check_distribution(match_pool, matches)
+    print(f"{args.num_matches:,} matches: indexed {seconds:.2f}s (alternation {alternation_rate(matches):.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark of the array based elo engine against the row based reference implementation.
+
+Usage:
+    python -m benchmarks.elo_benchmark --num-matches 1000000 --num-legacy-matches 20000
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from op_tcg.backend.elo import EloCreator, calculate_new_elo, get_k_factor
+
+
+def create_synthetic_matches(num_matches: int, num_leaders: int = 80, matches_per_timestamp: int = 4,
+                             seed: int = 42) -> pd.DataFrame:
+    """Creates a synthetic meta with num_matches matches, i.e. 2 * num_matches rows incl. reverse matches"""
+    rng = np.random.default_rng(seed)
+    leader_ids = np.array([f"OP{i // 60 + 1:02d}-{i % 60 + 1:03d}" for i in range(num_leaders)], dtype=object)
+    # skewed leader popularity, similar to a real meta
+    popularity = rng.zipf(1.5, num_leaders).astype(float)
+    popularity /= popularity.sum()
+    leader_idx = rng.choice(num_leaders, size=num_matches, p=popularity)
+    opponent_idx = rng.choice(num_leaders, size=num_matches, p=popularity)
+    result = rng.choice([0, 1, 2], size=num_matches, p=[0.49, 0.02, 0.49])
+    match_ids = np.array([f"{i:012x}" for i in rng.permutation(num_matches)], dtype=object)
+    start = datetime(2024, 1, 1)
+    timestamps = np.array([start + timedelta(minutes=int(i)) for i in range(num_matches // matches_per_timestamp + 1)])
+    match_timestamps = timestamps[np.arange(num_matches) // matches_per_timestamp]
+
+    df_matches = pd.DataFrame({
+        "id": np.concatenate([match_ids, match_ids]),
+        "leader_id": np.concatenate([leader_ids[leader_idx], leader_ids[opponent_idx]]),
+        "opponent_id": np.concatenate([leader_ids[opponent_idx], leader_ids[leader_idx]]),
+        "result": np.concatenate([result, 2 - result]),
+        "meta_format": "OP05",
+        "official": True,
+        "is_reverse": np.concatenate([np.zeros(num_matches, dtype=bool), np.ones(num_matches, dtype=bool)]),
+        "match_timestamp": np.concatenate([match_timestamps, match_timestamps]),
+    })
+    return df_matches.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def calculate_elo_ratings_legacy(elo_creator: EloCreator) -> None:
+    """Row based reference implementation of EloCreator.calculate_elo_ratings. Used to verify parity of the elo engine."""
+    leader_id2elo = elo_creator.leader_id2elo
+    match_timestamps = elo_creator.df_all_matches.sort_values("match_timestamp", ascending=True).match_timestamp.unique().tolist()
+    df_all_matches = elo_creator.df_all_matches.set_index('match_timestamp')
+    for match_timestamp in match_timestamps:
+        leader_id2elo_change: dict[str, int] = {lid: 0 for lid in leader_id2elo.keys()}
+        df_matches_at_same_time = df_all_matches.loc[match_timestamp]
+
+        def add_elo_change_of_match(df_match) -> None:
+            leader_id2elo_change_match: dict[str, int] = {lid: 0 for lid in leader_id2elo.keys()}
+            for i, match_data_row in df_match.iterrows():
+                # include dynamic elo change as otherwise high elo leader penalty is too high
+                leader_elo = leader_id2elo[match_data_row.leader_id] + leader_id2elo_change[match_data_row.leader_id]
+                opponent_elo = leader_id2elo[match_data_row.opponent_id] + leader_id2elo_change[match_data_row.opponent_id]
+                new_elo = calculate_new_elo(leader_elo, opponent_elo, match_data_row.result,
+                                            k_factor=get_k_factor(leader_elo))
+                # in case of mirror match, leader elo change should not be overwritten, but added
+                leader_id2elo_change_match[match_data_row.leader_id] += (new_elo - leader_elo)
+
+            for leader_id, elo_change in leader_id2elo_change_match.items():
+                if elo_change != 0:
+                    leader_id2elo_change[leader_id] += elo_change
+
+        # apply elo change for each match
+        df_matches_at_same_time.groupby("id").apply(add_elo_change_of_match)
+
+        for leader_id, elo_change in leader_id2elo_change.items():
+            leader_id2elo[leader_id] = leader_id2elo[leader_id] + elo_change
+
+
+def _timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num-matches", type=int, default=1_000_000)
+    parser.add_argument("--num-legacy-matches", type=int, default=20_000,
+                        help="Size of the meta used for the parity check with the row based implementation")
+    args = parser.parse_args()
+
+    df_legacy = create_synthetic_matches(args.num_legacy_matches)
+    legacy_creator = EloCreator(df_legacy)
+    engine_creator = EloCreator(df_legacy)
+    legacy_seconds = _timed(lambda: calculate_elo_ratings_legacy(legacy_creator))
+    engine_seconds = _timed(engine_creator.calculate_elo_ratings)
+    assert legacy_creator.leader_id2elo == engine_creator.leader_id2elo, "Elo engine does not match legacy results"
+    print(f"parity ok on {args.num_legacy_matches:,} matches: legacy {legacy_seconds:.2f}s, "
+          f"engine {engine_seconds:.3f}s, speedup x{legacy_seconds / engine_seconds:.0f}")
+
+    df_matches = create_synthetic_matches(args.num_matches)
+    engine_creator = EloCreator(df_matches)
+    engine_seconds = _timed(engine_creator.calculate_elo_ratings)
+    legacy_seconds_estimate = legacy_seconds * args.num_matches / args.num_legacy_matches
+    print(f"engine on {args.num_matches:,} matches: {engine_seconds:.2f}s "
+          f"(legacy extrapolated {legacy_seconds_estimate:.0f}s, speedup x{legacy_seconds_estimate / engine_seconds:.0f})")
+
+
+if __name__ == "__main__":
+    main()
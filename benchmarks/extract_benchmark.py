@@ -0,0 +1,70 @@
+"""
+Benchmark of the column wise validated extract of matches against the row based Match extract.
+
+Both paths start from the DataFrame which BigQuery returns. Converting the downloaded Arrow table to pandas is the
+same in both paths and therefore not measured.
+
+Usage:
+    python -m benchmarks.extract_benchmark --num-rows 1000000 --num-legacy-rows 20000
+"""
+import argparse
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from benchmarks.elo_benchmark import create_synthetic_matches
+from op_tcg.backend.etl.extract import validate_dataframe
+from op_tcg.backend.models.matches import BQMatches, Match
+
+
+def create_bq_result(num_rows: int) -> pd.DataFrame:
+    """Matches with the columns and dtypes of a BigQuery query result of the match table"""
+    df = create_synthetic_matches(num_rows // 2)
+    df["result"] = df.result.astype("Int64")
+    df["source"] = "limitless_tcg"
+    df["match_timestamp"] = df.match_timestamp.dt.tz_localize("UTC")
+    df["create_timestamp"] = pd.Timestamp(datetime(2024, 6, 1), tz="UTC")
+    for column in ["tournament_round", "tournament_phase"]:
+        df[column] = pd.array([None] * len(df), dtype="Int64")
+    for column in ["tournament_id", "tournament_table", "tournament_match", "player_id", "opponent_player_id"]:
+        df[column] = None
+    return df
+
+
+def extract_legacy(df: pd.DataFrame) -> pd.DataFrame:
+    """Previous row based extract of EloUpdateToBigQueryEtlJob incl. the DataFrame conversion of transform"""
+    matches = [Match(**df_row.to_dict()) for _, df_row in df.iterrows()]
+    return BQMatches(matches=matches).to_dataframe()
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num-rows", type=int, default=1_000_000)
+    parser.add_argument("--num-legacy-rows", type=int, default=20_000,
+                        help="Number of rows used for the parity check with the row based extract")
+    args = parser.parse_args()
+
+    df_legacy = create_bq_result(args.num_legacy_rows)
+    df_rows, legacy_seconds = _timed(lambda: extract_legacy(df_legacy.copy()))
+    df_columns, columnar_seconds = _timed(lambda: validate_dataframe(df_legacy.copy(), Match))
+    columns = ["id", "leader_id", "opponent_id", "result", "official", "is_reverse", "match_timestamp"]
+    assert df_rows[columns].equals(df_columns[columns]), "Validated extract does not match the row based extract"
+    print(f"parity ok on {args.num_legacy_rows:,} rows: legacy {legacy_seconds:.2f}s, "
+          f"columnar {columnar_seconds:.3f}s, speedup x{legacy_seconds / columnar_seconds:.0f}")
+
+    df = create_bq_result(args.num_rows)
+    _, columnar_seconds = _timed(lambda: validate_dataframe(df, Match))
+    legacy_seconds_estimate = legacy_seconds * args.num_rows / args.num_legacy_rows
+    print(f"columnar on {args.num_rows:,} rows: {columnar_seconds:.2f}s "
+          f"(legacy extrapolated {legacy_seconds_estimate:.0f}s, speedup x{legacy_seconds_estimate / columnar_seconds:.0f})")
+
+
+if __name__ == "__main__":
+    main()
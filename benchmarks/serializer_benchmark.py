@@ -0,0 +1,83 @@
+"""
+Benchmark of the compiled BigQuery row serializer against json.loads(model.model_dump_json()) followed by
+ensure_json_serializability, which every BigQuery write path used before.
+
+Both paths start from validated models, i.e. model creation is not measured.
+
+Usage:
+    python -m benchmarks.serializer_benchmark --num-rows 100000
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from op_tcg.backend.etl.load import ensure_json_serializability
+from op_tcg.backend.etl.serializer import get_bq_row_serializer
+from op_tcg.backend.models.bq_classes import BQTableBaseModel
+from op_tcg.backend.models.cards import CardPrice, CardCurrency
+from op_tcg.backend.models.common import DataSource
+from op_tcg.backend.models.input import MetaFormat
+from op_tcg.backend.models.matches import Match, MatchResult
+from op_tcg.backend.models.tournaments import TournamentStanding
+
+
+def create_card_prices(num_rows: int, rng: random.Random) -> list[CardPrice]:
+    return [CardPrice(card_id=f"OP01-{i % 120:03d}", aa_version=i % 3, price=round(rng.uniform(0.1, 100), 2),
+                      currency=CardCurrency.EURO if i % 2 else CardCurrency.US_DOLLAR) for i in range(num_rows)]
+
+
+def create_matches(num_rows: int, rng: random.Random) -> list[Match]:
+    start = datetime(2024, 1, 1)
+    return [Match(id=f"match-{i // 2}", leader_id=f"OP01-{rng.randrange(120):03d}",
+                  opponent_id=f"OP02-{rng.randrange(120):03d}", result=rng.choice(list(MatchResult)),
+                  meta_format=MetaFormat.OP01, official=True, is_reverse=bool(i % 2), source=DataSource.LIMITLESS,
+                  tournament_id=f"tournament-{i // 1000}", round=rng.randrange(1, 8),
+                  match_timestamp=start + timedelta(minutes=i)) for i in range(num_rows)]
+
+
+def create_tournament_standings(num_rows: int, rng: random.Random) -> list[TournamentStanding]:
+    return [TournamentStanding(tournament_id=f"tournament-{i // 100}", player=f"player-{i}", decklist_id=f"decklist-{i}",
+                               name=f"Player {i}", country="DE", placing=i % 100 + 1,
+                               record={"wins": rng.randrange(6), "losses": rng.randrange(6), "ties": 0},
+                               leader_id=f"OP01-{rng.randrange(120):03d}",
+                               decklist={f"OP01-{rng.randrange(120):03d}": 4 for _ in range(12)}, drop=None)
+                for i in range(num_rows)]
+
+
+def serialize_legacy(models: list[BQTableBaseModel]) -> list[dict]:
+    rows = [json.loads(model.model_dump_json()) for model in models]
+    for row in rows:
+        ensure_json_serializability(row)
+    return rows
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--num-rows", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for create_models in [create_card_prices, create_matches, create_tournament_standings]:
+        models = create_models(args.num_rows, rng)
+        model_name = type(models[0]).__name__
+        serializer = get_bq_row_serializer(type(models[0]))
+        legacy_rows, legacy_seconds = _timed(lambda: serialize_legacy(models))
+        rows, compiled_seconds = _timed(lambda: serializer.to_json_rows(models))
+        assert rows == legacy_rows, f"Compiled {model_name} rows do not match the legacy rows"
+        _, arrow_seconds = _timed(lambda: serializer.to_arrow_columns(models))
+        print(f"{model_name} ({args.num_rows:,} rows): legacy {legacy_seconds:.2f}s, "
+              f"compiled json {compiled_seconds:.2f}s (x{legacy_seconds / compiled_seconds:.1f}), "
+              f"arrow columns {arrow_seconds:.2f}s (x{legacy_seconds / arrow_seconds:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,23 @@
 import logging
-from typing import Any
-
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable
+
+import requests
 from google.cloud import bigquery
+from requests.adapters import HTTPAdapter
 
 import op_tcg
 import json
 from pathlib import Path
 
 from op_tcg.backend.etl.extract import crawl_limitless_card
-from op_tcg.backend.etl.load import bq_insert_rows, bq_upsert_rows
-from op_tcg.backend.models.cards import LimitlessCardData, CardPrice, CardCurrency, CardReleaseSet
+from op_tcg.backend.etl.load import bq_insert_rows, bq_upsert_rows, bq_replace_rows, bq_merge_rows, bq_append_rows
+from op_tcg.backend.etl.serializer import get_bq_row_serializer
+from op_tcg.backend.models.cards import Card, LimitlessCardData, CardPrice, CardCurrency, CardReleaseSet
 from op_tcg.backend.models.decklists import Decklist
 from op_tcg.backend.models.input import LimitlessLeaderMetaDoc
 from op_tcg.backend.models.bq_classes import BQTableBaseModel
@@ -27,7 +35,58 @@ class MatchesPipeline:
         return item
 
 
+class TournamentBuffer:
+    """Rows of one BigQuery table which are waiting for the next flush"""
+
+    def __init__(self, table: bigquery.Table, key_column: str | None):
+        self.table = table
+        self.key_column = key_column
+        # rows of a key which is added again replace the previous ones, same as the per item DELETE + insert
+        self.key2rows: dict[str, list[BQTableBaseModel]] = {}
+        self.rows_without_key: list[BQTableBaseModel] = []
+
+    def add(self, rows: list[BQTableBaseModel]):
+        if self.key_column is None:
+            self.rows_without_key.extend(rows)
+            return
+        for row in rows:
+            self.key2rows.pop(getattr(row, self.key_column), None)
+        for row in rows:
+            self.key2rows.setdefault(getattr(row, self.key_column), []).append(row)
+
+    @property
+    def rows(self) -> list[BQTableBaseModel]:
+        return [row for rows in self.key2rows.values() for row in rows] + self.rows_without_key
+
+    def clear(self):
+        self.key2rows = {}
+        self.rows_without_key = []
+
+
 class TournamentPipeline:
+    """
+    Writes all tournament related data to BigQuery.
+
+    Per default items are buffered and flushed in batches (every batch_size tournaments, after flush_interval_seconds
+    and on close_spider) with one staging load and one DELETE + INSERT transaction per table.
+    Setting TOURNAMENT_PIPELINE_BUFFERED to False restores the blocking BigQuery jobs per item.
+    """
+
+    def __init__(self, buffered: bool = True, batch_size: int = 50, flush_interval_seconds: float = 300.0):
+        self.buffered = buffered
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.table_id2buffer: dict[str, TournamentBuffer] = {}
+        self.num_buffered_tournaments = 0
+        self.last_flush_time = time.time()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(
+            buffered=crawler.settings.getbool("TOURNAMENT_PIPELINE_BUFFERED", True),
+            batch_size=crawler.settings.getint("TOURNAMENT_PIPELINE_BATCH_SIZE", 50),
+            flush_interval_seconds=crawler.settings.getfloat("TOURNAMENT_PIPELINE_FLUSH_INTERVAL", 300.0),
+        )
 
     def get_bq_table(self, bq_table_item: BQTableBaseModel, spider):
         if isinstance(bq_table_item, Match):
@@ -41,10 +100,65 @@ class TournamentPipeline:
         else:
             raise NotImplementedError
 
+    def buffer_rows(self, rows: list[BQTableBaseModel], table: bigquery.Table, key_column: str | None):
+        if table.table_id not in self.table_id2buffer:
+            self.table_id2buffer[table.table_id] = TournamentBuffer(table, key_column)
+        self.table_id2buffer[table.table_id].add(rows)
+
     def process_item(self, item: TournamentItem, spider):
         """
         Updates all tournament related data (if exists it will be deleted first)
         """
+        if not self.buffered:
+            return self.process_item_legacy(item, spider)
+
+        if isinstance(item, TournamentItem):
+            for bq_row_list in [item.matches, item.tournament_standings]:
+                if bq_row_list:
+                    self.buffer_rows(bq_row_list, self.get_bq_table(bq_row_list[0], spider), key_column="tournament_id")
+            self.buffer_rows([item.tournament], self.get_bq_table(item.tournament, spider), key_column="id")
+
+            decklists_to_upload = []
+            for decklist in item.decklists:
+                # ignore duplicate
+                if decklist.id not in spider.decklist_ids_crawled:
+                    decklists_to_upload.append(decklist)
+                    spider.decklist_ids_crawled.add(decklist.id)
+            if decklists_to_upload:
+                self.buffer_rows(decklists_to_upload, spider.decklist_table, key_column=None)
+
+            self.num_buffered_tournaments += 1
+            if (self.num_buffered_tournaments >= self.batch_size
+                    or time.time() - self.last_flush_time >= self.flush_interval_seconds):
+                self.flush(spider)
+
+        return item
+
+    def flush(self, spider):
+        """Writes all buffered rows to BigQuery"""
+        if self.num_buffered_tournaments == 0:
+            return
+        has_stats = hasattr(spider, "bq_add_data_stats")
+        for table_id, buffer in self.table_id2buffer.items():
+            rows = buffer.rows
+            if not rows:
+                continue
+            bq_replace_rows(rows, table=buffer.table, key_column=buffer.key_column, client=spider.bq_client)
+            buffer.clear()
+            if has_stats and table_id in spider.bq_add_data_stats:
+                spider.bq_add_data_stats[table_id] += len(rows)
+        logging.info(f"Flushed {self.num_buffered_tournaments} tournaments to BigQuery")
+        self.num_buffered_tournaments = 0
+        self.last_flush_time = time.time()
+
+    def close_spider(self, spider):
+        if self.buffered:
+            self.flush(spider)
+
+    def process_item_legacy(self, item: TournamentItem, spider):
+        """
+        Updates all tournament related data (if exists it will be deleted first) with blocking BigQuery jobs per item
+        """
         if isinstance(item, TournamentItem):
             has_stats = hasattr(spider, "bq_add_data_stats")
             for bq_row_list in [item.matches, item.tournament_standings]:
@@ -53,16 +167,15 @@ class TournamentPipeline:
                     # delete all rows of tournament
                     spider.bq_client.query(f"DELETE FROM `{bq_table.full_table_id.split(':')[1]}` WHERE tournament_id = '{item.tournament.id}';").result()
                     # insert all new rows
-                    rows_to_insert = [json.loads(bq_row.model_dump_json()) for bq_row in bq_row_list]
-                    bq_insert_rows(rows_to_insert, table=bq_table, client=spider.bq_client)
+                    bq_insert_rows(bq_row_list, table=bq_table, client=spider.bq_client)
                     if has_stats and bq_table.table_id in spider.bq_add_data_stats:
-                        spider.bq_add_data_stats[bq_table.table_id] += len(rows_to_insert)
+                        spider.bq_add_data_stats[bq_table.table_id] += len(bq_row_list)
 
             bq_table = self.get_bq_table(item.tournament, spider)
             # delete existing tournament
             spider.bq_client.query(f"DELETE FROM `{bq_table.full_table_id.split(':')[1]}` WHERE id = '{item.tournament.id}';").result()
             # insert all new matches
-            bq_insert_rows([json.loads(item.tournament.model_dump_json())], table=bq_table, client=spider.bq_client)
+            bq_insert_rows([item.tournament], table=bq_table, client=spider.bq_client)
             if has_stats and bq_table.table_id in spider.bq_add_data_stats:
                 spider.bq_add_data_stats[bq_table.table_id] += 1
 
@@ -72,39 +185,187 @@ class TournamentPipeline:
                 # ignore duplicate
                 if decklist.id not in spider.decklist_ids_crawled:
                     decklists_to_upload.append(decklist)
-                    spider.decklist_ids_crawled.append(decklist.id)
+                    spider.decklist_ids_crawled.add(decklist.id)
             # insert all new rows
             if decklists_to_upload:
-                rows_to_insert = [json.loads(bq_row.model_dump_json()) for bq_row in decklists_to_upload]
-                bq_insert_rows(rows_to_insert, table=spider.decklist_table, client=spider.bq_client)
+                bq_insert_rows(decklists_to_upload, table=spider.decklist_table, client=spider.bq_client)
                 if has_stats and spider.decklist_table.table_id in spider.bq_add_data_stats:
                     spider.bq_add_data_stats[spider.decklist_table.table_id] += len(decklists_to_upload)
 
         return item
 
+class BatchWriteStats:
+    """Latency and row throughput of the batch writes of a buffered pipeline"""
+
+    def __init__(self):
+        self.batch_rows: list[int] = []
+        self.batch_seconds: list[float] = []
+        self.num_failed_batches = 0
+
+    def add(self, num_rows: int, seconds: float):
+        self.batch_rows.append(num_rows)
+        self.batch_seconds.append(seconds)
+
+    def summary(self) -> dict[str, Any]:
+        total_seconds = sum(self.batch_seconds)
+        return {
+            "batches": len(self.batch_rows),
+            "failed_batches": self.num_failed_batches,
+            "rows": sum(self.batch_rows),
+            "mean_batch_seconds": round(total_seconds / len(self.batch_seconds), 3) if self.batch_seconds else 0.0,
+            "max_batch_seconds": round(max(self.batch_seconds, default=0.0), 3),
+            "rows_per_second": round(sum(self.batch_rows) / total_seconds, 1) if total_seconds else 0.0,
+        }
+
+
+class RowBuffer:
+    """Rows of one BigQuery table which are waiting for the next batch write.
+    The buffer is full once it holds batch_size rows or max_batch_bytes (estimated as JSON)."""
+
+    def __init__(self, model: type[BQTableBaseModel], batch_size: int = 10_000, max_batch_bytes: int = 10_000_000):
+        self.serializer = get_bq_row_serializer(model)
+        self.batch_size = batch_size
+        self.max_batch_bytes = max_batch_bytes
+        self.rows: list[BQTableBaseModel] = []
+        self.num_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def add(self, rows: list[BQTableBaseModel]):
+        for row in rows:
+            self.rows.append(row)
+            self.num_bytes += len(json.dumps(self.serializer.to_json_row(row)))
+
+    def is_full(self) -> bool:
+        return len(self.rows) >= self.batch_size or self.num_bytes >= self.max_batch_bytes
+
+    def take(self) -> list[BQTableBaseModel]:
+        """Returns all buffered rows and empties the buffer"""
+        rows, self.rows, self.num_bytes = self.rows, [], 0
+        return rows
+
+
+def write_batch(rows: list[BQTableBaseModel], table: bigquery.Table, client: bigquery.Client,
+                stats: BatchWriteStats, write_rows: Callable[..., None] | None = None) -> bool:
+    """Writes rows with write_rows (per default bq_merge_rows: one load job and one MERGE), a failed write is
+    retried once. Failures are logged and counted in stats. Returns whether the rows were written."""
+    if not rows:
+        return True
+    write_rows = write_rows or bq_merge_rows
+    start = time.perf_counter()
+    try:
+        try:
+            write_rows(rows, table=table, client=client)
+        except Exception as e:
+            logging.warning(f"Write of {len(rows)} rows into {table.table_id} failed, retrying: {e}")
+            write_rows(rows, table=table, client=client)
+    except Exception as e:
+        stats.num_failed_batches += 1
+        logging.exception(f"Write of {len(rows)} rows into {table.table_id} failed: {e}")
+        return False
+    seconds = time.perf_counter() - start
+    stats.add(len(rows), seconds)
+    logging.info(f"Wrote {len(rows)} rows into {table.table_id} in {seconds:.2f}s")
+    return True
+
+
+def append_batch(rows: list[BQTableBaseModel], table: bigquery.Table, client: bigquery.Client,
+                 stats: BatchWriteStats) -> bool:
+    """write_batch for append only tables like CardPrice: one WRITE_APPEND load job without deduplication or MERGE.
+    Both attempts share the load job id, so a retry after an ambiguous failure does not append the rows twice."""
+    return write_batch(rows, table=table, client=client, stats=stats,
+                       write_rows=partial(bq_append_rows, job_id=f"{table.table_id}_append_{uuid.uuid4().hex}"))
+
+
 class CardPipeline:
+    """
+    Crawls the card data of new decklist card ids and writes cards to BigQuery.
+
+    Card pages of tournament items are fetched on a thread pool with max_workers threads, so the Scrapy reactor is not
+    blocked by card page latency. Crawled cards and prices are buffered per table and written (cards with
+    bq_merge_rows, prices with bq_append_rows) once a buffer holds batch_size rows or max_batch_bytes and on
+    close_spider.
+    """
+
+    def __init__(self, max_workers: int = 8, request_timeout: float = 30.0, batch_size: int = 10_000,
+                 max_batch_bytes: int = 10_000_000):
+        self.max_workers = max_workers
+        self.request_timeout = request_timeout
+        self.executor: ThreadPoolExecutor | None = None
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=max_workers))
+        # card ids which are scheduled or crawled in this run
+        self.scheduled_card_ids: set[str] = set()
+        self.lock = threading.Lock()
+        # concurrent MERGE jobs into the same table conflict, so batches are written one at a time
+        self.write_lock = threading.Lock()
+        self.card_buffer = RowBuffer(Card, batch_size=batch_size, max_batch_bytes=max_batch_bytes)
+        self.card_price_buffer = RowBuffer(CardPrice, batch_size=batch_size, max_batch_bytes=max_batch_bytes)
+        self.stats = BatchWriteStats()
+        self.num_crawled_cards = 0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(
+            max_workers=crawler.settings.getint("CARD_PIPELINE_MAX_WORKERS", 8),
+            request_timeout=crawler.settings.getfloat("CARD_PIPELINE_REQUEST_TIMEOUT", 30.0),
+            batch_size=crawler.settings.getint("CARD_PIPELINE_BATCH_SIZE", 10_000),
+            max_batch_bytes=crawler.settings.getint("CARD_PIPELINE_MAX_BATCH_BYTES", 10_000_000),
+        )
+
+    def crawl_card(self, card_id: str, spider):
+        """Runs on the thread pool"""
+        try:
+            card_data: LimitlessCardData = crawl_limitless_card(card_id, session=self.session,
+                                                                timeout=self.request_timeout)
+        except Exception as e:
+            logging.warning(f"Card data of {card_id} could not be extracted: {e}")
+            # a later tournament item may retry the card
+            with self.lock:
+                self.scheduled_card_ids.discard(card_id)
+            return
+        card_data.remove_dupes()
+        with self.lock:
+            self.card_buffer.add(card_data.cards)
+            self.card_price_buffer.add(card_data.card_prices)
+            self.num_crawled_cards += 1
+            # mark card id as crawled
+            spider.already_crawled_card_ids.add(card_id)
+            is_full = self.card_buffer.is_full() or self.card_price_buffer.is_full()
+        if is_full:
+            self.flush(spider)
+
+    def flush(self, spider):
+        """Merges the buffered cards and appends the buffered prices to BigQuery"""
+        with self.write_lock:
+            with self.lock:
+                cards, card_prices = self.card_buffer.take(), self.card_price_buffer.take()
+            write_batch(cards, table=spider.card_table, client=spider.bq_client, stats=self.stats)
+            append_batch(card_prices, table=spider.card_price_table, client=spider.bq_client, stats=self.stats)
 
     def process_tournament_item(self, item: TournamentItem, spider):
         decklist_card_ids = []
         for tournament_standing in item.tournament_standings:
             if tournament_standing.decklist:
                 decklist_card_ids.extend(list(tournament_standing.decklist.keys()))
-        new_unique_card_ids = set(decklist_card_ids) - set(spider.already_crawled_card_ids)
-        for card_id in new_unique_card_ids:
-            # Crawl data from limitless
-            try:
-                card_data: LimitlessCardData = crawl_limitless_card(card_id)
-            except Exception as e:
-                logging.warning("Card data could not be extracted", str(e))
-                continue
-            # Upload to big query
-            card_data.remove_dupes()
-            bq_insert_rows([json.loads(bq_card.model_dump_json()) for bq_card in card_data.cards],
-                           table=spider.card_table, client=spider.bq_client)
-            bq_insert_rows([json.loads(bq_card_price.model_dump_json()) for bq_card_price in card_data.card_prices],
-                           table=spider.card_price_table, client=spider.bq_client)
-            # mark card id as crawled
-            spider.already_crawled_card_ids.append(card_id)
+        with self.lock:
+            new_unique_card_ids = {card_id for card_id in set(decklist_card_ids)
+                                   if card_id not in spider.already_crawled_card_ids
+                                   and card_id not in self.scheduled_card_ids}
+            self.scheduled_card_ids.update(new_unique_card_ids)
+        if new_unique_card_ids and self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="card_pipeline")
+        for card_id in sorted(new_unique_card_ids):
+            self.executor.submit(self.crawl_card, card_id, spider)
+
+    def close_spider(self, spider):
+        if self.executor is None:
+            return
+        self.executor.shutdown(wait=True)
+        self.executor = None
+        self.flush(spider)
+        logging.info(f"Crawled {self.num_crawled_cards} new cards, card writes: {self.stats.summary()}")
 
     def process_cards_item(self, item: CardsItem, spider):
         for card in item.cards:
@@ -135,39 +396,79 @@ class CardPipeline:
 
 
 class CardPricePipeline:
+    """
+    Writes card prices to BigQuery.
+
+    Per default prices are buffered and appended with bq_append_rows once batch_size rows or max_batch_bytes
+    (estimated as JSON) are reached and on close_spider. Batch latency and throughput are stored in
+    spider.price_write_stats. Setting CARD_PRICE_PIPELINE_BUFFERED to False restores the streaming insert per item.
+    """
+
+    def __init__(self, buffered: bool = True, batch_size: int = 10_000, max_batch_bytes: int = 10_000_000):
+        self.buffered = buffered
+        self.buffer = RowBuffer(CardPrice, batch_size=batch_size, max_batch_bytes=max_batch_bytes)
+        self.stats = BatchWriteStats()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(
+            buffered=crawler.settings.getbool("CARD_PRICE_PIPELINE_BUFFERED", True),
+            batch_size=crawler.settings.getint("CARD_PRICE_PIPELINE_BATCH_SIZE", 10_000),
+            max_batch_bytes=crawler.settings.getint("CARD_PRICE_PIPELINE_MAX_BATCH_BYTES", 10_000_000),
+        )
+
+    @staticmethod
+    def get_card_prices(item: LimitlessPriceRow) -> list[CardPrice]:
+        card_prices = []
+        for currency, price in [(CardCurrency.US_DOLLAR, item.price_usd), (CardCurrency.EURO, item.price_eur)]:
+            if price:
+                card_prices.append(CardPrice(card_id=item.card_id, language=item.language,
+                                             aa_version=item.aa_version, price=price, currency=currency))
+        return card_prices
+
+    @staticmethod
+    def update_price_count(item: LimitlessPriceRow, spider):
+        if item.card_id not in spider.price_count:
+            spider.price_count[item.card_id] = {}
+        if item.aa_version in spider.price_count[item.card_id]:
+            logging.warning(f"Price information of {item.card_id} {item.aa_version} was already uploaded")
+        else:
+            spider.price_count[item.card_id][item.aa_version] = 1
 
     def process_item(self, item: LimitlessPriceRow, spider):
         """
         Loads card price data to BigQuery
         """
-        def get_card_price(item: LimitlessPriceRow, currency: CardCurrency):
-            return CardPrice(
-                card_id=item.card_id,
-                language=item.language,
-                aa_version=item.aa_version,
-                price=item.price_usd if currency == CardCurrency.US_DOLLAR else item.price_eur,
-                currency=currency
-            )
+        if not self.buffered:
+            return self.process_item_legacy(item, spider)
 
         if isinstance(item, LimitlessPriceRow):
-            upload_data = []
-            if item.price_usd:
-                card_price_usd = get_card_price(item, CardCurrency.US_DOLLAR)
-                upload_data.append(json.loads(card_price_usd.model_dump_json()))
-            if item.price_eur:
-                card_price_eur = get_card_price(item, CardCurrency.EURO)
-                upload_data.append(json.loads(card_price_eur.model_dump_json()))
-
-            # update price count
-            if item.card_id not in spider.price_count:
-                spider.price_count[item.card_id] = {}
-            if item.aa_version in spider.price_count[item.card_id]:
-                logging.warning(f"Price information of {item.card_id} {item.aa_version} was already uploaded")
-            else:
-                spider.price_count[item.card_id][item.aa_version] = 1
-            bq_insert_rows(upload_data, table=spider.price_table, client=spider.bq_client)
+            self.buffer.add(self.get_card_prices(item))
+            self.update_price_count(item, spider)
+            if self.buffer.is_full():
+                self.flush(spider)
+        return item
+
+    def flush(self, spider):
+        """Appends all buffered prices to BigQuery with one load job"""
+        append_batch(self.buffer.take(), table=spider.price_table, client=spider.bq_client, stats=self.stats)
+
+    def close_spider(self, spider):
+        if self.buffered:
+            self.flush(spider)
+            # Spider.closed runs after the pipelines are closed
+            spider.price_write_stats = self.stats.summary()
+
+    def process_item_legacy(self, item: LimitlessPriceRow, spider):
+        """
+        Loads card price data to BigQuery with one streaming insert per item
+        """
+        if isinstance(item, LimitlessPriceRow):
+            self.update_price_count(item, spider)
+            bq_insert_rows(self.get_card_prices(item), table=spider.price_table, client=spider.bq_client)
         return item
 
+
 class CardReleaseSetPipeline:
 
     def process_item(self, item: ReleaseSetItem, spider):
@@ -176,7 +477,7 @@ class CardReleaseSetPipeline:
         """
 
         if isinstance(item, ReleaseSetItem):
-            bq_insert_rows([json.loads(item.release_set.model_dump_json())], table=spider.release_set_table, client=spider.bq_client)
+            bq_insert_rows([item.release_set], table=spider.release_set_table, client=spider.bq_client)
         return item
 
 
@@ -197,8 +498,7 @@ class SealedProductPipeline:
 
         prices_with_value = [p for p in item.prices if p is not None and p.price > 0]
         if prices_with_value:
-            rows_to_insert = [json.loads(p.model_dump_json()) for p in prices_with_value]
-            bq_insert_rows(rows_to_insert, table=self.price_table, client=self.bq_client)
+            bq_insert_rows(prices_with_value, table=self.price_table, client=self.bq_client)
 
         logging.info(
             "SealedProductPipeline: upserted %d products, inserted %d prices",
@@ -208,63 +508,117 @@ class SealedProductPipeline:
 
 
 class OpTopDeckDecklistPipeline:
+    """
+    Writes the tournaments, decklists and standings of op top decks to BigQuery.
+
+    Per default new rows are buffered per table and flushed with one bq_merge_rows per table (every batch_size items,
+    after flush_interval_seconds and on close_spider). Batch latency and throughput are stored in
+    spider.bq_write_stats. Setting OP_TOP_DECK_PIPELINE_BUFFERED to False restores the load job and MERGE per item
+    and table.
+    """
+
+    def __init__(self, buffered: bool = True, batch_size: int = 50, flush_interval_seconds: float = 300.0):
+        self.buffered = buffered
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.table_id2buffer: dict[str, tuple[bigquery.Table, list[BQTableBaseModel]]] = {}
+        self.num_buffered_items = 0
+        self.last_flush_time = time.time()
+        self.stats = BatchWriteStats()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(
+            buffered=crawler.settings.getbool("OP_TOP_DECK_PIPELINE_BUFFERED", True),
+            batch_size=crawler.settings.getint("OP_TOP_DECK_PIPELINE_BATCH_SIZE", 50),
+            flush_interval_seconds=crawler.settings.getfloat("OP_TOP_DECK_PIPELINE_FLUSH_INTERVAL", 300.0),
+        )
+
+    @staticmethod
+    def get_rows_to_upload(item: OpTopDecksItem, spider) -> list[tuple[list[BQTableBaseModel], bigquery.Table]]:
+        """New rows of the item per table. Rows which were already crawled are ignored."""
+        # upload tournaments to BQ
+        tournaments_to_upload = []
+        for tournament in item.tournaments:
+            # ignore duplicate
+            if tournament.id not in spider.tournament_ids_crawled:
+                tournaments_to_upload.append(tournament)
+                spider.tournament_ids_crawled.add(tournament.id)
+                spider.bq_add_data_stats[spider.tournament_table.table_id] += 1
+
+        # upload decklists to BQ
+        decklists_to_upload = []
+        for decklist in item.decklists:
+            # ignore duplicate
+            if decklist.id not in spider.decklist_ids_crawled:
+                decklists_to_upload.append(decklist)
+                spider.decklist_ids_crawled.add(decklist.id)
+                spider.bq_add_data_stats[spider.decklist_table.table_id] += 1
+
+        # upload tournament_standings to BQ
+        tournament_standings_to_upload = []
+        for tournament_standing in item.tournament_standings:
+            # ignore duplicate
+            if spider.tournament_standing_to_id(tournament_standing) not in spider.tournament_standing_ids_crawled:
+                tournament_standings_to_upload.append(tournament_standing)
+                spider.tournament_standing_ids_crawled.add(spider.tournament_standing_to_id(tournament_standing))
+                spider.bq_add_data_stats[spider.tournament_standing_table.table_id] += 1
+
+        # upload op_top_deck_decklists to BQ
+        op_top_deck_decklists_to_upload = []
+        for decklist in item.op_top_deck_decklists:
+            id = spider.op_top_deck_decklist_to_id(decklist)
+            # ignore already crawled decklists
+            if id not in spider.decklists_crawled:
+                op_top_deck_decklists_to_upload.append(decklist)
+                spider.decklists_crawled.add(id)
+                spider.bq_add_data_stats[spider.op_top_deck_table.table_id] += 1
+
+        return [(rows, table) for rows, table in [(tournaments_to_upload, spider.tournament_table),
+                                                  (decklists_to_upload, spider.decklist_table),
+                                                  (tournament_standings_to_upload, spider.tournament_standing_table),
+                                                  (op_top_deck_decklists_to_upload, spider.op_top_deck_table)]
+                if rows]
+
     def process_item(self, item: OpTopDecksItem, spider):
         """
-        Updates all tournament related data (if exists it will be deleted first)
+        Buffers all new tournament related data of the item
         """
-        def _upload_to_bq(data_to_upload: list[BQTableBaseModel],table: bigquery.Table):
-            if data_to_upload:
-                rows_to_insert = [json.loads(bq_row.model_dump_json()) for bq_row in data_to_upload]
-                bq_insert_rows(rows_to_insert, table=table, client=spider.bq_client)
+        if not self.buffered:
+            return self.process_item_legacy(item, spider)
 
         if isinstance(item, OpTopDecksItem):
-            # upload tournaments to BQ
-            tournaments_to_upload = []
-            for tournament in item.tournaments:
-                # ignore duplicate
-                if tournament.id not in spider.tournament_ids_crawled:
-                    tournaments_to_upload.append(tournament)
-                    spider.tournament_ids_crawled.append(tournament.id)
-                    spider.bq_add_data_stats[spider.tournament_table.table_id] += 1
-            # insert all new rows
-            if tournaments_to_upload:
-                _upload_to_bq(tournaments_to_upload, spider.tournament_table)
-
-            # upload decklists to BQ
-            decklists_to_upload = []
-            for decklist in item.decklists:
-                # ignore duplicate
-                if decklist.id not in spider.decklist_ids_crawled:
-                    decklists_to_upload.append(decklist)
-                    spider.decklist_ids_crawled.append(decklist.id)
-                    spider.bq_add_data_stats[spider.decklist_table.table_id] += 1
-            # insert all new rows
-            if decklists_to_upload:
-                _upload_to_bq(decklists_to_upload, spider.decklist_table)
-
-            # upload tournament_standings to BQ
-            tournament_standings_to_upload = []
-            for tournament_standing in item.tournament_standings:
-                # ignore duplicate
-                if spider.tournament_standing_to_id(tournament_standing) not in spider.tournament_standing_ids_crawled:
-                    tournament_standings_to_upload.append(tournament_standing)
-                    spider.tournament_standing_ids_crawled.append(spider.tournament_standing_to_id(tournament_standing))
-                    spider.bq_add_data_stats[spider.tournament_standing_table.table_id] += 1
-            # insert all new rows
-            if tournament_standings_to_upload:
-                _upload_to_bq(tournament_standings_to_upload, spider.tournament_standing_table)
-
-            # upload op_top_deck_decklists to BQ
-            op_top_deck_decklists_to_upload = []
-            for decklist in item.op_top_deck_decklists:
-                id = spider.op_top_deck_decklist_to_id(decklist)
-                # ignore already crawled decklists
-                if id not in spider.decklists_crawled:
-                    op_top_deck_decklists_to_upload.append(decklist)
-                    spider.decklists_crawled.append(id)
-                    spider.bq_add_data_stats[spider.op_top_deck_table.table_id] += 1
-            # insert all new rows
-            if op_top_deck_decklists_to_upload:
-                _upload_to_bq(op_top_deck_decklists_to_upload, spider.op_top_deck_table)
+            for rows, table in self.get_rows_to_upload(item, spider):
+                self.table_id2buffer.setdefault(table.table_id, (table, []))[1].extend(rows)
+            self.num_buffered_items += 1
+            if (self.num_buffered_items >= self.batch_size
+                    or time.time() - self.last_flush_time >= self.flush_interval_seconds):
+                self.flush(spider)
+        return item
 
-        return item
\ No newline at end of file
+    def flush(self, spider):
+        """Writes all buffered rows to BigQuery with one load job and one MERGE per table.
+        Rows of a failed write are dropped, their ids are crawled again by the next run."""
+        for table_id, (table, rows) in self.table_id2buffer.items():
+            if not write_batch(rows, table=table, client=spider.bq_client, stats=self.stats):
+                spider.bq_add_data_stats[table_id] -= len(rows)
+        if self.num_buffered_items:
+            logging.info(f"Flushed {self.num_buffered_items} op top decks items to BigQuery")
+        self.table_id2buffer = {}
+        self.num_buffered_items = 0
+        self.last_flush_time = time.time()
+
+    def close_spider(self, spider):
+        if self.buffered:
+            self.flush(spider)
+            # Spider.closed runs after the pipelines are closed
+            spider.bq_write_stats = self.stats.summary()
+
+    def process_item_legacy(self, item: OpTopDecksItem, spider):
+        """
+        Writes all new tournament related data of the item with one load job and MERGE per table
+        """
+        if isinstance(item, OpTopDecksItem):
+            for rows, table in self.get_rows_to_upload(item, spider):
+                bq_merge_rows(rows, table=table, client=spider.bq_client)
+        return item
@@ -406,3 +406,6 @@ class LimitlessPricesSpider(scrapy.Spider):
         sum_price_updates = sum(count for card in self.price_count.values() for count in card.values())
         sum_card_updates = sum(count for card in self.card_count.values() for count in card.values())
         logging.info(f"Finished spider with {sum_price_updates} price updates and {sum_card_updates} card updates")
+        price_write_stats = getattr(self, "price_write_stats", None)
+        if price_write_stats:
+            logging.info(f"Card price writes: {price_write_stats}")
@@ -9,6 +9,7 @@ from google.cloud import bigquery
 from pydantic import BaseModel, ValidationError
 
 from op_tcg.backend.crawling.items import TournamentItem
+from op_tcg.backend.crawling.state import CrawlState, CrawlStateSet, CrawlStateSnapshot
 from op_tcg.backend.etl.load import get_or_create_table
 from op_tcg.backend.models.cards import Card, CardPrice
 from op_tcg.backend.models.common import DataSource
@@ -29,28 +30,23 @@ class LimitlessTournamentSpider(scrapy.Spider):
 
     def get_already_crawled_tournament_ids(self) -> dict[str, bool]:
         """returns tournaments already crawled and if they had decklists available back than"""
-        tournament_id2decklists: dict[str, bool] = {}
-        for tournament_id in self.bq_client.query(
-                f"SELECT id, decklists FROM `{self.tournament_table.full_table_id.replace(':', '.')}`").result():
-            tournament_id2decklists[tournament_id["id"]] = tournament_id["decklists"]
-        return tournament_id2decklists
+        return self.crawl_state.load_mapping_from_bq(
+            "tournament_id2decklists", self.bq_client,
+            f"SELECT id, decklists, create_timestamp FROM `{self.tournament_table.full_table_id.replace(':', '.')}`",
+            key_column="id", value_column="decklists")
 
-    def get_already_crawled_card_ids(self) -> list[str]:
+    def get_already_crawled_card_ids(self) -> CrawlStateSet:
         """returns card ids already crawled"""
-        card_ids: list[str] = []
-        for card_row in self.bq_client.query(
-                f"SELECT id FROM `{self.card_table.full_table_id.replace(':', '.')}`").result():
-            card_ids.append(card_row["id"])
-        return card_ids
+        return self.crawl_state.load_from_bq(
+            "card_ids", self.bq_client, f"SELECT id, MAX(create_timestamp) AS create_timestamp FROM `{self.card_table.full_table_id.replace(':', '.')}` GROUP BY id")
 
 
-    def get_bq_decklist_ids(self) -> list[str]:
-        """Returns list of decklist ids stored in bq"""
-        decklist_ids: list[str] = []
-        for card_row in self.bq_client.query(
-                f"SELECT id FROM `{self.decklist_table.full_table_id.replace(':', '.')}`").result():
-            decklist_ids.append(dict(card_row)["id"])
-        return decklist_ids
+    def get_bq_decklist_ids(self) -> CrawlStateSet:
+        """Returns set of decklist ids stored in bq"""
+        # decklist ids are SHA-256 hex strings, store them as 16 byte digests
+        return self.crawl_state.load_from_bq(
+            "decklist_ids", self.bq_client, f"SELECT id, create_timestamp FROM `{self.decklist_table.full_table_id.replace(':', '.')}`",
+            digest_size=16)
 
     async def start(self):
         self.bq_client = bigquery.Client(location="europe-west1")
@@ -60,6 +56,7 @@ class LimitlessTournamentSpider(scrapy.Spider):
         self.decklist_table = get_or_create_table(Decklist, client=self.bq_client)
         self.card_table = get_or_create_table(Card, client=self.bq_client)
         self.card_price_table = get_or_create_table(CardPrice, client=self.bq_client)
+        self.crawl_state = CrawlState(snapshot=CrawlStateSnapshot.from_env())
         self.known_tournament_id2contains_decklists = self.get_already_crawled_tournament_ids()
         self.already_crawled_card_ids = self.get_already_crawled_card_ids()
         self.decklist_ids_crawled = self.get_bq_decklist_ids()
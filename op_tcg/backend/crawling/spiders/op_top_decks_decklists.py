@@ -10,6 +10,7 @@ import bs4
 from bs4 import BeautifulSoup
 
 from op_tcg.backend.crawling.items import OpTopDecksItem
+from op_tcg.backend.crawling.state import CrawlState, CrawlStateSet, CrawlStateSnapshot
 from op_tcg.backend.etl.load import get_or_create_table
 from google.cloud import bigquery
 
@@ -60,40 +61,34 @@ class OPTopDeckDecklistSpider(scrapy.Spider):
         self.logger.info("Deleted %d tournament_standing rows for meta formats %s", deleted, meta_format_values)
         return deleted
 
-    def get_bq_op_top_deck_decklists(self) -> list[OpTopDeckDecklistExtended]:
-        """Returns list of OPTopDeckDecklistExtended stored in bq"""
-        bq_decklists: list[OpTopDeckDecklistExtended] = []
-        for card_row in self.bq_client.query(
-                f"SELECT * FROM `{self.op_top_deck_table.full_table_id.replace(':', '.')}` as t1 "
-                f"LEFT JOIN `{self.decklist_table.full_table_id.replace(':', '.')}` as t2 on t1.decklist_id = t2.id").result():
-            bq_decklists.append(OpTopDeckDecklistExtended(**dict(card_row)))
-        return bq_decklists
-
-    def get_bq_decklist_ids(self) -> list[str]:
-        """Returns list of decklist ids stored in bq"""
-        decklist_ids: list[str] = []
-        for card_row in self.bq_client.query(
-                f"SELECT id FROM `{self.decklist_table.full_table_id.replace(':', '.')}`").result():
-            decklist_ids.append(dict(card_row)["id"])
-        return decklist_ids
-
-    def get_bq_tournament_ids(self) -> list[str]:
-        """Returns list of tournament ids stored in bq"""
-        tournament_ids: list[str] = []
-        for card_row in self.bq_client.query(
-                f"SELECT id FROM `{self.tournament_table.full_table_id.replace(':', '.')}` where source = '{DataSource.OP_TOP_DECKS}'").result():
-            tournament_ids.append(dict(card_row)["id"])
-        return tournament_ids
-
-    def get_bq_tournament_standing_ids(self) -> list[str]:
-        """Returns list of tournament_standing ids stored in bq"""
-        tournament_standing_ids: list[str] = []
-        for card_row in self.bq_client.query(
-                f"""SELECT t1.* FROM `{self.tournament_standing_table.full_table_id.replace(':', '.')}` as t1
+    def get_bq_op_top_deck_decklist_ids(self) -> CrawlStateSet:
+        """Returns set of op top deck decklist ids stored in bq"""
+        return self.crawl_state.load_from_bq(
+            "op_top_deck_decklist_ids", self.bq_client,
+            f"SELECT tournament_id, decklist_id, author, create_timestamp FROM `{self.op_top_deck_table.full_table_id.replace(':', '.')}`",
+            key_fn=lambda row: self.op_top_deck_decklist_to_id(OpTopDeckDecklist.model_construct(**row)))
+
+    def get_bq_decklist_ids(self) -> CrawlStateSet:
+        """Returns set of decklist ids stored in bq"""
+        # decklist ids are SHA-256 hex strings, store them as 16 byte digests
+        return self.crawl_state.load_from_bq(
+            "decklist_ids", self.bq_client, f"SELECT id, create_timestamp FROM `{self.decklist_table.full_table_id.replace(':', '.')}`",
+            digest_size=16)
+
+    def get_bq_tournament_ids(self) -> CrawlStateSet:
+        """Returns set of tournament ids stored in bq"""
+        return self.crawl_state.load_from_bq(
+            "tournament_ids", self.bq_client,
+            f"SELECT id, create_timestamp FROM `{self.tournament_table.full_table_id.replace(':', '.')}` where source = '{DataSource.OP_TOP_DECKS}'")
+
+    def get_bq_tournament_standing_ids(self) -> CrawlStateSet:
+        """Returns set of tournament_standing ids stored in bq"""
+        return self.crawl_state.load_from_bq(
+            "tournament_standing_ids", self.bq_client,
+            f"""SELECT t1.tournament_id, t1.decklist_id, t1.player_id, t1.create_timestamp FROM `{self.tournament_standing_table.full_table_id.replace(':', '.')}` as t1
                 LEFT JOIN `{self.tournament_table.full_table_id.replace(':', '.')}` as t2 on t1.tournament_id = t2.id
-                where t2.source = '{DataSource.OP_TOP_DECKS}'""").result():
-            tournament_standing_ids.append(self.tournament_standing_to_id(TournamentStanding(**dict(card_row))))
-        return tournament_standing_ids
+                where t2.source = '{DataSource.OP_TOP_DECKS}'""",
+            key_fn=lambda row: self.tournament_standing_to_id(TournamentStanding.model_construct(**row)))
 
     def op_top_deck_decklist_to_id(self, d: OpTopDeckDecklistExtended | OpTopDeckDecklist) -> str:
         return f"{d.tournament_id}_{d.decklist_id}_{d.author}"
@@ -109,14 +104,15 @@ class OPTopDeckDecklistSpider(scrapy.Spider):
         self.tournament_table = get_or_create_table(Tournament, client=self.bq_client)
         self.tournament_standing_table = get_or_create_table(TournamentStanding, client=self.bq_client)
 
+        self.crawl_state = CrawlState(snapshot=CrawlStateSnapshot.from_env())
         if self.delete_existing:
             self.delete_bq_tournament_standings()
+            self.crawl_state.invalidate("tournament_standing_ids")
 
         self.tournament_ids_crawled = self.get_bq_tournament_ids()
         self.tournament_standing_ids_crawled = self.get_bq_tournament_standing_ids()
         self.decklist_ids_crawled = self.get_bq_decklist_ids()
-        self.bq_decklists = self.get_bq_op_top_deck_decklists()
-        self.decklists_crawled = [self.op_top_deck_decklist_to_id(d) for d in self.bq_decklists]
+        self.decklists_crawled = self.get_bq_op_top_deck_decklist_ids()
         self.bq_add_data_stats = {
             self.decklist_table.table_id: 0,
             self.op_top_deck_table.table_id: 0,
@@ -398,3 +394,6 @@ class OPTopDeckDecklistSpider(scrapy.Spider):
 
     def closed(self, reason):
         logging.info(f"Finished spider with {self.bq_add_data_stats} new data in Big Query")
+        bq_write_stats = getattr(self, "bq_write_stats", None)
+        if bq_write_stats:
+            logging.info(f"Big Query writes: {bq_write_stats}")
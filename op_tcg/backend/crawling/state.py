@@ -0,0 +1,178 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+from google.cloud import bigquery
+
+import op_tcg
+
+_logger = logging.getLogger("crawl_state")
+
+# Increase if the key format of a crawl state changes, to rebuild all snapshots
+SNAPSHOT_VERSION = 1
+
+
+class CrawlStateSet:
+    """
+    Hashed set of already crawled keys with O(1) add/contains.
+    With digest_size, keys are stored as fixed width digests instead of strings, which keeps large key sets
+    (e.g. SHA-256 decklist ids) compact. Digests can not be converted back to the keys.
+    """
+
+    def __init__(self, keys: Iterable[str] = (), digest_size: int | None = None):
+        self.digest_size = digest_size
+        self._keys: set[str | bytes] = {self._to_key(key) for key in keys}
+
+    def _to_key(self, key: str) -> str | bytes:
+        if self.digest_size is None:
+            return key
+        return hashlib.blake2b(key.encode(), digest_size=self.digest_size).digest()
+
+    def add(self, key: str) -> None:
+        self._keys.add(self._to_key(key))
+
+    def __contains__(self, key: str) -> bool:
+        return self._to_key(key) in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class CrawlStateSnapshot:
+    """
+    On disk SQLite snapshot of crawl state keys (and optional values) per state name.
+
+    A sync only queries rows with create_timestamp > last_sync - overlap and upserts them, so the snapshot contains the
+    same keys as a full query as long as rows are not deleted. The snapshot of a state is rebuilt from scratch if it
+    does not exist, if its query changed, if the last full sync is older than max_age or after invalidate().
+    Every sync is one SQLite transaction, i.e. an interrupted sync leaves the previous snapshot intact.
+    """
+
+    def __init__(self, path: str | Path, max_age: timedelta = timedelta(days=7), overlap: timedelta = timedelta(days=1)):
+        self.path = Path(path)
+        self.max_age = max_age
+        # rows get their create_timestamp before they are written to BigQuery, so they might arrive late
+        self.overlap = overlap
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.executescript("""
+        CREATE TABLE IF NOT EXISTS crawl_state_keys (
+            name TEXT NOT NULL, key TEXT NOT NULL, value TEXT, PRIMARY KEY (name, key)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS crawl_state_syncs (
+            name TEXT PRIMARY KEY, query_hash TEXT NOT NULL, last_sync TEXT, last_full_sync TEXT NOT NULL
+        );
+        """)
+
+    @classmethod
+    def from_env(cls) -> "CrawlStateSnapshot | None":
+        """Snapshot at CRAWL_STATE_PATH (default data/crawl_state.sqlite). Disabled if CRAWL_STATE_PATH is empty."""
+        path = os.environ.get("CRAWL_STATE_PATH", str(Path(op_tcg.__file__).parent.parent / "data" / "crawl_state.sqlite"))
+        if not path:
+            return None
+        try:
+            return cls(path)
+        except (OSError, sqlite3.Error) as e:
+            _logger.warning(f"Crawl state snapshot {path} could not be opened, falling back to full queries: {e}")
+            return None
+
+    @staticmethod
+    def _query_hash(query: str) -> str:
+        return hashlib.sha256(f"{SNAPSHOT_VERSION}:{query}".encode()).hexdigest()
+
+    def invalidate(self, name: str) -> None:
+        """Forces a rebuild of the state on its next sync, e.g. after rows were deleted in BigQuery"""
+        with self.connection:
+            self.connection.execute("DELETE FROM crawl_state_syncs WHERE name = ?", (name,))
+
+    def sync(self, name: str, client: bigquery.Client, query: str, key_fn: Callable[[dict[str, Any]], str],
+             value_fn: Callable[[dict[str, Any]], str | None] | None = None) -> list[tuple[str, str | None]]:
+        """
+        Updates the snapshot of a state with new rows of query and returns all (key, value) pairs.
+        query must select a create_timestamp column.
+        """
+        query_hash = self._query_hash(query)
+        now = datetime.now(timezone.utc)
+        sync_row = self.connection.execute(
+            "SELECT query_hash, last_sync, last_full_sync FROM crawl_state_syncs WHERE name = ?", (name,)).fetchone()
+        full_sync = (sync_row is None or sync_row[0] != query_hash
+                     or now - datetime.fromisoformat(sync_row[2]) > self.max_age)
+        last_sync = None if full_sync or sync_row[1] is None else datetime.fromisoformat(sync_row[1])
+
+        if last_sync is None:
+            sync_query = f"SELECT * FROM ({query})"
+        else:
+            sync_query = f"SELECT * FROM ({query}) WHERE create_timestamp > TIMESTAMP('{(last_sync - self.overlap).isoformat()}')"
+
+        with self.connection:
+            if full_sync:
+                self.connection.execute("DELETE FROM crawl_state_keys WHERE name = ?", (name,))
+            num_rows = 0
+            for row in client.query(sync_query).result():
+                row = dict(row)
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO crawl_state_keys (name, key, value) VALUES (?, ?, ?)",
+                    (name, key_fn(row), value_fn(row) if value_fn else None))
+                create_timestamp = row.get("create_timestamp")
+                if create_timestamp is not None:
+                    if create_timestamp.tzinfo is None:
+                        create_timestamp = create_timestamp.replace(tzinfo=timezone.utc)
+                    last_sync = create_timestamp if last_sync is None else max(last_sync, create_timestamp)
+                num_rows += 1
+            self.connection.execute(
+                "INSERT OR REPLACE INTO crawl_state_syncs (name, query_hash, last_sync, last_full_sync) VALUES (?, ?, ?, ?)",
+                (name, query_hash, last_sync.isoformat() if last_sync else None,
+                 now.isoformat() if full_sync else sync_row[2]))
+        _logger.info(f"{'Rebuilt' if full_sync else 'Updated'} crawl state snapshot {name} with {num_rows} rows")
+        return self.connection.execute("SELECT key, value FROM crawl_state_keys WHERE name = ?", (name,)).fetchall()
+
+
+class CrawlState:
+    """Named sets of already crawled keys, shared between a spider and its pipelines.
+    With a snapshot, the keys are synced incrementally instead of querying all rows on every start."""
+
+    def __init__(self, snapshot: CrawlStateSnapshot | None = None):
+        self.snapshot = snapshot
+        self.name2keys: dict[str, CrawlStateSet] = {}
+
+    def __getitem__(self, name: str) -> CrawlStateSet:
+        return self.name2keys[name]
+
+    def create(self, name: str, keys: Iterable[str] = (), digest_size: int | None = None) -> CrawlStateSet:
+        self.name2keys[name] = CrawlStateSet(keys, digest_size=digest_size)
+        return self.name2keys[name]
+
+    def load_from_bq(self, name: str, client: bigquery.Client, query: str, key_column: str = "id",
+                     key_fn: Callable[[dict[str, Any]], str] | None = None,
+                     digest_size: int | None = None) -> CrawlStateSet:
+        """
+        Streams the result rows of a single query into a new key set.
+        The key is the key_column of a row or, if provided, the result of key_fn(row).
+        With a snapshot, query must select a create_timestamp column.
+        """
+        key_fn = key_fn or (lambda row: row[key_column])
+        if self.snapshot is not None:
+            keys = (key for key, _ in self.snapshot.sync(name, client, query, key_fn=key_fn))
+        else:
+            keys = (key_fn(dict(row)) for row in client.query(query).result())
+        crawl_state_set = self.create(name, keys, digest_size=digest_size)
+        _logger.info(f"Loaded {len(crawl_state_set)} keys of crawl state {name}")
+        return crawl_state_set
+
+    def load_mapping_from_bq(self, name: str, client: bigquery.Client, query: str, key_column: str,
+                             value_column: str) -> dict[str, Any]:
+        """Returns key_column -> value_column of all rows of query. Values are stored as JSON in the snapshot."""
+        if self.snapshot is None:
+            return {row[key_column]: row[value_column] for row in client.query(query).result()}
+        key_values = self.snapshot.sync(name, client, query, key_fn=lambda row: row[key_column],
+                                        value_fn=lambda row: json.dumps(row[value_column]))
+        return {key: json.loads(value) for key, value in key_values}
+
+    def invalidate(self, name: str) -> None:
+        if self.snapshot is not None:
+            self.snapshot.invalidate(name)
@@ -1,3 +1,11 @@
+import copy
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable
+
+from cachetools import TTLCache
 from google.cloud import firestore
 from op_tcg.backend.models.cards import OPTcgLanguage, CardCurrency
 from op_tcg.backend.models.input import MetaFormatRegion
@@ -21,6 +29,116 @@ def get_db():
             return None
     return _db
 
+
+# Writes of other instances become visible after this many seconds at the latest
+USER_COLLECTION_CACHE_TTL_SECONDS = float(os.environ.get("USER_COLLECTION_CACHE_TTL_SECONDS", "60"))
+
+
+class UserCollectionCache:
+    """Per user and subcollection cache of Firestore documents.
+
+    A read streams the subcollection once and keeps its documents (doc id -> data) for ttl seconds. Writes of this
+    process update the cached documents in place (write-through), so users see their own changes immediately without
+    another read. Loads which overlap with a write of the same subcollection are not stored, as they might miss it.
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: float = USER_COLLECTION_CACHE_TTL_SECONDS,
+                 timer: Callable[[], float] = time.monotonic):
+        # (user_id, collection) -> {doc_id: data}
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl, timer=timer)
+        # (user_id, collection) -> token of the latest load, removed by writes
+        self._loads: dict[tuple[str, str], object] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_documents(self, user_id: str, collection: str,
+                      load: Callable[[], dict[str, dict]]) -> list[tuple[str, dict]]:
+        """Returns copies of all (doc id, data) of the subcollection ordered by doc id like Firestore streams them"""
+        key = (user_id, collection)
+        with self._lock:
+            documents = self._entries.get(key)
+            if documents is not None:
+                self.hits += 1
+                return self._copy(documents)
+            self.misses += 1
+            token = self._loads[key] = object()
+        documents = load()
+        with self._lock:
+            if self._loads.get(key) is token:
+                del self._loads[key]
+                self._entries[key] = documents
+        return self._copy(documents)
+
+    @staticmethod
+    def _copy(documents: dict[str, dict]) -> list[tuple[str, dict]]:
+        # callers may modify the returned dicts, e.g. add the doc id
+        return [(doc_id, copy.deepcopy(documents[doc_id])) for doc_id in sorted(documents)]
+
+    def _write(self, user_id: str, collection: str, write: Callable[[dict[str, dict]], None]) -> None:
+        key = (user_id, collection)
+        with self._lock:
+            self._loads.pop(key, None)
+            documents = self._entries.get(key)
+            if documents is not None:
+                write(documents)
+
+    def set_document(self, user_id: str, collection: str, doc_id: str, data: dict) -> None:
+        data = _resolve_server_timestamps(data)
+        self._write(user_id, collection, lambda documents: documents.__setitem__(doc_id, data))
+
+    def update_document(self, user_id: str, collection: str, doc_id: str, fields: dict) -> None:
+        fields = _resolve_server_timestamps(fields)
+        self._write(user_id, collection,
+                    lambda documents: documents[doc_id].update(fields) if doc_id in documents else None)
+
+    def delete_document(self, user_id: str, collection: str, doc_id: str) -> None:
+        self._write(user_id, collection, lambda documents: documents.pop(doc_id, None))
+
+    def invalidate_user(self, user_id: str) -> None:
+        with self._lock:
+            for key in [key for key in list(self._entries) + list(self._loads) if key[0] == user_id]:
+                self._entries.pop(key, None)
+                self._loads.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._loads.clear()
+
+    def get_stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+def _resolve_server_timestamps(data: dict) -> dict:
+    """Copy of data for the cache, Firestore sets SERVER_TIMESTAMP fields to (about) the current time"""
+    now = datetime.now(timezone.utc)
+    return {field: now if value is firestore.SERVER_TIMESTAMP else copy.deepcopy(value) for field, value in data.items()}
+
+
+_USER_COLLECTION_CACHE = UserCollectionCache()
+
+
+def get_user_collection_cache_stats() -> dict[str, int]:
+    """Hits and misses of the per user subcollection cache"""
+    return _USER_COLLECTION_CACHE.get_stats()
+
+
+def _get_documents(user_id: str, collection: str) -> list[tuple[str, dict]]:
+    """All (doc id, data) of a subcollection of the user, served from the cache if possible"""
+    db = get_db()
+    if not db:
+        return []
+    collection_ref = db.collection('users').document(user_id).collection(collection)
+    return _USER_COLLECTION_CACHE.get_documents(
+        user_id, collection, lambda: {doc.id: doc.to_dict() for doc in collection_ref.stream()})
+
+
+# Firestore accepts at most 500 writes per WriteBatch, also used as chunk size of the recursive user deletion
+FIRESTORE_MAX_BATCH_WRITES = 500
+
+
 def get_user(user_id: str):
     """
     Fetches user data efficiently.
@@ -60,6 +178,10 @@ def update_user_login(user_info: dict):
     # Use merge=True to update fields without overwriting the entire document
     db.collection('users').document(user_id).set(data, merge=True)
 
+def _watchlist_doc_id(card_id: str, card_version: int, language: OPTcgLanguage) -> str:
+    return f"{card_id}_{card_version}_{language}"
+
+
 def add_to_watchlist(user_id: str, card_id: str, card_version: int = 0, language: OPTcgLanguage = OPTcgLanguage.EN, tags: list = None):
     """
     Adds a card to the user's watchlist efficiently.
@@ -73,25 +195,27 @@ def add_to_watchlist(user_id: str, card_id: str, card_version: int = 0, language
     watchlist_ref = db.collection('users').document(user_id).collection('watchlist')
 
     # Store minimal data, use composite key as document ID for uniqueness
-    doc_id = f"{card_id}_{card_version}_{language}"
-    watchlist_ref.document(doc_id).set({
+    doc_id = _watchlist_doc_id(card_id, card_version, language)
+    data = {
         'card_id': card_id,
         'card_version': card_version,
         'language': language,
         'quantity': 1,
         'tags': tags if tags is not None else [DEFAULT_WATCHLIST_TAG],
         'added_at': firestore.SERVER_TIMESTAMP
-    })
+    }
+    watchlist_ref.document(doc_id).set(data)
+    _USER_COLLECTION_CACHE.set_document(user_id, 'watchlist', doc_id, data)
 
 def update_watchlist_quantity(user_id: str, card_id: str, card_version: int = 0, language: OPTcgLanguage = OPTcgLanguage.EN, quantity: int = 1):
     """Updates the quantity of a card in the user's watchlist."""
     db = get_db()
     if not db:
         return
-    doc_id = f"{card_id}_{card_version}_{language}"
-    db.collection('users').document(user_id).collection('watchlist').document(doc_id).update(
-        {'quantity': max(1, quantity)}
-    )
+    doc_id = _watchlist_doc_id(card_id, card_version, language)
+    fields = {'quantity': max(1, quantity)}
+    db.collection('users').document(user_id).collection('watchlist').document(doc_id).update(fields)
+    _USER_COLLECTION_CACHE.update_document(user_id, 'watchlist', doc_id, fields)
 
 
 def update_watchlist_tags(user_id: str, card_id: str, card_version: int = 0, language: OPTcgLanguage = OPTcgLanguage.EN, tags: list = None):
@@ -99,10 +223,10 @@ def update_watchlist_tags(user_id: str, card_id: str, card_version: int = 0, lan
     db = get_db()
     if not db:
         return
-    doc_id = f"{card_id}_{card_version}_{language}"
-    db.collection('users').document(user_id).collection('watchlist').document(doc_id).update(
-        {'tags': tags or [DEFAULT_WATCHLIST_TAG]}
-    )
+    doc_id = _watchlist_doc_id(card_id, card_version, language)
+    fields = {'tags': tags or [DEFAULT_WATCHLIST_TAG]}
+    db.collection('users').document(user_id).collection('watchlist').document(doc_id).update(fields)
+    _USER_COLLECTION_CACHE.update_document(user_id, 'watchlist', doc_id, fields)
 
 def remove_from_watchlist(user_id: str, card_id: str, card_version: int  = 0, language: OPTcgLanguage = OPTcgLanguage.EN):
     """
@@ -113,22 +237,15 @@ def remove_from_watchlist(user_id: str, card_id: str, card_version: int  = 0, la
         return
 
     watchlist_ref = db.collection('users').document(user_id).collection('watchlist')
-    doc_id = f"{card_id}_{card_version}_{language}"
+    doc_id = _watchlist_doc_id(card_id, card_version, language)
     watchlist_ref.document(doc_id).delete()
+    _USER_COLLECTION_CACHE.delete_document(user_id, 'watchlist', doc_id)
 
 def get_watchlist(user_id: str):
     """
     Retrieves the user's watchlist.
     """
-    db = get_db()
-    if not db:
-        return []
-
-    watchlist_ref = db.collection('users').document(user_id).collection('watchlist')
-    # Use stream() for memory efficiency with large result sets
-    docs = watchlist_ref.stream()
-
-    return [doc.to_dict() for doc in docs]
+    return [data for _, data in _get_documents(user_id, 'watchlist')]
 
 
 def add_to_sealed_watchlist(user_id: str, product_id: str, marketplace: str = "cardmarket", quantity: int = 1):
@@ -137,12 +254,14 @@ def add_to_sealed_watchlist(user_id: str, product_id: str, marketplace: str = "c
     if not db:
         return
     doc_id = f"{product_id}__{marketplace}"
-    db.collection('users').document(user_id).collection('sealed_watchlist').document(doc_id).set({
+    data = {
         'product_id': product_id,
         'marketplace': marketplace,
         'quantity': max(1, quantity),
         'added_at': firestore.SERVER_TIMESTAMP,
-    })
+    }
+    db.collection('users').document(user_id).collection('sealed_watchlist').document(doc_id).set(data)
+    _USER_COLLECTION_CACHE.set_document(user_id, 'sealed_watchlist', doc_id, data)
 
 
 def update_sealed_watchlist_quantity(user_id: str, product_id: str, marketplace: str = "cardmarket", quantity: int = 1):
@@ -151,9 +270,9 @@ def update_sealed_watchlist_quantity(user_id: str, product_id: str, marketplace:
     if not db:
         return
     doc_id = f"{product_id}__{marketplace}"
-    db.collection('users').document(user_id).collection('sealed_watchlist').document(doc_id).update(
-        {'quantity': max(1, quantity)}
-    )
+    fields = {'quantity': max(1, quantity)}
+    db.collection('users').document(user_id).collection('sealed_watchlist').document(doc_id).update(fields)
+    _USER_COLLECTION_CACHE.update_document(user_id, 'sealed_watchlist', doc_id, fields)
 
 
 def remove_from_sealed_watchlist(user_id: str, product_id: str, marketplace: str = "cardmarket"):
@@ -163,15 +282,12 @@ def remove_from_sealed_watchlist(user_id: str, product_id: str, marketplace: str
         return
     doc_id = f"{product_id}__{marketplace}"
     db.collection('users').document(user_id).collection('sealed_watchlist').document(doc_id).delete()
+    _USER_COLLECTION_CACHE.delete_document(user_id, 'sealed_watchlist', doc_id)
 
 
 def get_sealed_watchlist(user_id: str) -> list[dict]:
     """Retrieves the user's sealed product watchlist."""
-    db = get_db()
-    if not db:
-        return []
-    docs = db.collection('users').document(user_id).collection('sealed_watchlist').stream()
-    return [doc.to_dict() for doc in docs]
+    return [data for _, data in _get_documents(user_id, 'sealed_watchlist')]
 
 
 def get_user_settings(user_id: str) -> dict:
@@ -222,6 +338,7 @@ def add_decklist_to_watchlist(user_id: str, leader_id: str, tournament_id: str,
     if decklist_id is not None:
         doc['decklist_id'] = decklist_id
     ref.document(doc_id).set(doc)
+    _USER_COLLECTION_CACHE.set_document(user_id, 'decklist_watchlist', doc_id, doc)
 
 
 def remove_decklist_from_watchlist(user_id: str, leader_id: str, tournament_id: str, player_id: str):
@@ -231,6 +348,7 @@ def remove_decklist_from_watchlist(user_id: str, leader_id: str, tournament_id:
         return
     doc_id = _decklist_doc_id(leader_id, tournament_id, player_id)
     db.collection('users').document(user_id).collection('decklist_watchlist').document(doc_id).delete()
+    _USER_COLLECTION_CACHE.delete_document(user_id, 'decklist_watchlist', doc_id)
 
 
 def update_decklist_watchlist_tags(user_id: str, leader_id: str, tournament_id: str, player_id: str, tags: list = None):
@@ -239,23 +357,14 @@ def update_decklist_watchlist_tags(user_id: str, leader_id: str, tournament_id:
     if not db:
         return
     doc_id = _decklist_doc_id(leader_id, tournament_id, player_id)
-    db.collection('users').document(user_id).collection('decklist_watchlist').document(doc_id).update(
-        {'tags': tags or [DEFAULT_WATCHLIST_TAG]}
-    )
+    fields = {'tags': tags or [DEFAULT_WATCHLIST_TAG]}
+    db.collection('users').document(user_id).collection('decklist_watchlist').document(doc_id).update(fields)
+    _USER_COLLECTION_CACHE.update_document(user_id, 'decklist_watchlist', doc_id, fields)
 
 
 def get_decklist_watchlist(user_id: str) -> list[dict]:
     """Retrieves the user's decklist watchlist."""
-    db = get_db()
-    if not db:
-        return []
-    ref = db.collection('users').document(user_id).collection('decklist_watchlist')
-    result = []
-    for doc in ref.stream():
-        d = doc.to_dict()
-        d['id'] = doc.id
-        result.append(d)
-    return result
+    return [{**data, 'id': doc_id} for doc_id, data in _get_documents(user_id, 'decklist_watchlist')]
 
 
 def create_custom_decklist(user_id: str, name: str, leader_id: str, decklist: dict,
@@ -264,7 +373,7 @@ def create_custom_decklist(user_id: str, name: str, leader_id: str, decklist: di
     db = get_db()
     if not db:
         return ""
-    _, doc_ref = db.collection('users').document(user_id).collection('custom_decklists').add({
+    data = {
         'name': name,
         'leader_id': leader_id,
         'decklist': decklist,
@@ -272,21 +381,15 @@ def create_custom_decklist(user_id: str, name: str, leader_id: str, decklist: di
         'tags': tags if tags is not None else [DEFAULT_DECKLIST_WATCHLIST_TAG],
         'created_at': firestore.SERVER_TIMESTAMP,
         'updated_at': firestore.SERVER_TIMESTAMP,
-    })
+    }
+    _, doc_ref = db.collection('users').document(user_id).collection('custom_decklists').add(data)
+    _USER_COLLECTION_CACHE.set_document(user_id, 'custom_decklists', doc_ref.id, data)
     return doc_ref.id
 
 
 def get_custom_decklists(user_id: str) -> list[dict]:
     """Returns all custom decklists for a user; each dict includes 'id' (Firestore doc ID)."""
-    db = get_db()
-    if not db:
-        return []
-    result = []
-    for doc in db.collection('users').document(user_id).collection('custom_decklists').stream():
-        d = doc.to_dict()
-        d['id'] = doc.id
-        result.append(d)
-    return result
+    return [{**data, 'id': doc_id} for doc_id, data in _get_documents(user_id, 'custom_decklists')]
 
 
 def update_custom_decklist(user_id: str, custom_id: str, name: str = None, leader_id: str = None,
@@ -301,6 +404,7 @@ def update_custom_decklist(user_id: str, custom_id: str, name: str = None, leade
         if val is not None:
             data[field] = val
     db.collection('users').document(user_id).collection('custom_decklists').document(custom_id).update(data)
+    _USER_COLLECTION_CACHE.update_document(user_id, 'custom_decklists', custom_id, data)
 
 
 def delete_custom_decklist(user_id: str, custom_id: str):
@@ -309,15 +413,14 @@ def delete_custom_decklist(user_id: str, custom_id: str):
     if not db:
         return
     db.collection('users').document(user_id).collection('custom_decklists').document(custom_id).delete()
+    _USER_COLLECTION_CACHE.delete_document(user_id, 'custom_decklists', custom_id)
 
 
 def delete_user(user_id: str):
-    """Deletes a user's watchlist subcollection and user document."""
+    """Deletes the user document with all its subcollections."""
     db = get_db()
     if not db:
         return
-    # Delete all watchlist docs first (subcollections must be removed manually)
-    watchlist_ref = db.collection('users').document(user_id).collection('watchlist')
-    for doc in watchlist_ref.stream():
-        doc.reference.delete()
-    db.collection('users').document(user_id).delete()
+    # deletes the documents of all subcollections in chunks with a BulkWriter instead of one RPC per document
+    db.recursive_delete(db.collection('users').document(user_id), chunk_size=FIRESTORE_MAX_BATCH_WRITES)
+    _USER_COLLECTION_CACHE.invalidate_user(user_id)
@@ -1,71 +1,173 @@
+from dataclasses import dataclass
+from datetime import date
 from uuid import uuid4
 
+import numpy as np
 import pandas as pd
 
 from op_tcg.backend.models.matches import MatchResult
-from op_tcg.backend.models.leader import LeaderElo
+from op_tcg.backend.models.leader import LeaderElo, LeaderEloCheckpoint
+
+
+def get_k_factor(leader_elo: int) -> int:
+    k_factor = 32
+    if leader_elo >= 3000:
+        k_factor = 5
+    # ranges of FIDE
+    elif leader_elo >= 2400:
+        k_factor = 10
+    elif leader_elo >= 1500:
+        k_factor = 20
+    return k_factor
+
+
+@dataclass(frozen=True)
+class EloMatchArrays:
+    """Compact, integer encoded representation of matches used by the elo engine.
+
+    Rows are sorted by (match_timestamp, id), so that every match (incl. its reverse match)
+    forms a contiguous group which is described by ``group_offsets``.
+    """
+    leader_ids: list[str]
+    leader_idx: np.ndarray
+    opponent_idx: np.ndarray
+    result: np.ndarray
+    group_offsets: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.leader_idx)
+
+
+def _sorted_string_codes(values: pd.Series) -> np.ndarray:
+    """Integer codes which preserve the lexicographic order of the string values"""
+    # factorizing without sort and ranking the fixed width uniques is much faster than sorting python strings
+    codes, uniques = pd.factorize(values)
+    ranks = np.empty(len(uniques), dtype=np.int64)
+    ranks[np.argsort(np.asarray(uniques, dtype=str), kind="stable")] = np.arange(len(uniques))
+    return ranks[codes]
+
+
+def encode_matches(df_matches: pd.DataFrame, leader_ids: list[str] | None = None) -> EloMatchArrays:
+    """
+    Encodes a matches dataframe into integer arrays.
+
+    :param df_matches: pd.DataFrame - Matches with at least the columns id, leader_id, opponent_id, result and match_timestamp
+    :param leader_ids: list[str] - Optional leader id vocabulary. Leader ids not included are appended in order of appearance.
+    :return: EloMatchArrays - Encoded matches sorted by (match_timestamp, id)
+    """
+    vocabulary = pd.Index(leader_ids or [], dtype=object)
+    new_leader_ids = pd.Index(df_matches.leader_id.unique(), dtype=object)
+    vocabulary = vocabulary.append(new_leader_ids[~new_leader_ids.isin(vocabulary)])
+
+    leader_idx = vocabulary.get_indexer(df_matches.leader_id)
+    opponent_idx = vocabulary.get_indexer(df_matches.opponent_id)
+    if (opponent_idx < 0).any():
+        unknown_ids = df_matches.opponent_id[opponent_idx < 0].unique().tolist()
+        raise KeyError(f"Opponent ids {unknown_ids} do not occur as leader id")
+
+    # same ordering as iterating over sorted timestamps and grouping by match id
+    timestamp_codes, _ = pd.factorize(df_matches.match_timestamp, sort=True)
+    match_id_codes = _sorted_string_codes(df_matches.id)
+    order = np.lexsort((match_id_codes, timestamp_codes))
+    timestamp_codes = timestamp_codes[order]
+    match_id_codes = match_id_codes[order]
+
+    is_group_start = np.ones(len(order), dtype=bool)
+    is_group_start[1:] = (timestamp_codes[1:] != timestamp_codes[:-1]) | (match_id_codes[1:] != match_id_codes[:-1])
+    group_offsets = np.append(np.flatnonzero(is_group_start), len(order))
+
+    return EloMatchArrays(
+        leader_ids=vocabulary.tolist(),
+        leader_idx=leader_idx[order].astype(np.int32),
+        opponent_idx=opponent_idx[order].astype(np.int32),
+        result=df_matches.result.to_numpy(dtype=np.int8)[order],
+        group_offsets=group_offsets.astype(np.int64),
+    )
+
+
+def calculate_elo_ratings_arrays(match_arrays: EloMatchArrays, elo_ratings: np.ndarray | None = None) -> np.ndarray:
+    """
+    Folds all encoded matches into the elo ratings.
+
+    All rows of one match are calculated with the ratings before the match, their changes are summed up
+    (mirror matches) and applied afterward. As changes of matches at the same timestamp are applied one after another,
+    this is equivalent to batching all matches of one match_timestamp.
+
+    :param match_arrays: EloMatchArrays - Encoded matches
+    :param elo_ratings: np.ndarray - Start ratings aligned with match_arrays.leader_ids. Defaults to 1000 for every leader.
+    :return: np.ndarray - Final elo rating per leader
+    """
+    if elo_ratings is None:
+        elo_ratings = np.full(len(match_arrays.leader_ids), 1000, dtype=np.int64)
+    # python scalars keep the arithmetic identical to calculate_new_elo and are faster than numpy scalars in this loop
+    elos: list[int] = elo_ratings.tolist()
+    leader_idx: list[int] = match_arrays.leader_idx.tolist()
+    opponent_idx: list[int] = match_arrays.opponent_idx.tolist()
+    results: list[int] = match_arrays.result.tolist()
+    group_offsets: list[int] = match_arrays.group_offsets.tolist()
+
+    for group_start, group_end in zip(group_offsets[:-1], group_offsets[1:]):
+        if group_end - group_start == 2 and leader_idx[group_start] != leader_idx[group_start + 1]:
+            # common case: match and reverse match of two different leaders
+            l1, l2 = leader_idx[group_start], leader_idx[group_start + 1]
+            l1_elo, l2_elo = elos[l1], elos[l2]
+            l1_new_elo = calculate_new_elo(l1_elo, elos[opponent_idx[group_start]], results[group_start],
+                                           k_factor=get_k_factor(l1_elo))
+            l2_new_elo = calculate_new_elo(l2_elo, elos[opponent_idx[group_start + 1]], results[group_start + 1],
+                                           k_factor=get_k_factor(l2_elo))
+            elos[l1] = l1_new_elo
+            elos[l2] = l2_new_elo
+            continue
+
+        # in case of mirror match, leader elo change should not be overwritten, but added
+        elo_changes: dict[int, int] = {}
+        for i in range(group_start, group_end):
+            leader_elo = elos[leader_idx[i]]
+            new_elo = calculate_new_elo(leader_elo, elos[opponent_idx[i]], results[i], k_factor=get_k_factor(leader_elo))
+            elo_changes[leader_idx[i]] = elo_changes.get(leader_idx[i], 0) + new_elo - leader_elo
+        for i, elo_change in elo_changes.items():
+            elos[i] += elo_change
+
+    return np.array(elos, dtype=np.int64)
 
 
 class EloCreator:
     leader_id2elo: dict[str, int]
 
-    def __init__(self, df_all_matches: pd.DataFrame, only_official: bool | None = None):
+    def __init__(self, df_all_matches: pd.DataFrame, only_official: bool | None = None,
+                 leader_id2elo: dict[str, int] | None = None, start_date: date | None = None):
+        """
+        :param df_all_matches: pd.DataFrame - Matches of a single meta format
+        :param only_official: bool - Whether df_all_matches contains only official matches. Derived from the data if not provided.
+        :param leader_id2elo: dict[str, int] - Optional start ratings, e.g. of a checkpoint. New leaders start with 1000.
+        :param start_date: date - Optional start date of the elo calculation, e.g. of a checkpoint
+        """
         self.df_all_matches = df_all_matches
-        self.leader_id2elo = {leader_id: 1000 for leader_id in df_all_matches.leader_id.unique()}
-        self.start_date = df_all_matches.sort_values("match_timestamp", ascending=True).iloc[0].match_timestamp.date()
-        self.end_date = df_all_matches.sort_values("match_timestamp", ascending=False).iloc[0].match_timestamp.date()
+        self.leader_id2elo = dict(leader_id2elo or {})
+        for leader_id in df_all_matches.leader_id.unique():
+            self.leader_id2elo.setdefault(leader_id, 1000)
+        self.start_date = start_date or df_all_matches.match_timestamp.min().date()
+        self.end_date = df_all_matches.match_timestamp.max().date()
+        self.last_match_timestamp = df_all_matches.match_timestamp.max()
+        self.last_create_timestamp = df_all_matches.create_timestamp.max() if "create_timestamp" in df_all_matches else None
         self.only_official = only_official if only_official is not None else len(df_all_matches.query("official != True")) == 0
         self.meta_format = df_all_matches.sort_values("match_timestamp", ascending=False).iloc[0].meta_format
 
     def get_k_factor(self, leader_elo) -> int:
-        k_factor = 32
-        if leader_elo >= 3000:
-            k_factor = 5
-        # ranges of FIDE
-        elif leader_elo >= 2400:
-            k_factor = 10
-        elif leader_elo >= 1500:
-            k_factor = 20
-        return k_factor
+        return get_k_factor(leader_elo)
 
-    def calculate_elo_ratings(self):
-        match_timestamps = self.df_all_matches.sort_values("match_timestamp", ascending=True).match_timestamp.unique().tolist()
-        df_all_matches = self.df_all_matches.set_index('match_timestamp')
-        for match_timestamp in match_timestamps:
-            saka_elo_change = []
-            leader_id2elo_change: dict[str, int] = {lid: 0 for lid in self.leader_id2elo.keys()}
-            df_matches_at_same_time = df_all_matches.loc[match_timestamp]
-
-            def add_elo_change_of_match(df_match) -> None:
-                leader_id2elo_change_match: dict[str, int] = {lid: 0 for lid in self.leader_id2elo.keys()}
-                for i, match_data_row in df_match.iterrows():
-                    # include dynamic elo change as otherwise high elo leader penalty is too high
-                    leader_elo = self.leader_id2elo[match_data_row.leader_id] + leader_id2elo_change[
-                        match_data_row.leader_id]
-                    opponent_elo = self.leader_id2elo[match_data_row.opponent_id] + leader_id2elo_change[
-                        match_data_row.opponent_id]
-                    k_factor = self.get_k_factor(leader_elo)
-                    new_elo = calculate_new_elo(leader_elo,
-                                                opponent_elo,
-                                                match_data_row.result,
-                                                k_factor=k_factor)
-
-                    # in case of mirror match, leader elo change should not be overwritten, but added
-                    leader_id2elo_change_match[match_data_row.leader_id] += (new_elo - leader_elo)
-
-                for leader_id, elo_change in leader_id2elo_change_match.items():
-                    if elo_change != 0:
-                        if leader_id == "OP05-041":
-                            saka_elo_change.append(f"{self.leader_id2elo[match_data_row.leader_id] + leader_id2elo_change[leader_id]} | {elo_change}")
-                        leader_id2elo_change[leader_id] += elo_change
-
-            # apply elo change for each match
-            df_matches_at_same_time.groupby("id").apply(add_elo_change_of_match)
-
-            for leader_id, elo_change in leader_id2elo_change.items():
-                self.leader_id2elo[leader_id] = self.leader_id2elo[leader_id] + elo_change
-        print("Elo calculation completed")
+    def to_match_arrays(self) -> tuple[EloMatchArrays, np.ndarray]:
+        """Returns the encoded matches and the aligned start ratings, i.e. the arguments of calculate_elo_ratings_arrays"""
+        match_arrays = encode_matches(self.df_all_matches, leader_ids=list(self.leader_id2elo.keys()))
+        elo_ratings = np.array([self.leader_id2elo.get(lid, 1000) for lid in match_arrays.leader_ids], dtype=np.int64)
+        return match_arrays, elo_ratings
+
+    def set_elo_ratings(self, leader_ids: list[str], elo_ratings: np.ndarray):
+        self.leader_id2elo = dict(zip(leader_ids, elo_ratings.tolist()))
 
+    def calculate_elo_ratings(self):
+        match_arrays, elo_ratings = self.to_match_arrays()
+        self.set_elo_ratings(match_arrays.leader_ids, calculate_elo_ratings_arrays(match_arrays, elo_ratings))
 
     def to_bq_leader_elos(self) -> list[LeaderElo]:
         leader_elos: list[LeaderElo] = []
@@ -81,6 +183,30 @@ class EloCreator:
         return leader_elos
 
 
+    def to_bq_leader_elo_checkpoints(self) -> list[LeaderEloCheckpoint]:
+        return [LeaderEloCheckpoint(
+            leader_id=leader_id,
+            elo=elo,
+            only_official=self.only_official,
+            meta_format=self.meta_format,
+            start_date=self.start_date,
+            last_match_timestamp=self.last_match_timestamp,
+            last_create_timestamp=self.last_create_timestamp
+        ) for leader_id, elo in self.leader_id2elo.items()]
+
+
+def checkpoints2bq_leader_elos(checkpoints: list[LeaderEloCheckpoint]) -> list[LeaderElo]:
+    """Creates the leader elo rows of a checkpoint which did not receive any new matches"""
+    return [LeaderElo(
+        leader_id=checkpoint.leader_id,
+        elo=checkpoint.elo,
+        only_official=checkpoint.only_official,
+        meta_format=checkpoint.meta_format,
+        start_date=checkpoint.start_date,
+        end_date=checkpoint.last_match_timestamp.date()
+    ) for checkpoint in checkpoints]
+
+
 def calculate_new_elo(current_elo: int, opponent_elo: int, result: MatchResult, k_factor=32) -> int:
     """
     Calculate the new Elo rating for a player based on the current rating,
@@ -1,23 +1,31 @@
-import json
+import base64
+import hashlib
 import logging
 import sys
 import tempfile
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Iterator
 
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
 from google.api_core.exceptions import NotFound
 
-from op_tcg.backend.elo import EloCreator
+from op_tcg.backend.elo import EloCreator, checkpoints2bq_leader_elos, calculate_elo_ratings_arrays
 from op_tcg.backend.etl.base import AbstractETLJob, E, T
-from op_tcg.backend.etl.load import get_or_create_table, bq_insert_rows, upload2gcp_storage
-from op_tcg.backend.etl.transform import BQMatchCreator
+from op_tcg.backend.etl.load import get_or_create_table, bq_insert_rows, upload_bytes2gcp_storage, \
+    write_rows2parquet, bq_load_parquet, bq_merge_rows
+from op_tcg.backend.etl.transform import iter_match_rows
 from op_tcg.backend.models.bq_enums import BQDataset
-from op_tcg.backend.models.input import AllLeaderMetaDocs, MetaFormat, LimitlessLeaderMetaDoc
+from op_tcg.backend.models.input import AllLeaderMetaDocs, MetaFormat
 from op_tcg.backend.models.matches import BQMatches, Match
-from op_tcg.backend.models.leader import LeaderElo
+from op_tcg.backend.models.leader import LeaderElo, LeaderEloCheckpoint
 from op_tcg.backend.models.cards import Card
-from op_tcg.backend.etl.extract import read_json_files
+from op_tcg.backend.utils.utils import HostRateLimiter
+from op_tcg.backend.etl.extract import index_json_files, validate_dataframe, bq_query2dataframe, \
+    dataframe2records
 from pathlib import Path
 from google.cloud import bigquery, storage
 from dotenv import load_dotenv
@@ -26,116 +34,236 @@ load_dotenv()
 logging.basicConfig(stream=sys.stdout, level=logging.INFO)
 _logger = logging.getLogger("etl_classes")
 
-class LocalMatchesToBigQueryEtlJob(AbstractETLJob[AllLeaderMetaDocs, BQMatches]):
-    def __init__(self, data_dir: Path, meta_formats: list[MetaFormat] | None = None, official: bool=True):
+class LocalMatchesToBigQueryEtlJob(AbstractETLJob[dict[MetaFormat, dict[str, Path]], Iterator[dict[str, Any]]]):
+    def __init__(self, data_dir: Path, meta_formats: list[MetaFormat] | None = None, official: bool=True,
+                 batch_size: int = 100_000):
+        """
+        :param data_dir: Path - Directory with {leader_id}_{meta_format}.json files of MatchesPipeline
+        :param meta_formats: list[MetaFormat] - Meta formats which are replaced in BQ
+        :param official: bool - Whether the matches are official
+        :param batch_size: int - Number of match rows per Arrow record batch
+        """
         self.data_dir = data_dir
         self.meta_formats = meta_formats
         self.bq_client = bigquery.Client()
         self.official = official
+        self.batch_size = batch_size
 
-    def validate(self, extracted_data: AllLeaderMetaDocs) -> bool:
+    def validate(self, extracted_data: dict[MetaFormat, dict[str, Path]]) -> bool:
         return True
 
-    def extract(self) -> AllLeaderMetaDocs:
-        all_matches: AllLeaderMetaDocs = read_json_files(self.data_dir)
-        # include only the relevant meta formats
-        if self.meta_formats:
-            filtered_docs: list[LimitlessLeaderMetaDoc] = []
-            for doc in all_matches.documents:
-                if doc.meta_format in self.meta_formats:
-                    filtered_docs.append(doc)
-            all_matches.documents = filtered_docs
-        meta_formats_in_data = list(set([doc.meta_format for doc in all_matches.documents]))
-        assert all(require_meta_format in meta_formats_in_data for require_meta_format in self.meta_formats), "Not all required meta formats exist in the source data"
-        return all_matches
-
-    def transform(self, all_local_matches: AllLeaderMetaDocs) -> BQMatches:
-        bq_match_creator = BQMatchCreator(all_local_matches, official=self.official)
-        return bq_match_creator.transform2BQMatches()
-
-    def load(self, transformed_data: BQMatches) -> None:
+    def extract(self) -> dict[MetaFormat, dict[str, Path]]:
+        """Returns the files of the relevant meta formats, which are only parsed during transform"""
+        meta_format2leader_id2file_path = index_json_files(self.data_dir, meta_formats=self.meta_formats)
+        assert all(require_meta_format in meta_format2leader_id2file_path for require_meta_format in self.meta_formats), "Not all required meta formats exist in the source data"
+        return meta_format2leader_id2file_path
+
+    def transform(self, meta_format2leader_id2file_path: dict[MetaFormat, dict[str, Path]]) -> Iterator[dict[str, Any]]:
+        return iter_match_rows(meta_format2leader_id2file_path, official=self.official)
+
+    def load(self, match_rows: Iterator[dict[str, Any]]) -> None:
         table = get_or_create_table(model=Match, dataset_id=BQDataset.MATCHES, client=self.bq_client)
-        df = transformed_data.to_dataframe()
-        official_condition = "NOT official" if self.official else "official"
-        if len(df) > 0:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = Path(tmp_dir) / "matches.parquet"
+            num_rows = write_rows2parquet(match_rows, file_path, bq_schema=table.schema, batch_size=self.batch_size)
+            if num_rows == 0:
+                return
+            official_condition = "NOT official" if self.official else "official"
             # delete existing official data in selected meta by only keeping other meta formats
             self.bq_client.query(f"""
             CREATE OR REPLACE TABLE {table.dataset_id}.{table.table_id} AS
             SELECT *
             FROM {table.dataset_id}.{table.table_id}
             WHERE (meta_format not in ('{"','".join(self.meta_formats)}')) OR {official_condition};
-            """)
-        # upload data of meta_formats to BQ
-        self.bq_client.load_table_from_dataframe(df, table)
-        _logger.info(f"Loading to BQ table {table.dataset_id}.{table.table_id} succeeded")
+            """).result()
+            # upload data of meta_formats to BQ
+            bq_load_parquet(file_path, table, client=self.bq_client)
+        self.delete_elo_checkpoints()
+        _logger.info(f"Loading {num_rows} matches to BQ table {table.dataset_id}.{table.table_id} succeeded")
 
+    def delete_elo_checkpoints(self) -> None:
+        """The replaced matches get new match and create timestamps, so the elo checkpoints of the replaced meta
+        formats do not match the table anymore. Without checkpoint the next elo update calculates them from scratch."""
+        checkpoint_table = get_or_create_table(LeaderEloCheckpoint, client=self.bq_client)
+        in_meta_format = "('" + "','".join(self.meta_formats) + "')"
+        self.bq_client.query(
+            f"DELETE FROM `{checkpoint_table.full_table_id.replace(':', '.')}` WHERE meta_format in {in_meta_format};").result()
 
-class EloUpdateToBigQueryEtlJob(AbstractETLJob[BQMatches, list[LeaderElo]]):
-    def __init__(self, meta_formats: list[MetaFormat], matches_csv_file_path: Path | str | None = None):
+
+class EloUpdateToBigQueryEtlJob(AbstractETLJob[pd.DataFrame, list[LeaderElo]]):
+    def __init__(self, meta_formats: list[MetaFormat], matches_csv_file_path: Path | str | None = None,
+                 incremental: bool = False, workers: int = 1):
+        """
+        :param meta_formats: list[MetaFormat] - Meta formats for which the elo ratings are calculated
+        :param matches_csv_file_path: Path - Optional matches.csv used instead of the BQ matches table
+        :param incremental: bool - If True, only matches created after the last LeaderEloCheckpoint are folded into
+            the stored ratings. Requires matches to arrive in match_timestamp order.
+        :param workers: int - Number of processes which calculate the (meta_format, only_official) partitions in parallel
+        """
         self.bq_client = bigquery.Client(location="europe-west1")
         self.meta_formats = meta_formats
         self.in_meta_format = "('" + "','".join(self.meta_formats) + "')"
         self.matches_csv_file_path = matches_csv_file_path
+        self.incremental = incremental
+        self.workers = workers
+        # (meta_format, only_official) -> checkpoint rows of all leaders
+        self.checkpoints: dict[tuple[MetaFormat, bool], list[LeaderEloCheckpoint]] = {}
+        self.new_checkpoints: list[LeaderEloCheckpoint] = []
 
     def validate(self, extracted_data: AllLeaderMetaDocs) -> bool:
         return True
 
-    def extract(self) -> BQMatches:
+    def extract_checkpoints(self) -> dict[tuple[MetaFormat, bool], list[LeaderEloCheckpoint]]:
+        table = get_or_create_table(LeaderEloCheckpoint, client=self.bq_client)
+        query = f"SELECT * FROM `{table.full_table_id.replace(':', '.')}` WHERE meta_format in {self.in_meta_format}"
+        _logger.info(f"Query BQ with '{query}'")
+        checkpoints: dict[tuple[MetaFormat, bool], list[LeaderEloCheckpoint]] = {}
+        for row in self.bq_client.query_and_wait(query):
+            checkpoint = LeaderEloCheckpoint(**dict(row.items()))
+            # checkpoints without watermark can not be continued, their partition is calculated from scratch
+            if checkpoint.last_create_timestamp is None:
+                continue
+            checkpoints.setdefault((checkpoint.meta_format, checkpoint.only_official), []).append(checkpoint)
+        return checkpoints
+
+    def get_meta_format2last_create_timestamp(self) -> dict[MetaFormat, datetime]:
+        """Watermark of a meta format: all matches created until then are included in the elo ratings.
+        The create_timestamp is used instead of the match_timestamp, because matches which share the match_timestamp
+        of the watermark can be loaded in a later run."""
+        meta_format2last_create_timestamp = {}
+        for meta_format in self.meta_formats:
+            partition_checkpoints = [self.checkpoints.get((meta_format, only_official)) for only_official in [True, False]]
+            # a meta without checkpoint for both partitions is calculated from scratch
+            if all(partition_checkpoints):
+                meta_format2last_create_timestamp[meta_format] = min(
+                    checkpoints[0].last_create_timestamp for checkpoints in partition_checkpoints)
+        return meta_format2last_create_timestamp
+
+    def get_matches_query(self) -> str:
+        meta_conditions = []
+        meta_format2last_create_timestamp = self.get_meta_format2last_create_timestamp()
+        for meta_format in self.meta_formats:
+            if meta_format in meta_format2last_create_timestamp:
+                meta_conditions.append(f"(meta_format = '{meta_format}' AND create_timestamp > "
+                                       f"TIMESTAMP('{meta_format2last_create_timestamp[meta_format].isoformat()}'))")
+            else:
+                meta_conditions.append(f"meta_format = '{meta_format}'")
+        return f"SELECT * FROM {BQDataset.MATCHES}.{Match.__tablename__} WHERE {' OR '.join(meta_conditions)}"
+
+    def extract(self) -> pd.DataFrame:
+        """Returns all matches as one DataFrame, validated with the pandera schema of Match"""
+        if self.incremental:
+            self.checkpoints = self.extract_checkpoints()
         if self.matches_csv_file_path:
-            df = pd.read_csv(self.matches_csv_file_path)
-        else:
-            query = f"SELECT * FROM {BQDataset.MATCHES}.{Match.__tablename__} WHERE meta_format in {self.in_meta_format}"
-            _logger.info(f"Query BQ with '{query}'")
-            df = self.bq_client.query_and_wait(query).to_dataframe()
-            _logger.info(f"Extracted {len(df)} rows from bq {BQDataset.MATCHES}.{Match.__tablename__}")
-        matches: list[Match] = []
-        for i, df_row in df.iterrows():
-            matches.append(Match(**df_row.to_dict()))
-        return BQMatches(matches=matches)
-
-
-    def transform(self, all_matches: BQMatches) -> list[LeaderElo]:
-        df_all_matches = all_matches.to_dataframe()
-        elo_ratings: list[LeaderElo] = []
-        def calculate_all_elo_ratings(df_matches):
-            meta_format = df_matches.meta_format.unique().tolist()
+            return validate_dataframe(pd.read_csv(self.matches_csv_file_path), Match)
+        query = self.get_matches_query()
+        _logger.info(f"Query BQ with '{query}'")
+        df = bq_query2dataframe(query, Match, client=self.bq_client)
+        _logger.info(f"Extracted {len(df)} rows from bq {BQDataset.MATCHES}.{Match.__tablename__}")
+        return df
+
+    def create_elo_creator(self, df_matches: pd.DataFrame | None, meta_format: MetaFormat, only_official: bool) -> EloCreator | None:
+        """Creates the elo creator of a partition, starting at its checkpoint if one exists. None if nothing is to do."""
+        checkpoints = self.checkpoints.get((meta_format, only_official))
+        if df_matches is None:
+            if checkpoints:
+                return None
+            raise IndexError(f"No matches available for meta {meta_format}")
+        if checkpoints:
+            last_create_timestamp = pd.Timestamp(checkpoints[0].last_create_timestamp)
+            create_timestamps = pd.to_datetime(df_matches.create_timestamp, utc=last_create_timestamp.tzinfo is not None)
+            df_matches = df_matches[create_timestamps > last_create_timestamp]
+            if len(df_matches) == 0:
+                return None
+            return EloCreator(df_matches, only_official=only_official,
+                              leader_id2elo={checkpoint.leader_id: checkpoint.elo for checkpoint in checkpoints},
+                              start_date=checkpoints[0].start_date)
+        return EloCreator(df_matches, only_official=only_official)
+
+    def transform(self, all_matches: pd.DataFrame | BQMatches) -> list[LeaderElo]:
+        df_all_matches = all_matches.to_dataframe() if isinstance(all_matches, BQMatches) else all_matches
+        # partitions in deterministic order, either with elo creator or with unchanged checkpoint
+        partitions: list[tuple[EloCreator | None, list[LeaderEloCheckpoint]]] = []
+        meta_formats_in_data = df_all_matches.meta_format.unique().tolist() if len(df_all_matches) > 0 else []
+        # metas with checkpoint but without new matches still need their elo rows
+        for meta_format in sorted(set(meta_formats_in_data) | {meta for meta, _ in self.checkpoints}):
+            df_matches = df_all_matches[df_all_matches.meta_format == meta_format] if meta_format in meta_formats_in_data else None
             for only_official in [True, False]:
-                _logger.info(f"Calculate Elo for meta {meta_format} and only_official {only_official}")
+                _logger.info(f"Prepare Elo for meta {meta_format} and only_official {only_official}")
+                df_partition = df_matches.query("official") if only_official and df_matches is not None else df_matches
                 try:
-                    if only_official:
-                        elo_creator = EloCreator(df_matches.query("official"), only_official=True)
-                    else:
-                        elo_creator = EloCreator(df_matches, only_official=False)
+                    elo_creator = self.create_elo_creator(df_partition, meta_format, only_official)
                 except IndexError as e:
                     logging.error(f"Elo creation failed for {self.meta_formats} and only_official {only_official}")
                     continue
-                elo_creator.calculate_elo_ratings()
+                partitions.append((elo_creator, self.checkpoints.get((meta_format, only_official), [])))
+
+        self.calculate_elo_ratings([elo_creator for elo_creator, _ in partitions if elo_creator is not None])
+
+        elo_ratings: list[LeaderElo] = []
+        self.new_checkpoints = []
+        for elo_creator, checkpoints in partitions:
+            if elo_creator is None:
+                # no new matches since the checkpoint, ratings stay the same
+                elo_ratings.extend(checkpoints2bq_leader_elos(checkpoints))
+                self.new_checkpoints.extend(checkpoints)
+            else:
                 elo_ratings.extend(elo_creator.to_bq_leader_elos())
-        if len(df_all_matches) > 0:
-            df_all_matches.groupby("meta_format").apply(calculate_all_elo_ratings)
+                self.new_checkpoints.extend(elo_creator.to_bq_leader_elo_checkpoints())
         return elo_ratings
 
-    def load(self, transformed_data: list[LeaderElo]) -> None:
-        # ensure bq table exists
-        table = get_or_create_table(LeaderElo)
-        leader_ids_to_update = list(set([d.leader_id for d in transformed_data]))
-        in_leader_ids_to_update = "('" + "','".join(leader_ids_to_update) + "')"
+    def calculate_elo_ratings(self, elo_creators: list[EloCreator]) -> None:
+        if self.workers <= 1 or len(elo_creators) <= 1:
+            for elo_creator in elo_creators:
+                _logger.info(f"Calculate Elo for meta {elo_creator.meta_format} and only_official {elo_creator.only_official}")
+                elo_creator.calculate_elo_ratings()
+            return
 
-        # delete all rows of meta
-        self.bq_client.query(
-            f"DELETE FROM `{table.full_table_id.split(':')[1]}` WHERE meta_format in {self.in_meta_format} and leader_id in {in_leader_ids_to_update};").result()
-        # insert all new rows
-        rows_to_insert = [json.loads(bq_leader_elo.model_dump_json()) for bq_leader_elo in transformed_data]
-        bq_insert_rows(rows_to_insert, table=table, client=self.bq_client)
+        _logger.info(f"Calculate Elo of {len(elo_creators)} partitions with {self.workers} workers")
+        # only the compact integer arrays are pickled to the workers, not the match dataframes
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(elo_creators))) as executor:
+            futures = []
+            for elo_creator in elo_creators:
+                match_arrays, elo_ratings = elo_creator.to_match_arrays()
+                futures.append((match_arrays.leader_ids, executor.submit(calculate_elo_ratings_arrays, match_arrays, elo_ratings)))
+            for elo_creator, (leader_ids, future) in zip(elo_creators, futures):
+                elo_creator.set_elo_ratings(leader_ids, future.result())
+
+    def load(self, transformed_data: list[LeaderElo]) -> None:
+        """
+        Merges the elo ratings and checkpoints into BQ with one load job and one MERGE each.
+        All rows of the calculated meta formats, which are not part of the new data, are deleted.
+        """
+        table = get_or_create_table(LeaderElo, client=self.bq_client)
+        bq_merge_rows(transformed_data, table=table, client=self.bq_client,
+                      not_matched_by_source_condition=self._in_meta_formats_condition(transformed_data))
         _logger.info(f"Loading {len(transformed_data)} rows with meta {self.meta_formats} succeeded")
 
+        # store rating state for the next incremental run
+        if self.new_checkpoints:
+            checkpoint_table = get_or_create_table(LeaderEloCheckpoint, client=self.bq_client)
+            bq_merge_rows(self.new_checkpoints, table=checkpoint_table, client=self.bq_client,
+                          not_matched_by_source_condition=self._in_meta_formats_condition(self.new_checkpoints))
+            _logger.info(f"Stored {len(self.new_checkpoints)} elo checkpoints with meta {self.meta_formats}")
+
+    @staticmethod
+    def _in_meta_formats_condition(rows: list[LeaderElo | LeaderEloCheckpoint]) -> str:
+        meta_formats = sorted({row.meta_format for row in rows})
+        return "target.meta_format IN ('" + "','".join(meta_formats) + "')"
+
 
 class CardImageUpdateToGCPEtlJob(AbstractETLJob[list[Card], list[Card]]):
-    def __init__(self, meta_formats: list[MetaFormat] | None = None):
-        self.bq_client = bigquery.Client(location="europe-west1")
-        self.storage_client = storage.Client()
+    card_image_prefix = "card/images/"
+
+    def __init__(self, meta_formats: list[MetaFormat] | None = None, max_workers: int = 8,
+                 requests_per_second_per_host: float = 4.0, bq_client: bigquery.Client | None = None,
+                 storage_client: storage.Client | None = None):
+        self.bq_client = bq_client or bigquery.Client(location="europe-west1")
+        self.storage_client = storage_client or storage.Client()
         self.bucket = f"{self.bq_client.project}-public"
         self.meta_formats = meta_formats or []
+        self.max_workers = max_workers
+        self.rate_limiter = HostRateLimiter(requests_per_second_per_host)
         self.in_meta_format_where_statement = "release_meta in ('" + "','".join(self.meta_formats) + "')"
 
     def validate(self, extracted_data: AllLeaderMetaDocs) -> bool:
@@ -146,22 +274,23 @@ class CardImageUpdateToGCPEtlJob(AbstractETLJob[list[Card], list[Card]]):
         if self.meta_formats:
             query += f"and {self.in_meta_format_where_statement}"
         _logger.info(f"Query BQ with '{query}'")
-        df = self.bq_client.query_and_wait(query).to_dataframe()
+        df = bq_query2dataframe(query, Card, client=self.bq_client)
         _logger.info(f"Extracted {len(df)} rows from bq {BQDataset.CARDS}.{Card.__tablename__}")
-        cards: list[Card] = []
-        for i, df_row in df.iterrows():
-            cards.append(Card(**df_row.to_dict()))
-        return cards
+        # transform and load work on Card models, which are created from plain records instead of iterrows
+        return [Card(**record) for record in dataframe2records(df)]
 
 
     @staticmethod
-    def _download_with_retry(url: str, max_retries: int = 3) -> bytes:
+    def _download_with_retry(url: str, max_retries: int = 3, session: requests.Session | None = None,
+                             rate_limiter: HostRateLimiter | None = None) -> bytes:
         """Download image with exponential backoff on connection errors."""
         delay = 5
         last_exc: Exception = RuntimeError(f"max_retries must be >= 1, got {max_retries}")
         for attempt in range(max_retries):
             try:
-                response = requests.get(url, timeout=30)
+                if rate_limiter is not None:
+                    rate_limiter.wait(url)
+                response = (session or requests).get(url, timeout=30)
                 response.raise_for_status()
                 return response.content
             except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
@@ -173,35 +302,56 @@ class CardImageUpdateToGCPEtlJob(AbstractETLJob[list[Card], list[Card]]):
                 delay *= 2
         raise last_exc
 
+    def _image_url_path(self, card: Card) -> tuple[str, str]:
+        file_type = card.image_url.split('.')[-1]
+        return f"{self.card_image_prefix}{card.language.upper()}/{card.aa_version}/{card.id}.{file_type}", file_type
+
+    def _mirror_card(self, card: Card, bucket: storage.Bucket, session: requests.Session,
+                     blob_name2md5_hash: dict[str, str]) -> bool:
+        """Mirrors the image of card to bucket and updates its image_url. Returns False if an identical blob existed."""
+        img_data = self._download_with_retry(card.image_url, session=session, rate_limiter=self.rate_limiter)
+        image_url_path, file_type = self._image_url_path(card)
+        # GCS exposes the base64 encoded md5 of every blob
+        md5_hash = base64.b64encode(hashlib.md5(img_data).digest()).decode()
+        uploaded = blob_name2md5_hash.get(image_url_path) != md5_hash
+        if uploaded:
+            upload_bytes2gcp_storage(img_data, blob_name=image_url_path, bucket=bucket,
+                                     content_type=f"image/{file_type}")
+        card.image_url = f"https://storage.googleapis.com/{self.bucket}/{image_url_path}"
+        return uploaded
+
     def transform(self, cards: list[Card]) -> list[Card]:
+        """Downloads and uploads images with a pool of max_workers threads, rate limited per image host"""
         total = len(cards)
-        _logger.info(f"transform: starting image upload for {total} card(s)")
+        _logger.info(f"transform: starting image upload for {total} card(s) with {self.max_workers} workers")
+        if total == 0:
+            return []
+        bucket = self.storage_client.get_bucket(self.bucket)
+        blob_name2md5_hash = {blob.name: blob.md5_hash for blob in bucket.list_blobs(prefix=self.card_image_prefix)}
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
         successful: list[Card] = []
         failed_count = 0
-        for i, card in enumerate(cards):
-            try:
-                with tempfile.NamedTemporaryFile() as tmp:
-                    img_data = self._download_with_retry(card.image_url)
-                    tmp.write(img_data)
-                    file_type = card.image_url.split('.')[-1]
-                    image_url_path = f"card/images/{card.language.upper()}/{card.aa_version}/{card.id}.{file_type}"
-                    upload2gcp_storage(path_to_file=tmp.name,
-                                       bucket=self.bucket,
-                                       blob_name=image_url_path,
-                                       content_type=f"image/{file_type}",
-                                       client=self.storage_client)
-                    card.image_url = f"https://storage.googleapis.com/{self.bucket}/{image_url_path}"
+        skipped_count = 0
+        with session, ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self._mirror_card, card, bucket, session, blob_name2md5_hash) for card in cards]
+            for i, (card, future) in enumerate(zip(cards, futures)):
+                try:
+                    if not future.result():
+                        skipped_count += 1
                     successful.append(card)
+                except Exception as e:
+                    failed_count += 1
+                    _logger.error(f"Failed to process card {card.id} ({card.language}, aa_version={card.aa_version}): {e}")
                 processed = i + 1
                 if processed % 100 == 0:
                     _logger.info(f"transform: processed {processed}/{total} images ({failed_count} failed so far)")
-                # Brief pause to avoid rate limiting
-                time.sleep(0.5)
-            except Exception as e:
-                failed_count += 1
-                _logger.error(f"Failed to process card {card.id} ({card.language}, aa_version={card.aa_version}): {e}")
 
-        _logger.info(f"transform: finished — {len(successful)}/{total} succeeded, {failed_count} failed")
+        _logger.info(f"transform: finished — {len(successful)}/{total} succeeded ({skipped_count} unchanged blobs "
+                     f"not uploaded), {failed_count} failed")
         return successful
 
     def load(self, cards: list[Card]) -> None:
@@ -220,7 +370,7 @@ class CardImageUpdateToGCPEtlJob(AbstractETLJob[list[Card], list[Card]]):
                     _logger.warning(f"load: skipping duplicate card {key}")
                     continue
                 seen_keys.add(key)
-                rows_to_insert.append(json.loads(card.model_dump_json()))
+                rows_to_insert.append(card)
 
             # Retry insert until the freshly-created table is reachable by the
             # streaming API (propagation can take several seconds after create_table).
@@ -2,13 +2,21 @@ import json
 import os
 import re
 from pathlib import Path
+from types import UnionType, NoneType
+from typing import Any, get_args, get_origin
 from urllib.parse import urlparse, parse_qs
 
+import numpy as np
+import pandas as pd
 import requests
 from bs4 import BeautifulSoup
 from bs4.element import Tag
+from google.cloud import bigquery
+from pydantic.fields import FieldInfo
 
 from op_tcg.backend.models.input import AllLeaderMetaDocs, LimitlessLeaderMetaDoc, MetaFormat
+from op_tcg.backend.models.bq_classes import BQTableBaseModel
+from op_tcg.backend.utils.annotations import pydantic_field_annotation_to_type
 from op_tcg.backend.models.leader import Leader
 from op_tcg.backend.models.cards import OPTcgColor, OPTcgAttribute, OPTcgLanguage, OPTcgTournamentStatus, \
     OPTcgCardCatagory, BaseCard, Card, OPTcgCardRarity, LimitlessCardData, CardPrice, CardCurrency, CardMarketplaceUrl, \
@@ -38,6 +46,92 @@ def read_json_files(data_dir: str | Path) -> AllLeaderMetaDocs:
     return AllLeaderMetaDocs(documents=documents)
 
 
+def read_json_file(file_path: str | Path) -> LimitlessLeaderMetaDoc:
+    with open(file_path, 'r') as file:
+        return LimitlessLeaderMetaDoc(**json.load(file))
+
+
+def index_json_files(data_dir: str | Path, meta_formats: list[MetaFormat] | None = None) -> dict[MetaFormat, dict[str, Path]]:
+    """Returns meta_format -> leader_id -> file path of all LimitlessLeaderMetaDoc files without parsing them.
+    Leader id and meta format are taken from the file name {leader_id}_{meta_format}.json written by MatchesPipeline.
+    Files with another name are parsed one at a time to read both values.
+    """
+    meta_format2leader_id2file_path: dict[MetaFormat, dict[str, Path]] = {}
+    meta_format_values = {meta_format.value for meta_format in MetaFormat}
+    for filename in sorted(os.listdir(data_dir)):
+        if not filename.endswith('.json'):
+            continue
+        file_path = Path(data_dir) / filename
+        leader_id, _, meta_format = filename.removesuffix('.json').rpartition('_')
+        if not leader_id or meta_format not in meta_format_values:
+            doc = read_json_file(file_path)
+            leader_id, meta_format = doc.leader_id, doc.meta_format
+        meta_format = MetaFormat(meta_format)
+        if meta_formats and meta_format not in meta_formats:
+            continue
+        meta_format2leader_id2file_path.setdefault(meta_format, {})[leader_id] = file_path
+    return meta_format2leader_id2file_path
+
+
+def _is_nested_field(field_info: FieldInfo) -> bool:
+    """Whether the field is a list (BigQuery REPEATED) or dict (BigQuery JSON) field"""
+    annotation = field_info.annotation
+    field_types = get_args(annotation) if isinstance(annotation, UnionType) else (annotation,)
+    return any(get_origin(field_type) in (list, dict) for field_type in field_types)
+
+
+def _is_nullable_int_field(field_info: FieldInfo) -> bool:
+    field_type = pydantic_field_annotation_to_type(field_info)
+    return (isinstance(field_info.annotation, UnionType) and NoneType in get_args(field_info.annotation)
+            and isinstance(field_type, type) and issubclass(field_type, int) and not issubclass(field_type, bool))
+
+
+def validate_dataframe(df: pd.DataFrame, model: type[BQTableBaseModel]) -> pd.DataFrame:
+    """
+    Validates and coerces all rows of df column wise with the pandera schema of model, instead of creating one pydantic
+    model per row. Missing optional columns get their model default, same as creating the model from a row.
+    Timestamp columns which are not parsed yet (e.g. of a csv file) or naive are converted to UTC in place.
+    List and dict columns are left as they are, nullable int columns are coerced to the nullable Int64 dtype.
+    Raises a pandera SchemaError if a column can not be coerced, e.g. a required column contains NULL.
+    """
+    schema = model.paSchema()
+    schema.coerce = True
+    for name, field_info in model.model_fields.items():
+        if name not in df and not field_info.is_required():
+            df[name] = field_info.get_default(call_default_factory=True, validated_data={})
+        if _is_nested_field(field_info):
+            schema = schema.remove_columns([name])
+        elif _is_nullable_int_field(field_info):
+            schema = schema.update_column(name, dtype=pd.Int64Dtype())
+    for name, column in schema.columns.items():
+        if name not in df or not isinstance(column.dtype.type, pd.DatetimeTZDtype):
+            continue
+        if not pd.api.types.is_datetime64_any_dtype(df[name]):
+            df[name] = pd.to_datetime(df[name], utc=True, format="ISO8601")
+        elif df[name].dt.tz is None:
+            df[name] = df[name].dt.tz_localize("UTC")
+    return schema.validate(df)
+
+
+def dataframe2records(df: pd.DataFrame) -> list[dict[str, Any]]:
+    """Records of a validated dataframe which can be passed to the pydantic model.
+    Missing values become None and array values (REPEATED columns of an Arrow table) become lists."""
+    records = df.astype(object).where(df.notna(), None).to_dict("records")
+    array_columns = [name for name in df.columns
+                     if df[name].dtype == object and any(isinstance(value, np.ndarray) for value in df[name])]
+    for record in records:
+        for name in array_columns:
+            if isinstance(record[name], np.ndarray):
+                record[name] = record[name].tolist()
+    return records
+
+
+def bq_query2dataframe(query: str, model: type[BQTableBaseModel], client: bigquery.Client) -> pd.DataFrame:
+    """Downloads the result of query as Arrow table, converts it to pandas once and validates it column wise"""
+    arrow_table = client.query_and_wait(query).to_arrow()
+    return validate_dataframe(arrow_table.to_pandas(), model)
+
+
 def get_leader_ids(data_dir: Path) -> list[str]:
     """Returns list of leader ids e.g. OP01-001 for crawling the limitless site"""
     leader_ids = []
@@ -221,10 +315,11 @@ def base_card2bq_card(base_card: BaseCard, soup: BeautifulSoup) -> Card:
         **base_card.model_dump(),
     )
 
-def crawl_limitless_card(card_id, language: OPTcgLanguage = OPTcgLanguage.EN) -> LimitlessCardData:
+def crawl_limitless_card(card_id, language: OPTcgLanguage = OPTcgLanguage.EN, session: requests.Session | None = None,
+                         timeout: float | None = None) -> LimitlessCardData:
     base_url = "https://onepiece.limitlesstcg.com"
     limitless_url = f"{base_url}/cards/{language}/{card_id}?v=0"
-    response = requests.get(limitless_url)
+    response = (session or requests).get(limitless_url, timeout=timeout)
     response.raise_for_status()
     html_str = response.text
     soup = BeautifulSoup(html_str)
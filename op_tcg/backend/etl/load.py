@@ -1,16 +1,19 @@
-import json
 import os
 import logging
 import sys
+import tempfile
 import uuid
 from datetime import datetime, date, timedelta
-from typing import Any
+from pathlib import Path
+from typing import Any, Iterable
 
 from google.cloud import bigquery
 from google.cloud import storage
+from google.api_core.exceptions import Conflict, GoogleAPICallError
 from google.cloud.exceptions import NotFound
 from google.cloud.bigquery import QueryJobConfig
 
+from op_tcg.backend.etl.serializer import get_bq_row_serializer
 from op_tcg.backend.models.base import SQLTableBaseModel
 from op_tcg.backend.models.storage import StorageBucket
 from op_tcg.backend.utils.annotations import pydantic_model_to_bq_types, pydantic_model_to_bq_schema
@@ -115,15 +118,18 @@ def ensure_json_serializability(row_to_insert):
                     row_to_insert[col_name][i] = str(col_value_i)
 
 
-def bq_insert_rows(rows_to_insert: list[dict[str, Any]], table: bigquery.Table,
+def bq_insert_rows(rows_to_insert: list[dict[str, Any]] | list[SQLTableBaseModel], table: bigquery.Table,
                    client: bigquery.Client | None = None) -> None:
-    """Adds a new row to BigQuery"""
+    """Adds new rows to BigQuery. Models are serialized with the compiled serializer of their class."""
     if len(rows_to_insert) == 0:
         _logger.warning(f"Skip bq insert in table {table}, as no rows are provided.")
         return None
     client = client if client else bigquery.Client()
-    for row in rows_to_insert:
-        ensure_json_serializability(row)
+    if isinstance(rows_to_insert[0], SQLTableBaseModel):
+        rows_to_insert = get_bq_row_serializer(type(rows_to_insert[0])).to_json_rows(rows_to_insert)
+    else:
+        for row in rows_to_insert:
+            ensure_json_serializability(row)
     table_id = f"{table.project}.{table.dataset_id}.{table.table_id}"
 
     errors = client.insert_rows_json(table_id, rows_to_insert)  # Make an API request.
@@ -135,8 +141,7 @@ def bq_insert_rows(rows_to_insert: list[dict[str, Any]], table: bigquery.Table,
 
 def generate_merge_statement(bq_model: SQLTableBaseModel) -> str:
     """Function to generate MERGE statement for upserting a row"""
-    model_dict = json.loads(bq_model.model_dump_json())
-    ensure_json_serializability(model_dict)
+    model_dict = get_bq_row_serializer(type(bq_model)).to_json_row(bq_model)
     # Prepare the columns and corresponding values
     columns = ', '.join(f"`{key}`" for key in model_dict.keys())
     values_placeholders = ', '.join(f"@{key}" for key in model_dict.keys())
@@ -169,8 +174,7 @@ def bq_upsert_row(bq_model: SQLTableBaseModel, client: bigquery.Client | None =
     merge_sql = generate_merge_statement(bq_model)
 
     # Prepare the query parameters
-    model_dict = json.loads(bq_model.model_dump_json())
-    ensure_json_serializability(model_dict)
+    model_dict = get_bq_row_serializer(type(bq_model)).to_json_row(bq_model)
     field_name2bq_field_type: dict[str, bigquery.SchemaField] = pydantic_model_to_bq_types(bq_model)
     query_params = []
     for key, value in model_dict.items():
@@ -197,97 +201,242 @@ def upload2gcp_storage(path_to_file: str, blob_name: str, bucket: str = StorageB
     blob = bucket.blob(blob_name)
     blob.upload_from_filename(path_to_file, content_type=content_type)
 
+
+def upload_bytes2gcp_storage(data: bytes, blob_name: str, bucket: storage.Bucket, content_type: str | None = None) -> storage.Blob:
+    """Uploads data from memory without a temp file. The bucket handle is passed in, so it can be reused for many uploads."""
+    blob = bucket.blob(blob_name)
+    blob.upload_from_string(data, content_type=content_type)
+    return blob
+
 def bq_upsert_rows(rows: list[SQLTableBaseModel], client: bigquery.Client | None = None, table: bigquery.Table | None = None):
     """
-    Upserts multiple rows into BigQuery using a temporary table and MERGE statement.
+    Upserts multiple rows into BigQuery with bq_merge_rows, i.e. one load job into a temporary table and one MERGE
+    statement. Errors are logged and not raised.
+    """
+    if not rows:
+        return
+    if not get_primary_keys(type(rows[0])):
+        _logger.warning(f"No primary keys found for {type(rows[0]).__name__}, skip upsert.")
+        return
+    try:
+        bq_merge_rows(rows, table=table, client=client)
+    except Exception as e:
+        _logger.exception(f"An error occurred during upsert: {e}")
+
+
+def bq_replace_rows(rows: list[SQLTableBaseModel], table: bigquery.Table, key_column: str | None = None,
+                    client: bigquery.Client | None = None) -> None:
+    """
+    Loads multiple rows with a single load job into a temporary staging table. Afterwards, all rows of the target
+    table sharing a key_column value with the staged rows are replaced by the staged rows in one transaction.
+    If key_column is None, the staged rows are only appended.
     """
     if not rows:
         return
 
     client = client or bigquery.Client()
-    model_class = type(rows[0])
+    target_table_id = f"{table.project}.{table.dataset_id}.{table.table_id}"
+    temp_table = bq_stage_rows(rows, table, client=client)
+    temp_table_id = f"{temp_table.project}.{temp_table.dataset_id}.{temp_table.table_id}"
 
-    # Get target table
-    if table:
-        target_table = table
-    else:
-        target_table = get_or_create_table(model_class, client=client)
+    try:
+        columns = ', '.join(f"`{field.name}`" for field in temp_table.schema)
+        delete_statement = f"""
+        DELETE FROM `{target_table_id}`
+        WHERE `{key_column}` IN (SELECT DISTINCT `{key_column}` FROM `{temp_table_id}`);""" if key_column else ""
+        client.query(f"""
+        BEGIN TRANSACTION;
+        {delete_statement}
+        INSERT INTO `{target_table_id}` ({columns})
+        SELECT {columns} FROM `{temp_table_id}`;
+        COMMIT TRANSACTION;
+        """).result()
+        _logger.info(f"Replaced {len(rows)} rows in {target_table_id}")
+    finally:
+        client.delete_table(temp_table, not_found_ok=True)
 
-    target_table_id = f"{target_table.project}.{target_table.dataset_id}.{target_table.table_id}"
 
-    # Create temp table
-    dataset_ref = bigquery.DatasetReference(target_table.project, target_table.dataset_id)
-    temp_table_ref = dataset_ref.table(f"{target_table.table_id}_temp_{uuid.uuid4().hex}")
+def bq_schema_to_arrow_schema(bq_schema: list[bigquery.SchemaField]):
+    """Arrow schema of a flat BigQuery table schema. TIMESTAMP columns are UTC, naive datetimes are read as UTC."""
+    # pyarrow is only required for Arrow/Parquet based loads
+    import pyarrow as pa
 
-    schema = pydantic_model_to_bq_schema(model_class)
-    temp_table = bigquery.Table(temp_table_ref, schema=schema)
-    temp_table.expires = datetime.now() + timedelta(hours=1)
+    bq_type2arrow_type = {
+        "STRING": pa.string(), "BOOL": pa.bool_(), "BOOLEAN": pa.bool_(), "INT64": pa.int64(), "INTEGER": pa.int64(),
+        "FLOAT64": pa.float64(), "FLOAT": pa.float64(), "TIMESTAMP": pa.timestamp("us", tz="UTC"),
+        "DATETIME": pa.timestamp("us"), "DATE": pa.date32(), "TIME": pa.time64("us"),
+    }
+    arrow_fields = []
+    for schema_field in bq_schema:
+        arrow_type = bq_type2arrow_type[schema_field.field_type]
+        if schema_field.mode == "REPEATED":
+            arrow_type = pa.list_(arrow_type)
+        arrow_fields.append(pa.field(schema_field.name, arrow_type, nullable=schema_field.mode != "REQUIRED"))
+    return pa.schema(arrow_fields)
 
-    try:
-        temp_table = client.create_table(temp_table)
-    except Exception as e:
-        _logger.error(f"Failed to create temp table {temp_table_ref}: {e}")
-        return
 
+def write_rows2parquet(rows: Iterable[dict[str, Any]], file_path: str | Path, bq_schema: list[bigquery.SchemaField],
+                       batch_size: int = 100_000) -> int:
+    """
+    Writes rows into Arrow record batches of batch_size rows, which are appended to a Parquet file.
+    Only one batch is held in memory, columns missing in a row are NULL. Returns the number of written rows.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = bq_schema_to_arrow_schema(bq_schema)
+    num_rows = 0
+    with pq.ParquetWriter(file_path, schema) as writer:
+        columns: dict[str, list] = {name: [] for name in schema.names}
+        for row in rows:
+            for name, values in columns.items():
+                values.append(row.get(name))
+            num_rows += 1
+            if num_rows % batch_size == 0:
+                writer.write_batch(pa.RecordBatch.from_pydict(columns, schema=schema))
+                columns = {name: [] for name in schema.names}
+        if num_rows % batch_size or num_rows == 0:
+            writer.write_batch(pa.RecordBatch.from_pydict(columns, schema=schema))
+    return num_rows
+
+
+def bq_load_parquet(file_path: str | Path, table: bigquery.Table, client: bigquery.Client | None = None,
+                    write_disposition: str = bigquery.WriteDisposition.WRITE_APPEND,
+                    job_id: str | None = None) -> bigquery.LoadJob:
+    """Loads a local Parquet file into table with one load job and waits for it"""
+    client = client or bigquery.Client()
+    job_config = bigquery.LoadJobConfig(source_format=bigquery.SourceFormat.PARQUET,
+                                        write_disposition=write_disposition)
+    with open(file_path, "rb") as file:
+        load_job = client.load_table_from_file(file, table, job_config=job_config, job_id=job_id)
+    load_job.result()
+    _logger.info(f"Loaded {load_job.output_rows} rows from {file_path} into {table.dataset_id}.{table.table_id}")
+    return load_job
+
+
+def get_primary_keys(model_class: type[SQLTableBaseModel]) -> list[str]:
+    return [field for field, value in model_class.model_fields.items() if
+            value.json_schema_extra and value.json_schema_extra.get('primary_key', False)]
+
+
+def bq_append_rows(rows: list[SQLTableBaseModel], table: bigquery.Table, client: bigquery.Client | None = None,
+                   job_id: str | None = None) -> None:
+    """
+    Appends rows to table with one Parquet load job, without deduplication or DML. Load jobs are atomic.
+    Calls with the same job_id append the rows at most once: if the job of an earlier call exists, the rows are only
+    loaded again if that job failed.
+    """
+    if not rows:
+        return
+    client = client or bigquery.Client()
+    serializer = get_bq_row_serializer(type(rows[0]))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = Path(tmp_dir) / "rows.parquet"
+        write_rows2parquet(map(serializer.to_arrow_row, rows), file_path, bq_schema=serializer.schema)
+        try:
+            bq_load_parquet(file_path, table, client=client, job_id=job_id)
+        except Conflict:
+            if job_id is None:
+                raise
+            try:
+                client.get_job(job_id).result()
+                _logger.info(f"Load job {job_id} already appended the rows to {table.table_id}")
+                return
+            except GoogleAPICallError as e:
+                _logger.warning(f"Load job {job_id} failed, the rows are loaded again: {e}")
+            bq_load_parquet(file_path, table, client=client, job_id=f"{job_id}_{uuid.uuid4().hex[:8]}")
+
+
+def bq_stage_rows(rows: list[SQLTableBaseModel], table: bigquery.Table,
+                  client: bigquery.Client | None = None) -> bigquery.Table:
+    """
+    Loads rows with one Parquet load job into a new temporary table in the dataset of table.
+    The temporary table expires after one hour, callers should delete it as soon as it is merged.
+    """
+    client = client or bigquery.Client()
+    schema = get_bq_row_serializer(type(rows[0])).schema
+    dataset_ref = bigquery.DatasetReference(table.project, table.dataset_id)
+    temp_table = bigquery.Table(dataset_ref.table(f"{table.table_id}_staging_{uuid.uuid4().hex}"), schema=schema)
+    temp_table.expires = datetime.now() + timedelta(hours=1)
+    temp_table = client.create_table(temp_table)
     try:
-        # Insert rows into temp table
-        rows_dicts = [json.loads(row.model_dump_json()) for row in rows]
-        for row in rows_dicts:
-            ensure_json_serializability(row)
+        bq_append_rows(rows, temp_table, client=client)
+    except Exception:
+        client.delete_table(temp_table, not_found_ok=True)
+        raise
+    return temp_table
 
-        errors = client.insert_rows_json(temp_table, rows_dicts)
-        if errors:
-             raise ValueError(f"Encountered errors while inserting rows into temp table: {errors}")
-
-        # Generate MERGE statement
-        primary_keys = [field for field, value in model_class.model_fields.items() if
-                        value.json_schema_extra and value.json_schema_extra.get('primary_key', False)]
-
-        if not primary_keys:
-             _logger.warning(f"No primary keys found for {model_class.__name__}, falling back to append-only insert.")
-             # Fallback to insert?
-             return
-
-        # Columns to update (all except PKs)
-        all_columns = list(rows_dicts[0].keys())
-        update_columns = [col for col in all_columns if col not in primary_keys]
-
-        on_clause = ' AND '.join(f"target.`{pk}` = source.`{pk}`" for pk in primary_keys)
-
-        if update_columns:
-            update_expressions = []
-            for col in update_columns:
-                # Special handling for image_url: keep GCS URLs, never downgrade to marketplace URL
-                if col == 'image_url':
-                    update_expressions.append(f"target.`{col}` = IF(STARTS_WITH(target.`{col}`, 'https://storage.googleapis.com'), target.`{col}`, source.`{col}`)")
-                # Preserve gcs_image_url once set — the crawler writes it; never overwrite with NULL on plain upserts
-                elif col == 'gcs_image_url':
-                    update_expressions.append(f"target.`{col}` = COALESCE(target.`{col}`, source.`{col}`)")
-                else:
-                    update_expressions.append(f"target.`{col}` = source.`{col}`")
-            update_clause = ', '.join(update_expressions)
-            when_matched = f"WHEN MATCHED THEN UPDATE SET {update_clause}"
-        else:
-            when_matched = ""
 
-        insert_columns = ', '.join(f"`{col}`" for col in all_columns)
-        insert_values = ', '.join(f"source.`{col}`" for col in all_columns)
+# Columns which are not simply overwritten by a MERGE
+COLUMN2MERGE_UPDATE_EXPRESSION = {
+    # keep GCS URLs, never downgrade to marketplace URL
+    "image_url": "IF(STARTS_WITH(target.`image_url`, 'https://storage.googleapis.com'), target.`image_url`, source.`image_url`)",
+    # preserve gcs_image_url once set — the crawler writes it; never overwrite with NULL on plain upserts
+    "gcs_image_url": "COALESCE(target.`gcs_image_url`, source.`gcs_image_url`)",
+}
 
-        merge_sql = f"""
-        MERGE `{target_table_id}` target
-        USING `{temp_table.project}.{temp_table.dataset_id}.{temp_table.table_id}` source
-        ON {on_clause}
-        {when_matched}
-        WHEN NOT MATCHED THEN
-            INSERT ({insert_columns}) VALUES ({insert_values})
-        """
 
-        query_job = client.query(merge_sql)
-        query_job.result()
-        _logger.info(f"Upserted {len(rows)} rows into {target_table_id}")
+def generate_bulk_merge_statement(target_table_id: str, source_table_id: str, columns: list[str],
+                                  primary_keys: list[str], nullable_keys: list[str] | None = None,
+                                  not_matched_by_source_condition: str | None = None) -> str:
+    """
+    MERGE statement, which updates target rows with the primary keys of a source row and inserts all other source rows.
+    nullable_keys are compared NULL safe. Target rows without source row which match not_matched_by_source_condition
+    are deleted, e.g. "target.meta_format IN ('OP01')" replaces a whole meta format.
+    """
+    nullable_keys = nullable_keys or []
+    on_clause = ' AND '.join(
+        f"(target.`{pk}` = source.`{pk}` OR (target.`{pk}` IS NULL AND source.`{pk}` IS NULL))" if pk in nullable_keys
+        else f"target.`{pk}` = source.`{pk}`" for pk in primary_keys)
+    update_columns = [col for col in columns if col not in primary_keys]
+    when_matched = ""
+    if update_columns:
+        update_clause = ', '.join(
+            f"target.`{col}` = {COLUMN2MERGE_UPDATE_EXPRESSION.get(col, f'source.`{col}`')}" for col in update_columns)
+        when_matched = f"WHEN MATCHED THEN UPDATE SET {update_clause}"
+    insert_columns = ', '.join(f"`{col}`" for col in columns)
+    insert_values = ', '.join(f"source.`{col}`" for col in columns)
+    when_not_matched_by_source = (f"WHEN NOT MATCHED BY SOURCE AND {not_matched_by_source_condition} THEN DELETE"
+                                  if not_matched_by_source_condition else "")
+    return f"""
+    MERGE `{target_table_id}` target
+    USING `{source_table_id}` source
+    ON {on_clause}
+    {when_matched}
+    WHEN NOT MATCHED THEN
+        INSERT ({insert_columns}) VALUES ({insert_values})
+    {when_not_matched_by_source}
+    """
 
-    except Exception as e:
-        _logger.exception(f"An error occurred during upsert: {e}")
+
+def bq_merge_rows(rows: list[SQLTableBaseModel], table: bigquery.Table | None = None,
+                  client: bigquery.Client | None = None, not_matched_by_source_condition: str | None = None) -> None:
+    """
+    Bulk upsert of rows keyed on the primary_key fields of their model: one Parquet load job into a temporary table,
+    one MERGE statement and the deletion of the temporary table. Unlike streaming inserts, the written rows can be
+    updated or deleted by DML right away. Rows with the same primary key are deduplicated, the last one wins.
+    See generate_bulk_merge_statement for not_matched_by_source_condition.
+    """
+    if not rows:
+        return
+    client = client or bigquery.Client()
+    model_class = type(rows[0])
+    table = table or get_or_create_table(model_class, client=client)
+    primary_keys = get_primary_keys(model_class)
+    if not primary_keys:
+        raise ValueError(f"{model_class.__name__} has no primary keys to merge on")
+
+    # MERGE fails if a target row matches more than one source row
+    key2row = {tuple(getattr(row, pk) for pk in primary_keys): row for row in rows}
+    temp_table = bq_stage_rows(list(key2row.values()), table, client=client)
+    target_table_id = f"{table.project}.{table.dataset_id}.{table.table_id}"
+    try:
+        merge_sql = generate_bulk_merge_statement(
+            target_table_id, f"{temp_table.project}.{temp_table.dataset_id}.{temp_table.table_id}",
+            columns=[field.name for field in temp_table.schema], primary_keys=primary_keys,
+            nullable_keys=[field.name for field in temp_table.schema if field.mode == "NULLABLE"],
+            not_matched_by_source_condition=not_matched_by_source_condition)
+        client.query(merge_sql).result()
+        _logger.info(f"Merged {len(key2row)} rows into {target_table_id}")
     finally:
-        # Delete temp table
         client.delete_table(temp_table, not_found_ok=True)
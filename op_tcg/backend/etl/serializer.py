@@ -0,0 +1,143 @@
+from datetime import date, datetime
+from enum import Enum
+from functools import cache
+from math import isfinite
+from types import GenericAlias
+from typing import Any, Callable, Iterable, get_args, get_origin
+
+from pydantic import BaseModel
+from pydantic_core import to_jsonable_python
+
+from op_tcg.backend.models.bq_enums import BQFieldMode, BQFieldType
+from op_tcg.backend.utils.annotations import pydantic_model_to_bq_schema, pydantic_field_annotation_to_type
+
+Converter = Callable[[Any], Any]
+
+
+def _enum_value(value: Any) -> Any:
+    return value._value_ if isinstance(value, Enum) else value
+
+
+def _finite_float(value: Any) -> Any:
+    # pydantic serializes nan and inf as null
+    return value if value is None or isfinite(value) else None
+
+
+def _json_timestamp(value: Any) -> Any:
+    if not isinstance(value, datetime):
+        return value
+    timestamp = value.isoformat()
+    # same format as model_dump_json
+    return timestamp[:-6] + "Z" if timestamp.endswith("+00:00") else timestamp
+
+
+def _json_date(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def _dict_string(value: Any) -> Any:
+    # dicts are stored as string, which BQTableBaseModel.str2dict parses again
+    return str(to_jsonable_python(value)) if isinstance(value, (dict, BaseModel)) else value
+
+
+def _scalar_dict_string(value: Any) -> Any:
+    # dicts of str keys and str, int or bool values are already json compatible
+    return str(value) if isinstance(value, dict) else value
+
+
+# converters, which are inlined into the compiled functions. _x is the field value.
+_INLINE_EXPRESSIONS: dict[Converter, str] = {
+    _enum_value: "(_x._value_ if isinstance(_x := {value}, Enum) else _x)",
+    _finite_float: "(_x if (_x := {value}) is None or isfinite(_x) else None)",
+}
+_NAMESPACE = {"Enum": Enum, "isfinite": isfinite, "_json_timestamp": _json_timestamp, "_json_date": _json_date,
+              "_dict_string": _dict_string,
+              "_scalar_dict_string": _scalar_dict_string, "_enum_value": _enum_value, "_finite_float": _finite_float}
+
+
+def _expression(value: str, converter: Converter | None, repeated: bool) -> str:
+    if converter is None:
+        return value
+    if repeated:
+        return f"(None if (_x := {value}) is None else [{converter.__name__}(_y) for _y in _x])"
+    if converter in _INLINE_EXPRESSIONS:
+        return _INLINE_EXPRESSIONS[converter].format(value=value)
+    return f"{converter.__name__}({value})"
+
+
+def _compile_row_function(fields: list[tuple[str, Converter | None, bool]]) -> Callable[[dict[str, Any]], dict[str, Any]]:
+    """Generates one function with a dict display of all fields, i.e. without a loop over the fields per row"""
+    items = ", ".join(f"{name!r}: {_expression(f'_get({name!r})', converter, repeated)}"
+                      for name, converter, repeated in fields)
+    namespace = dict(_NAMESPACE)
+    exec(f"def to_row(values):\n    _get = values.get\n    return {{{items}}}", namespace)
+    return namespace["to_row"]
+
+
+class BQRowSerializer:
+    """
+    Serializer of one model class, compiled from its BigQuery schema.
+
+    Every field gets a conversion matching its BigQuery type, fields which need no conversion (e.g. str, int or bool)
+    are copied as they are. All conversions of a row are generated into one function per output format.
+    Rows are either models or plain dicts with the field names as keys.
+    to_json_row returns the same row as json.loads(model.model_dump_json()) followed by ensure_json_serializability,
+    to_arrow_row keeps dates and timestamps as python objects for Arrow record batches.
+    """
+
+    def __init__(self, model: type[BaseModel]):
+        self.model = model
+        self.schema = pydantic_model_to_bq_schema(model)
+        json_fields, arrow_fields = [], []
+        for schema_field in self.schema:
+            json_converter, arrow_converter = self._get_converters(model.model_fields[schema_field.name],
+                                                                   schema_field.field_type)
+            repeated = schema_field.mode == BQFieldMode.REPEATED
+            json_fields.append((schema_field.name, json_converter, repeated))
+            arrow_fields.append((schema_field.name, arrow_converter, repeated))
+        self._to_json_row = _compile_row_function(json_fields)
+        self._to_arrow_row = _compile_row_function(arrow_fields)
+
+    @staticmethod
+    def _get_converters(field_info, bq_type: str) -> tuple[Converter | None, Converter | None]:
+        field_type = pydantic_field_annotation_to_type(field_info)
+        if get_origin(field_type) is dict and all(arg in (str, int, bool) for arg in get_args(field_type)):
+            return _scalar_dict_string, _scalar_dict_string
+        if isinstance(field_type, GenericAlias) or (isinstance(field_type, type) and issubclass(field_type, BaseModel)):
+            return _dict_string, _dict_string
+        if bq_type == BQFieldType.TIMESTAMP:
+            return _json_timestamp, None
+        if bq_type == BQFieldType.DATE:
+            return _json_date, None
+        if bq_type == BQFieldType.FLOAT64:
+            return _finite_float, _finite_float
+        if isinstance(field_type, type) and issubclass(field_type, (str, int)) and not issubclass(field_type, Enum):
+            return None, None
+        # enums and all other types which are stored as string in BQ
+        return _enum_value, _enum_value
+
+    @staticmethod
+    def _values(row: BaseModel | dict[str, Any]) -> dict[str, Any]:
+        return row.__dict__ if isinstance(row, BaseModel) else row
+
+    def to_json_row(self, row: BaseModel | dict[str, Any]) -> dict[str, Any]:
+        return self._to_json_row(self._values(row))
+
+    def to_json_rows(self, rows: Iterable[BaseModel | dict[str, Any]]) -> list[dict[str, Any]]:
+        to_json_row, values = self._to_json_row, self._values
+        return [to_json_row(values(row)) for row in rows]
+
+    def to_arrow_row(self, row: BaseModel | dict[str, Any]) -> dict[str, Any]:
+        return self._to_arrow_row(self._values(row))
+
+    def to_arrow_columns(self, rows: Iterable[BaseModel | dict[str, Any]]) -> dict[str, list[Any]]:
+        """Column name -> column values in schema order, e.g. for pyarrow.RecordBatch.from_pydict"""
+        to_arrow_row, values = self._to_arrow_row, self._values
+        arrow_rows = [to_arrow_row(values(row)) for row in rows]
+        return {schema_field.name: [row[schema_field.name] for row in arrow_rows] for schema_field in self.schema}
+
+
+@cache
+def get_bq_row_serializer(model: type[BaseModel]) -> BQRowSerializer:
+    """Serializer of a model class, compiled once per class"""
+    return BQRowSerializer(model)
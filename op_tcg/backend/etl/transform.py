@@ -1,17 +1,19 @@
-import copy
 import random
 from datetime import timedelta, datetime
+from pathlib import Path
+from typing import Any, Iterator
 from uuid import uuid4
 
 from op_tcg.backend.models.input import LimitlessMatch, MetaFormat, AllLeaderMetaDocs, meta_format2release_datetime
 from op_tcg.backend.models.matches import BQMatches, Match, MatchResult
 from op_tcg.backend.models.common import DataSource
+from op_tcg.backend.etl.extract import read_json_file
 from op_tcg.backend.models.transform import Transform2BQMatch
 
 
 class BQMatchCreator:
 
-    def __init__(self, all_local_matches: AllLeaderMetaDocs, official: bool):
+    def __init__(self, all_local_matches: AllLeaderMetaDocs, official: bool, seed: int | None = None):
         self.meta_leader_matches: dict[MetaFormat, dict[str, list[LimitlessMatch]]] = {}
         self.meta_leader_ids: dict[MetaFormat, str] = {}
         for doc in all_local_matches.documents:
@@ -24,6 +26,7 @@ class BQMatchCreator:
         for meta_format in self.all_metas:
             self.meta_leader_ids[meta_format] = list(self.meta_leader_matches[meta_format].keys())
         self.official = official
+        self.seed = seed
 
         # remove matches with not yet existent leader_ids
         for meta_format, leader_id2limitless_matches in self.meta_leader_matches.items():
@@ -83,11 +86,50 @@ class BQMatchCreator:
             transform_matches: list[Transform2BQMatch] = []
             for leader_id, limitless_matches in leader_matches.items():
                 transform_matches.extend(self.limitless_matches2transform_matches(leader_id, limitless_matches))
-            sorted_transform_matches = distribute_matches(transform_matches)
+            sorted_transform_matches = distribute_matches(transform_matches, seed=self.seed)
             bq_matches.extend(self.transform_matches2bq_matches(sorted_transform_matches, meta_format))
         return BQMatches(matches=bq_matches)
 
 
+def iter_match_rows(meta_format2leader_id2file_path: dict[MetaFormat, dict[str, Path]], official: bool,
+                    seed: int | None = None) -> Iterator[dict[str, Any]]:
+    """Streaming version of BQMatchCreator.transform2BQMatches, which yields Match rows as dicts.
+
+    Files are parsed one at a time and only the compact matches of one meta format are held in memory, since
+    distribute_matches interleaves all leaders of a meta format. Columns missing in a row are NULL.
+    """
+    for meta_format in sorted(meta_format2leader_id2file_path):
+        leader_id2file_path = meta_format2leader_id2file_path[meta_format]
+        transform_matches: list[Transform2BQMatch] = []
+        for leader_id, file_path in leader_id2file_path.items():
+            doc = read_json_file(file_path)
+            # remove matches with not yet existent leader_ids
+            limitless_matches = [match for match in doc.matches if match.leader_id in leader_id2file_path]
+            transform_matches.extend(BQMatchCreator.limitless_matches2transform_matches(doc.leader_id, limitless_matches))
+        sorted_transform_matches = distribute_matches(transform_matches, seed=seed)
+        del transform_matches
+
+        start_date = meta_format2release_datetime(meta_format)
+        create_timestamp = datetime.now()
+        match_timestamp_inc = 0
+        for transform_match in sorted_transform_matches:
+            yield {
+                "id": transform_match.id,
+                "leader_id": transform_match.leader_id,
+                "opponent_id": transform_match.opponent_id,
+                "result": int(transform_match.result),
+                "meta_format": str(meta_format),
+                "official": official,
+                "is_reverse": transform_match.is_reverse,
+                "source": str(DataSource.LIMITLESS),
+                "match_timestamp": start_date + timedelta(minutes=match_timestamp_inc),
+                "create_timestamp": create_timestamp,
+            }
+            # after reverse match, we incremente timestamp
+            if transform_match.is_reverse:
+                match_timestamp_inc += 1
+
+
 def randomize_datetime(start_datetime: datetime):
     # Generate a random number of days, hours, and minutes within the range of 10 days
     days = random.randint(-10, 10)
@@ -125,65 +167,116 @@ def pick_random_match(matches: list[Transform2BQMatch], leader_id: str,
     return chosen_match
 
 
-def distribute_matches(match_pool: list[Transform2BQMatch]) -> list[Transform2BQMatch]:
+class IndexedBucket:
+    """Unordered collection with O(1) add, remove and random choice"""
+
+    def __init__(self):
+        self.items: list = []
+        self.item2position: dict = {}
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def add(self, item) -> None:
+        self.item2position[item] = len(self.items)
+        self.items.append(item)
+
+    def remove(self, item) -> None:
+        # move last item into the gap, so that no list elements need to be shifted
+        position = self.item2position.pop(item)
+        last_item = self.items.pop()
+        if position < len(self.items):
+            self.items[position] = last_item
+            self.item2position[last_item] = position
+
+    def random_choice(self, rnd: random.Random):
+        return self.items[rnd.randrange(len(self.items))]
+
+
+def distribute_matches(match_pool: list[Transform2BQMatch], seed: int | None = None) -> list[Transform2BQMatch]:
     """Sorts a list of Transform2BQMatch so that leaders are equally distributed.
         e.g. [Match Leader OP01-001. Match Leader ST13-003, Match Leader OP03-099, ..., Match Leader OP01-001]
+
+    Every match is directly followed by its reverse match, which gets the same id. Consecutive matches picked for a
+    leader alternate their result if possible. The match pool is indexed by (leader_id, result) and
+    (leader_id, opponent_id, result), so that every pick is O(1).
+
+    :param match_pool: list[Transform2BQMatch] - Matches incl. reverse matches
+    :param seed: int - Optional seed for a reproducible distribution
     """
-    leader_ids = list(set(match.leader_id for match in match_pool))
-    result_transform_bq_match = []
-    last_results: dict[str, MatchResult | None] = {leader_id: None for leader_id in leader_ids}
+    rnd = random.Random(seed)
+    leader_result2matches: dict[tuple[str, MatchResult], IndexedBucket] = {}
+    reverse_key2matches: dict[tuple[str, str, MatchResult], IndexedBucket] = {}
+    leader_id2match_count: dict[str, int] = {}
+    for i, match in enumerate(match_pool):
+        leader_result2matches.setdefault((match.leader_id, match.result), IndexedBucket()).add(i)
+        reverse_key2matches.setdefault((match.leader_id, match.opponent_id, match.result), IndexedBucket()).add(i)
+        leader_id2match_count[match.leader_id] = leader_id2match_count.get(match.leader_id, 0) + 1
 
-    def add_to_result_list(match_to_add: Transform2BQMatch, matches: list[Transform2BQMatch]) -> list[
-        Transform2BQMatch]:
-        result_transform_bq_match.append(match_to_add)
-        last_results[match_to_add.leader_id] = match_to_add.result
-        return [match for match in matches if match.id != match_to_add.id]
+    def remove_from_pool(i: int) -> None:
+        match = match_pool[i]
+        leader_result2matches[(match.leader_id, match.result)].remove(i)
+        reverse_key2matches[(match.leader_id, match.opponent_id, match.result)].remove(i)
+        leader_id2match_count[match.leader_id] -= 1
+
+    def pick_match(leader_id: str, exclude_result: MatchResult | None) -> int | None:
+        # weight buckets by size, so that every valid match has the same probability
+        buckets = [leader_result2matches.get((leader_id, result)) for result in MatchResult if result != exclude_result]
+        buckets = [bucket for bucket in buckets if bucket]
+        num_valid_matches = sum(len(bucket) for bucket in buckets)
+        if num_valid_matches == 0:
+            return None
+        match_i = rnd.randrange(num_valid_matches)
+        for bucket in buckets:
+            if match_i < len(bucket):
+                return bucket.items[match_i]
+            match_i -= len(bucket)
 
-    while match_pool:
-        # shuffle leader_ids for each iteration
-        leader_ids_iteration = copy.deepcopy(leader_ids)
+    leader_ids = list(leader_id2match_count.keys())
+    result_transform_bq_match = []
+    last_results: dict[str, MatchResult | None] = {leader_id: None for leader_id in leader_ids}
+    while leader_ids:
+        leader_ids_iteration = IndexedBucket()
+        for leader_id in leader_ids:
+            leader_ids_iteration.add(leader_id)
         while len(leader_ids_iteration) > 0:
-            # pick a random leader_id
-            chosen_leader_id: list[str] = random.choice(leader_ids_iteration)
-            if len([match for match in match_pool if match.leader_id == chosen_leader_id]) == 0:
+            chosen_leader_id = leader_ids_iteration.random_choice(rnd)
+            if leader_id2match_count[chosen_leader_id] == 0:
                 # leader has no more matches left
                 leader_ids_iteration.remove(chosen_leader_id)
                 leader_ids.remove(chosen_leader_id)
+                continue
 
-            chosen_match = pick_random_match(match_pool, chosen_leader_id,
-                                             exclude_result=last_results[chosen_leader_id])
-            if chosen_match:
-                match_pool = add_to_result_list(chosen_match, match_pool)
-                leader_ids_iteration.remove(chosen_match.leader_id)
-                # Find and append the reverse match
-                tmp_reverse_match = Transform2BQMatch(
-                    id="reverse_match",
-                    leader_id=chosen_match.opponent_id,
-                    opponent_id=chosen_match.leader_id,
-                    result=opposite_result(chosen_match.result)
-                )
-                first_found_reverse_match = next((match for match in match_pool if
-                                                  match.leader_id == tmp_reverse_match.leader_id and
-                                                  match.opponent_id == tmp_reverse_match.opponent_id and
-                                                  match.result == tmp_reverse_match.result),
-                                                 None)
-                # A reverse match should always exist
-                if first_found_reverse_match == None:
-                    raise ValueError("Could not find a reverse match")
-
-                # modify id of reverse match
-                first_found_reverse_match.id = chosen_match.id
-                first_found_reverse_match.is_reverse = True
-                match_pool = add_to_result_list(first_found_reverse_match, match_pool)
-                try:
-                    leader_ids_iteration.remove(chosen_match.opponent_id)
-                except ValueError:
-                    pass
-            else:
+            chosen_match_i = pick_match(chosen_leader_id, exclude_result=last_results[chosen_leader_id])
+            if chosen_match_i is None:
                 # if no match exist with different result, we switch the result for the next iteration
                 if last_results[chosen_leader_id] != MatchResult.DRAW:
                     last_results[chosen_leader_id] = opposite_result(last_results[chosen_leader_id])
                 else:
                     last_results[chosen_leader_id] = MatchResult.LOSE
+                continue
+
+            chosen_match = match_pool[chosen_match_i]
+            remove_from_pool(chosen_match_i)
+            result_transform_bq_match.append(chosen_match)
+            last_results[chosen_match.leader_id] = chosen_match.result
+            leader_ids_iteration.remove(chosen_match.leader_id)
+
+            # A reverse match should always exist
+            reverse_matches = reverse_key2matches.get(
+                (chosen_match.opponent_id, chosen_match.leader_id, opposite_result(chosen_match.result)))
+            if not reverse_matches:
+                raise ValueError("Could not find a reverse match")
+            reverse_match_i = reverse_matches.items[-1]
+            remove_from_pool(reverse_match_i)
+            reverse_match = match_pool[reverse_match_i]
+            # modify id of reverse match
+            reverse_match.id = chosen_match.id
+            reverse_match.is_reverse = True
+            result_transform_bq_match.append(reverse_match)
+            last_results[reverse_match.leader_id] = reverse_match.result
+            if chosen_match.opponent_id in leader_ids_iteration.item2position:
+                leader_ids_iteration.remove(chosen_match.opponent_id)
 
     return result_transform_bq_match
+
@@ -1,4 +1,3 @@
-import json
 from abc import ABC
 from datetime import datetime
 
@@ -38,8 +37,7 @@ class BQTableBaseModel(SQLTableBaseModel, ABC):
 
     def insert_to_bq(self, client: bigquery.Client | None = None):
         """Adds a new row to BQ"""
-        # ensure json serialization without enum objects
-        bq_insert_rows([json.loads(self.model_dump_json())],
+        bq_insert_rows([self],
                        table=get_or_create_table(type(self), client=client), client=client)
 
 
@@ -1,6 +1,8 @@
 import datetime
-from enum import StrEnum, auto
+from enum import StrEnum, auto, unique
 from datetime import datetime
+from types import MappingProxyType
+from typing import Mapping
 
 from pydantic import BaseModel, Field
 
@@ -12,6 +14,7 @@ class MetaFormatRegion(EnumBase, StrEnum):
     WEST = auto()
     ALL = auto()
 
+@unique
 class MetaFormat(EnumBase, StrEnum):
     # Note: must be in the right order for some frontend functionality
     OP01 = "OP01"
@@ -33,7 +36,7 @@ class MetaFormat(EnumBase, StrEnum):
     OP17 = "OP17"
     OP18 = "OP18"
     OP19 = "OP19"
-    OP20 = "OP18"
+    OP20 = "OP20"
 
     @classmethod
     def to_list(cls, only_after_release: bool = True, until_meta_format: str | None = None, region: MetaFormatRegion = MetaFormatRegion.ALL) -> list[str]:
@@ -49,22 +52,21 @@ class MetaFormat(EnumBase, StrEnum):
         Returns:
             List of meta format strings
         """
-        all_meta_formats = list(map(lambda c: c.value, cls))
-        if until_meta_format is not None:
-            until_meta_format_i = all_meta_formats.index(cls(until_meta_format))
-            all_meta_formats = all_meta_formats[:until_meta_format_i+1]
-        return_meta_formats = []
-        for meta_format in all_meta_formats:
-            if not only_after_release:
-                return_meta_formats.append(meta_format)
-            elif meta_format2release_datetime(meta_format, region) and (
-                    meta_format2release_datetime(meta_format, region) <= datetime.now()):
-                return_meta_formats.append(meta_format)
-        return return_meta_formats
+        return list(META_FORMAT_REGISTRY.to_tuple(only_after_release, until_meta_format, region))
 
     @classmethod
     def latest_meta_format(cls, only_after_release: bool = True, region: MetaFormatRegion = MetaFormatRegion.ALL) -> "MetaFormat":
-        return cls.to_list(only_after_release=only_after_release, region=region)[-1]
+        return META_FORMAT_REGISTRY.to_tuple(only_after_release, None, region)[-1]
+
+    @classmethod
+    def index_of(cls, meta_format: str) -> int:
+        """Position of the meta format in release order. Raises ValueError for unknown meta formats."""
+        return META_FORMAT_REGISTRY.index_of(meta_format)
+
+    @classmethod
+    def is_before(cls, meta_format: str, other_meta_format: str) -> bool:
+        """Whether meta_format was released before other_meta_format"""
+        return META_FORMAT_REGISTRY.index_of(meta_format) < META_FORMAT_REGISTRY.index_of(other_meta_format)
 
 class SideMetaFormat(EnumBase, StrEnum):
     EB01 = "EB01"
@@ -97,6 +99,120 @@ class AllLeaderMetaDocs(BaseModel):
     documents: list[LimitlessLeaderMetaDoc]
 
 
+# Japanese release dates
+# TODO: include correct datetime (only approximated right now)
+_JAPANESE_RELEASE_DATETIMES: dict[MetaFormat, datetime] = {
+    MetaFormat.OP01: datetime(2022, 9, 2),     # 3 months earlier
+    MetaFormat.OP02: datetime(2022, 12, 10),   # 3 months earlier  
+    MetaFormat.OP03: datetime(2023, 3, 30),    # 3 months earlier
+    MetaFormat.OP04: datetime(2023, 6, 22),    # 3 months earlier
+    MetaFormat.OP05: datetime(2023, 9, 8),     # 3 months earlier
+    MetaFormat.OP06: datetime(2023, 12, 8),    # 3 months earlier
+    MetaFormat.OP07: datetime(2024, 3, 28),    # 3 months earlier
+    MetaFormat.OP08: datetime(2024, 6, 13),    # 3 months earlier
+    MetaFormat.OP09: datetime(2024, 9, 13),    # 3 months earlier
+    MetaFormat.OP10: datetime(2024, 12, 21),   # 3 months earlier
+    MetaFormat.OP11: datetime(2025, 3, 6),     # 3 months earlier
+    MetaFormat.OP12: datetime(2025, 5, 31),    # 3 months earlier
+    MetaFormat.OP13: datetime(2025, 8, 23),    # 3 months earlier
+    MetaFormat.OP14: datetime(2025, 11, 21),    # 3 months earlier
+    MetaFormat.OP15: datetime(2026, 3, 4),
+    MetaFormat.OP16: datetime(2026, 5, 29),
+    MetaFormat.OP17: datetime(2026, 8, 28),
+}
+
+# Western release dates (existing dates)
+_WESTERN_RELEASE_DATETIMES: dict[MetaFormat, datetime] = {
+    MetaFormat.OP01: datetime(2022, 12, 2),
+    MetaFormat.OP02: datetime(2023, 3, 10),
+    MetaFormat.OP03: datetime(2023, 6, 30),
+    MetaFormat.OP04: datetime(2023, 9, 22),
+    MetaFormat.OP05: datetime(2023, 12, 8),
+    MetaFormat.OP06: datetime(2024, 3, 8),
+    MetaFormat.OP07: datetime(2024, 6, 28),
+    MetaFormat.OP08: datetime(2024, 9, 13),
+    MetaFormat.OP09: datetime(2024, 12, 13),
+    MetaFormat.OP10: datetime(2025, 3, 21),
+    MetaFormat.OP11: datetime(2025, 6, 6),
+    MetaFormat.OP12: datetime(2025, 8, 22),
+    MetaFormat.OP13: datetime(2025, 11, 7),
+    MetaFormat.OP14: datetime(2026, 1, 16),
+    MetaFormat.OP15: datetime(2026, 4, 3),
+    MetaFormat.OP16: datetime(2026, 6, 12),
+    MetaFormat.OP17: datetime(2026, 8, 28),
+}
+
+
+class MetaFormatRegistry:
+    """Read-only lookup tables of all meta formats in release order, built and validated once at import.
+
+    to_tuple results depend on the current time, they are memoized per arguments until the next release datetime
+    of any meta format has passed.
+    """
+
+    def __init__(self, release_datetimes: dict[MetaFormatRegion, dict[MetaFormat, datetime]]):
+        self.meta_formats: tuple[MetaFormat, ...] = tuple(MetaFormat)
+        self.ordinal: Mapping[str, int] = MappingProxyType(
+            {meta_format.value: i for i, meta_format in enumerate(self.meta_formats)})
+        self.release_datetimes: Mapping[MetaFormatRegion, Mapping[str, datetime]] = MappingProxyType(
+            {region: MappingProxyType(dict(datetimes)) for region, datetimes in release_datetimes.items()})
+        self._to_tuple_memo: dict[tuple, tuple[str, ...]] = {}
+        # memo entries are valid until this datetime
+        self._memo_valid_until = datetime.min
+        self.validate()
+
+    def validate(self) -> None:
+        """Raises ValueError if release datetimes belong to unknown meta formats or are not in release order.
+        Duplicated meta format values are rejected by @unique already."""
+        for region, datetimes in self.release_datetimes.items():
+            unknown = [meta_format for meta_format in datetimes if meta_format not in self.ordinal]
+            if unknown:
+                raise ValueError(f"Release datetimes of unknown meta formats in {region}: {unknown}")
+            ordered = sorted(datetimes, key=self.ordinal.__getitem__)
+            for previous, meta_format in zip(ordered, ordered[1:]):
+                if datetimes[previous] > datetimes[meta_format]:
+                    raise ValueError(f"{meta_format} is released before {previous} in {region}")
+
+    def index_of(self, meta_format: str) -> int:
+        try:
+            return self.ordinal[meta_format]
+        except KeyError:
+            raise ValueError(f"{meta_format!r} is not a valid MetaFormat") from None
+
+    def is_released(self, meta_format: str, region: MetaFormatRegion, now: datetime) -> bool:
+        release_datetime = self.release_datetimes.get(region, {}).get(meta_format)
+        return release_datetime is not None and release_datetime <= now
+
+    def _next_release_datetime(self, now: datetime) -> datetime:
+        return min((release_datetime for datetimes in self.release_datetimes.values()
+                    for release_datetime in datetimes.values() if release_datetime > now), default=datetime.max)
+
+    def to_tuple(self, only_after_release: bool = True, until_meta_format: str | None = None,
+                 region: MetaFormatRegion = MetaFormatRegion.ALL) -> tuple[str, ...]:
+        """Meta format values in release order, see MetaFormat.to_list"""
+        key = (only_after_release, until_meta_format, region)
+        now = datetime.now()
+        if now >= self._memo_valid_until:
+            self._to_tuple_memo.clear()
+            self._memo_valid_until = self._next_release_datetime(now)
+        meta_formats = self._to_tuple_memo.get(key)
+        if meta_formats is None:
+            meta_formats = self.meta_formats
+            if until_meta_format is not None:
+                meta_formats = meta_formats[:self.index_of(MetaFormat(until_meta_format)) + 1]
+            meta_formats = tuple(meta_format.value for meta_format in meta_formats
+                                 if not only_after_release or self.is_released(meta_format, region, now))
+            self._to_tuple_memo[key] = meta_formats
+        return meta_formats
+
+
+META_FORMAT_REGISTRY = MetaFormatRegistry({
+    MetaFormatRegion.ASIA: _JAPANESE_RELEASE_DATETIMES,
+    MetaFormatRegion.WEST: _WESTERN_RELEASE_DATETIMES,
+    # the earliest release date (Japanese)
+    MetaFormatRegion.ALL: _JAPANESE_RELEASE_DATETIMES,
+})
+
 def meta_format2release_datetime(meta_format: MetaFormat, region: MetaFormatRegion = MetaFormatRegion.WEST) -> datetime | None:
     """
     Get the release datetime for a meta format in a specific region.
@@ -110,58 +226,7 @@ def meta_format2release_datetime(meta_format: MetaFormat, region: MetaFormatRegi
         datetime object for the release date, or None if not available
         
     """
-    # Japanese release dates
-    # TODO: include correct datetime (only approximated right now)
-    japanese_releases = {
-        MetaFormat.OP01: datetime(2022, 9, 2),     # 3 months earlier
-        MetaFormat.OP02: datetime(2022, 12, 10),   # 3 months earlier  
-        MetaFormat.OP03: datetime(2023, 3, 30),    # 3 months earlier
-        MetaFormat.OP04: datetime(2023, 6, 22),    # 3 months earlier
-        MetaFormat.OP05: datetime(2023, 9, 8),     # 3 months earlier
-        MetaFormat.OP06: datetime(2023, 12, 8),    # 3 months earlier
-        MetaFormat.OP07: datetime(2024, 3, 28),    # 3 months earlier
-        MetaFormat.OP08: datetime(2024, 6, 13),    # 3 months earlier
-        MetaFormat.OP09: datetime(2024, 9, 13),    # 3 months earlier
-        MetaFormat.OP10: datetime(2024, 12, 21),   # 3 months earlier
-        MetaFormat.OP11: datetime(2025, 3, 6),     # 3 months earlier
-        MetaFormat.OP12: datetime(2025, 5, 31),    # 3 months earlier
-        MetaFormat.OP13: datetime(2025, 8, 23),    # 3 months earlier
-        MetaFormat.OP14: datetime(2025, 11, 21),    # 3 months earlier
-        MetaFormat.OP15: datetime(2026, 3, 4),
-        MetaFormat.OP16: datetime(2026, 5, 29),
-        MetaFormat.OP17: datetime(2026, 8, 28),
-    }
-    
-    # Western release dates (existing dates)
-    western_releases = {
-        MetaFormat.OP01: datetime(2022, 12, 2),
-        MetaFormat.OP02: datetime(2023, 3, 10),
-        MetaFormat.OP03: datetime(2023, 6, 30),
-        MetaFormat.OP04: datetime(2023, 9, 22),
-        MetaFormat.OP05: datetime(2023, 12, 8),
-        MetaFormat.OP06: datetime(2024, 3, 8),
-        MetaFormat.OP07: datetime(2024, 6, 28),
-        MetaFormat.OP08: datetime(2024, 9, 13),
-        MetaFormat.OP09: datetime(2024, 12, 13),
-        MetaFormat.OP10: datetime(2025, 3, 21),
-        MetaFormat.OP11: datetime(2025, 6, 6),
-        MetaFormat.OP12: datetime(2025, 8, 22),
-        MetaFormat.OP13: datetime(2025, 11, 7),
-        MetaFormat.OP14: datetime(2026, 1, 16),
-        MetaFormat.OP15: datetime(2026, 4, 3),
-        MetaFormat.OP16: datetime(2026, 6, 12),
-        MetaFormat.OP17: datetime(2026, 8, 28),
-    }
-    
-    if region == MetaFormatRegion.ASIA:
-        return japanese_releases.get(meta_format)
-    elif region == MetaFormatRegion.WEST:
-        return western_releases.get(meta_format)
-    elif region == MetaFormatRegion.ALL:
-        # Return the earliest release date (Japanese)
-        return japanese_releases.get(meta_format)
-    else:
-        return None
+    return META_FORMAT_REGISTRY.release_datetimes.get(region, {}).get(meta_format)
 
 def meta_format2side_meta_format(meta_format: MetaFormat, region: MetaFormatRegion = MetaFormatRegion.WEST) -> SideMetaFormat | None:
     """
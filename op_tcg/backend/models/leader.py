@@ -1,4 +1,4 @@
-from datetime import date
+from datetime import date, datetime
 from enum import StrEnum
 
 from pydantic import Field
@@ -28,6 +28,21 @@ class LeaderElo(BQTableBaseModel):
     end_date: date = Field(description="Date in which the elo calculation ended")
 
 
+class LeaderEloCheckpoint(BQTableBaseModel):
+    _dataset_id: str = BQDataset.LEADERS
+    meta_format: MetaFormat = Field(description="Meta in which the elo is calculated", primary_key=True)
+    leader_id: str = Field(description="The op tcg leader id e.g. OP03-099", primary_key=True)
+    only_official: bool = Field(default=False, description="Whether the matches are only originated from "
+                                                           "official tournaments", primary_key=True)
+    elo: int = Field(description="Elo rating of leader after all matches until last_match_timestamp")
+    start_date: date = Field(description="Date in which the elo calculation started")
+    last_match_timestamp: datetime = Field(description="Timestamp of the latest match included in the elo rating")
+    last_create_timestamp: datetime | None = Field(default=None, description="Latest create_timestamp of the matches "
+                                                                             "included in the elo rating. Matches "
+                                                                             "created afterwards are folded into the "
+                                                                             "rating by the next incremental run")
+
+
 class TournamentWinner(BQTableBaseModel):
     _dataset_id: str = BQDataset.LEADERS
     meta_format: MetaFormat = Field(description="Meta until or in which the elo is calculated", primary_key=True)
@@ -1,4 +1,7 @@
 from functools import wraps
+from typing import Callable
+from urllib.parse import urlparse
+import threading
 import time
 
 def booleanize(s):
@@ -13,4 +16,26 @@ def timeit(func):
         total_time = end_time - start_time
         print(f'Function {func.__name__}{args} {kwargs} Took {total_time:.4f} seconds')
         return result
-    return timeit_wrapper
\ No newline at end of file
+    return timeit_wrapper
+
+class HostRateLimiter:
+    """Spaces requests to the same host by at least 1/requests_per_second seconds.
+    Thread safe, requests to different hosts do not wait for each other."""
+
+    def __init__(self, requests_per_second: float, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.min_interval = 1 / requests_per_second if requests_per_second > 0 else 0.0
+        self.clock = clock
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        self._host2next_slot: dict[str, float] = {}
+
+    def wait(self, url: str) -> None:
+        host = urlparse(url).netloc
+        with self._lock:
+            now = self.clock()
+            # reserve the next free slot of the host and sleep outside of the lock
+            slot = max(now, self._host2next_slot.get(host, now))
+            self._host2next_slot[host] = slot + self.min_interval
+        if slot > now:
+            self.sleep(slot - now)
@@ -202,9 +202,9 @@ def crawl_decklist_cards(
             logging.warning("Card data could not be extracted", str(e))
             continue
         # Upload to big query
-        bq_insert_rows([json.loads(bq_card.model_dump_json()) for bq_card in card_data.cards], table=card_table,
+        bq_insert_rows(card_data.cards, table=card_table,
                        client=bq_client)
-        bq_insert_rows([json.loads(bq_card_price.model_dump_json()) for bq_card_price in card_data.card_prices],
+        bq_insert_rows(card_data.card_prices,
                        table=card_price_table, client=bq_client)
 
 @op_top_deck_group.command()
@@ -230,7 +230,7 @@ def crawl_decklists(
     else:
         # default: take the latest west and asia meta
         latest_meta_format = MetaFormat.latest_meta_format()
-        latest_meta_format_i = MetaFormat.to_list(only_after_release=False).index(latest_meta_format)
+        latest_meta_format_i = MetaFormat.index_of(latest_meta_format)
         meta_formats = MetaFormat.to_list(only_after_release=False)[latest_meta_format_i: latest_meta_format_i+2]
 
     process.crawl(OPTopDeckDecklistSpider, meta_formats=meta_formats, delete_existing=delete_existing)
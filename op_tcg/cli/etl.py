@@ -35,29 +35,38 @@ def upload_matches(
 @etl_group.command()
 @click.option("--meta-formats", "-m", multiple=True)
 @click.option("--file-path", "-f", type=click.Path(), default=None)
+@click.option("--incremental", is_flag=True, default=False)
+@click.option("--workers", "-w", type=int, default=1)
 def calculate_leader_elo(
         meta_formats: tuple[MetaFormat],
-        file_path: Path=None
+        file_path: Path=None,
+        incremental: bool=False,
+        workers: int=1
 ) -> None:
     """
     Starts a job which calculates all elo rating for all leaders and all meta format and pushes result to BQ.
 
     file_path: Optional file path to matches.csv containing rows matching the BQ Schema BQMatch
     meta_formats: Tuple of relevant meta format which should be used for the data update. If None provided, all meta formats are used.
+    incremental: Only fold matches created after the last stored elo checkpoint into the ratings
+    workers: Number of processes which calculate the meta formats (official and all matches) in parallel
 
     """
 
     assert not (file_path is None and meta_formats is None), "Content of file is not filtered by meta format. Either provide a file only or select some meta formats"
     meta_formats = meta_formats or MetaFormat.to_list()
-    etl_job = EloUpdateToBigQueryEtlJob(meta_formats=meta_formats, matches_csv_file_path=file_path)
+    etl_job = EloUpdateToBigQueryEtlJob(meta_formats=meta_formats, matches_csv_file_path=file_path, incremental=incremental,
+                                         workers=workers)
     etl_job.run()
 
 @etl_group.command()
 @click.option("--meta-formats", "-m", multiple=True)
 @click.option("--file-path", "-f", type=click.Path(), default=None)
+@click.option("--max-workers", "-w", type=int, default=8, help="Number of concurrent image downloads/uploads")
 def update_card_images(
         meta_formats: tuple[MetaFormat],
-        file_path: Path=None
+        file_path: Path=None,
+        max_workers: int = 8
 ) -> None:
     """
     Starts a job which downloads all card images which do no exist yet in gcp storage.
@@ -66,7 +75,7 @@ def update_card_images(
 
     assert not (file_path is None and meta_formats is None), "Content of file is not filtered by meta format. Either provide a file only or select some meta formats"
     meta_formats = list(meta_formats)
-    etl_job = CardImageUpdateToGCPEtlJob(meta_formats=meta_formats)
+    etl_job = CardImageUpdateToGCPEtlJob(meta_formats=meta_formats, max_workers=max_workers)
     etl_job.run()
 
 
@@ -2,10 +2,10 @@ from fasthtml import ft
 from starlette.requests import Request
 from op_tcg.backend.models.input import MetaFormat
 from op_tcg.backend.models.cards import CardCurrency, OPTcgLanguage
-from op_tcg.frontend.utils.extract import get_leader_data, get_tournament_decklist_data, get_card_id_card_data_lookup, get_leader_extended
+from op_tcg.frontend.utils.extract import get_leader_data, get_card_id_card_data_lookup, get_leader_extended
 from op_tcg.frontend.utils.api import get_query_params_as_dict
 from op_tcg.frontend.utils.card_price import get_decklist_price
-from op_tcg.frontend.utils.decklist import tournament_standings2decklist_data
+from op_tcg.frontend.utils.decklist import get_decklist_data
 from op_tcg.frontend.utils.filter import filter_leader_extended
 from op_tcg.frontend.components.loading import create_loading_spinner
 from op_tcg.frontend.pages.card_movement import (
@@ -35,23 +35,13 @@ def get_card_frequency_analysis(leader_id: str, current_meta: MetaFormat, previo
     """Analyze card frequency changes between two meta formats for a specific leader"""
     card_id2card_data = get_card_id_card_data_lookup()
     
-    # Get tournament decklist data for both meta formats
-    current_decklists = get_tournament_decklist_data(
-        meta_formats=[current_meta], 
-        leader_ids=[leader_id]
-    )
-    previous_decklists = get_tournament_decklist_data(
-        meta_formats=[previous_meta], 
-        leader_ids=[leader_id]
-    )
+    # Get precomputed decklist data for both meta formats
+    current_data = get_decklist_data(leader_id, meta_formats=[current_meta])
+    previous_data = get_decklist_data(leader_id, meta_formats=[previous_meta])
     
-    if not current_decklists and not previous_decklists:
+    if not current_data and not previous_data:
         return {"error": "No decklist data found for either meta format"}
     
-    # Convert to decklist data structures
-    current_data = tournament_standings2decklist_data(current_decklists, card_id2card_data) if current_decklists else None
-    previous_data = tournament_standings2decklist_data(previous_decklists, card_id2card_data) if previous_decklists else None
-    
     # Get all cards that appear in either meta
     all_card_ids = set()
     if current_data:
@@ -122,8 +112,8 @@ def get_card_frequency_analysis(leader_id: str, current_meta: MetaFormat, previo
     return {
         "current_meta": current_meta,
         "previous_meta": previous_meta,
-        "current_decklists_count": len(current_decklists) if current_decklists else 0,
-        "previous_decklists_count": len(previous_decklists) if previous_decklists else 0,
+        "current_decklists_count": current_data.num_decklists if current_data else 0,
+        "previous_decklists_count": previous_data.num_decklists if previous_data else 0,
         "increased_cards": increased_cards[:20],  # Top 20 increased
         "decreased_cards": decreased_cards[:20],  # Top 20 decreased
         "new_cards": new_cards[:15],  # Top 15 new
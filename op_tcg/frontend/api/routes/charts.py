@@ -75,20 +75,16 @@ def setup_api_routes(rt):
         region_param = request.query_params.get("region", MetaFormatRegion.ALL.value)
         region = MetaFormatRegion(region_param) if region_param else MetaFormatRegion.ALL
         
-        all_leader_data = get_leader_extended(meta_format_region=region)
-        
+        # Get only the data for the specific leader we're charting
+        leader_data = get_leader_extended(leader_ids=[leader_id], meta_format_region=region,
+                                          only_official=only_official_param)
+
         # Filter by all meta formats up to and including the selected one
         relevant_meta_formats = all_meta_formats[:meta_format_index + 1]
-        filtered_leaders = [l for l in all_leader_data if l.meta_format in relevant_meta_formats]
-        
-        # Apply only_official filter
-        filtered_leaders = [l for l in filtered_leaders if l.only_official == only_official_param]
-        
-        # Sort by meta format to ensure chronological order
-        filtered_leaders.sort(key=lambda x: all_meta_formats.index(x.meta_format))
+        leader_history = [l for l in leader_data if l.meta_format in relevant_meta_formats]
 
-        # Get only the data for the specific leader we're charting
-        leader_history = [l for l in filtered_leaders if l.id == leader_id]
+        # Sort by meta format to ensure chronological order
+        leader_history.sort(key=lambda x: MetaFormat.index_of(x.meta_format))
         
         if not leader_history:
             # No data for this leader, return empty chart
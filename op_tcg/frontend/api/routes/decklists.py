@@ -11,7 +11,7 @@ from op_tcg.frontend.utils.extract import (
 from op_tcg.frontend.components.decklist import create_decklist_section
 from op_tcg.frontend.api.models import LeaderDataParams
 from op_tcg.backend.models.input import MetaFormatRegion
-from op_tcg.frontend.utils.decklist import DecklistViewMode
+from op_tcg.frontend.utils.decklist import DecklistViewMode, get_decklist_data
 from op_tcg.frontend.components.decklist_modal import create_decklist_modal, display_decklist_modal
 from op_tcg.frontend.components.decklist_export import create_decklist_export_component
 from op_tcg.backend.db import get_decklist_watchlist
@@ -30,9 +30,10 @@ def setup_api_routes(rt):
             meta_format_region=params.region
         )
         card_id2card_data = get_card_id_card_data_lookup()
+        decklist_data = get_decklist_data(params.lid, meta_formats=params.meta_format, meta_format_region=params.region)
         
         # Create decklist section
-        return create_decklist_section(params.lid, tournament_decklists, card_id2card_data)
+        return create_decklist_section(params.lid, tournament_decklists, card_id2card_data, decklist_data=decklist_data)
 
     @rt("/api/decklist-modal")
     async def get_decklist_modal(request: Request):
@@ -1,16 +1,15 @@
-import re
 from fasthtml import ft
 from starlette.requests import Request
 
 from op_tcg.backend.db import get_watchlist
 from op_tcg.backend.models.leader import LeaderExtended, LeaderboardSortBy
-from op_tcg.backend.models.input import MetaFormat, MetaFormatRegion
+from op_tcg.backend.models.input import MetaFormatRegion
 from op_tcg.backend.models.cards import CardCurrency
 from op_tcg.frontend.utils.extract import (
     get_card_lookup_by_id_and_aa,
     get_leader_extended,
     get_card_popularity_data,
-    get_card_id_card_data_lookup,
+    get_card_search_index,
     get_leader_average_deck_prices
 )
 from op_tcg.frontend.pages.home import create_leaderboard_table
@@ -23,91 +22,17 @@ from op_tcg.frontend.api.models import LeaderboardFilter, LeaderboardSort, Leade
 from op_tcg.frontend.components.card_modal import create_card_modal
 from op_tcg.frontend.components.info_modal import create_info_modal
 
-def filter_cards(cards_data: list, params: CardPopularityParams) -> list:
-    """Filter cards based on the provided parameters.
-    
+def filter_cards(params: CardPopularityParams) -> list:
+    """Filter all cards based on the provided parameters with the cached card search index.
+
     Args:
-        cards_data: List of card data objects
         params: CardPopularityParams object containing filter criteria
-        
+
     Returns:
-        Filtered list of cards
+        Filtered list of cards in the order of the card lookup
     """
-    filtered_cards = []
-    
-    for card in cards_data:
-        # Skip if card is from a newer meta format
-        if card.meta_format and MetaFormat.to_list(only_after_release=False).index(card.meta_format) > MetaFormat.to_list(only_after_release=False).index(params.meta_format):
-            continue
-            
-        # Filter by release meta format
-        if params.release_meta_format and card.meta_format != params.release_meta_format:
-            continue
+    return get_card_search_index().filter(params)
 
-        # Filter by search term — split on whitespace and ";" so "OP09 Luffy" works
-        if params.search_term:
-            searchable = card.get_searchable_string().lower()
-            search_terms = [t for t in re.split(r'[;\s]+', params.search_term.lower()) if t]
-            if not all(term in searchable for term in search_terms):
-                continue
-            
-        # Filter by colors
-        if not any(color in params.card_colors for color in card.colors):
-            continue
-            
-        # Filter by attributes
-        if params.card_attributes and not any(attr in params.card_attributes for attr in card.attributes):
-            continue
-            
-        # Filter by card category
-        if params.card_category and card.card_category not in params.card_category:
-            continue
-            
-        # Filter by card rarity
-        if params.card_rarity and card.rarity not in params.card_rarity:
-            continue
-
-        # Filter by counter
-        if params.card_counter == 0 and card.counter not in [None, 0]:
-            continue
-
-        elif params.card_counter not in [0, None] and card.counter != params.card_counter:
-            continue
-
-        # Filter by card types
-        if params.card_types and not any(t in params.card_types for t in card.types):
-            continue
-            
-        # Filter by cost range
-        if card.cost is not None and not (params.min_cost <= card.cost <= params.max_cost):
-            continue
-            
-        # Filter by power range
-        if card.power is not None and not (params.min_power * 1000 <= card.power <= params.max_power * 1000):
-            continue
-            
-        # Filter by price range
-        if params.currency == CardCurrency.EURO and card.latest_eur_price:
-            if not (params.min_price <= card.latest_eur_price <= params.max_price):
-                continue
-        elif params.currency == CardCurrency.US_DOLLAR and card.latest_usd_price:
-            if not (params.min_price <= card.latest_usd_price <= params.max_price):
-                continue
-                
-        # Filter by abilities
-        if params.card_abilities or params.ability_text:
-            if params.filter_operator == "OR":
-                if not (any(ability in card.ability for ability in (params.card_abilities or [])) or 
-                       (params.ability_text and params.ability_text.lower() in card.ability.lower())):
-                    continue
-            else:  # AND
-                if not (all(ability in card.ability for ability in (params.card_abilities or [])) and 
-                       (not params.ability_text or params.ability_text.lower() in card.ability.lower())):
-                    continue
-        
-        filtered_cards.append(card)
-    
-    return filtered_cards
 
 def setup_api_routes(rt):
     @rt("/api/tournament-content")
@@ -265,8 +190,7 @@ def setup_api_routes(rt):
         # Parse params using Pydantic model
         params = CardPopularityParams(**get_query_params_as_dict(request))
         
-        # Get card data and popularity data
-        card_data_lookup = get_card_id_card_data_lookup()
+        # Get popularity data
         card_popularity_list = get_card_popularity_data()
         
         # Filter card popularity data by requested meta format
@@ -281,9 +205,8 @@ def setup_api_routes(rt):
             for cid, popularity_list in card_popularity_dict.items() 
         }
         
-        # Get all cards and apply filters
-        cards_data = list(card_data_lookup.values())
-        filtered_cards = filter_cards(cards_data, params)
+        # Apply filters to all cards
+        filtered_cards = filter_cards(params)
         
         # Sort cards by popularity
         filtered_cards.sort(
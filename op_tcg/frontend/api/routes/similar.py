@@ -4,7 +4,8 @@ from starlette.requests import Request
 from op_tcg.backend.etl.extract import get_card_image_url
 from op_tcg.frontend.utils.api import get_query_params_as_dict
 from op_tcg.frontend.api.models import LeaderDataParams
-from op_tcg.frontend.utils.similar import get_most_similar_leader_data, SimilarLeaderData
+from op_tcg.frontend.utils.similar import get_most_similar_leader_data, SimilarLeaderData, \
+    SIMILARITY_THRESHOLD_OCCURRENCE, SIMILAR_LEADERS_TOP_K
 from op_tcg.frontend.utils.leader_data import lid_to_name_and_lid, get_lid2ldata_dict_cached
 from op_tcg.frontend.utils.extract import get_card_id_card_data_lookup
 from op_tcg.backend.models.cards import Card, LatestCardPrice, OPTcgLanguage
@@ -19,7 +20,10 @@ def setup_api_routes(rt):
         lid2similar_leader_data: dict[str, SimilarLeaderData] = get_most_similar_leader_data(
             params.lid,
             params.meta_format,
-            threshold_occurrence=0.1
+            threshold_occurrence=SIMILARITY_THRESHOLD_OCCURRENCE,
+            top_k=SIMILAR_LEADERS_TOP_K,
+            # the selected leader can be outside of the top k
+            include_leader_ids=[params.similar_lid] if params.similar_lid else None
         )
         
         if not lid2similar_leader_data:
@@ -39,6 +43,10 @@ def setup_api_routes(rt):
         # Get the selected similar leader ID from the request or use the most similar one
         selected_most_similar_lid = params.similar_lid if params.similar_lid in most_similar_leader_ids else most_similar_leader_ids[0]
         similar_leader_data = lid2similar_leader_data[selected_most_similar_lid]
+        # the dropdown shows the top k leaders and the selected one
+        select_leader_ids = most_similar_leader_ids[:SIMILAR_LEADERS_TOP_K]
+        if selected_most_similar_lid not in select_leader_ids:
+            select_leader_ids.append(selected_most_similar_lid)
         
         # Calculate prices
         cards_missing_price_eur = sum([
@@ -82,7 +90,7 @@ def setup_api_routes(rt):
                             value=lid,
                             selected=(lid == selected_most_similar_lid)
                         )
-                        for lid in most_similar_leader_ids[:10]
+                        for lid in select_leader_ids
                     ],
                     hx_get="/api/leader-similar",
                     hx_trigger="change",
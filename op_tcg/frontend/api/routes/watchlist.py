@@ -702,11 +702,7 @@ def setup_watchlist_routes(rt):
             return JSONResponse({"error": "Missing required fields"}, status_code=400)
         meta_format = data.get('meta_format', '')
         tags = _parse_tags(data.get('tags', [DEFAULT_WATCHLIST_TAG]))
-        td = next(
-            (x for x in get_all_tournament_decklist_data()
-             if x.tournament_id == tournament_id and x.player_id == player_id),
-            None,
-        )
+        td = get_all_tournament_decklist_data().find(tournament_id, player_id)
         tournament_timestamp = td.tournament_timestamp if td else None
         decklist_id = td.decklist_id if td else None
         add_decklist_to_watchlist(user.get('sub'), leader_id, tournament_id, player_id, meta_format, tags, tournament_timestamp, decklist_id)
@@ -785,11 +781,7 @@ def setup_watchlist_routes(rt):
             return ft.P("Missing parameters.", style="color:#ef4444;font-size:.875rem;padding:.75rem;")
 
         # Cached lookup — fast after first call
-        all_decklists = get_all_tournament_decklist_data()
-        selected = next(
-            (td for td in all_decklists if td.tournament_id == tournament_id and td.player_id == player_id),
-            None
-        )
+        selected = get_all_tournament_decklist_data().find(tournament_id, player_id)
 
         if not selected or not selected.decklist:
             return ft.P("Decklist not found.", style="color:#475569;font-size:.875rem;padding:.75rem;")
@@ -993,8 +985,7 @@ def setup_watchlist_routes(rt):
         if not params.search_term:
             return ft.P("Type to search for cards.", style="color:#475569;font-size:.875rem;text-align:center;padding:16px 0;")
 
-        card_lookup = get_card_id_card_data_lookup()
-        filtered = filter_cards(list(card_lookup.values()), params)
+        filtered = filter_cards(params)
 
         if not filtered:
             return ft.P("No cards found.", style="color:#475569;font-size:.875rem;text-align:center;padding:16px 0;")
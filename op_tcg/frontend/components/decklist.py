@@ -175,7 +175,8 @@ def display_decklist(decklist: dict[str, int], card_id2card_data: dict[str, Exte
         cls="mb-8"  # Added extra margin for spacing
     )
 
-def create_decklist_section(leader_id: str, tournament_decklists, card_id2card_data):
+def create_decklist_section(leader_id: str, tournament_decklists, card_id2card_data,
+                            decklist_data: DecklistData | None = None):
     """
     Create a complete decklist section for the leader page.
     
@@ -183,6 +184,7 @@ def create_decklist_section(leader_id: str, tournament_decklists, card_id2card_d
         leader_id: Leader card ID
         tournament_decklists: List of tournament decklists
         card_id2card_data: Mapping of card IDs to card data
+        decklist_data: Precomputed aggregate of tournament_decklists. Calculated from tournament_decklists if None
     
     Returns:
         A Div containing the complete decklist section
@@ -198,7 +200,8 @@ def create_decklist_section(leader_id: str, tournament_decklists, card_id2card_d
     if not tournament_decklists:
         return ft.P("No decklist data available for this leader.", cls="text-red-400")
     
-    decklist_data = tournament_standings2decklist_data(tournament_decklists, card_id2card_data)
+    if decklist_data is None:
+        decklist_data = tournament_standings2decklist_data(tournament_decklists, card_id2card_data)
     common_card_ids = decklist_data_to_card_ids(
         decklist_data,
         occurrence_threshold=0.02,
@@ -33,8 +33,7 @@ from starlette.requests import Request
 from op_tcg.frontend.utils.cache_warmer import start_cache_warming, stop_cache_warming, warm_cache_now
 from op_tcg.frontend.utils.seo import canonical_base, write_static_sitemap, page_head
 from op_tcg.frontend.utils.og_images import (
-    get_meta_og_image_bytes, warm_meta_og_image,
-    get_leader_og_image_bytes, warm_leader_og_image,
+    get_og_image_renderer, og_image_response, start_og_image_rendering, stop_og_image_rendering,
 )
 from op_tcg.frontend.utils.middleware import canonical_redirect_middleware
 from starlette.middleware.base import BaseHTTPMiddleware
@@ -61,9 +60,8 @@ async def lifespan(app):
         # Generate static sitemap on startup so /sitemap.xml is always available
         write_static_sitemap()
         logger.info("Static sitemap.xml generated successfully")
-        # Pre-generate OG images so social previews are ready immediately
-        warm_meta_og_image()
-        warm_leader_og_image()
+        # Render OG images in the background so social previews are ready without blocking requests
+        start_og_image_rendering()
     except Exception as e:
         logger.error(f"Failed to start cache warming: {e}")
     
@@ -76,6 +74,7 @@ async def lifespan(app):
         logger.info("Cache warming stopped successfully")
     except Exception as e:
         logger.error(f"Error stopping cache warming: {e}")
+    stop_og_image_rendering()
 
 # Create main app with lifespan manager
 app, rt = fast_app(
@@ -149,8 +148,6 @@ setup_api_routes(rt)
 setup_auth_routes(rt)
 setup_settings_routes(rt)
 
-from starlette.responses import Response as StarletteResponse
-
 
 class _FileRouteMiddleware(BaseHTTPMiddleware):
     """Serve paths with file extensions before FastHTML routing (which doesn't match dots)."""
@@ -159,17 +156,23 @@ class _FileRouteMiddleware(BaseHTTPMiddleware):
         path = request.url.path
         if path == "/sitemap.xml":
             return FileResponse("public/sitemap.xml", media_type="application/xml")
-        if path == "/og/meta.png":
-            png = get_meta_og_image_bytes()
-            if png:
-                return StarletteResponse(content=png, media_type="image/png",
-                                         headers={"Cache-Control": "public, max-age=14400"})
-            return FileResponse("public/favicon32x23.png", media_type="image/png")
-        if path == "/og/leader.png":
-            png = get_leader_og_image_bytes()
-            if png:
-                return StarletteResponse(content=png, media_type="image/png",
-                                         headers={"Cache-Control": "public, max-age=14400"})
+        if path.startswith("/og/") and path.endswith(".png"):
+            # OG images are rendered in the background, requests only get the last good file
+            renderer = get_og_image_renderer()
+            fallback = None
+            if path == "/og/meta.png":
+                image = renderer.get_image("meta")
+            elif path == "/og/leader.png":
+                image = renderer.get_image("leader")
+            elif path.startswith("/og/leader/"):
+                leader_id = path.removeprefix("/og/leader/").removesuffix(".png")
+                image, fallback = renderer.get_leader_image(leader_id), renderer.get_image("leader")
+                if image is None:
+                    image, fallback = fallback, None
+            else:
+                return await call_next(request)
+            if image is not None:
+                return og_image_response(request.headers, image, fallback=fallback)
             return FileResponse("public/favicon32x23.png", media_type="image/png")
         return await call_next(request)
 
@@ -303,7 +306,7 @@ def leader_default(request: Request):
         "One Piece TCG leaders, OP TCG leader tier list, OPTCG leader win rate, "
         "One Piece card game decks, OP TCG best leaders, One Piece TCG decklists by leader"
     )
-    og_image_url = f"{base}/og/leader.png"
+    og_image_url = f"{base}/og/leader/{leader_id}.png" if leader_id else f"{base}/og/leader.png"
 
     persist_query = {
         "meta_format": request.query_params.get("meta_format"),
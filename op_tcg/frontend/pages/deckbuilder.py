@@ -816,11 +816,7 @@ def deckbuilder_page(request):
             prefill_decklist = {k: int(v) for k, v in (match.get('decklist') or {}).items()}
 
     if import_tournament_id and import_player_id:
-        td = next(
-            (x for x in get_all_tournament_decklist_data()
-             if x.tournament_id == import_tournament_id and x.player_id == import_player_id),
-            None,
-        )
+        td = get_all_tournament_decklist_data().find(import_tournament_id, import_player_id)
         if td:
             prefill_decklist = {k: int(v) for k, v in (td.decklist or {}).items()}
             prefill_leader_id = td.leader_id  # always override — import brings its own leader
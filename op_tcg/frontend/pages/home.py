@@ -279,7 +279,7 @@ def create_chart_data_for_leader(leader: LeaderExtended, all_leaders: list[Leade
 
 
 def create_leaderboard_table(filtered_leaders: list[LeaderExtended], all_leaders: list[LeaderExtended], meta_format: MetaFormat, region: MetaFormatRegion | None = None, leader_prices: dict[str, float] | None = None, sort_by: LeaderboardSortBy = LeaderboardSortBy.WIN_RATE, ascending: bool = False):
-    relevant_meta_formats = MetaFormat.to_list()[:MetaFormat.to_list().index(meta_format) + 1]
+    relevant_meta_formats = MetaFormat.to_list(until_meta_format=meta_format)
     selected_meta_leaders = [
         leader for leader in filtered_leaders
         if leader.meta_format == meta_format and leader.meta_format in relevant_meta_formats
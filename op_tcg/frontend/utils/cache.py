@@ -1,15 +1,154 @@
+import hashlib
 import logging
-from typing import Any
+import os
+import threading
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Any, Callable, Hashable, TypeVar
 from cachetools import TTLCache
 from google.cloud import bigquery
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+def cache_key_hash(key: Hashable) -> str:
+    """Short stable label of a cache key, raw keys contain SQL text and query parameters"""
+    return hashlib.sha256(repr(key).encode()).hexdigest()[:12]
+
+
+class StaleWhileRevalidateCache:
+    """TTL cache which keeps serving expired entries for a grace window while they are refreshed in the background.
+
+    Entries are fresh until ttl seconds after they were stored. Afterwards they are stale for grace_seconds: a read
+    still returns the stale value, but schedules the loader of the entry on the refresh executor. Entries without a
+    loader or older than ttl + grace_seconds are treated like expired TTLCache entries.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, grace_seconds: float = 0.0, timer: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.grace_seconds = grace_seconds
+        self._timer = timer
+        # key -> (value, stored_at, loader). The underlying TTLCache drops entries after the grace window.
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl + grace_seconds, timer=timer)
+        self._refreshing: set[Hashable] = set()
+        self._lock = threading.RLock()
+        self.stale_hits = 0
+        self.refreshes = 0
+        self.failed_refreshes = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __getitem__(self, key: Hashable) -> Any:
+        with self._lock:
+            if key not in self._entries:
+                raise KeyError(key)
+        return self.get(key)
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        self.set(key, value)
+
+    def set(self, key: Hashable, value: Any, loader: Callable[[], Any] | None = None) -> None:
+        """Stores a value. loader recomputes and stores the entry, it is kept from the previous entry if not provided."""
+        with self._lock:
+            if loader is None and key in self._entries:
+                loader = self._entries[key][2]
+            self._entries[key] = (value, self._timer(), loader)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, stored_at, loader = entry
+            if self._timer() - stored_at < self.ttl:
+                return value
+            self.stale_hits += 1
+            if loader is not None and key not in self._refreshing:
+                self._refreshing.add(key)
+                self._submit_refresh(key, loader)
+            return value
+
+    def get_fresh(self, key: Hashable, default: Any = None) -> Any:
+        """Returns the value only if the entry is not stale"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._timer() - entry[1] >= self.ttl:
+                return default
+            return entry[0]
+
+    def _submit_refresh(self, key: Hashable, loader: Callable[[], Any]) -> None:
+        def refresh():
+            try:
+                loader()
+                self.refreshes += 1
+            except Exception as e:
+                self.failed_refreshes += 1
+                logger.error(f"Background refresh of cache entry failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        try:
+            get_refresh_executor().submit(refresh)
+        except RuntimeError as e:
+            # executor was shut down, the entry is refreshed on its next miss
+            self._refreshing.discard(key)
+            logger.warning(f"Could not schedule cache refresh: {e}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_entry_stats(self) -> list[dict[str, Any]]:
+        """Freshness metadata of all entries, keys are only reported as cache_key_hash"""
+        with self._lock:
+            now = self._timer()
+            entry_stats = []
+            for key, (_, stored_at, loader) in list(self._entries.items()):
+                age = now - stored_at
+                entry_stats.append({
+                    "key_hash": cache_key_hash(key),
+                    "age_seconds": round(age, 1),
+                    "state": "fresh" if age < self.ttl else "stale",
+                    "expires_in_seconds": round(self.ttl - age, 1) if age < self.ttl else round(self.ttl + self.grace_seconds - age, 1),
+                    "refreshable": loader is not None,
+                    "refreshing": key in self._refreshing
+                })
+            return entry_stats
+
+
+_refresh_executor: Executor | None = None
+
+
+def set_refresh_executor(executor: Executor) -> None:
+    """Background refreshes of stale cache entries run on this executor, e.g. the one of the cache warmer"""
+    global _refresh_executor
+    _refresh_executor = executor
+
+
+def get_refresh_executor() -> Executor:
+    global _refresh_executor
+    if _refresh_executor is None:
+        _refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache_refresh")
+    return _refresh_executor
+
+
+# Stale entries are served for this share of the TTL while they are refreshed. 0 disables stale-while-revalidate.
+CACHE_STALE_GRACE_FACTOR = float(os.environ.get("CACHE_STALE_GRACE_FACTOR", "0.5"))
+
 # Multiple cache instances for different TTL values
-_CACHE_6H = TTLCache(maxsize=512, ttl=60*60*6)   # 6 hours
-_CACHE_1H = TTLCache(maxsize=512, ttl=60*60*1)   # 1 hour
-_CACHE_30M = TTLCache(maxsize=512, ttl=60*30)    # 30 minutes
-_CACHE_1D = TTLCache(maxsize=256, ttl=60*60*24)  # 1 day
+_CACHE_6H = StaleWhileRevalidateCache(maxsize=512, ttl=60*60*6, grace_seconds=60*60*6*CACHE_STALE_GRACE_FACTOR)   # 6 hours
+_CACHE_1H = StaleWhileRevalidateCache(maxsize=512, ttl=60*60*1, grace_seconds=60*60*1*CACHE_STALE_GRACE_FACTOR)   # 1 hour
+_CACHE_30M = StaleWhileRevalidateCache(maxsize=512, ttl=60*30, grace_seconds=60*30*CACHE_STALE_GRACE_FACTOR)    # 30 minutes
+_CACHE_1D = StaleWhileRevalidateCache(maxsize=256, ttl=60*60*24, grace_seconds=60*60*24*CACHE_STALE_GRACE_FACTOR)  # 1 day
 
 # Export cache instances for monitoring
 CACHE_INSTANCES = {
@@ -20,6 +159,68 @@ CACHE_INSTANCES = {
 }
 
 
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution.
+
+    The first caller of a key executes the function, all callers arriving while it is running wait for the same
+    future and get the same result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._futures: dict[Hashable, Future] = {}
+        self.executed_calls = 0
+        self.coalesced_calls = 0
+
+    def _join(self, key: Hashable) -> tuple[Future, bool]:
+        """Returns the future of the key and whether the caller is responsible for executing the call"""
+        with self._lock:
+            future = self._futures.get(key)
+            if future is not None:
+                self.coalesced_calls += 1
+                return future, False
+            future = Future()
+            self._futures[key] = future
+            self.executed_calls += 1
+            return future, True
+
+    def _finish(self, key: Hashable, future: Future, result: Any = None, exception: BaseException | None = None) -> None:
+        with self._lock:
+            if self._futures.get(key) is future:
+                del self._futures[key]
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+
+    def _run(self, key: Hashable, future: Future, fn: Callable[[], T]) -> None:
+        """Executes fn and publishes its result (or exception) to all callers waiting for the future"""
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, future, exception=e)
+            return
+        self._finish(key, future, result=result)
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        future, is_leader = self._join(key)
+        if is_leader:
+            self._run(key, future, fn)
+        return future.result()
+
+    def get_stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "executed_calls": self.executed_calls,
+                "coalesced_calls": self.coalesced_calls,
+                "in_flight": len(self._futures)
+            }
+
+
+# Coalesces identical BigQuery jobs of concurrent cache misses
+_BQ_QUERY_SINGLE_FLIGHT = SingleFlight()
+
+
 def clear_all_caches() -> None:
     """Clear all cache instances"""
     for name, cache in CACHE_INSTANCES.items():
@@ -31,12 +232,20 @@ def get_cache_stats() -> dict[str, dict[str, Any]]:
     stats = {}
     for name, cache in CACHE_INSTANCES.items():
         try:
+            entry_stats = cache.get_entry_stats()
             stats[name] = {
                 "size": len(cache),
                 "max_size": cache.maxsize,
                 "ttl_seconds": cache.ttl,
                 "ttl_hours": round(cache.ttl / 3600, 1),
-                "utilization_percent": round((len(cache) / cache.maxsize * 100) if cache.maxsize > 0 else 0, 1)
+                "grace_seconds": cache.grace_seconds,
+                "utilization_percent": round((len(cache) / cache.maxsize * 100) if cache.maxsize > 0 else 0, 1),
+                "fresh_items": sum(1 for e in entry_stats if e["state"] == "fresh"),
+                "stale_items": sum(1 for e in entry_stats if e["state"] == "stale"),
+                "stale_hits": cache.stale_hits,
+                "background_refreshes": cache.refreshes,
+                "failed_background_refreshes": cache.failed_refreshes,
+                "entries": entry_stats
             }
         except Exception as e:
             logger.error(f"Error getting stats for cache {name}: {e}")
@@ -56,4 +265,8 @@ def get_total_cache_items() -> int:
 
 def get_total_cache_capacity() -> int:
     """Get total capacity across all caches"""
-    return sum(cache.maxsize for cache in CACHE_INSTANCES.values()) 
\ No newline at end of file
+    return sum(cache.maxsize for cache in CACHE_INSTANCES.values()) 
+
+def get_single_flight_stats() -> dict[str, int]:
+    """Get the number of executed and coalesced BigQuery calls"""
+    return _BQ_QUERY_SINGLE_FLIGHT.get_stats()
@@ -1,7 +1,9 @@
 import time
 from dataclasses import dataclass, field
 from typing import Dict, Any
-from op_tcg.frontend.utils.cache import get_cache_stats, get_total_cache_items, get_total_cache_capacity
+from op_tcg.backend.db import get_user_collection_cache_stats
+from op_tcg.frontend.utils.cache import get_cache_stats, get_total_cache_items, get_total_cache_capacity, \
+    get_single_flight_stats
 
 @dataclass
 class CacheStats:
@@ -25,5 +27,7 @@ def get_cache_summary() -> Dict[str, Any]:
         "total_capacity": total_capacity,
         "utilization_percent": round((total_items / total_capacity * 100) if total_capacity > 0 else 0, 1),
         "cache_details": cache_stats,
+        "single_flight": get_single_flight_stats(),
+        "user_collections": get_user_collection_cache_stats(),
         "timestamp": time.time()
     } 
\ No newline at end of file
@@ -9,8 +9,11 @@ from op_tcg.backend.models.input import MetaFormat
 from op_tcg.frontend.utils.extract import (
     get_all_tournament_decklist_data, get_leader_data, get_leader_extended, get_card_popularity_data,
     get_all_tournament_extened_data, get_card_id_card_data_lookup, get_card_lookup_by_id_and_aa,
+    get_card_search_index,
     get_card_types, get_leader_win_rate
 )
+from op_tcg.frontend.utils.cache import set_refresh_executor
+from op_tcg.frontend.utils.similar import get_leader_similarity_engine, SIMILARITY_THRESHOLD_OCCURRENCE
 
 logger = logging.getLogger(__name__)
 
@@ -25,8 +28,10 @@ class CacheWarmer:
         self.warm_interval_hours = warm_interval_hours
         self.warm_interval_seconds = warm_interval_hours * 3600
         self.is_running = False
-        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache_warmer")
+        # One worker is occupied by the background loop, the others run manual warming and stale entry refreshes
+        self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cache_warmer")
         self._stop_event = threading.Event()
+        set_refresh_executor(self.executor)
         
         logger.info(f"Cache warmer initialized with {self.warm_interval_hours}h interval")
         
@@ -37,10 +42,16 @@ class CacheWarmer:
             lambda: get_leader_extended(),
             lambda: get_leader_data(),
             lambda: get_card_id_card_data_lookup(),
+            lambda: get_card_search_index(),
             lambda: get_card_lookup_by_id_and_aa(),
             lambda: get_card_popularity_data(),
             lambda: get_card_types(),
             lambda: get_all_tournament_decklist_data(),
+            # Per (leader, meta format, region) decklist aggregates
+            lambda: get_all_tournament_decklist_data().aggregates,
+            # Top k similar leaders of the latest meta format
+            lambda: get_leader_similarity_engine([MetaFormat.latest_meta_format()],
+                                                 threshold_occurrence=SIMILARITY_THRESHOLD_OCCURRENCE),
             
             # Meta-specific data
             lambda: get_all_tournament_extened_data(),
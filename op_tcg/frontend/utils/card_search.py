@@ -0,0 +1,193 @@
+import re
+from collections import defaultdict
+from typing import Hashable, Iterable
+
+import numpy as np
+
+from op_tcg.backend.models.cards import ExtendedCardData, OPTcgAbility, CardCurrency
+from op_tcg.backend.models.input import MetaFormat
+from op_tcg.frontend.api.models import CardPopularityParams
+
+# Length of the longest indexed n-gram. Shorter search terms are looked up directly.
+_MAX_NGRAM = 3
+
+
+def split_search_term(search_term: str) -> list[str]:
+    """Lower cased search terms, split on whitespace and ";" so "OP09 Luffy" works"""
+    return [t for t in re.split(r'[;\s]+', search_term.lower()) if t]
+
+
+class _BitsetBuilder:
+    """Collects card positions per key and packs them into int bitsets (bit i is the card at position i)"""
+
+    def __init__(self, num_cards: int):
+        self.num_bytes = (num_cards + 7) // 8
+        self.key2bytes: dict[Hashable, bytearray] = defaultdict(lambda: bytearray(self.num_bytes))
+
+    def add(self, key: Hashable, position: int) -> None:
+        self.key2bytes[key][position >> 3] |= 1 << (position & 7)
+
+    def build(self) -> dict[Hashable, int]:
+        return {key: int.from_bytes(buffer, "little") for key, buffer in self.key2bytes.items()}
+
+
+def _ngrams(text: str) -> set[str]:
+    return {text[i:i + n] for n in range(1, _MAX_NGRAM + 1) for i in range(len(text) - n + 1)}
+
+
+def _union(bitsets: Iterable[int]) -> int:
+    bits = 0
+    for bitset in bitsets:
+        bits |= bitset
+    return bits
+
+
+class CardSearchIndex:
+    """Inverted index of all cards of a card lookup for the card search.
+
+    Every filter of CardPopularityParams is answered with int bitsets (bit i is the card at position i):
+    n-gram postings of the lower cased searchable string and ability text, and one bitset per color, attribute,
+    category, rarity, counter, type, cost, power, ability keyword and release meta format. A query intersects the
+    bitsets and verifies the substring and price filters on the remaining candidates only.
+    The index is immutable, it is rebuilt whenever the cached card lookup is refreshed.
+    """
+
+    def __init__(self, card_lookup: dict[str, ExtendedCardData]):
+        self.card_lookup = card_lookup
+        self.cards: list[ExtendedCardData] = list(card_lookup.values())
+        num_cards = len(self.cards)
+        self.all_bits = (1 << num_cards) - 1
+        self.num_bytes = (num_cards + 7) // 8
+        self.searchable_texts = [card.get_searchable_string().lower() for card in self.cards]
+        self.ability_texts = [card.ability.lower() for card in self.cards]
+
+        search_grams, ability_grams = _BitsetBuilder(num_cards), _BitsetBuilder(num_cards)
+        colors, attributes, categories, rarities = (_BitsetBuilder(num_cards) for _ in range(4))
+        counters, types, costs, powers, meta_formats = (_BitsetBuilder(num_cards) for _ in range(5))
+        for i, card in enumerate(self.cards):
+            for gram in _ngrams(self.searchable_texts[i]):
+                search_grams.add(gram, i)
+            for gram in _ngrams(self.ability_texts[i]):
+                ability_grams.add(gram, i)
+            for color in card.colors:
+                colors.add(color, i)
+            for attribute in card.attributes:
+                attributes.add(attribute, i)
+            for card_type in card.types:
+                types.add(card_type, i)
+            categories.add(card.card_category, i)
+            rarities.add(card.rarity, i)
+            counters.add(card.counter, i)
+            costs.add(card.cost, i)
+            powers.add(card.power, i)
+            meta_formats.add(card.meta_format, i)
+        self.search_gram_bits = search_grams.build()
+        self.ability_gram_bits = ability_grams.build()
+        self.color_bits = colors.build()
+        self.attribute_bits = attributes.build()
+        self.category_bits = categories.build()
+        self.rarity_bits = rarities.build()
+        self.counter_bits = counters.build()
+        self.type_bits = types.build()
+        self.cost_bits = costs.build()
+        self.power_bits = powers.build()
+        self.release_meta_format_bits = meta_formats.build()
+        # cards released until (and including) the meta format, cards without release meta format are always included
+        self.released_until_bits: dict[MetaFormat, int] = {}
+        released = self.release_meta_format_bits.get(None, 0)
+        for meta_format in MetaFormat.to_list(only_after_release=False):
+            released |= self.release_meta_format_bits.get(meta_format, 0)
+            self.released_until_bits[meta_format] = released
+        self.keyword_ability_bits = {ability: self._scan_ability(ability) for ability in OPTcgAbility.to_list()}
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    def _scan_ability(self, ability: str) -> int:
+        return _union(1 << i for i, card in enumerate(self.cards) if ability in card.ability)
+
+    @staticmethod
+    def _gram_candidates(gram_bits: dict[str, int], term: str) -> int:
+        """Superset of the cards containing term: all cards which contain every n-gram of term"""
+        if len(term) <= _MAX_NGRAM:
+            return gram_bits.get(term, 0)
+        bits = gram_bits.get(term[:_MAX_NGRAM], 0)
+        for i in range(1, len(term) - _MAX_NGRAM + 1):
+            if not bits:
+                break
+            bits &= gram_bits.get(term[i:i + _MAX_NGRAM], 0)
+        return bits
+
+    @staticmethod
+    def _range_bits(value2bits: dict[int | None, int], min_value: float, max_value: float) -> int:
+        """Cards with a value in [min_value, max_value] or without a value"""
+        return _union(bits for value, bits in value2bits.items() if value is None or min_value <= value <= max_value)
+
+    def positions(self, bits: int) -> np.ndarray:
+        """Ascending card positions of a bitset"""
+        bit_array = np.unpackbits(np.frombuffer(bits.to_bytes(self.num_bytes, "little"), dtype=np.uint8),
+                                  bitorder="little")
+        return np.flatnonzero(bit_array)
+
+    def filter(self, params: CardPopularityParams) -> list[ExtendedCardData]:
+        """Returns all cards matching params in the order of the card lookup"""
+        bits = self.released_until_bits.get(params.meta_format, self.all_bits)
+        if params.release_meta_format:
+            bits &= self.release_meta_format_bits.get(params.release_meta_format, 0)
+        bits &= _union(self.color_bits.get(color, 0) for color in params.card_colors)
+        if params.card_attributes:
+            bits &= _union(self.attribute_bits.get(attribute, 0) for attribute in params.card_attributes)
+        if params.card_category:
+            bits &= _union(self.category_bits.get(category, 0) for category in params.card_category)
+        if params.card_rarity:
+            bits &= _union(self.rarity_bits.get(rarity, 0) for rarity in params.card_rarity)
+        if params.card_counter == 0:
+            bits &= self.counter_bits.get(None, 0) | self.counter_bits.get(0, 0)
+        elif params.card_counter is not None:
+            bits &= self.counter_bits.get(params.card_counter, 0)
+        if params.card_types:
+            bits &= _union(self.type_bits.get(card_type, 0) for card_type in params.card_types)
+        bits &= self._range_bits(self.cost_bits, params.min_cost, params.max_cost)
+        bits &= self._range_bits(self.power_bits, params.min_power * 1000, params.max_power * 1000)
+
+        search_terms = split_search_term(params.search_term) if params.search_term else []
+        for term in search_terms:
+            if not bits:
+                break
+            bits &= self._gram_candidates(self.search_gram_bits, term)
+
+        # cards matching the ability keywords need no verification of the ability text
+        ability_text = params.ability_text.lower() if params.ability_text else None
+        keyword_bits = self.all_bits
+        if params.card_abilities or params.ability_text:
+            keywords = [self.keyword_ability_bits.get(ability) if ability in self.keyword_ability_bits
+                        else self._scan_ability(ability) for ability in params.card_abilities or []]
+            text_bits = self._gram_candidates(self.ability_gram_bits, ability_text) if ability_text else 0
+            if params.filter_operator == "OR":
+                keyword_bits = _union(keywords)
+                bits &= keyword_bits | text_bits
+            else:
+                for keyword in keywords:
+                    bits &= keyword
+                if ability_text:
+                    bits &= text_bits
+                keyword_bits = 0
+
+        return [self.cards[i] for i in self.positions(bits).tolist()
+                if self._verify(i, params, search_terms, ability_text, keyword_bits)]
+
+    def _verify(self, i: int, params: CardPopularityParams, search_terms: list[str], ability_text: str | None,
+                keyword_bits: int) -> bool:
+        """Checks the filters which the bitsets only approximate"""
+        searchable = self.searchable_texts[i]
+        if not all(term in searchable for term in search_terms if len(term) > _MAX_NGRAM):
+            return False
+        if ability_text and not (keyword_bits >> i) & 1 and ability_text not in self.ability_texts[i]:
+            return False
+        card = self.cards[i]
+        if params.currency == CardCurrency.EURO and card.latest_eur_price:
+            return params.min_price <= card.latest_eur_price <= params.max_price
+        if params.currency == CardCurrency.US_DOLLAR and card.latest_usd_price:
+            return params.min_price <= card.latest_usd_price <= params.max_price
+        return True
+
@@ -7,9 +7,11 @@ from pydantic import BaseModel, Field
 
 from op_tcg.backend.models.base import EnumBase
 from op_tcg.backend.models.cards import LatestCardPrice, ExtendedCardData, CardCurrency
-from op_tcg.backend.models.input import MetaFormat
+from op_tcg.backend.models.input import MetaFormat, MetaFormatRegion
 from op_tcg.backend.models.tournaments import TournamentDecklist
-from op_tcg.frontend.utils.extract import get_tournament_decklist_data
+from op_tcg.frontend.utils.extract import get_tournament_decklist_data, get_all_tournament_decklist_data, \
+    get_card_id_card_data_lookup
+from op_tcg.frontend.utils.decklist_store import TournamentDecklistView, DecklistAggregate
 
 class DecklistData(BaseModel):
     num_decklists: int
@@ -25,7 +27,7 @@ class DecklistData(BaseModel):
     max_tournament_date: date | None = None
 
 def tournament_standings2decklist_data(
-        tournament_decklists: list[TournamentDecklist],
+        tournament_decklists: list[TournamentDecklist | TournamentDecklistView],
         card_id2card_data: dict[str, LatestCardPrice]) -> DecklistData:
     """
     Convert tournament decklist data to a decklist data structure
@@ -87,6 +89,57 @@ def tournament_standings2decklist_data(
         max_tournament_date=max_tournament_date
     )
 
+def decklist_aggregate2decklist_data(decklist_aggregate: DecklistAggregate,
+                                     card_id2card_data: dict[str, LatestCardPrice]) -> DecklistData:
+    """
+    Convert a precomputed decklist aggregate to a decklist data structure.
+    Result is the same as tournament_standings2decklist_data on the aggregated decklists.
+
+    Args:
+        decklist_aggregate: Summed card statistics of a leader
+        card_id2card_data: Mapping of card IDs to card data
+
+    Returns:
+        DecklistData with aggregated information about the decklists
+    """
+    num_decklists = decklist_aggregate.num_decklists
+    card_id2occurrences = dict(zip(decklist_aggregate.card_ids, decklist_aggregate.card_occurrences.tolist()))
+    card_id2total_count = dict(zip(decklist_aggregate.card_ids, decklist_aggregate.card_total_counts.tolist()))
+    return DecklistData(
+        num_decklists=num_decklists,
+        avg_price_eur=decklist_aggregate.price_eur_sum / num_decklists,
+        avg_price_usd=decklist_aggregate.price_usd_sum / num_decklists,
+        card_id2occurrences=card_id2occurrences,
+        card_id2occurrence_proportion={card_id: occurrences / num_decklists
+                                       for card_id, occurrences in card_id2occurrences.items()},
+        card_id2total_count=card_id2total_count,
+        card_id2avg_count_card={card_id: round(total_count / card_id2occurrences[card_id], 2)
+                                for card_id, total_count in card_id2total_count.items()},
+        card_id2card_data={cid: card_id2card_data[cid] for cid in card_id2occurrences if cid in card_id2card_data},
+        meta_formats=decklist_aggregate.meta_formats,
+        min_tournament_date=decklist_aggregate.min_tournament_timestamp.date(),
+        max_tournament_date=decklist_aggregate.max_tournament_timestamp.date()
+    )
+
+def get_decklist_data(leader_id: str, meta_formats: list[MetaFormat] | None = None,
+                      meta_format_region: MetaFormatRegion = MetaFormatRegion.ALL) -> DecklistData | None:
+    """
+    Get the decklist data of a leader from the precomputed decklist aggregates
+
+    Args:
+        leader_id: Leader card ID
+        meta_formats: Meta formats to include, all if None
+        meta_format_region: Region of the tournaments
+
+    Returns:
+        DecklistData or None if no decklist is available
+    """
+    decklist_aggregate = get_all_tournament_decklist_data().aggregates.get(
+        leader_id, meta_formats=meta_formats, meta_format_region=meta_format_region)
+    if decklist_aggregate is None:
+        return None
+    return decklist_aggregate2decklist_data(decklist_aggregate, get_card_id_card_data_lookup())
+
 def decklist_data_to_card_ids(decklist_data: DecklistData, occurrence_threshold: float = 0.0,
                              exclude_card_ids: list[str] | None = None) -> list[str]:
     """
@@ -116,7 +169,7 @@ def decklist_data_to_card_ids(decklist_data: DecklistData, occurrence_threshold:
         decklist_data.card_id2occurrence_proportion[card_id] >= occurrence_threshold
     ]
 
-def get_best_matching_decklist(tournament_decklists: list[TournamentDecklist], 
+def get_best_matching_decklist(tournament_decklists: list[TournamentDecklist | TournamentDecklistView], 
                               decklist_data: DecklistData) -> dict[str, int]:
     """
     Find the decklist that best matches the aggregated decklist data
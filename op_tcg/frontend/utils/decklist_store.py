@@ -0,0 +1,342 @@
+from dataclasses import dataclass
+from datetime import datetime
+from functools import cached_property
+from typing import Any, Iterator
+
+import numpy as np
+
+from op_tcg.backend.models.cards import LatestCardPrice
+from op_tcg.backend.models.input import MetaFormat, MetaFormatRegion
+from op_tcg.backend.models.tournaments import TournamentDecklist
+
+
+def _to_meta_format(value: str) -> MetaFormat | str:
+    try:
+        return MetaFormat(value)
+    except ValueError:
+        return value
+
+
+class _Vocabulary:
+    """Maps values to dense integer codes in order of appearance"""
+
+    def __init__(self):
+        self.values: list = []
+        self.value2code: dict = {}
+
+    def encode(self, value) -> int:
+        code = self.value2code.get(value)
+        if code is None:
+            code = len(self.values)
+            self.value2code[value] = code
+            self.values.append(value)
+        return code
+
+    def codes(self, values) -> np.ndarray:
+        """Codes of all known values. Unknown values are ignored."""
+        return np.array([self.value2code[v] for v in values if v in self.value2code], dtype=np.int32)
+
+
+@dataclass(frozen=True)
+class DecklistAggregate:
+    """Summed card statistics of all decklists of one leader in a set of meta formats and regions.
+    Card arrays are aligned with card_ids, which are in order of first appearance in the decklists.
+    """
+    num_decklists: int
+    card_ids: list[str]
+    card_occurrences: np.ndarray
+    card_total_counts: np.ndarray
+    price_eur_sum: float
+    price_usd_sum: float
+    min_tournament_timestamp: datetime
+    max_tournament_timestamp: datetime
+    meta_formats: list[MetaFormat | str]
+
+
+class TournamentDecklistView:
+    """Read only view of a single decklist in the TournamentDecklistStore.
+    Exposes the same attributes as TournamentDecklist, but values are only materialised on access.
+    """
+    __slots__ = ("_store", "_i")
+
+    def __init__(self, store: "TournamentDecklistStore", i: int):
+        self._store = store
+        self._i = i
+
+    def __repr__(self) -> str:
+        return f"TournamentDecklistView(leader_id={self.leader_id!r}, tournament_id={self.tournament_id!r}, player_id={self.player_id!r})"
+
+    @property
+    def leader_id(self) -> str:
+        return self._store.leader_ids.values[self._store.leader_codes[self._i]]
+
+    @property
+    def tournament_id(self) -> str:
+        return self._store.tournament_ids.values[self._store.tournament_codes[self._i]]
+
+    @property
+    def player_id(self) -> str:
+        return self._store.player_ids.values[self._store.player_codes[self._i]]
+
+    @property
+    def placing(self) -> int | None:
+        placing = int(self._store.placings[self._i])
+        return None if placing < 0 else placing
+
+    @property
+    def decklist_id(self) -> str | None:
+        return self._store.decklist_ids[self._i]
+
+    @property
+    def meta_format(self) -> MetaFormat | str:
+        return self._store.meta_formats.values[self._store.meta_format_codes[self._i]]
+
+    @property
+    def meta_format_region(self) -> MetaFormatRegion:
+        return self._store.meta_format_regions.values[self._store.meta_format_region_codes[self._i]]
+
+    @property
+    def tournament_timestamp(self) -> datetime:
+        return self._store.tournament_timestamps[self._store.tournament_codes[self._i]]
+
+    @property
+    def decklist(self) -> dict[str, int]:
+        return self._store.get_decklist(self._i)
+
+    @property
+    def price_eur(self) -> float:
+        return float(self._store.prices_eur[self._i])
+
+    @property
+    def price_usd(self) -> float:
+        return float(self._store.prices_usd[self._i])
+
+
+class TournamentDecklistStore:
+    """Columnar in memory store of all tournament decklists.
+
+    Leader, meta format, region, tournament and player are integer coded arrays and the decklists are kept as a
+    sparse card count matrix in CSR layout over a card id vocabulary. Compared to one pydantic object per decklist,
+    this keeps the resident memory small and filters are vectorized masks instead of list comprehensions.
+    """
+
+    def __init__(self, tournament_standing_rows: list[dict[str, Any]], card_id2card_data: dict[str, LatestCardPrice]):
+        self.leader_ids = _Vocabulary()
+        self.tournament_ids = _Vocabulary()
+        self.player_ids = _Vocabulary()
+        self.meta_formats = _Vocabulary()
+        self.meta_format_regions = _Vocabulary()
+        self.card_ids = _Vocabulary()
+        self.tournament_timestamps: list[datetime] = []
+        self.decklist_ids: list[str | None] = []
+
+        leader_codes, tournament_codes, player_codes, placings = [], [], [], []
+        meta_format_codes, meta_format_region_codes = [], []
+        decklist_indptr, decklist_card_codes, decklist_counts = [0], [], []
+        # To track unique combinations of leader_id, tournament_id, player_id, and placing
+        seen_decklists = set()
+        for ts in tournament_standing_rows:
+            key = (ts['leader_id'], ts['tournament_id'], ts['player_id'], ts['placing'])
+            if key in seen_decklists:
+                continue
+            seen_decklists.add(key)
+            decklist = ts['decklist']
+            if isinstance(decklist, str):
+                decklist = TournamentDecklist.str2dict(decklist)
+
+            tournament_code = self.tournament_ids.encode(ts['tournament_id'])
+            if tournament_code == len(self.tournament_timestamps):
+                self.tournament_timestamps.append(ts['tournament_timestamp'])
+            leader_codes.append(self.leader_ids.encode(ts['leader_id']))
+            tournament_codes.append(tournament_code)
+            player_codes.append(self.player_ids.encode(ts['player_id']))
+            placings.append(-1 if ts['placing'] is None else ts['placing'])
+            meta_format_codes.append(self.meta_formats.encode(_to_meta_format(ts['meta_format'])))
+            meta_format_region_codes.append(self.meta_format_regions.encode(MetaFormatRegion(ts['meta_format_region'])))
+            self.decklist_ids.append(ts.get('decklist_id'))
+            for card_id, count in decklist.items():
+                decklist_card_codes.append(self.card_ids.encode(card_id))
+                decklist_counts.append(count)
+            decklist_indptr.append(len(decklist_card_codes))
+
+        self.leader_codes = np.array(leader_codes, dtype=np.int32)
+        self.tournament_codes = np.array(tournament_codes, dtype=np.int32)
+        self.player_codes = np.array(player_codes, dtype=np.int32)
+        # -1 encodes a missing placing
+        self.placings = np.array(placings, dtype=np.int32)
+        self.meta_format_codes = np.array(meta_format_codes, dtype=np.int16)
+        self.meta_format_region_codes = np.array(meta_format_region_codes, dtype=np.int8)
+        self.decklist_indptr = np.array(decklist_indptr, dtype=np.int64)
+        self.decklist_card_codes = np.array(decklist_card_codes, dtype=np.int32)
+        self.decklist_counts = np.array(decklist_counts, dtype=np.int16)
+        self.prices_eur, self.prices_usd = self._calculate_decklist_prices(card_id2card_data)
+
+    def __len__(self) -> int:
+        return len(self.leader_codes)
+
+    def __iter__(self) -> Iterator[TournamentDecklistView]:
+        return (TournamentDecklistView(self, i) for i in range(len(self)))
+
+    def __getitem__(self, i: int) -> TournamentDecklistView:
+        if not -len(self) <= i < len(self):
+            raise IndexError(i)
+        return TournamentDecklistView(self, i % len(self))
+
+    @property
+    def decklist_row_ids(self) -> np.ndarray:
+        """Decklist index of every non zero entry of the card count matrix"""
+        return np.repeat(np.arange(len(self), dtype=np.int32), np.diff(self.decklist_indptr))
+
+    def _calculate_decklist_prices(self, card_id2card_data: dict[str, LatestCardPrice]) -> tuple[np.ndarray, np.ndarray]:
+        """Sum of all card prices per decklist, same as get_decklist_price but as one sparse matrix vector product"""
+        card_prices_eur = np.zeros(len(self.card_ids.values))
+        card_prices_usd = np.zeros(len(self.card_ids.values))
+        for card_code, card_id in enumerate(self.card_ids.values):
+            card_data = card_id2card_data.get(card_id)
+            if card_data:
+                card_prices_eur[card_code] = card_data.latest_eur_price or 0.0
+                card_prices_usd[card_code] = card_data.latest_usd_price or 0.0
+        row_ids = self.decklist_row_ids
+        prices_eur = np.bincount(row_ids, weights=card_prices_eur[self.decklist_card_codes] * self.decklist_counts,
+                                 minlength=len(self))
+        prices_usd = np.bincount(row_ids, weights=card_prices_usd[self.decklist_card_codes] * self.decklist_counts,
+                                 minlength=len(self))
+        return prices_eur, prices_usd
+
+    def get_decklist(self, i: int) -> dict[str, int]:
+        start, end = self.decklist_indptr[i], self.decklist_indptr[i + 1]
+        card_ids = self.card_ids.values
+        return {card_ids[card_code]: int(count) for card_code, count in
+                zip(self.decklist_card_codes[start:end].tolist(), self.decklist_counts[start:end].tolist())}
+
+    def filter_mask(self, meta_formats: list[MetaFormat] | None = None, leader_ids: list[str] | None = None,
+                    meta_format_region: MetaFormatRegion = MetaFormatRegion.ALL) -> np.ndarray:
+        mask = np.ones(len(self), dtype=bool)
+        if leader_ids:
+            mask &= np.isin(self.leader_codes, self.leader_ids.codes(leader_ids))
+        if meta_formats:
+            mask &= np.isin(self.meta_format_codes, self.meta_formats.codes(meta_formats))
+        if meta_format_region != MetaFormatRegion.ALL:
+            mask &= np.isin(self.meta_format_region_codes, self.meta_format_regions.codes([meta_format_region]))
+        return mask
+
+    def select(self, meta_formats: list[MetaFormat] | None = None, leader_ids: list[str] | None = None,
+               meta_format_region: MetaFormatRegion = MetaFormatRegion.ALL) -> list[TournamentDecklistView]:
+        """Returns views of all decklists matching the filters, in the order of the source rows"""
+        return [TournamentDecklistView(self, i) for i in
+                np.flatnonzero(self.filter_mask(meta_formats, leader_ids, meta_format_region)).tolist()]
+
+    def find(self, tournament_id: str, player_id: str) -> TournamentDecklistView | None:
+        """Returns the first decklist of a player in a tournament"""
+        tournament_code = self.tournament_ids.value2code.get(tournament_id)
+        player_code = self.player_ids.value2code.get(player_id)
+        if tournament_code is None or player_code is None:
+            return None
+        indices = np.flatnonzero((self.tournament_codes == tournament_code) & (self.player_codes == player_code))
+        return TournamentDecklistView(self, int(indices[0])) if len(indices) > 0 else None
+
+    @cached_property
+    def aggregates(self) -> "DecklistAggregates":
+        """Per (leader, meta format, region) aggregates, computed once per store"""
+        return DecklistAggregates(self)
+
+    def meta_format_counts(self) -> dict[MetaFormat | str, int]:
+        counts = np.bincount(self.meta_format_codes, minlength=len(self.meta_formats.values))
+        return {meta_format: int(count) for meta_format, count in zip(self.meta_formats.values, counts) if count > 0}
+
+
+class DecklistAggregates:
+    """Card occurrence and count sums for every (leader_id, meta_format, meta_format_region) group of a
+    TournamentDecklistStore, computed in one vectorized pass over the card count matrix.
+    Groups are additive, so any selection of meta formats and regions is answered by summing a few groups.
+    """
+
+    def __init__(self, store: TournamentDecklistStore):
+        self._store = store
+        num_meta_formats = max(len(store.meta_formats.values), 1)
+        num_regions = max(len(store.meta_format_regions.values), 1)
+        decklist_group_codes = ((store.leader_codes.astype(np.int64) * num_meta_formats + store.meta_format_codes)
+                                * num_regions + store.meta_format_region_codes)
+        group_codes, decklist_groups = np.unique(decklist_group_codes, return_inverse=True)
+        self._num_meta_formats = num_meta_formats
+        self._num_regions = num_regions
+        self._group_code2group = {int(code): group for group, code in enumerate(group_codes.tolist())}
+        num_groups = len(group_codes)
+
+        self.num_decklists = np.bincount(decklist_groups, minlength=num_groups)
+        self.price_eur_sums = np.bincount(decklist_groups, weights=store.prices_eur, minlength=num_groups)
+        self.price_usd_sums = np.bincount(decklist_groups, weights=store.prices_usd, minlength=num_groups)
+        self.first_decklist = np.full(num_groups, len(store), dtype=np.int64)
+        np.minimum.at(self.first_decklist, decklist_groups, np.arange(len(store)))
+
+        # first and last tournament per group
+        timestamps = np.array([ts.timestamp() for ts in store.tournament_timestamps])[store.tournament_codes] \
+            if len(store) > 0 else np.zeros(0)
+        order = np.lexsort((timestamps, decklist_groups))
+        group_starts = np.searchsorted(decklist_groups[order], np.arange(num_groups))
+        group_ends = np.searchsorted(decklist_groups[order], np.arange(num_groups), side="right") - 1
+        self.min_tournament_codes = store.tournament_codes[order[group_starts]] if num_groups else np.zeros(0, np.int32)
+        self.max_tournament_codes = store.tournament_codes[order[group_ends]] if num_groups else np.zeros(0, np.int32)
+
+        # one entry per (group, card), sorted by group
+        num_cards = max(len(store.card_ids.values), 1)
+        entry_keys = decklist_groups[store.decklist_row_ids].astype(np.int64) * num_cards + store.decklist_card_codes
+        keys, first_entries, key_inverse = np.unique(entry_keys, return_index=True, return_inverse=True)
+        self.card_codes = (keys % num_cards).astype(np.int32)
+        self.card_first_entries = first_entries
+        self.card_occurrences = np.bincount(key_inverse, minlength=len(keys))
+        self.card_total_counts = np.bincount(key_inverse, weights=store.decklist_counts,
+                                             minlength=len(keys)).astype(np.int64)
+        self.group_indptr = np.searchsorted(keys // num_cards, np.arange(num_groups + 1))
+
+    def _groups(self, leader_id: str, meta_formats: list[MetaFormat] | None,
+                meta_format_region: MetaFormatRegion) -> list[int]:
+        store = self._store
+        leader_code = store.leader_ids.value2code.get(leader_id)
+        if leader_code is None:
+            return []
+        meta_format_codes = store.meta_formats.codes(meta_formats) if meta_formats else range(len(store.meta_formats.values))
+        region_codes = range(len(store.meta_format_regions.values)) if meta_format_region == MetaFormatRegion.ALL \
+            else store.meta_format_regions.codes([meta_format_region])
+        groups = [self._group_code2group.get((leader_code * self._num_meta_formats + int(meta_format_code))
+                                             * self._num_regions + int(region_code))
+                  for meta_format_code in meta_format_codes for region_code in region_codes]
+        return sorted(group for group in groups if group is not None)
+
+    def get(self, leader_id: str, meta_formats: list[MetaFormat] | None = None,
+            meta_format_region: MetaFormatRegion = MetaFormatRegion.ALL) -> DecklistAggregate | None:
+        """Aggregate of all decklists of a leader, same selection as TournamentDecklistStore.select.
+        Returns None if no decklist matches."""
+        groups = self._groups(leader_id, meta_formats, meta_format_region)
+        if not groups:
+            return None
+        entries = np.concatenate([np.arange(self.group_indptr[g], self.group_indptr[g + 1]) for g in groups])
+        card_codes, card_inverse = np.unique(self.card_codes[entries], return_inverse=True)
+        first_entries = np.full(len(card_codes), np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(first_entries, card_inverse, self.card_first_entries[entries])
+        order = np.argsort(first_entries, kind="stable")
+        card_occurrences = np.bincount(card_inverse, weights=self.card_occurrences[entries]).astype(np.int64)
+        card_total_counts = np.bincount(card_inverse, weights=self.card_total_counts[entries]).astype(np.int64)
+
+        store = self._store
+        timestamps = store.tournament_timestamps
+        meta_format_codes = sorted({int(store.meta_format_codes[self.first_decklist[g]]) for g in groups})
+        return DecklistAggregate(
+            num_decklists=int(self.num_decklists[groups].sum()),
+            card_ids=[store.card_ids.values[c] for c in card_codes[order].tolist()],
+            card_occurrences=card_occurrences[order],
+            card_total_counts=card_total_counts[order],
+            price_eur_sum=float(self.price_eur_sums[groups].sum()),
+            price_usd_sum=float(self.price_usd_sums[groups].sum()),
+            min_tournament_timestamp=min((timestamps[self.min_tournament_codes[g]] for g in groups)),
+            max_tournament_timestamp=max((timestamps[self.max_tournament_codes[g]] for g in groups)),
+            meta_formats=[store.meta_formats.values[c] for c in meta_format_codes],
+        )
+
+    def get_leader_ids(self, meta_formats: list[MetaFormat] | None = None,
+                       meta_format_region: MetaFormatRegion = MetaFormatRegion.ALL) -> list[str]:
+        """Leaders with at least one matching decklist, in order of their first decklist"""
+        store = self._store
+        indices = np.flatnonzero(store.filter_mask(meta_formats=meta_formats, meta_format_region=meta_format_region))
+        leader_codes, first_indices = np.unique(store.leader_codes[indices], return_index=True)
+        return [store.leader_ids.values[c] for c in leader_codes[np.argsort(first_indices)].tolist()]
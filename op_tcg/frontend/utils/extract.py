@@ -1,7 +1,7 @@
 import logging
 import os
 import re
-from collections import Counter, defaultdict
+from collections import defaultdict
 
 from cachetools import TTLCache, cached
 
@@ -14,9 +14,11 @@ from op_tcg.backend.models.input import MetaFormat, MetaFormatRegion
 from op_tcg.backend.models.leader import Leader, TournamentWinner, LeaderElo, LeaderExtended
 from op_tcg.backend.models.matches import Match, LeaderWinRate
 from op_tcg.backend.models.tournaments import TournamentStanding, Tournament, TournamentStandingExtended, \
-    TournamentDecklist, TournamentExtended
+    TournamentExtended
 from op_tcg.backend.utils.utils import timeit
-from op_tcg.frontend.utils.card_price import get_decklist_price
+from op_tcg.frontend.utils.card_search import CardSearchIndex
+from op_tcg.frontend.utils.decklist_store import TournamentDecklistStore, TournamentDecklistView
+from op_tcg.frontend.utils.leader_store import LeaderExtendedStore
 from op_tcg.frontend.utils.utils import run_bq_query
 
 
@@ -47,41 +49,33 @@ def get_leader_win_rate(meta_formats: list[MetaFormat], leader_ids: list[str] |
     else:
         return bq_win_rates
 
-def get_leader_extended(meta_formats: list[MetaFormat] | None = None, leader_ids: list[str] | None = None, meta_format_region: MetaFormatRegion = MetaFormatRegion.ALL, only_official: bool | None = None) -> list[LeaderExtended]:
-    # ensure only available meta formats are used per default
-    meta_formats = meta_formats or MetaFormat.to_list()
-    bq_leader_data: list[LeaderExtended] = []
+_leader_extended_store: LeaderExtendedStore | None = None
+
+
+def get_leader_extended_store() -> LeaderExtendedStore:
+    """Returns the indexed LeaderExtended store. It is rebuilt only if the cached query result changed."""
+    global _leader_extended_store
     # Extended leader data is computed, cache for 6 hours (default)
     leader_data_rows = run_bq_query(
         f"""SELECT * FROM `{get_bq_table_id(LeaderExtended)}`""", ttl_hours=6.0)
-    bq_leader_data.extend([LeaderExtended(**d) for d in leader_data_rows])
+    if _leader_extended_store is None or _leader_extended_store.rows is not leader_data_rows:
+        _leader_extended_store = LeaderExtendedStore(leader_data_rows)
+    return _leader_extended_store
 
-    # Apply filters
-    if leader_ids:
-        bq_leader_data = [bql for bql in bq_leader_data if (bql.id in leader_ids)]
-    if meta_format_region:
-        bq_leader_data = [bql for bql in bq_leader_data if (bql.meta_format_region == meta_format_region)]
-    if meta_formats:
-        bq_leader_data = [bql for bql in bq_leader_data if (bql.meta_format in meta_formats)]
-    if only_official is not None:
-        bq_leader_data = [l for l in bq_leader_data if l.only_official == only_official]
 
-    return bq_leader_data
+def get_leader_extended(meta_formats: list[MetaFormat] | None = None, leader_ids: list[str] | None = None, meta_format_region: MetaFormatRegion = MetaFormatRegion.ALL, only_official: bool | None = None) -> list[LeaderExtended]:
+    # ensure only available meta formats are used per default
+    meta_formats = meta_formats or MetaFormat.to_list()
+    return get_leader_extended_store().filter(meta_formats=meta_formats, leader_ids=leader_ids,
+                                              meta_format_region=meta_format_region, only_official=only_official)
 
 
-def get_tournament_decklist_data(meta_formats: list[MetaFormat], leader_ids: list[str] | None = None, meta_format_region: MetaFormatRegion = MetaFormatRegion.ALL) -> list[TournamentDecklist]:
-    leader_ids = leader_ids or []
-    bq_decklists = get_all_tournament_decklist_data()
-    if leader_ids:
-        bq_decklists = [ts for ts in bq_decklists if ts.leader_id in leader_ids]
-    if meta_formats:
-        bq_decklists = [ts for ts in bq_decklists if ts.meta_format in meta_formats]
-    if meta_format_region != MetaFormatRegion.ALL:
-        bq_decklists = [ts for ts in bq_decklists if ts.meta_format_region == meta_format_region]
-    return bq_decklists
+def get_tournament_decklist_data(meta_formats: list[MetaFormat], leader_ids: list[str] | None = None, meta_format_region: MetaFormatRegion = MetaFormatRegion.ALL) -> list[TournamentDecklistView]:
+    return get_all_tournament_decklist_data().select(meta_formats=meta_formats, leader_ids=leader_ids,
+                                                     meta_format_region=meta_format_region)
 
 @cached(cache=TTLCache(maxsize=1024, ttl=60*60*24))
-def get_all_tournament_decklist_data() -> list[TournamentDecklist]:
+def get_all_tournament_decklist_data() -> TournamentDecklistStore:
     """Function is cached since data processing is expensive."""
     card_id2card_data = get_card_id_card_data_lookup()
     # cached for each session
@@ -93,19 +87,7 @@ left join `{get_bq_table_id(Decklist)}` t3 on t1.decklist_id = t3.id
 where
 t1.decklist IS NOT NULL
 OR t3.decklist IS NOT NULL""", ttl_hours=None)
-    tournament_decklists: list[TournamentDecklist] = []
-    leader_ids = [l.id for l in get_leader_data()]
-    seen_decklists = set()
-    # To track unique combinations of leader_id, tournament_id, player_id, and placing
-    for ts in tournament_standing_rows:
-        key = (ts['leader_id'], ts['tournament_id'], ts['player_id'], ts['placing'])
-        if key not in seen_decklists:
-            tournament_decklist = TournamentDecklist(**ts)
-            tournament_decklist.price_usd = get_decklist_price(tournament_decklist.decklist, card_id2card_data, currency=CardCurrency.US_DOLLAR)
-            tournament_decklist.price_eur = get_decklist_price(tournament_decklist.decklist, card_id2card_data, currency=CardCurrency.EURO)
-            tournament_decklists.append(tournament_decklist)
-            seen_decklists.add(key)  # Mark this combination as seen
-    return tournament_decklists
+    return TournamentDecklistStore(tournament_standing_rows, card_id2card_data)
 
 @timeit
 def get_all_tournament_extened_data(meta_formats: list[MetaFormat] | None = None) -> list[TournamentExtended]:
@@ -170,10 +152,7 @@ def get_card_popularity_by_meta(card_id: str, until_meta_format: MetaFormat | No
     return card_popularity_by_meta
 
 def get_meta_format_to_num_decklists() -> dict[MetaFormat, int]:
-    decklists = get_all_tournament_decklist_data()
-    # Use a Counter to count occurrences of each meta_format
-    meta_format_counter = Counter(decklist.meta_format for decklist in decklists)
-    return dict(meta_format_counter)
+    return get_all_tournament_decklist_data().meta_format_counts()
 
 def get_card_types() -> list[str]:
     latest_card_rows = run_bq_query(
@@ -190,6 +169,17 @@ def get_card_id_card_data_lookup(aa_version: int = 0, ensure_latest_price_not_nu
             cdata.ensure_latest_price_not_none()
     return {card.id: card for card in card_data}
 
+_card_search_index: CardSearchIndex | None = None
+
+
+def get_card_search_index() -> CardSearchIndex:
+    """Returns the card search index of all base cards. It is rebuilt only if the cached card lookup changed."""
+    global _card_search_index
+    card_lookup = get_card_id_card_data_lookup()
+    if _card_search_index is None or _card_search_index.card_lookup is not card_lookup:
+        _card_search_index = CardSearchIndex(card_lookup)
+    return _card_search_index
+
 @cached(cache=TTLCache(maxsize=1, ttl=60*60*24))
 def get_card_lookup_by_id_and_aa() -> dict[str, dict[int, ExtendedCardData]]:
     card_data = get_card_data()
@@ -0,0 +1,85 @@
+import threading
+from collections import defaultdict
+from typing import Any
+
+from cachetools import LRUCache
+
+from op_tcg.backend.models.input import MetaFormat, MetaFormatRegion
+from op_tcg.backend.models.leader import LeaderExtended
+
+
+class LeaderExtendedStore:
+    """In memory store of all LeaderExtended rows with secondary indexes.
+
+    Rows are indexed by (meta_format_region, meta_format, only_official) and by leader id, so filtered lookups are
+    dictionary hits instead of linear scans. Filter results of the most recent filter combinations are memoized,
+    since the store is rebuilt whenever the underlying query cache is refreshed.
+    """
+
+    # leader id combinations of the request parameters are unbounded, so only the most recent filters are kept
+    FILTER_CACHE_SIZE = 1024
+
+    def __init__(self, leader_extended_rows: list[dict[str, Any]]):
+        self.rows = leader_extended_rows
+        self.leaders: list[LeaderExtended] = [LeaderExtended(**d) for d in leader_extended_rows]
+        self.key2positions: dict[tuple[MetaFormatRegion | None, MetaFormat | None, bool | None], list[int]] = defaultdict(list)
+        self.leader_id2positions: dict[str, list[int]] = defaultdict(list)
+        for i, leader in enumerate(self.leaders):
+            self.key2positions[self._key(leader)].append(i)
+            self.leader_id2positions[leader.id].append(i)
+        self.regions = {region for region, _, _ in self.key2positions}
+        self.only_official_values = {only_official for _, _, only_official in self.key2positions}
+        self._filter_cache: LRUCache[tuple, list[LeaderExtended]] = LRUCache(maxsize=self.FILTER_CACHE_SIZE)
+        self._filter_cache_lock = threading.Lock()
+
+    @staticmethod
+    def _key(leader: LeaderExtended) -> tuple[MetaFormatRegion | None, MetaFormat | None, bool | None]:
+        return leader.meta_format_region, leader.meta_format, leader.only_official
+
+    def __len__(self) -> int:
+        return len(self.leaders)
+
+    def get_by_leader_id(self, leader_id: str) -> list[LeaderExtended]:
+        return [self.leaders[i] for i in self.leader_id2positions.get(leader_id, [])]
+
+    def filter(self, meta_formats: list[MetaFormat] | None = None, leader_ids: list[str] | None = None,
+               meta_format_region: MetaFormatRegion | None = MetaFormatRegion.ALL,
+               only_official: bool | None = None) -> list[LeaderExtended]:
+        """Returns all leaders matching the filters in the order of the source rows.
+        Falsy filter values (and only_official None) disable the respective filter.
+        """
+        cache_key = (tuple(meta_formats) if meta_formats else None,
+                     frozenset(leader_ids) if leader_ids else None,
+                     meta_format_region or None,
+                     only_official)
+        with self._filter_cache_lock:
+            leaders = self._filter_cache.get(cache_key)
+        if leaders is None:
+            leaders = self._filter(meta_formats, leader_ids, meta_format_region, only_official)
+            with self._filter_cache_lock:
+                self._filter_cache[cache_key] = leaders
+        # return a copy, since callers are allowed to sort or extend the result
+        return list(leaders)
+
+    def _filter(self, meta_formats: list[MetaFormat] | None, leader_ids: list[str] | None,
+                meta_format_region: MetaFormatRegion | None, only_official: bool | None) -> list[LeaderExtended]:
+        regions = [meta_format_region] if meta_format_region else self.regions
+        only_official_values = [only_official] if only_official is not None else self.only_official_values
+        meta_format_set = set(meta_formats) if meta_formats else None
+
+        if leader_ids:
+            # leaders only have a few rows each, so checking their keys is cheaper than scanning the key buckets
+            positions = [i for leader_id in set(leader_ids) for i in self.leader_id2positions.get(leader_id, [])
+                         if self._matches(self.leaders[i], meta_format_set, regions, only_official_values)]
+        else:
+            meta_format_keys = meta_formats if meta_formats else {meta_format for _, meta_format, _ in self.key2positions}
+            positions = [i for region in regions for meta_format in set(meta_format_keys)
+                         for only_official_value in only_official_values
+                         for i in self.key2positions.get((region, meta_format, only_official_value), [])]
+        return [self.leaders[i] for i in sorted(positions)]
+
+    @staticmethod
+    def _matches(leader: LeaderExtended, meta_format_set: set[MetaFormat] | None, regions, only_official_values) -> bool:
+        return ((meta_format_set is None or leader.meta_format in meta_format_set)
+                and leader.meta_format_region in regions
+                and leader.only_official in only_official_values)
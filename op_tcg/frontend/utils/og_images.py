@@ -1,15 +1,36 @@
-"""Server-side OG image generation for social media previews."""
+"""Server-side OG image generation for social media previews.
 
+Images are never rendered in a request. OGImageRenderer prepares the chart data on a background thread, plots it in
+a separate process and atomically swaps the PNG file, so requests always get the last good image.
+"""
+
+import email.utils
+import multiprocessing
 import os
+import re
+import threading
 import time
 import logging
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from io import BytesIO
+from pathlib import Path
+from typing import Any, Callable
+
+from cachetools import TTLCache
+from starlette.responses import Response
 
 logger = logging.getLogger(__name__)
 
-_OG_META_PATH = "public/og-meta.png"
-_OG_LEADER_PATH = "public/og-leader.png"
+_OG_DIR = "public"
+_OG_META_FILE = "og-meta.png"
+_OG_LEADER_FILE = "og-leader.png"
+_OG_LEADERS_DIR = "og-leaders"
 _CACHE_TTL_SECONDS = 4 * 3600  # Regenerate at most every 4 hours
+_MAX_LEADER_IMAGES = int(os.environ.get("OG_MAX_LEADER_IMAGES", "256"))
+_LEADER_ID_PATTERN = re.compile(r"[A-Za-z0-9-]{1,20}")
+# leader ids without data are not rendered again until the chart data is refreshed
+_MAX_MISSING_LEADER_IDS = 10_000
 
 # OG image dimensions (standard Open Graph)
 _WIDTH_IN = 12.0
@@ -23,13 +44,8 @@ _TEXT_MUTED = "#9CA3AF"
 _GRID_COLOR = "#374151"
 
 
-def _render_meta_chart() -> bytes:
-    """Render the meta index stacked bar chart as PNG bytes using matplotlib."""
-    import matplotlib
-    matplotlib.use("Agg")
-    import matplotlib.pyplot as plt
-    import numpy as np
-
+def _meta_chart_data() -> dict:
+    """Picklable input of _plot_meta_chart, computed with the (warm) query caches of the web process."""
     from op_tcg.backend.models.input import MetaFormatRegion
     from op_tcg.frontend.api.routes.meta import _compute_meta_share
 
@@ -37,6 +53,19 @@ def _render_meta_chart() -> bytes:
         region=MetaFormatRegion.ALL,
         view_mode="leaders",
     )
+    return {"chart_data": chart_data, "meta_formats": [str(mf) for mf in meta_formats],
+            "display_names": list(display_names), "colors": list(colors)}
+
+
+def _plot_meta_chart(data: dict) -> bytes:
+    """Render the meta index stacked bar chart as PNG bytes using matplotlib."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import numpy as np
+
+    chart_data, meta_formats = data["chart_data"], data["meta_formats"]
+    display_names, colors = data["display_names"], data["colors"]
 
     fig, ax = plt.subplots(figsize=(_WIDTH_IN, _HEIGHT_IN))
     fig.patch.set_facecolor(_BG_DARK)
@@ -95,13 +124,8 @@ def _render_meta_chart() -> bytes:
     return buf.read()
 
 
-def _render_leader_chart() -> bytes:
-    """Render a horizontal bar chart of top leaders by tournament wins as PNG bytes."""
-    import matplotlib
-    matplotlib.use("Agg")
-    import matplotlib.pyplot as plt
-    import numpy as np
-
+def _leader_chart_data() -> dict:
+    """Picklable input of _plot_leader_chart with the top leaders by tournament wins of the latest meta."""
     from op_tcg.backend.models.input import MetaFormat, MetaFormatRegion
     from op_tcg.frontend.utils.extract import get_leader_extended
 
@@ -123,29 +147,37 @@ def _render_leader_chart() -> bytes:
 
     candidates = [l for l in seen.values() if (l.tournament_wins or 0) >= 1]
     candidates.sort(key=lambda l: l.tournament_wins or 0, reverse=True)
-    top = candidates[:12]
+    # Reverse so highest wins ends up at the top of the chart
+    top = candidates[:12][::-1]
+    colors = []
+    for l in top:
+        try:
+            colors.append(l.to_hex_color())
+        except Exception:
+            colors.append("#6B7280")
+    return {"latest": str(latest), "labels": [f"{l.name} ({l.id})" if l.name else l.id for l in top],
+            "values": [l.tournament_wins or 0 for l in top], "colors": colors}
+
+
+def _plot_leader_chart(data: dict) -> bytes:
+    """Render a horizontal bar chart of top leaders by tournament wins as PNG bytes."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import numpy as np
+
+    latest, labels, values, colors = data["latest"], data["labels"], data["values"], data["colors"]
 
     fig, ax = plt.subplots(figsize=(_WIDTH_IN, _HEIGHT_IN))
     fig.patch.set_facecolor(_BG_DARK)
     ax.set_facecolor(_BG_CARD)
 
-    if not top:
+    if not labels:
         ax.text(0.5, 0.5, "No data available",
                 ha="center", va="center", color=_TEXT_MUTED, fontsize=14,
                 transform=ax.transAxes)
     else:
-        # Reverse so highest wins ends up at the top of the chart
-        top = top[::-1]
-        labels = [f"{l.name} ({l.id})" if l.name else l.id for l in top]
-        values = [l.tournament_wins or 0 for l in top]
-        colors = []
-        for l in top:
-            try:
-                colors.append(l.to_hex_color())
-            except Exception:
-                colors.append("#6B7280")
-
-        y = np.arange(len(top))
+        y = np.arange(len(labels))
         bars = ax.barh(y, values, color=colors, alpha=0.88, height=0.6)
 
         # Win count labels beside each bar
@@ -185,42 +217,309 @@ def _render_leader_chart() -> bytes:
     return buf.read()
 
 
-def _get_cached(path: str, render_fn) -> bytes | None:
-    """Generic file-cache helper: return cached bytes or regenerate."""
+
+
+def _leader_detail_chart_data(leader_id: str) -> dict | None:
+    """Picklable input of _plot_leader_detail_chart. None if the leader has no data."""
+    from op_tcg.backend.models.input import MetaFormat, MetaFormatRegion
+    from op_tcg.frontend.utils.extract import get_leader_extended
+
+    leaders = [l for l in get_leader_extended(leader_ids=[leader_id], meta_format_region=MetaFormatRegion.ALL,
+                                              only_official=False) if l.meta_format is not None]
+    if not leaders:
+        return None
+    leaders.sort(key=lambda l: MetaFormat.index_of(l.meta_format))
+    leaders = leaders[-10:]
     try:
-        if os.path.exists(path):
-            if time.time() - os.path.getmtime(path) < _CACHE_TTL_SECONDS:
-                with open(path, "rb") as f:
-                    return f.read()
-        png = render_fn()
-        os.makedirs("public", exist_ok=True)
-        with open(path, "wb") as f:
-            f.write(png)
-        return png
+        color = leaders[-1].to_hex_color()
     except Exception:
-        logger.exception("Failed to generate OG image: %s", path)
-        return None
+        color = "#6B7280"
+    name = leaders[-1].name
+    return {"title": f"{name} ({leader_id})" if name else leader_id, "color": color,
+            "meta_formats": [str(l.meta_format) for l in leaders],
+            "win_rates": [(l.win_rate or 0.0) * 100 for l in leaders],
+            "tournament_wins": [l.tournament_wins or 0 for l in leaders]}
 
 
-def get_leader_og_image_bytes() -> bytes | None:
-    return _get_cached(_OG_LEADER_PATH, _render_leader_chart)
+def _plot_leader_detail_chart(data: dict) -> bytes:
+    """Render the win rate per meta format of one leader as PNG bytes."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import numpy as np
+
+    fig, ax = plt.subplots(figsize=(_WIDTH_IN, _HEIGHT_IN))
+    fig.patch.set_facecolor(_BG_DARK)
+    ax.set_facecolor(_BG_CARD)
 
+    x = np.arange(len(data["meta_formats"]))
+    bars = ax.bar(x, data["win_rates"], color=data["color"], alpha=0.88, width=0.6)
+    # Tournament wins above each bar
+    for bar, wins in zip(bars, data["tournament_wins"]):
+        ax.text(bar.get_x() + bar.get_width() / 2, bar.get_height() + 1.5, f"{wins} wins",
+                ha="center", va="bottom", color=_TEXT_PRIMARY, fontsize=9)
+
+    ax.set_xticks(x)
+    ax.set_xticklabels(data["meta_formats"], color=_TEXT_PRIMARY, fontsize=11)
+    ax.set_ylim(0, 100)
+    ax.set_ylabel("Win Rate (%)", color=_TEXT_MUTED, fontsize=11)
+    ax.tick_params(axis="y", colors=_TEXT_MUTED, labelsize=10)
+    ax.tick_params(axis="x", length=0)
+    for spine in ("top", "right"):
+        ax.spines[spine].set_visible(False)
+    for spine in ("bottom", "left"):
+        ax.spines[spine].set_color(_GRID_COLOR)
+    ax.grid(axis="y", color=_GRID_COLOR, linewidth=0.8, linestyle="--", alpha=0.7)
+    ax.set_axisbelow(True)
 
-def warm_leader_og_image() -> None:
-    try:
-        get_leader_og_image_bytes()
-        logger.info("Leader OG image generated: %s", _OG_LEADER_PATH)
-    except Exception:
-        logger.exception("Leader OG image warm-up failed")
+    ax.set_title(
+        f"{data['title']} – Win Rate by Meta",
+        color=_TEXT_PRIMARY, fontsize=16, fontweight="bold", pad=14, loc="left",
+    )
+    fig.text(0.98, 0.015, "op-tcg-leaderboard.com", ha="right", va="bottom",
+             color=_TEXT_MUTED, fontsize=9)
 
+    fig.tight_layout(rect=(0, 0.02, 1, 1))
 
-def get_meta_og_image_bytes() -> bytes | None:
-    return _get_cached(_OG_META_PATH, _render_meta_chart)
+    buf = BytesIO()
+    fig.savefig(buf, format="png", dpi=_DPI, facecolor=fig.get_facecolor(), bbox_inches="tight")
+    plt.close(fig)
+    buf.seek(0)
+    return buf.read()
 
 
-def warm_meta_og_image() -> None:
+class OGImage:
+    """A rendered PNG file with the validators of conditional GET requests"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        stat = path.stat()
+        self.last_modified = stat.st_mtime
+        # the file is only ever replaced, so mtime and size identify its content
+        self.etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+    def read(self) -> bytes:
+        return self.path.read_bytes()
+
+    def is_stale(self, max_age_seconds: float) -> bool:
+        return time.time() - self.last_modified >= max_age_seconds
+
+
+def _write_atomic(path: Path, content: bytes) -> OGImage:
+    """Writes a temporary file and renames it, so readers see either the old or the new image"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_path.write_bytes(content)
+    os.replace(tmp_path, path)
+    return OGImage(path)
+
+
+# site wide images: name -> (file name, data function, plot function)
+_SITE_IMAGES: dict[str, tuple[str, Callable[[], Any], Callable[[Any], bytes]]] = {
+    "meta": (_OG_META_FILE, _meta_chart_data, _plot_meta_chart),
+    "leader": (_OG_LEADER_FILE, _leader_chart_data, _plot_leader_chart),
+}
+
+
+class OGImageRenderer:
+    """
+    Renders the site wide OG images every interval_seconds and per leader OG images on first request.
+
+    Chart data is prepared on a thread (using the query caches of the web process), matplotlib runs in a
+    separate process, so neither blocks the event loop. Leader images are kept in an on disk LRU of at most
+    max_leader_images files. Stale leader images are served while they are rendered again. Leader ids without data
+    are remembered for interval_seconds, so requests of unknown ids do not schedule a render each.
+    """
+
+    def __init__(self, directory: str | Path = _OG_DIR, interval_seconds: float = _CACHE_TTL_SECONDS,
+                 max_leader_images: int = _MAX_LEADER_IMAGES, process_executor: Executor | None = None,
+                 site_images: dict[str, tuple[str, Callable[[], Any], Callable[[Any], bytes]]] | None = None,
+                 leader_image: tuple[Callable[[str], Any], Callable[[Any], bytes]] = (
+                         _leader_detail_chart_data, _plot_leader_detail_chart)):
+        self.directory = Path(directory)
+        self.leaders_directory = self.directory / _OG_LEADERS_DIR
+        self.interval_seconds = interval_seconds
+        self.max_leader_images = max_leader_images
+        self.site_images = site_images if site_images is not None else _SITE_IMAGES
+        self.leader_image = leader_image
+        self._process_executor = process_executor
+        self._thread_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="og_images")
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._in_flight: set[str] = set()
+        self._images: dict[str, OGImage] = {}
+        # leader id -> image, least recently used first
+        self._leader_images: OrderedDict[str, OGImage] = OrderedDict()
+        self._missing_leader_ids: TTLCache[str, bool] = TTLCache(maxsize=_MAX_MISSING_LEADER_IDS, ttl=interval_seconds)
+        self.is_running = False
+        self._load_from_disk()
+
+    def _load_from_disk(self) -> None:
+        """The last good images of a previous process are served until they are rendered again"""
+        for name, (file_name, _, _) in self.site_images.items():
+            if (self.directory / file_name).exists():
+                self._images[name] = OGImage(self.directory / file_name)
+        if self.leaders_directory.exists():
+            leader_images = [OGImage(path) for path in self.leaders_directory.glob("*.png")]
+            for image in sorted(leader_images, key=lambda image: image.last_modified):
+                self._leader_images[image.path.stem] = image
+            self._evict_leader_images()
+
+    def _get_process_executor(self) -> Executor:
+        if self._process_executor is None:
+            # spawn instead of fork, since the web process runs threads
+            self._process_executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        return self._process_executor
+
+    def _plot(self, plot: Callable[[Any], bytes], data: Any) -> bytes:
+        return self._get_process_executor().submit(plot, data).result()
+
+    def _schedule(self, key: str, fn: Callable, *args) -> None:
+        """Runs fn on the background thread, unless the same render is already in flight"""
+        with self._lock:
+            if key in self._in_flight or self._stop_event.is_set():
+                return
+            self._in_flight.add(key)
+
+        def run():
+            try:
+                fn(*args)
+            except Exception:
+                logger.exception("Failed to render OG image %s", key)
+            finally:
+                with self._lock:
+                    self._in_flight.discard(key)
+
+        self._thread_executor.submit(run)
+
+    def render_site_image(self, name: str) -> OGImage:
+        file_name, prepare, plot = self.site_images[name]
+        image = _write_atomic(self.directory / file_name, self._plot(plot, prepare()))
+        with self._lock:
+            self._images[name] = image
+        logger.info("OG image generated: %s", image.path)
+        return image
+
+    def render_site_images(self, only_stale: bool = False) -> None:
+        for name in self.site_images:
+            image = self._images.get(name)
+            if only_stale and image is not None and not image.is_stale(self.interval_seconds):
+                continue
+            try:
+                self.render_site_image(name)
+            except Exception:
+                # the last good image stays in place
+                logger.exception("Failed to render OG image %s", name)
+
+    def render_leader_image(self, leader_id: str) -> OGImage | None:
+        prepare, plot = self.leader_image
+        data = prepare(leader_id)
+        if data is None:
+            with self._lock:
+                self._missing_leader_ids[leader_id] = True
+            return None
+        image = _write_atomic(self.leaders_directory / f"{leader_id}.png", self._plot(plot, data))
+        with self._lock:
+            self._leader_images[leader_id] = image
+            self._leader_images.move_to_end(leader_id)
+            self._evict_leader_images()
+        return image
+
+    def _evict_leader_images(self) -> None:
+        while len(self._leader_images) > self.max_leader_images:
+            _, image = self._leader_images.popitem(last=False)
+            image.path.unlink(missing_ok=True)
+
+    def get_image(self, name: str) -> OGImage | None:
+        """Last good site wide image. Never renders, a missing image is scheduled instead."""
+        image = self._images.get(name)
+        if image is None and name in self.site_images:
+            self._schedule(f"site:{name}", self.render_site_image, name)
+        return image
+
+    def get_leader_image(self, leader_id: str) -> OGImage | None:
+        """Last good image of a leader. Missing or stale images are rendered in the background."""
+        if not _LEADER_ID_PATTERN.fullmatch(leader_id):
+            return None
+        with self._lock:
+            image = self._leader_images.get(leader_id)
+            if image is not None:
+                self._leader_images.move_to_end(leader_id)
+            elif leader_id in self._missing_leader_ids:
+                return None
+        if image is None or image.is_stale(self.interval_seconds):
+            self._schedule(f"leader:{leader_id}", self.render_leader_image, leader_id)
+        return image
+
+    def start(self) -> None:
+        """Renders missing or stale site wide images right away and all of them every interval_seconds"""
+        if self.is_running:
+            return
+        self.is_running = True
+        self._stop_event.clear()
+
+        def background_loop():
+            self.render_site_images(only_stale=True)
+            while not self._stop_event.wait(timeout=self.interval_seconds):
+                self.render_site_images()
+
+        threading.Thread(target=background_loop, name="og_images_scheduler", daemon=True).start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.is_running = False
+        self._thread_executor.shutdown(wait=False, cancel_futures=True)
+        if self._process_executor is not None:
+            self._process_executor.shutdown(wait=False, cancel_futures=True)
+
+
+def og_image_response(request_headers, image: OGImage, max_age_seconds: int = _CACHE_TTL_SECONDS,
+                      fallback: OGImage | None = None) -> Response:
+    """PNG response with ETag and Last-Modified, 304 Not Modified if the client has the current image.
+    The fallback image is served if the file of image was deleted in the meantime, e.g. evicted from the leader LRU.
+    """
+    headers = {
+        "Cache-Control": f"public, max-age={max_age_seconds}",
+        "ETag": image.etag,
+        "Last-Modified": email.utils.formatdate(image.last_modified, usegmt=True),
+    }
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since
+        etags = {etag.strip().removeprefix("W/") for etag in if_none_match.split(",")}
+        if image.etag in etags or "*" in etags:
+            return Response(status_code=304, headers=headers)
+    elif request_headers.get("if-modified-since"):
+        try:
+            if_modified_since = email.utils.parsedate_to_datetime(request_headers["if-modified-since"]).timestamp()
+        except (TypeError, ValueError):
+            if_modified_since = None
+        # Last-Modified has a resolution of seconds
+        if if_modified_since is not None and int(image.last_modified) <= if_modified_since:
+            return Response(status_code=304, headers=headers)
     try:
-        get_meta_og_image_bytes()
-        logger.info("Meta OG image generated: %s", _OG_META_PATH)
-    except Exception:
-        logger.exception("Meta OG image warm-up failed")
+        content = image.read()
+    except FileNotFoundError:
+        if fallback is None:
+            raise
+        return og_image_response(request_headers, fallback, max_age_seconds)
+    return Response(content=content, media_type="image/png", headers=headers)
+
+
+_og_image_renderer: OGImageRenderer | None = None
+
+
+def get_og_image_renderer() -> OGImageRenderer:
+    global _og_image_renderer
+    if _og_image_renderer is None:
+        _og_image_renderer = OGImageRenderer()
+    return _og_image_renderer
+
+
+def start_og_image_rendering() -> None:
+    get_og_image_renderer().start()
+
+
+def stop_og_image_rendering() -> None:
+    if _og_image_renderer is not None:
+        _og_image_renderer.stop()
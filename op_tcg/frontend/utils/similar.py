@@ -1,9 +1,14 @@
+import threading
 from typing import Dict
+
+from cachetools import LRUCache
 from pydantic import BaseModel
 from op_tcg.backend.models.input import MetaFormat
-from op_tcg.frontend.utils.extract import get_tournament_decklist_data
-from op_tcg.frontend.utils.decklist import decklist_data_to_card_ids, tournament_standings2decklist_data
-from op_tcg.frontend.utils.extract import get_card_id_card_data_lookup
+from op_tcg.frontend.utils.extract import get_all_tournament_decklist_data
+from op_tcg.frontend.utils.similarity_engine import LeaderSimilarityEngine
+
+# Occurrence threshold used by the leader page
+SIMILARITY_THRESHOLD_OCCURRENCE = 0.1
 
 class SimilarLeaderData(BaseModel):
     """Data class for storing similar leader information"""
@@ -12,7 +17,40 @@ class SimilarLeaderData(BaseModel):
     cards_missing: list[str]
     card_id2avg_count_card: Dict[str, float]
 
-def get_most_similar_leader_data(leader_id: str, meta_formats: list[MetaFormat], threshold_occurrence: float = 0.4) -> Dict[str, SimilarLeaderData]:
+# meta format selections of the request parameters are unbounded, so only the most recent engines are kept
+SIMILARITY_ENGINE_CACHE_SIZE = 16
+# number of most similar leaders shown by the leader page
+SIMILAR_LEADERS_TOP_K = 10
+
+# shared by the cache warmer and request threads
+_similarity_engines: LRUCache[tuple, LeaderSimilarityEngine] = LRUCache(maxsize=SIMILARITY_ENGINE_CACHE_SIZE)
+_similarity_engines_lock = threading.Lock()
+
+
+def get_leader_similarity_engine(meta_formats: list[MetaFormat], threshold_occurrence: float = 0.4) -> LeaderSimilarityEngine:
+    """
+    Get the similarity engine of a meta format selection.
+    Engines are rebuilt once the decklist aggregates are refreshed.
+    """
+    decklist_aggregates = get_all_tournament_decklist_data().aggregates
+    key = (tuple(sorted(meta_formats)), threshold_occurrence)
+    with _similarity_engines_lock:
+        engine = _similarity_engines.get(key)
+    if engine is not None and engine.decklist_aggregates is decklist_aggregates:
+        return engine
+    engine = LeaderSimilarityEngine(decklist_aggregates, meta_formats=meta_formats,
+                                    threshold_occurrence=threshold_occurrence, top_k=SIMILAR_LEADERS_TOP_K)
+    with _similarity_engines_lock:
+        # drop engines of outdated aggregates
+        for outdated_key in [k for k, e in _similarity_engines.items()
+                             if e.decklist_aggregates is not decklist_aggregates]:
+            del _similarity_engines[outdated_key]
+        _similarity_engines[key] = engine
+    return engine
+
+def get_most_similar_leader_data(leader_id: str, meta_formats: list[MetaFormat], threshold_occurrence: float = 0.4,
+                                 top_k: int | None = None,
+                                 include_leader_ids: list[str] | None = None) -> Dict[str, SimilarLeaderData]:
     """
     Get data about leaders with similar decklists.
     
@@ -20,68 +58,32 @@ def get_most_similar_leader_data(leader_id: str, meta_formats: list[MetaFormat],
         leader_id: ID of the leader to find similar decklists for
         meta_formats: List of meta formats to consider
         threshold_occurrence: Minimum occurrence threshold for cards to be considered
+        top_k: Only return the k most similar leaders. All leaders if None
+        include_leader_ids: Leaders which are returned in addition to the top k, if they are comparable
         
     Returns:
         Dictionary mapping leader IDs to their similarity data
     """
-    # Get tournament decklists for the target leader
-    target_decklists = get_tournament_decklist_data(meta_formats=meta_formats, leader_ids=[leader_id])
-    if not target_decklists:
-        return {}
-        
-    # Convert to decklist data and get card IDs
-    cid2cdata_dict = get_card_id_card_data_lookup()
-    target_decklist_data = tournament_standings2decklist_data(target_decklists, cid2cdata_dict)
-    target_card_ids = decklist_data_to_card_ids(target_decklist_data, 
-                                               occurrence_threshold=threshold_occurrence,
-                                               exclude_card_ids=[leader_id])
-    
-    if not target_card_ids:
-        return {}
-    
-    # Get all leaders' decklists from the same meta formats
-    all_decklists = get_tournament_decklist_data(meta_formats=meta_formats)
-    
-    # Group decklists by leader
-    leader2decklists = {}
-    for decklist in all_decklists:
-        if decklist.leader_id == leader_id:
-            continue
-        if decklist.leader_id not in leader2decklists:
-            leader2decklists[decklist.leader_id] = []
-        leader2decklists[decklist.leader_id].append(decklist)
-    
-    # Calculate similarity for each leader
+    engine = get_leader_similarity_engine(meta_formats, threshold_occurrence)
+    target_card_ids = set(engine.get_common_card_ids(leader_id)) if leader_id in engine.leader_id2row else set()
+
+    leader_scores = list(engine.get_top_k(leader_id, k=top_k))
+    for other_leader_id in include_leader_ids or []:
+        if other_leader_id not in dict(leader_scores):
+            similarity_score = engine.get_score(leader_id, other_leader_id)
+            if similarity_score is not None:
+                leader_scores.append((other_leader_id, similarity_score))
+
     result = {}
-    for other_leader_id, other_decklists in leader2decklists.items():
-        # Get card IDs for the other leader
-        other_decklist_data = tournament_standings2decklist_data(other_decklists, cid2cdata_dict)
-        other_card_ids = decklist_data_to_card_ids(other_decklist_data,
-                                                  occurrence_threshold=threshold_occurrence,
-                                                  exclude_card_ids=[other_leader_id])
-        
-        if not other_card_ids:
-            continue
-            
-        # Calculate intersection and missing cards
-        cards_intersection = list(set(target_card_ids) & set(other_card_ids))
-        cards_missing = list(set(other_card_ids) - set(target_card_ids))
-        
-        # Calculate similarity score
-        similarity_score = len(cards_intersection) / len(target_card_ids)
-        
-        # Get average card counts
-        card_id2avg_count = {}
-        for card_id in cards_intersection + cards_missing:
-            if card_id in other_decklist_data.card_id2total_count:
-                card_id2avg_count[card_id] = other_decklist_data.card_id2total_count[card_id] / other_decklist_data.num_decklists
-        
-        # Create similarity data
+    for other_leader_id, similarity_score in leader_scores:
+        other_card_ids = engine.get_common_card_ids(other_leader_id)
+        cards_intersection = [cid for cid in other_card_ids if cid in target_card_ids]
+        cards_missing = [cid for cid in other_card_ids if cid not in target_card_ids]
         result[other_leader_id] = SimilarLeaderData(
             similarity_score=similarity_score,
             cards_intersection=cards_intersection,
             cards_missing=cards_missing,
-            card_id2avg_count_card=card_id2avg_count
+            card_id2avg_count_card=engine.get_card_id2avg_count(other_leader_id, cards_intersection + cards_missing)
         )
     
-    return result 
\ No newline at end of file
+    return result
@@ -0,0 +1,124 @@
+from enum import StrEnum
+
+import numpy as np
+
+from op_tcg.backend.models.base import EnumBase
+from op_tcg.backend.models.input import MetaFormat, MetaFormatRegion
+from op_tcg.frontend.utils.decklist_store import DecklistAggregates
+
+
+class SimilarityMetric(EnumBase, StrEnum):
+    # share of the target leaders common cards, which are also common in the other leaders decks
+    INTERSECTION = "intersection"
+    JACCARD = "jaccard"
+    COSINE = "cosine"
+
+
+class LeaderSimilarityEngine:
+    """Leader similarity based on a leaders x cards occurrence proportion matrix of one meta format selection.
+
+    A card is common for a leader if its occurrence proportion is at least threshold_occurrence. The leader card itself
+    is never common. All pairwise scores are computed with one matrix product and the top k leaders of every
+    leader are precomputed, so a request is a row lookup.
+    """
+
+    def __init__(self, decklist_aggregates: DecklistAggregates, meta_formats: list[MetaFormat] | None = None,
+                 meta_format_region: MetaFormatRegion = MetaFormatRegion.ALL, threshold_occurrence: float = 0.4,
+                 top_k: int = 10):
+        self.decklist_aggregates = decklist_aggregates
+        self.threshold_occurrence = threshold_occurrence
+        self.leader_ids: list[str] = []
+        self.card_ids: list[str] = []
+        card_id2column: dict[str, int] = {}
+        rows, columns, occurrence_proportions, avg_counts = [], [], [], []
+        for leader_id in decklist_aggregates.get_leader_ids(meta_formats=meta_formats,
+                                                            meta_format_region=meta_format_region):
+            aggregate = decklist_aggregates.get(leader_id, meta_formats=meta_formats,
+                                                meta_format_region=meta_format_region)
+            row = len(self.leader_ids)
+            self.leader_ids.append(leader_id)
+            for card_id in aggregate.card_ids:
+                if card_id not in card_id2column:
+                    card_id2column[card_id] = len(self.card_ids)
+                    self.card_ids.append(card_id)
+                columns.append(card_id2column[card_id])
+            rows.extend([row] * len(aggregate.card_ids))
+            occurrence_proportions.append(aggregate.card_occurrences / aggregate.num_decklists)
+            avg_counts.append(aggregate.card_total_counts / aggregate.num_decklists)
+        self.leader_id2row = {leader_id: row for row, leader_id in enumerate(self.leader_ids)}
+        self.card_id2column = card_id2column
+
+        shape = (len(self.leader_ids), len(self.card_ids))
+        self.occurrence_proportions = np.zeros(shape, dtype=np.float64)
+        self.avg_counts = np.zeros(shape, dtype=np.float32)
+        if rows:
+            self.occurrence_proportions[rows, columns] = np.concatenate(occurrence_proportions)
+            self.avg_counts[rows, columns] = np.concatenate(avg_counts)
+
+        self.common_cards = self.occurrence_proportions >= threshold_occurrence
+        leader_columns = [card_id2column.get(leader_id) for leader_id in self.leader_ids]
+        leader_rows = [row for row, column in enumerate(leader_columns) if column is not None]
+        self.common_cards[leader_rows, [leader_columns[row] for row in leader_rows]] = False
+        self.num_common_cards = self.common_cards.sum(axis=1)
+        common_cards = self.common_cards.astype(np.float32)
+        self.num_shared_cards = common_cards @ common_cards.T
+
+        self.top_k = top_k
+        self.leader_id2top_k = {leader_id: self._top_k(row, top_k, SimilarityMetric.INTERSECTION)
+                                for leader_id, row in self.leader_id2row.items()}
+
+    def scores(self, metric: SimilarityMetric = SimilarityMetric.INTERSECTION) -> np.ndarray:
+        """Leaders x leaders matrix, row is the target and column the other leader"""
+        return self._scores(slice(None), metric)
+
+    def _scores(self, rows: slice | int, metric: SimilarityMetric) -> np.ndarray:
+        if metric == SimilarityMetric.COSINE:
+            norms = np.linalg.norm(self.occurrence_proportions, axis=1)
+            norms[norms == 0] = 1
+            normalized = self.occurrence_proportions / norms[:, None]
+            return normalized[rows] @ normalized.T
+        num_common_cards = self.num_common_cards[rows]
+        num_common_cards = num_common_cards[:, None] if np.ndim(num_common_cards) else num_common_cards
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if metric == SimilarityMetric.JACCARD:
+                union = num_common_cards + self.num_common_cards - self.num_shared_cards[rows]
+                return np.nan_to_num(self.num_shared_cards[rows] / union)
+            return np.nan_to_num(self.num_shared_cards[rows] / num_common_cards)
+
+    def _top_k(self, row: int, k: int | None, metric: SimilarityMetric) -> list[tuple[str, float]]:
+        if self.num_common_cards[row] == 0:
+            return []
+        scores = self._scores(row, metric)
+        # only leaders with common cards are comparable, ties keep the leader order
+        candidates = np.flatnonzero(self.num_common_cards > 0)
+        candidates = candidates[candidates != row]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")][:k]
+        return [(self.leader_ids[i], float(scores[i])) for i in candidates.tolist()]
+
+    def get_top_k(self, leader_id: str, k: int | None = None,
+                  metric: SimilarityMetric = SimilarityMetric.INTERSECTION) -> list[tuple[str, float]]:
+        """Most similar leaders with their score, sorted by score. All comparable leaders if k is None."""
+        row = self.leader_id2row.get(leader_id)
+        if row is None:
+            return []
+        if metric == SimilarityMetric.INTERSECTION and k is not None and k <= self.top_k:
+            return self.leader_id2top_k[leader_id][:k]
+        return self._top_k(row, k, metric)
+
+    def get_score(self, leader_id: str, other_leader_id: str,
+                  metric: SimilarityMetric = SimilarityMetric.INTERSECTION) -> float | None:
+        """Score of one leader pair, None if the leaders are not comparable (same as a missing get_top_k entry)"""
+        row, other_row = self.leader_id2row.get(leader_id), self.leader_id2row.get(other_leader_id)
+        if row is None or other_row is None or row == other_row \
+                or self.num_common_cards[row] == 0 or self.num_common_cards[other_row] == 0:
+            return None
+        return float(self._scores(row, metric)[other_row])
+
+    def get_common_card_ids(self, leader_id: str) -> list[str]:
+        return [self.card_ids[i] for i in np.flatnonzero(self.common_cards[self.leader_id2row[leader_id]]).tolist()]
+
+    def get_card_id2avg_count(self, leader_id: str, card_ids: list[str]) -> dict[str, float]:
+        """Average count per decklist of the leader, including decklists without the card"""
+        row = self.avg_counts[self.leader_id2row[leader_id]]
+        return {card_id: float(row[self.card_id2column[card_id]]) for card_id in card_ids
+                if card_id in self.card_id2column and row[self.card_id2column[card_id]] > 0}
@@ -4,7 +4,9 @@ import time
 from typing import Any
 from google.oauth2 import service_account
 from google.cloud import bigquery, storage, firestore
-from op_tcg.frontend.utils.cache import _CACHE_1D, _CACHE_6H, _CACHE_1H, _CACHE_30M
+from functools import partial
+from op_tcg.frontend.utils.cache import _CACHE_1D, _CACHE_6H, _CACHE_1H, _CACHE_30M, _BQ_QUERY_SINGLE_FLIGHT, \
+    StaleWhileRevalidateCache
 
 
 # Create API client using credentials
@@ -36,9 +38,74 @@ firestore_client = firestore.Client(credentials=credentials, database="op-leader
 
 
 
+def _get_query_cache(ttl_hours: float | None) -> StaleWhileRevalidateCache | None:
+    """Select appropriate cache based on TTL"""
+    if ttl_hours is None:
+        return None
+    if ttl_hours >= 24:
+        return _CACHE_1D
+    elif ttl_hours >= 6:
+        return _CACHE_6H
+    elif ttl_hours >= 1:
+        return _CACHE_1H
+    else:
+        return _CACHE_30M
+
+
+def _execute_bq_query(query: str, ttl_hours: float | None, location: str, cache: StaleWhileRevalidateCache | None,
+                      cache_key: str | None) -> list[dict[str, Any]]:
+    # A coalesced call which finished just before this one might already have filled the cache
+    if cache is not None:
+        rows = cache.get_fresh(cache_key)
+        if rows is not None:
+            return rows
+
+    # Execute query
+    t_start = time.time()
+    logging.info(f"Running bq query (TTL: {ttl_hours}h): {query}")
+    query_job = bq_client.query(query, location=location)
+    query_line = query.replace("\n", " ")
+    rows_raw = query_job.result()
+    logging.info(f"Finished bq query '{query_line[:50]}...{query_line[-50:]}' in {time.time() - t_start:.2f}s")
+
+    
+    # Convert to list of dicts. Required for caching to hash the return value.
+    rows = [dict(row) for row in rows_raw]
+    
+    # Cache the result if caching is enabled. Stale entries are refreshed by running the query again.
+    if cache is not None and cache_key is not None:
+        cache.set(cache_key, rows, loader=partial(_run_bq_query_uncached, query, ttl_hours, location))
+    
+    return rows
+
+
+def _run_bq_query_uncached(query: str, ttl_hours: float | None, location: str) -> list[dict[str, Any]]:
+    cache = _get_query_cache(ttl_hours)
+    cache_key = f"{query}|ttl_{ttl_hours}" if cache is not None else None
+    return _BQ_QUERY_SINGLE_FLIGHT.do(
+        (cache_key or query, location),
+        lambda: _execute_bq_query(query, ttl_hours, location, cache, cache_key))
+
+
+def _lookup_query_cache(query: str, ttl_hours: float | None) -> tuple[StaleWhileRevalidateCache | None, str | None, list[dict[str, Any]] | None]:
+    """Returns the cache, the cache key and the cached rows (None on a cache miss).
+    Stale rows are returned as well and refreshed in the background."""
+    cache = _get_query_cache(ttl_hours)
+    if cache is None:
+        return None, None, None
+    # Create cache key that includes TTL to prevent conflicts
+    cache_key = f"{query}|ttl_{ttl_hours}"
+    rows = cache.get(cache_key)
+    if rows is not None:
+        logging.info(f"Cache hit for query: {query[:100]}...")
+    return cache, cache_key, rows
+
+
 def run_bq_query(query: str, ttl_hours: float | None = None, location: str = "europe-west1") -> list[dict[str, Any]]:
     """
-    Runs a bigquery query with configurable TTL caching
+    Runs a bigquery query with configurable TTL caching.
+    Concurrent cache misses of the same query are coalesced into a single BigQuery job.
+    Expired entries are served for a grace window while they are refreshed in the background.
     
     Args:
         query: The BigQuery SQL query string
@@ -53,43 +120,7 @@ def run_bq_query(query: str, ttl_hours: float | None = None, location: str = "eu
     Returns:
         List of dictionaries representing query results
     """
-    
-    # Select appropriate cache based on TTL
-    cache = None
-    cache_key = None
-    
-    if ttl_hours is not None:
-        if ttl_hours >= 24:
-            cache = _CACHE_1D
-        elif ttl_hours >= 6:
-            cache = _CACHE_6H
-        elif ttl_hours >= 1:
-            cache = _CACHE_1H
-        else:
-            cache = _CACHE_30M
-            
-        # Create cache key that includes TTL to prevent conflicts
-        cache_key = f"{query}|ttl_{ttl_hours}"
-        
-        # Check if result is in cache
-        if cache_key in cache:
-            logging.info(f"Cache hit for query: {query[:100]}...")
-            return cache[cache_key]
-    
-    # Execute query
-    t_start = time.time()
-    logging.info(f"Running bq query (TTL: {ttl_hours}h): {query}")
-    query_job = bq_client.query(query, location=location)
-    query_line = query.replace("\n", " ")
-    rows_raw = query_job.result()
-    logging.info(f"Finished bq query '{query_line[:50]}...{query_line[-50:]}' in {time.time() - t_start:.2f}s")
-
-    
-    # Convert to list of dicts. Required for caching to hash the return value.
-    rows = [dict(row) for row in rows_raw]
-    
-    # Cache the result if caching is enabled
-    if cache is not None and cache_key is not None:
-        cache[cache_key] = rows
-    
-    return rows
\ No newline at end of file
+    _, _, rows = _lookup_query_cache(query, ttl_hours)
+    if rows is not None:
+        return rows
+    return _run_bq_query_uncached(query, ttl_hours, location)
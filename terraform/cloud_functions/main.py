@@ -13,20 +13,27 @@ from op_tcg.backend.crawling.spiders.op_top_decks_decklists import OPTopDeckDeck
 from op_tcg.backend.etl.classes import EloUpdateToBigQueryEtlJob, CardImageUpdateToGCPEtlJob
 from op_tcg.backend.models.input import MetaFormat
 
+# /tmp is the only writable path in cloud functions, warm instances reuse the crawl state snapshot
+os.environ.setdefault("CRAWL_STATE_PATH", "/tmp/crawl_state.sqlite")
+
 
 def run_all_etl_elo_update(event, context):
     topic_id = "elo-update-pub-sub"
     print("GOOGLE_CLOUD_PROJECT", os.getenv("GOOGLE_CLOUD_PROJECT"))
 
+    # the scheduled update continues the elo checkpoints, {"incremental": false} recalculates all metas from scratch
+    message_dict = json.loads(base64.b64decode(event['data']).decode('utf-8')) if event.get('data') else {}
+    incremental = message_dict.get("incremental", True)
+
     publisher = pubsub_v1.PublisherClient()
     topic_path = publisher.topic_path(os.getenv("GOOGLE_CLOUD_PROJECT"), topic_id)
 
+    # one message per meta, so that the metas are calculated by parallel function instances
     for meta_format in MetaFormat.to_list():
         # Data must be a bytestring
-        data_dict = {"meta_formats": [meta_format]}
+        data_dict = {"meta_formats": [meta_format], "incremental": incremental}
         data = json.dumps(data_dict)  # Convert the dictionary to a JSON string
         data = data.encode("utf-8")  # Convert the string to bytes
-        # Add two attributes, origin and username, to the message
         future = publisher.publish(
             topic_path, data
         )
@@ -54,11 +61,21 @@ def run_etl_elo_update(event, context):
 
     print(f"Received message: {message_dict}")
     meta_formats = message_dict.get("meta_formats") or MetaFormat.to_list()
-    print("Call cloud function with meta_formats", meta_formats, type(meta_formats))
-
-    for meta_format in meta_formats:
-        etl_job = EloUpdateToBigQueryEtlJob(meta_formats=[meta_format], matches_csv_file_path=None)
+    # only matches created after the stored elo checkpoint are queried. run_all_etl_elo_update always sets the flag,
+    # manually published messages without it recalculate their metas from scratch
+    incremental = message_dict.get("incremental", False)
+    # the worker count depends on the cpus of this function instance (available_cpu in terraform), not of the publisher
+    workers = int(os.environ.get("ELO_UPDATE_WORKERS", os.cpu_count() or 1))
+    print("Call cloud function with meta_formats", meta_formats, type(meta_formats), "incremental", incremental, "workers", workers)
+
+    if workers > 1:
+        etl_job = EloUpdateToBigQueryEtlJob(meta_formats=meta_formats, matches_csv_file_path=None,
+                                            incremental=incremental, workers=workers)
         etl_job.run()
+    else:
+        for meta_format in meta_formats:
+            etl_job = EloUpdateToBigQueryEtlJob(meta_formats=[meta_format], matches_csv_file_path=None, incremental=incremental)
+            etl_job.run()
     return f"Success with meta formats {meta_formats}!"
 
 def run_crawl_tournament(event, context):
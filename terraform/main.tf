@@ -230,6 +230,12 @@ resource "google_cloudfunctions2_function" "single-elo" {
     available_memory      = "1024M"
     timeout_seconds       = 540
     service_account_email = google_service_account.cloud_function_sa.email
+    # the official and all matches elo of a meta are calculated in parallel with ELO_UPDATE_WORKERS processes.
+    # os.cpu_count() reports the host cpus, not the cpu share of the instance. More than 1 worker requires
+    # available_cpu >= 2 (and at least 1024M memory for two match partitions).
+    environment_variables = {
+      ELO_UPDATE_WORKERS = "1"
+    }
   }
 }
 
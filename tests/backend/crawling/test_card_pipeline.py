@@ -0,0 +1,117 @@
+"""
+Tests for the non blocking card crawling of the CardPipeline.
+"""
+import threading
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from google.cloud import bigquery
+
+from op_tcg.backend.crawling.items import TournamentItem
+from op_tcg.backend.crawling.pipelines import CardPipeline
+from op_tcg.backend.crawling.state import CrawlStateSet
+from op_tcg.backend.models.cards import Card, CardPrice, CardCurrency, LimitlessCardData
+from op_tcg.backend.models.tournaments import Tournament, TournamentStanding
+
+
+def create_spider(already_crawled_card_ids: list[str] = ()):
+    return SimpleNamespace(
+        bq_client=MagicMock(),
+        card_table=bigquery.Table("project.cards.Card"),
+        card_price_table=bigquery.Table("project.cards.CardPrice"),
+        already_crawled_card_ids=CrawlStateSet(already_crawled_card_ids),
+    )
+
+
+def create_item(tournament_id: str, decklists: list[dict[str, int]]) -> TournamentItem:
+    return TournamentItem(
+        tournament=Tournament.model_construct(id=tournament_id),
+        tournament_standings=[TournamentStanding.model_construct(tournament_id=tournament_id, player_id=f"p{i}",
+                                                                 decklist=decklist)
+                              for i, decklist in enumerate(decklists)],
+        matches=[],
+        decklists=[],
+    )
+
+
+def create_card_data(card_id: str) -> LimitlessCardData:
+    cards = []
+    for aa_version in [0, 0, 1]:
+        card = Card.from_default()
+        card.id = card_id
+        card.aa_version = aa_version
+        cards.append(card)
+    return LimitlessCardData(cards=cards, card_prices=[
+        CardPrice(card_id=card_id, aa_version=0, price=1.0, currency=CardCurrency.EURO)])
+
+
+@pytest.fixture
+def bq_writes():
+    """(write function, table id, rows) of all BigQuery writes in call order"""
+    writes = []
+    with patch("op_tcg.backend.crawling.pipelines.bq_merge_rows",
+               side_effect=lambda rows, table, client: writes.append(("merge", table.table_id, rows))), \
+            patch("op_tcg.backend.crawling.pipelines.bq_append_rows",
+                  side_effect=lambda rows, table, client, job_id: writes.append(("append", table.table_id, rows))):
+        yield writes
+
+
+def test_cards_are_crawled_in_parallel_and_written_once(bq_writes):
+    # every card page blocks until all four are requested, i.e. the requests run concurrently
+    barrier = threading.Barrier(4, timeout=5)
+    crawled_card_ids = []
+
+    def crawl_limitless_card(card_id, session=None, timeout=None):
+        crawled_card_ids.append(card_id)
+        barrier.wait()
+        if card_id == "OP01-004":
+            raise ValueError("card page not found")
+        return create_card_data(card_id)
+
+    spider = create_spider(already_crawled_card_ids=["OP01-005"])
+    pipeline = CardPipeline(max_workers=4)
+    with patch("op_tcg.backend.crawling.pipelines.crawl_limitless_card", side_effect=crawl_limitless_card):
+        pipeline.process_item(create_item("t1", [{"OP01-001": 4, "OP01-002": 4}, {"OP01-003": 2, "OP01-005": 1}]), spider)
+        # scheduled card ids are not crawled twice
+        pipeline.process_item(create_item("t2", [{"OP01-001": 4, "OP01-004": 4}]), spider)
+        # no BigQuery writes before the spider is closed
+        assert bq_writes == []
+        pipeline.close_spider(spider)
+
+    assert sorted(crawled_card_ids) == ["OP01-001", "OP01-002", "OP01-003", "OP01-004"]
+    # cards are merged, prices are only appended
+    assert [(write, table_id) for write, table_id, _ in bq_writes] == [("merge", "Card"), ("append", "CardPrice")]
+    cards, card_prices = [rows for _, _, rows in bq_writes]
+    # duplicated designs are removed
+    assert sorted((card.id, card.aa_version) for card in cards) == [
+        (card_id, aa_version) for card_id in ["OP01-001", "OP01-002", "OP01-003"] for aa_version in [0, 1]]
+    assert len(card_prices) == 3
+    assert "OP01-003" in spider.already_crawled_card_ids
+    # failed cards can be retried by later items
+    assert "OP01-004" not in spider.already_crawled_card_ids
+    assert "OP01-004" not in pipeline.scheduled_card_ids
+
+
+def test_close_without_tournament_items_writes_nothing(bq_writes):
+    pipeline = CardPipeline()
+    pipeline.close_spider(create_spider())
+    assert bq_writes == []
+
+
+def test_cards_are_flushed_in_bounded_batches_during_crawl(bq_writes):
+    spider = create_spider()
+    pipeline = CardPipeline(max_workers=1, batch_size=4)
+    with patch("op_tcg.backend.crawling.pipelines.crawl_limitless_card",
+               side_effect=lambda card_id, **kwargs: create_card_data(card_id)):
+        pipeline.process_item(create_item("t1", [{f"OP01-00{i}": 4 for i in range(1, 6)}]), spider)
+        pipeline.executor.shutdown(wait=True)
+        # every second card fills the card buffer with 2 designs each
+        assert [len(rows) for _, _, rows in bq_writes] == [4, 2, 4, 2]
+        assert len(pipeline.card_buffer) == 2 and len(pipeline.card_price_buffer) == 1
+        pipeline.close_spider(spider)
+
+    written = [(table_id, len(rows)) for _, table_id, rows in bq_writes]
+    assert written[4:] == [("Card", 2), ("CardPrice", 1)]
+    assert sum(n for table_id, n in written if table_id == "Card") == 10
+    assert pipeline.stats.summary()["rows"] == 15
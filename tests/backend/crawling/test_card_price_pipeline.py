@@ -0,0 +1,110 @@
+"""
+Tests for the batched BigQuery writes of the CardPricePipeline.
+"""
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from op_tcg.backend.crawling.items import LimitlessPriceRow
+from op_tcg.backend.crawling.pipelines import CardPricePipeline
+from op_tcg.backend.models.cards import CardCurrency, OPTcgLanguage
+
+
+def create_spider():
+    return SimpleNamespace(bq_client=MagicMock(), price_table=MagicMock(), price_count={})
+
+
+def create_item(card_id: str, aa_version: int = 0, price_usd: float | None = 1.5,
+                price_eur: float | None = 1.2) -> LimitlessPriceRow:
+    return LimitlessPriceRow(card_id=card_id, aa_version=aa_version, language=OPTcgLanguage.EN, name="Card",
+                             card_category="Character", rarity="C", price_usd=price_usd, price_eur=price_eur)
+
+
+@pytest.fixture
+def bq_append_rows():
+    with patch("op_tcg.backend.crawling.pipelines.bq_append_rows") as mock:
+        yield mock
+
+
+def appended_batches(bq_append_rows) -> list[list]:
+    return [c.args[0] for c in bq_append_rows.call_args_list]
+
+
+def test_prices_are_flushed_by_count_and_on_close(bq_append_rows):
+    spider = create_spider()
+    pipeline = CardPricePipeline(batch_size=4)
+    for i in range(3):
+        pipeline.process_item(create_item(f"OP01-{i:03d}"), spider)
+    # two prices per item, the first flush happens after the second item
+    assert [len(batch) for batch in appended_batches(bq_append_rows)] == [4]
+    pipeline.process_item(create_item("OP01-100", price_eur=None), spider)
+    pipeline.close_spider(spider)
+
+    batches = appended_batches(bq_append_rows)
+    assert [len(batch) for batch in batches] == [4, 3]
+    assert [(p.card_id, p.currency) for p in batches[1]] == [
+        ("OP01-002", CardCurrency.US_DOLLAR), ("OP01-002", CardCurrency.EURO), ("OP01-100", CardCurrency.US_DOLLAR)]
+    assert all(c.kwargs["table"] is spider.price_table for c in bq_append_rows.call_args_list)
+    assert spider.price_write_stats["batches"] == 2
+    assert spider.price_write_stats["rows"] == 7
+
+
+def test_prices_are_flushed_by_bytes(bq_append_rows):
+    spider = create_spider()
+    pipeline = CardPricePipeline(batch_size=1000, max_batch_bytes=1)
+    pipeline.process_item(create_item("OP01-001"), spider)
+    assert [len(batch) for batch in appended_batches(bq_append_rows)] == [2]
+    assert pipeline.buffer.rows == [] and pipeline.buffer.num_bytes == 0
+
+
+def test_duplicate_prices_are_logged(bq_append_rows, caplog):
+    spider = create_spider()
+    pipeline = CardPricePipeline()
+    pipeline.process_item(create_item("OP01-001"), spider)
+    pipeline.process_item(create_item("OP01-001"), spider)
+    assert spider.price_count == {"OP01-001": {0: 1}}
+    assert "Price information of OP01-001 0 was already uploaded" in caplog.text
+
+
+def test_failed_flush_is_counted(bq_append_rows):
+    bq_append_rows.side_effect = RuntimeError("quota exceeded")
+    spider = create_spider()
+    pipeline = CardPricePipeline()
+    pipeline.process_item(create_item("OP01-001"), spider)
+    with patch("op_tcg.backend.crawling.pipelines.bq_merge_rows") as bq_merge_rows:
+        pipeline.close_spider(spider)
+    # prices are never merged or deduplicated
+    bq_merge_rows.assert_not_called()
+    assert bq_append_rows.call_count == 2
+    assert spider.price_write_stats["failed_batches"] == 1
+    assert spider.price_write_stats["rows"] == 0
+
+
+def test_failed_append_is_retried_with_the_same_load_job_id(bq_append_rows):
+    spider = create_spider()
+    pipeline = CardPricePipeline()
+    pipeline.process_item(create_item("OP01-001"), spider)
+    bq_append_rows.side_effect = [RuntimeError("connection reset"), None]
+    pipeline.close_spider(spider)
+
+    first_attempt, retry = bq_append_rows.call_args_list
+    assert first_attempt.kwargs["job_id"] == retry.kwargs["job_id"]
+    assert spider.price_write_stats["failed_batches"] == 0
+    assert spider.price_write_stats["rows"] == 2
+
+    # every batch gets its own load job
+    bq_append_rows.reset_mock(side_effect=True)
+    pipeline.process_item(create_item("OP01-002"), spider)
+    pipeline.flush(spider)
+    assert bq_append_rows.call_args.kwargs["job_id"] != first_attempt.kwargs["job_id"]
+
+
+def test_unbuffered_pipeline_inserts_per_item():
+    spider = create_spider()
+    pipeline = CardPricePipeline(buffered=False)
+    with patch("op_tcg.backend.crawling.pipelines.bq_insert_rows") as bq_insert_rows:
+        pipeline.process_item(create_item("OP01-001"), spider)
+        pipeline.process_item(create_item("OP01-002"), spider)
+    assert bq_insert_rows.call_count == 2
+    assert [p.currency for p in bq_insert_rows.call_args.args[0]] == [CardCurrency.US_DOLLAR, CardCurrency.EURO]
@@ -0,0 +1,131 @@
+"""
+Tests for the set based crawl state shared by spiders and pipelines.
+"""
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+import pytest
+
+from op_tcg.backend.crawling.state import CrawlState, CrawlStateSet, CrawlStateSnapshot
+from op_tcg.backend.utils.database import create_decklist_id
+
+
+@pytest.mark.parametrize("digest_size", [None, 8, 16])
+def test_add_and_contains(digest_size):
+    decklist_ids = [create_decklist_id({f"OP01-{i:03d}": 4}) for i in range(100)]
+    crawl_state_set = CrawlStateSet(decklist_ids[:50], digest_size=digest_size)
+
+    assert len(crawl_state_set) == 50
+    assert all(decklist_id in crawl_state_set for decklist_id in decklist_ids[:50])
+    assert not any(decklist_id in crawl_state_set for decklist_id in decklist_ids[50:])
+
+    crawl_state_set.add(decklist_ids[50])
+    crawl_state_set.add(decklist_ids[50])
+    assert decklist_ids[50] in crawl_state_set
+    assert len(crawl_state_set) == 51
+
+
+def test_digests_have_fixed_width():
+    crawl_state_set = CrawlStateSet([create_decklist_id({"OP01-001": 1}), "short"], digest_size=16)
+    assert {len(key) for key in crawl_state_set._keys} == {16}
+
+
+def test_load_from_bq_streams_one_query():
+    client = MagicMock()
+    client.query.return_value.result.return_value = iter([
+        {"tournament_id": "t1", "decklist_id": "d1", "author": "a"},
+        {"tournament_id": "t1", "decklist_id": "d2", "author": "b"},
+    ])
+    crawl_state = CrawlState()
+    keys = crawl_state.load_from_bq("op_top_deck_decklist_ids", client, "SELECT ...",
+                                    key_fn=lambda row: f"{row['tournament_id']}_{row['decklist_id']}_{row['author']}")
+
+    client.query.assert_called_once_with("SELECT ...")
+    assert crawl_state["op_top_deck_decklist_ids"] is keys
+    assert "t1_d2_b" in keys and "t1_d1_b" not in keys
+
+
+def test_load_from_bq_key_column():
+    client = MagicMock()
+    client.query.return_value.result.return_value = iter([{"id": "OP01-001"}, {"id": "OP01-002"}])
+    keys = CrawlState().load_from_bq("card_ids", client, "SELECT ...")
+    assert "OP01-002" in keys and len(keys) == 2
+
+
+class FakeIncrementalClient:
+    """Returns all rows for full queries and rows newer than the TIMESTAMP(...) literal for incremental queries"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def query(self, query):
+        self.queries.append(query)
+        rows = self.rows
+        if "TIMESTAMP('" in query:
+            since = datetime.fromisoformat(query.split("TIMESTAMP('")[1].split("')")[0])
+            rows = [row for row in rows if row["create_timestamp"] > since]
+        job = MagicMock()
+        job.result.return_value = iter(list(rows))
+        return job
+
+
+def _row(card_id: str, days: int) -> dict:
+    return {"id": card_id, "create_timestamp": datetime(2025, 1, 1, tzinfo=timezone.utc) + timedelta(days=days)}
+
+
+def test_snapshot_incremental_sync_equals_full_load(tmp_path):
+    client = FakeIncrementalClient([_row(f"OP01-{i:03d}", i) for i in range(10)])
+    CrawlState(snapshot=CrawlStateSnapshot(tmp_path / "state.sqlite")).load_from_bq("card_ids", client, "SELECT ...")
+    assert "TIMESTAMP(" not in client.queries[-1]
+
+    client.rows.append(_row("OP02-001", 20))
+    # arrives late, but within the overlap window
+    client.rows.append(_row("OP02-002", 9))
+    # a new process reads the snapshot from disk
+    keys = CrawlState(snapshot=CrawlStateSnapshot(tmp_path / "state.sqlite")).load_from_bq("card_ids", client, "SELECT ...")
+
+    assert "TIMESTAMP('2025-01-09" in client.queries[-1]
+    full_keys = CrawlState().load_from_bq("card_ids", client, "SELECT ...")
+    assert len(keys) == len(full_keys) == 12
+    assert all(f"OP01-{i:03d}" in keys for i in range(10)) and "OP02-001" in keys and "OP02-002" in keys
+
+
+def test_snapshot_rebuilds_on_query_change_and_invalidate(tmp_path):
+    snapshot = CrawlStateSnapshot(tmp_path / "state.sqlite")
+    client = FakeIncrementalClient([_row("OP01-001", 0), _row("OP01-002", 1)])
+    snapshot.sync("card_ids", client, "SELECT ...", key_fn=lambda row: row["id"])
+
+    # rows deleted in BigQuery are only removed by a full rebuild
+    client.rows.pop()
+    assert len(snapshot.sync("card_ids", client, "SELECT ...", key_fn=lambda row: row["id"])) == 2
+    snapshot.invalidate("card_ids")
+    assert snapshot.sync("card_ids", client, "SELECT ...", key_fn=lambda row: row["id"]) == [("OP01-001", None)]
+    assert "TIMESTAMP(" not in client.queries[-1]
+
+    client.rows.append(_row("OP01-003", 2))
+    snapshot.sync("card_ids", client, "SELECT other", key_fn=lambda row: row["id"])
+    assert "TIMESTAMP(" not in client.queries[-1]
+
+
+def test_snapshot_rebuilds_after_max_age(tmp_path):
+    snapshot = CrawlStateSnapshot(tmp_path / "state.sqlite", max_age=timedelta(0))
+    client = FakeIncrementalClient([_row("OP01-001", 0)])
+    snapshot.sync("card_ids", client, "SELECT ...", key_fn=lambda row: row["id"])
+    snapshot.sync("card_ids", client, "SELECT ...", key_fn=lambda row: row["id"])
+    assert all("TIMESTAMP(" not in query for query in client.queries)
+
+
+def test_load_mapping_from_bq_with_snapshot(tmp_path):
+    client = FakeIncrementalClient([{"id": "t1", "decklists": False, **_row("t1", 0)},
+                                    {"id": "t2", "decklists": True, **_row("t2", 1)}])
+    crawl_state = CrawlState(snapshot=CrawlStateSnapshot(tmp_path / "state.sqlite"))
+    crawl_state.load_mapping_from_bq("tournament_id2decklists", client, "SELECT ...", "id", "decklists")
+
+    # tournament t1 is crawled again after its decklists were published
+    client.rows.append({"id": "t1", "decklists": True, **_row("t1", 5)})
+    tournament_id2decklists = crawl_state.load_mapping_from_bq(
+        "tournament_id2decklists", client, "SELECT ...", "id", "decklists")
+    assert tournament_id2decklists == {"t1": True, "t2": True}
+    assert tournament_id2decklists == CrawlState().load_mapping_from_bq(
+        "tournament_id2decklists", client, "SELECT ...", "id", "decklists")
@@ -0,0 +1,110 @@
+"""
+Tests for the buffered BigQuery writes of the OpTopDeckDecklistPipeline.
+"""
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from google.cloud import bigquery
+
+from op_tcg.backend.crawling.items import OpTopDecksItem
+from op_tcg.backend.crawling.pipelines import OpTopDeckDecklistPipeline
+from op_tcg.backend.crawling.spiders.op_top_decks_decklists import OPTopDeckDecklistSpider
+from op_tcg.backend.models.decklists import Decklist, OpTopDeckDecklist
+from op_tcg.backend.models.tournaments import Tournament, TournamentStanding
+
+
+def create_spider():
+    tables = {table_id: bigquery.Table(f"project.matches.{table_id}") for table_id in
+              ["Tournament", "Decklist", "TournamentStanding", "OpTopDeckDecklist"]}
+    spider = SimpleNamespace(
+        bq_client=MagicMock(),
+        tournament_table=tables["Tournament"],
+        decklist_table=tables["Decklist"],
+        tournament_standing_table=tables["TournamentStanding"],
+        op_top_deck_table=tables["OpTopDeckDecklist"],
+        tournament_ids_crawled=set(), decklist_ids_crawled=set(), tournament_standing_ids_crawled=set(),
+        decklists_crawled=set(),
+        bq_add_data_stats={table_id: 0 for table_id in tables},
+    )
+    spider.tournament_standing_to_id = lambda ts: OPTopDeckDecklistSpider.tournament_standing_to_id(spider, ts)
+    spider.op_top_deck_decklist_to_id = lambda d: OPTopDeckDecklistSpider.op_top_deck_decklist_to_id(spider, d)
+    return spider
+
+
+def create_item(tournament_id: str, decklist_ids: list[str]) -> OpTopDecksItem:
+    return OpTopDecksItem(
+        tournaments=[Tournament.model_construct(id=tournament_id)],
+        decklists=[Decklist.model_construct(id=decklist_id) for decklist_id in decklist_ids],
+        tournament_standings=[TournamentStanding.model_construct(tournament_id=tournament_id, decklist_id=decklist_id,
+                                                                 player_id=f"p{i}")
+                              for i, decklist_id in enumerate(decklist_ids)],
+        op_top_deck_decklists=[OpTopDeckDecklist.model_construct(tournament_id=tournament_id, decklist_id=decklist_id,
+                                                                 author="author")
+                               for decklist_id in decklist_ids],
+    )
+
+
+@pytest.fixture
+def bq_merge_rows():
+    with patch("op_tcg.backend.crawling.pipelines.bq_merge_rows") as mock:
+        yield mock
+
+
+def merged_rows(bq_merge_rows) -> dict[str, int]:
+    return {c.kwargs["table"].table_id: len(c.args[0]) for c in bq_merge_rows.call_args_list}
+
+
+def test_items_are_flushed_in_batches_and_on_close(bq_merge_rows):
+    spider = create_spider()
+    pipeline = OpTopDeckDecklistPipeline(batch_size=2)
+
+    pipeline.process_item(create_item("t1", ["d1", "d2"]), spider)
+    bq_merge_rows.assert_not_called()
+    pipeline.process_item(create_item("t2", ["d2", "d3"]), spider)
+
+    # one MERGE per table for both items, the duplicate decklist d2 is written once
+    assert merged_rows(bq_merge_rows) == {"Tournament": 2, "Decklist": 3, "TournamentStanding": 4,
+                                          "OpTopDeckDecklist": 4}
+    assert spider.bq_add_data_stats == {"Tournament": 2, "Decklist": 3, "TournamentStanding": 4,
+                                        "OpTopDeckDecklist": 4}
+
+    bq_merge_rows.reset_mock()
+    pipeline.process_item(create_item("t3", ["d4"]), spider)
+    pipeline.close_spider(spider)
+    assert merged_rows(bq_merge_rows) == {"Tournament": 1, "Decklist": 1, "TournamentStanding": 1,
+                                          "OpTopDeckDecklist": 1}
+    bq_merge_rows.reset_mock()
+    pipeline.close_spider(spider)
+    bq_merge_rows.assert_not_called()
+
+
+def test_unbuffered_pipeline_writes_every_item(bq_merge_rows):
+    spider = create_spider()
+    pipeline = OpTopDeckDecklistPipeline(buffered=False)
+    pipeline.process_item(create_item("t1", ["d1"]), spider)
+    pipeline.process_item(create_item("t1", ["d1"]), spider)
+    assert bq_merge_rows.call_count == 4
+
+
+def test_failed_write_is_retried_counted_and_does_not_fail_the_item(bq_merge_rows):
+    spider = create_spider()
+    pipeline = OpTopDeckDecklistPipeline(batch_size=1)
+
+    def merge_rows(rows, table, client):
+        if table.table_id == "Decklist":
+            raise RuntimeError("quota exceeded")
+
+    bq_merge_rows.side_effect = merge_rows
+    assert pipeline.process_item(create_item("t1", ["d1", "d2"]), spider)
+    # the failed table is retried once, the other tables are written
+    assert [c.kwargs["table"].table_id for c in bq_merge_rows.call_args_list] == [
+        "Tournament", "Decklist", "Decklist", "TournamentStanding", "OpTopDeckDecklist"]
+    assert pipeline.table_id2buffer == {}
+    assert spider.bq_add_data_stats == {"Tournament": 1, "Decklist": 0, "TournamentStanding": 2,
+                                        "OpTopDeckDecklist": 2}
+
+    pipeline.close_spider(spider)
+    assert spider.bq_write_stats["batches"] == 3
+    assert spider.bq_write_stats["failed_batches"] == 1
+    assert spider.bq_write_stats["rows"] == 5
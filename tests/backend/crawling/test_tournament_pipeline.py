@@ -0,0 +1,114 @@
+"""
+Tests for the buffered BigQuery writes of the TournamentPipeline.
+"""
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from google.cloud import bigquery
+
+from op_tcg.backend.crawling.items import TournamentItem
+from op_tcg.backend.crawling.pipelines import TournamentPipeline
+from op_tcg.backend.crawling.state import CrawlStateSet
+from op_tcg.backend.models.decklists import Decklist
+from op_tcg.backend.models.matches import Match
+from op_tcg.backend.models.tournaments import Tournament, TournamentStanding
+
+
+def create_spider():
+    def table(table_id: str) -> bigquery.Table:
+        bq_table = bigquery.Table(f"project.matches.{table_id}")
+        # set by the API for existing tables
+        bq_table._properties["id"] = f"project:matches.{table_id}"
+        return bq_table
+
+    spider = SimpleNamespace(
+        bq_client=MagicMock(),
+        match_table=table("Match"),
+        tournament_table=table("Tournament"),
+        tournament_standing_table=table("TournamentStanding"),
+        decklist_table=table("Decklist"),
+        decklist_ids_crawled=CrawlStateSet(digest_size=16),
+    )
+    spider.bq_add_data_stats = {t.table_id: 0 for t in
+                                [spider.match_table, spider.tournament_table, spider.tournament_standing_table, spider.decklist_table]}
+    return spider
+
+
+def create_item(tournament_id: str, decklist_ids: list[str], num_matches: int = 4) -> TournamentItem:
+    return TournamentItem(
+        tournament=Tournament.model_construct(id=tournament_id),
+        tournament_standings=[TournamentStanding.model_construct(tournament_id=tournament_id, player_id=f"p{i}")
+                              for i in range(2)],
+        matches=[Match.model_construct(id=f"{tournament_id}_{i}", tournament_id=tournament_id) for i in range(num_matches)],
+        decklists=[Decklist.model_construct(id=decklist_id) for decklist_id in decklist_ids],
+    )
+
+
+@pytest.fixture
+def bq_replace_rows():
+    with patch("op_tcg.backend.crawling.pipelines.bq_replace_rows") as mock:
+        yield mock
+
+
+def replaced_rows(bq_replace_rows) -> dict[str, tuple[list, str | None]]:
+    return {c.kwargs["table"].table_id: (c.args[0], c.kwargs["key_column"]) for c in bq_replace_rows.call_args_list}
+
+
+def test_items_are_flushed_in_batches(bq_replace_rows):
+    spider = create_spider()
+    pipeline = TournamentPipeline(batch_size=2)
+
+    pipeline.process_item(create_item("t1", ["d1", "d2"]), spider)
+    bq_replace_rows.assert_not_called()
+    pipeline.process_item(create_item("t2", ["d2", "d3"]), spider)
+
+    # one write per table for both tournaments
+    assert bq_replace_rows.call_count == 4
+    table_id2rows = replaced_rows(bq_replace_rows)
+    assert len(table_id2rows["Match"][0]) == 8 and table_id2rows["Match"][1] == "tournament_id"
+    assert len(table_id2rows["TournamentStanding"][0]) == 4
+    assert [t.id for t in table_id2rows["Tournament"][0]] == ["t1", "t2"] and table_id2rows["Tournament"][1] == "id"
+    assert [d.id for d in table_id2rows["Decklist"][0]] == ["d1", "d2", "d3"] and table_id2rows["Decklist"][1] is None
+    spider.bq_client.query.assert_not_called()
+    assert spider.bq_add_data_stats == {"Match": 8, "Tournament": 2, "TournamentStanding": 4, "Decklist": 3}
+
+
+def test_close_spider_flushes_remaining_items(bq_replace_rows):
+    spider = create_spider()
+    pipeline = TournamentPipeline(batch_size=10)
+    pipeline.process_item(create_item("t1", ["d1"]), spider)
+    # a tournament crawled twice replaces its previous rows
+    pipeline.process_item(create_item("t1", [], num_matches=2), spider)
+    bq_replace_rows.assert_not_called()
+
+    pipeline.close_spider(spider)
+    table_id2rows = replaced_rows(bq_replace_rows)
+    assert [m.id for m in table_id2rows["Match"][0]] == ["t1_0", "t1_1"]
+    assert len(table_id2rows["Tournament"][0]) == 1
+    assert spider.bq_add_data_stats["Match"] == 2
+
+    # nothing left to flush
+    pipeline.close_spider(spider)
+    assert bq_replace_rows.call_count == 4
+
+
+def test_flush_interval(bq_replace_rows):
+    spider = create_spider()
+    pipeline = TournamentPipeline(batch_size=10, flush_interval_seconds=0)
+    pipeline.process_item(create_item("t1", []), spider)
+    assert bq_replace_rows.call_count == 3
+
+
+def test_unbuffered_mode_writes_per_item(bq_replace_rows):
+    spider = create_spider()
+    pipeline = TournamentPipeline(buffered=False)
+    with patch("op_tcg.backend.crawling.pipelines.bq_insert_rows") as bq_insert_rows:
+        pipeline.process_item(create_item("t1", ["d1"]), spider)
+        pipeline.close_spider(spider)
+
+    bq_replace_rows.assert_not_called()
+    assert bq_insert_rows.call_count == 4
+    # delete of matches, standings and the tournament
+    assert spider.bq_client.query.call_count == 3
+    assert spider.bq_add_data_stats == {"Match": 4, "Tournament": 1, "TournamentStanding": 2, "Decklist": 1}
@@ -0,0 +1,139 @@
+"""
+Tests of the concurrent card image mirroring of CardImageUpdateToGCPEtlJob against a local HTTP server and a fake
+storage client.
+"""
+import base64
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock
+
+import pytest
+
+from op_tcg.backend.etl.classes import CardImageUpdateToGCPEtlJob
+from op_tcg.backend.models.cards import Card
+from op_tcg.backend.utils.utils import HostRateLimiter
+
+IMAGES = {f"/OP01-{i:03d}.png": f"image {i}".encode() for i in range(20)}
+
+
+class ImageHandler(BaseHTTPRequestHandler):
+    requested_paths: list[str] = []
+
+    def do_GET(self):
+        self.requested_paths.append(self.path)
+        if self.path not in IMAGES:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(IMAGES[self.path])))
+        self.end_headers()
+        self.wfile.write(IMAGES[self.path])
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def image_server():
+    ImageHandler.requested_paths = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ImageHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def _md5_hash(data: bytes) -> str:
+    return base64.b64encode(hashlib.md5(data).digest()).decode()
+
+
+class FakeBlob:
+    def __init__(self, bucket: "FakeBucket", name: str):
+        self.bucket = bucket
+        self.name = name
+        self.md5_hash = None
+
+    def upload_from_string(self, data: bytes, content_type: str | None = None):
+        self.md5_hash = _md5_hash(data)
+        self.bucket.uploads.append((self.name, content_type))
+        self.bucket.blobs[self.name] = self
+
+
+class FakeBucket:
+    def __init__(self):
+        self.blobs: dict[str, FakeBlob] = {}
+        self.uploads: list[tuple[str, str]] = []
+
+    def blob(self, name: str) -> FakeBlob:
+        return FakeBlob(self, name)
+
+    def list_blobs(self, prefix: str = ""):
+        return [blob for name, blob in self.blobs.items() if name.startswith(prefix)]
+
+
+class FakeStorageClient:
+    def __init__(self):
+        self.bucket = FakeBucket()
+        self.get_bucket_calls = 0
+
+    def get_bucket(self, bucket_name: str) -> FakeBucket:
+        self.get_bucket_calls += 1
+        return self.bucket
+
+
+def make_card(card_id: str, image_url: str) -> Card:
+    card = Card.from_default()
+    card.id = card_id
+    card.image_url = image_url
+    return card
+
+
+def test_transform_mirrors_images_concurrently(image_server):
+    storage_client = FakeStorageClient()
+    bq_client = MagicMock()
+    bq_client.project = "test-project"
+    job = CardImageUpdateToGCPEtlJob(max_workers=4, requests_per_second_per_host=0, bq_client=bq_client,
+                                     storage_client=storage_client)
+    # an identical image exists already, a changed one must be overwritten
+    unchanged = FakeBlob(storage_client.bucket, "card/images/EN/0/OP01-000.png")
+    unchanged.md5_hash = _md5_hash(IMAGES["/OP01-000.png"])
+    changed = FakeBlob(storage_client.bucket, "card/images/EN/0/OP01-001.png")
+    changed.md5_hash = _md5_hash(b"old image")
+    storage_client.bucket.blobs = {unchanged.name: unchanged, changed.name: changed}
+
+    cards = [make_card(path[1:-4], f"{image_server}{path}") for path in IMAGES]
+    cards.insert(5, make_card("OP99-999", f"{image_server}/OP99-999.png"))
+    successful = job.transform(cards)
+
+    assert [card.id for card in successful] == [path[1:-4] for path in IMAGES]
+    assert all(card.image_url == f"https://storage.googleapis.com/test-project-public/card/images/EN/0/{card.id}.png"
+               for card in successful)
+    uploaded_names = [name for name, _ in storage_client.bucket.uploads]
+    assert sorted(uploaded_names) == sorted(f"card/images/EN/0/{path[1:]}" for path in IMAGES if path != "/OP01-000.png")
+    assert {content_type for _, content_type in storage_client.bucket.uploads} == {"image/png"}
+    assert storage_client.bucket.blobs[changed.name].md5_hash == _md5_hash(IMAGES["/OP01-001.png"])
+    # 404 is not retried, the bucket is fetched once
+    assert ImageHandler.requested_paths.count("/OP99-999.png") == 1
+    assert storage_client.get_bucket_calls == 1
+
+
+def test_host_rate_limiter_spaces_requests_per_host():
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+
+    rate_limiter = HostRateLimiter(requests_per_second=2, clock=lambda: now[0], sleep=sleep)
+    for _ in range(3):
+        rate_limiter.wait("https://a.example.com/1.png")
+    rate_limiter.wait("https://b.example.com/1.png")
+    assert sleeps == [0.5, 1.0]
+
+    # slots in the past do not delay new requests
+    now[0] = 10.0
+    rate_limiter.wait("https://a.example.com/2.png")
+    assert sleeps == [0.5, 1.0]
@@ -0,0 +1,66 @@
+"""
+Tests of the column wise validation of extracted BigQuery rows.
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandera.errors import SchemaError
+
+from op_tcg.backend.etl.extract import validate_dataframe, dataframe2records
+from op_tcg.backend.models.cards import Card, OPTcgColor
+from op_tcg.backend.models.matches import Match
+
+
+def make_df_matches(**columns) -> pd.DataFrame:
+    df = pd.DataFrame({
+        "id": ["a", "a"], "leader_id": ["OP01-001", "OP01-060"], "opponent_id": ["OP01-060", "OP01-001"],
+        # BigQuery returns nullable integer columns
+        "result": pd.array([2, 0], dtype="Int64"), "meta_format": ["OP01", "OP01"], "official": [True, True],
+        "is_reverse": [False, True], "source": ["limitless_tcg"] * 2, "tournament_round": pd.array([None, 3], dtype="Int64"),
+        "match_timestamp": ["2024-01-01T00:00:00", "2024-01-01T00:00:00+00:00"],
+        "create_timestamp": [datetime(2024, 1, 2)] * 2,
+    })
+    return df.assign(**columns)
+
+
+def test_validate_dataframe_coerces_columns():
+    df = validate_dataframe(make_df_matches(), Match)
+    assert df.result.dtype == "int64"
+    assert df.tournament_round.isna().tolist() == [True, False]
+    assert str(df.match_timestamp.dtype) == str(df.create_timestamp.dtype) == "datetime64[ns, UTC]"
+    assert (df.match_timestamp == pd.Timestamp("2024-01-01", tz="UTC")).all()
+
+
+def test_validate_dataframe_rejects_null_in_required_column():
+    with pytest.raises(SchemaError):
+        validate_dataframe(make_df_matches(result=pd.array([None, 0], dtype="Int64")), Match)
+
+
+def make_df_cards() -> pd.DataFrame:
+    # Arrow converts REPEATED columns to numpy arrays and nullable integer columns with NULLs to float
+    return pd.DataFrame({
+        "id": ["OP01-001", "OP01-016"], "language": ["en", "en"], "aa_version": [0, 0],
+        "name": ["Roronoa Zoro", "Nami"], "image_url": ["https://a.png", "https://b.png"],
+        "colors": [np.array(["Red"], dtype=object), np.array(["Red", "Green"], dtype=object)],
+        "ability": ["", "[Blocker]"], "tournament_status": [None, None],
+        "types": [np.array(["Supernovas", "Straw Hat Crew"], dtype=object), np.array([], dtype=object)],
+        "rarity": ["Leader", "Rare"], "card_category": ["Leader", "Character"], "release_set_id": ["OP01", "OP01"],
+        "attributes": [np.array(["Slash"], dtype=object), np.array([], dtype=object)],
+        "power": [5000.0, 2000.0], "cost": [np.nan, 1.0], "counter": [np.nan, 1000.0], "life": [5.0, np.nan],
+        "create_timestamp": [datetime(2024, 1, 2)] * 2,
+    })
+
+
+def test_validate_dataframe_keeps_list_columns_and_null_ints():
+    df = validate_dataframe(make_df_cards(), Card)
+    assert df.colors.tolist()[1].tolist() == ["Red", "Green"]
+    assert str(df.counter.dtype) == "Int64"
+
+    cards = [Card(**record) for record in dataframe2records(df)]
+    assert cards[0].colors == [OPTcgColor.RED]
+    assert cards[0].types == ["Supernovas", "Straw Hat Crew"]
+    assert cards[1].attributes == []
+    assert (cards[0].cost, cards[0].counter, cards[0].life) == (None, None, 5)
+    assert (cards[1].cost, cards[1].counter, cards[1].life) == (1, 1000, None)
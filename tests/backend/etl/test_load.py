@@ -0,0 +1,99 @@
+"""
+Tests of the bulk MERGE load of BigQuery rows.
+"""
+from datetime import date
+from unittest.mock import MagicMock
+
+import pytest
+from google.cloud import bigquery
+
+from google.api_core.exceptions import BadRequest, Conflict
+
+from op_tcg.backend.etl.load import generate_bulk_merge_statement, get_primary_keys, bq_merge_rows, bq_append_rows
+from op_tcg.backend.models.input import MetaFormat
+from op_tcg.backend.models.leader import LeaderElo
+from op_tcg.backend.models.tournaments import TournamentStanding
+
+
+def make_leader_elo(leader_id: str, elo: int, meta_format: MetaFormat = MetaFormat.OP01) -> LeaderElo:
+    return LeaderElo(meta_format=meta_format, leader_id=leader_id, only_official=True, elo=elo,
+                     start_date=date(2024, 1, 1), end_date=date(2024, 2, 1))
+
+
+def test_generate_bulk_merge_statement():
+    merge_sql = generate_bulk_merge_statement(
+        "project.cards.card", "project.cards.card_staging", columns=["id", "aa_version", "image_url", "name"],
+        primary_keys=["id", "aa_version"], nullable_keys=["aa_version"],
+        not_matched_by_source_condition="target.release_meta IN ('OP01')")
+    assert "MERGE `project.cards.card` target" in merge_sql
+    assert "USING `project.cards.card_staging` source" in merge_sql
+    assert ("ON target.`id` = source.`id` AND (target.`aa_version` = source.`aa_version` OR "
+            "(target.`aa_version` IS NULL AND source.`aa_version` IS NULL))") in merge_sql
+    # primary keys are never updated, GCS image urls are kept
+    assert "target.`id` = source.`id`," not in merge_sql
+    assert "target.`image_url` = IF(STARTS_WITH(target.`image_url`, 'https://storage.googleapis.com')" in merge_sql
+    assert "target.`name` = source.`name`" in merge_sql
+    assert "INSERT (`id`, `aa_version`, `image_url`, `name`)" in merge_sql
+    assert "WHEN NOT MATCHED BY SOURCE AND target.release_meta IN ('OP01') THEN DELETE" in merge_sql
+
+
+def test_generate_bulk_merge_statement_without_update_columns():
+    merge_sql = generate_bulk_merge_statement("p.d.t", "p.d.s", columns=["id"], primary_keys=["id"])
+    assert "WHEN MATCHED" not in merge_sql
+    assert "NOT MATCHED BY SOURCE" not in merge_sql
+
+
+def test_get_primary_keys():
+    assert get_primary_keys(TournamentStanding) == ["tournament_id", "player_id", "decklist_id"]
+
+
+def test_bq_merge_rows_deduplicates_and_cleans_up():
+    pq = pytest.importorskip("pyarrow.parquet", exc_type=ImportError)
+    client = MagicMock()
+    client.create_table.side_effect = lambda table: table
+    loaded_rows = []
+    client.load_table_from_file.side_effect = lambda file, table, job_config, job_id: loaded_rows.extend(
+        pq.read_table(file).to_pylist()) or MagicMock()
+    table = bigquery.Table("project.leaders.leader_elo")
+    rows = [make_leader_elo("OP01-001", 1000), make_leader_elo("OP01-060", 1100), make_leader_elo("OP01-001", 1200)]
+
+    bq_merge_rows(rows, table=table, client=client, not_matched_by_source_condition="target.meta_format IN ('OP01')")
+
+    # the last row of a primary key wins
+    assert [(row["leader_id"], row["elo"]) for row in loaded_rows] == [("OP01-001", 1200), ("OP01-060", 1100)]
+    merge_sql = client.query.call_args.args[0]
+    assert "MERGE `project.leaders.leader_elo` target" in merge_sql
+    assert "WHEN NOT MATCHED BY SOURCE AND target.meta_format IN ('OP01') THEN DELETE" in merge_sql
+    temp_table = client.create_table.call_args.args[0]
+    assert temp_table.table_id.startswith("leader_elo_staging_")
+    client.delete_table.assert_called_once_with(temp_table, not_found_ok=True)
+
+
+def test_bq_append_rows_keeps_duplicates_and_is_idempotent_per_job_id():
+    pq = pytest.importorskip("pyarrow.parquet", exc_type=ImportError)
+    client = MagicMock()
+    load_job_ids = []
+
+    def load_table_from_file(file, table, job_config, job_id):
+        assert job_config.write_disposition == bigquery.WriteDisposition.WRITE_APPEND
+        if job_id in load_job_ids:
+            raise Conflict(f"Already Exists: Job {job_id}")
+        load_job_ids.append(job_id)
+        assert len(pq.read_table(file).to_pylist()) == 2
+        return MagicMock()
+
+    client.load_table_from_file.side_effect = load_table_from_file
+    table = bigquery.Table("project.leaders.leader_elo")
+    # rows with the same primary key are not deduplicated
+    rows = [make_leader_elo("OP01-001", 1000), make_leader_elo("OP01-001", 1200)]
+
+    bq_append_rows(rows, table=table, client=client, job_id="append_1")
+    # the job of the first call succeeded, the rows are not appended twice
+    bq_append_rows(rows, table=table, client=client, job_id="append_1")
+    assert load_job_ids == ["append_1"]
+    client.query.assert_not_called()
+
+    # the job of the first call failed, the rows are loaded with a new job id
+    client.get_job.return_value.result.side_effect = BadRequest("invalid parquet")
+    bq_append_rows(rows, table=table, client=client, job_id="append_1")
+    assert len(load_job_ids) == 2 and load_job_ids[1].startswith("append_1_")
@@ -0,0 +1,80 @@
+"""
+Tests of the streaming match ingestion of LocalMatchesToBigQueryEtlJob.
+"""
+import json
+
+import pytest
+
+from op_tcg.backend.etl.extract import index_json_files
+from op_tcg.backend.etl.transform import BQMatchCreator, iter_match_rows
+from op_tcg.backend.models.input import AllLeaderMetaDocs, LimitlessLeaderMetaDoc, LimitlessMatch, MetaFormat
+from op_tcg.backend.models.matches import Match
+
+LEADER_IDS = ["OP01-001", "OP01-060", "OP02-001", "ST13-003"]
+
+
+def make_doc(leader_id: str, meta_format: MetaFormat, opponent_ids: list[str]) -> LimitlessLeaderMetaDoc:
+    matches = []
+    for opponent_id in opponent_ids:
+        if opponent_id == leader_id:
+            continue
+        # scores are mirrored between both leaders, so that every match has a reverse match
+        score_win, score_lose = (2, 1) if leader_id < opponent_id else (1, 2)
+        matches.append(LimitlessMatch(leader_name=leader_id, leader_id=opponent_id, num_matches=3, score_win=score_win,
+                                      score_lose=score_lose, score_draw=0, win_rate=0.5))
+    return LimitlessLeaderMetaDoc(leader_id=leader_id, meta_format=meta_format, matches=matches)
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    for meta_format in [MetaFormat.OP01, MetaFormat.OP02]:
+        for leader_id in LEADER_IDS:
+            # ST13-003 was not crawled in OP01, its matches are removed
+            if meta_format == MetaFormat.OP01 and leader_id == "ST13-003":
+                continue
+            doc = make_doc(leader_id, meta_format, LEADER_IDS)
+            with open(tmp_path / f"{leader_id}_{meta_format}.json", "w") as fp:
+                json.dump(doc.model_dump(), fp)
+    return tmp_path
+
+
+def test_index_json_files_filters_by_file_name(data_dir):
+    # files of other meta formats are never parsed
+    (data_dir / f"OP01-001_{MetaFormat.OP03}.json").write_text("not json")
+    index = index_json_files(data_dir, meta_formats=[MetaFormat.OP02])
+    assert list(index) == [MetaFormat.OP02]
+    assert sorted(index[MetaFormat.OP02]) == LEADER_IDS
+
+
+def test_index_json_files_parses_unknown_file_names(data_dir):
+    doc = make_doc("OP05-060", MetaFormat.OP01, LEADER_IDS)
+    with open(data_dir / "export.json", "w") as fp:
+        json.dump(doc.model_dump(), fp)
+    assert index_json_files(data_dir)[MetaFormat.OP01]["OP05-060"] == data_dir / "export.json"
+
+
+def test_iter_match_rows_equals_bq_match_creator(data_dir):
+    index = index_json_files(data_dir)
+    docs = [LimitlessLeaderMetaDoc(**json.loads(file_path.read_text()))
+            for meta_format in index for file_path in index[meta_format].values()]
+    matches = BQMatchCreator(AllLeaderMetaDocs(documents=docs), official=True, seed=1).transform2BQMatches().matches
+
+    rows = list(iter_match_rows(index, official=True, seed=1))
+    columns = ["leader_id", "opponent_id", "result", "meta_format", "official", "is_reverse", "source", "match_timestamp"]
+    assert [tuple(row[c] for c in columns) for row in rows] == [tuple(getattr(m, c) for c in columns) for m in matches]
+    assert not any(row["opponent_id"] == "ST13-003" for row in rows if row["meta_format"] == MetaFormat.OP01)
+    # every row is a valid Match
+    assert all(Match(**row).id == row["id"] for row in rows)
+
+
+def test_write_rows2parquet_in_batches(data_dir, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet", exc_type=ImportError)
+    from op_tcg.backend.etl.load import write_rows2parquet
+    from op_tcg.backend.utils.annotations import pydantic_model_to_bq_schema
+
+    rows = list(iter_match_rows(index_json_files(data_dir), official=True))
+    file_path = tmp_path / "matches.parquet"
+    assert write_rows2parquet(iter(rows), file_path, pydantic_model_to_bq_schema(Match), batch_size=7) == len(rows)
+    parquet_file = pq.ParquetFile(file_path)
+    assert parquet_file.metadata.num_rows == len(rows)
+    assert parquet_file.read().column("leader_id").to_pylist() == [row["leader_id"] for row in rows]
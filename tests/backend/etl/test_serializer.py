@@ -0,0 +1,74 @@
+"""
+Tests of the compiled BigQuery row serializer against the json.loads(model_dump_json()) path.
+"""
+import json
+from datetime import date, datetime, timezone
+
+import pytest
+
+from op_tcg.backend.etl.load import ensure_json_serializability
+from op_tcg.backend.etl.serializer import get_bq_row_serializer
+from op_tcg.backend.models.cards import CardPrice, CardCurrency, Card
+from op_tcg.backend.models.common import DataSource
+from op_tcg.backend.models.decklists import Decklist
+from op_tcg.backend.models.input import MetaFormat
+from op_tcg.backend.models.leader import LeaderElo
+from op_tcg.backend.models.matches import Match, MatchResult
+from op_tcg.backend.models.tournaments import TournamentStanding, Tournament
+
+
+def legacy_json_row(model) -> dict:
+    row = json.loads(model.model_dump_json())
+    ensure_json_serializability(row)
+    return row
+
+
+MODELS = [
+    CardPrice(card_id="OP01-001", aa_version=1, price=4.39, currency=CardCurrency.EURO,
+              create_timestamp=datetime(2024, 5, 1, 12, 30, 1, 123000)),
+    CardPrice(card_id="OP01-001", aa_version=0, price=float("nan"), currency=CardCurrency.US_DOLLAR,
+              create_timestamp=datetime(2024, 5, 1, tzinfo=timezone.utc)),
+    Match(id="m1", leader_id="OP01-001", opponent_id="OP01-060", result=MatchResult.WIN, meta_format=MetaFormat.OP01,
+          is_reverse=False, source=DataSource.LIMITLESS, round=3, match_timestamp=datetime(2024, 1, 1, 10)),
+    Match(id="m2", leader_id="OP01-001", opponent_id="OP01-060", result=MatchResult.DRAW, meta_format="OP01",
+          is_reverse=True, source="session-id", match_timestamp=datetime(2024, 1, 1, tzinfo=timezone.utc)),
+    TournamentStanding(tournament_id="t1", player="p1", decklist_id="d1", name="Player", country="DE", placing=1,
+                       record={"wins": 3, "losses": 0, "ties": 1}, leader_id="OP01-001",
+                       decklist={"OP01-001": 1, "OP01-006": 4}, drop=None),
+    TournamentStanding(tournament_id="t1", player="p2", decklist_id=None, name="Player", country=None, placing=None,
+                       record=None, leader_id=None, decklist=None, drop=2),
+    Tournament(id="t1", name="Tournament", players=32, decklists=True, isPublic=True, isOnline=False,
+               phases=[{"phase": 1, "type": "SWISS", "rounds": 5, "mode": "BO1"}], meta_format=MetaFormat.OP01,
+               source=DataSource.LIMITLESS, date=datetime(2024, 1, 1, 18)),
+    Decklist(id="d1", leader_id="OP01-001", decklist={"OP01-006": 4}),
+    LeaderElo(meta_format=MetaFormat.OP01, leader_id="OP01-001", only_official=True, elo=1100,
+              start_date=date(2024, 1, 1), end_date=date(2024, 2, 1)),
+    Card.from_default(),
+]
+
+
+@pytest.mark.parametrize("model", MODELS, ids=lambda model: type(model).__name__)
+def test_to_json_row_equals_legacy_path(model):
+    serializer = get_bq_row_serializer(type(model))
+    assert serializer.to_json_row(model) == legacy_json_row(model)
+    # python mode dicts are serialized the same way as models
+    assert serializer.to_json_row(model.model_dump()) == legacy_json_row(model)
+
+
+def test_serializer_is_cached_per_model():
+    assert get_bq_row_serializer(Match) is get_bq_row_serializer(Match)
+    assert get_bq_row_serializer(Match) is not get_bq_row_serializer(CardPrice)
+
+
+def test_to_arrow_keeps_python_values():
+    standing = MODELS[4]
+    serializer = get_bq_row_serializer(TournamentStanding)
+    row = serializer.to_arrow_row(standing)
+    assert row["record"] == str({"wins": 3, "losses": 0, "ties": 1})
+    assert isinstance(row["create_timestamp"], datetime)
+
+    match_columns = get_bq_row_serializer(Match).to_arrow_columns(MODELS[2:4])
+    assert list(match_columns) == [field.name for field in get_bq_row_serializer(Match).schema]
+    assert match_columns["result"] == [2, 1]
+    assert match_columns["match_timestamp"][0] == datetime(2024, 1, 1, 10)
+    assert get_bq_row_serializer(CardPrice).to_arrow_row(MODELS[1])["price"] is None
@@ -0,0 +1,81 @@
+"""
+Tests of the indexed match distribution used by BQMatchCreator.
+"""
+import copy
+import random
+from collections import Counter
+from uuid import uuid4
+
+import pytest
+
+from benchmarks.distribute_matches_benchmark import distribute_matches_legacy
+from op_tcg.backend.etl.transform import distribute_matches, opposite_result, IndexedBucket
+from op_tcg.backend.models.matches import MatchResult
+from op_tcg.backend.models.transform import Transform2BQMatch
+
+
+def make_match_pool(num_matches: int, seed: int = 0) -> list[Transform2BQMatch]:
+    rnd = random.Random(seed)
+    leader_ids = ["OP01-001", "OP01-060", "OP02-001", "OP03-099", "ST13-003"]
+    match_pool = []
+    for _ in range(num_matches):
+        leader_id, opponent_id = rnd.choice(leader_ids), rnd.choice(leader_ids)
+        result = rnd.choice(list(MatchResult))
+        match_pool.append(Transform2BQMatch(id=uuid4().hex, leader_id=leader_id, opponent_id=opponent_id, result=result))
+        match_pool.append(Transform2BQMatch(id=uuid4().hex, leader_id=opponent_id, opponent_id=leader_id,
+                                            result=opposite_result(result)))
+    rnd.shuffle(match_pool)
+    return match_pool
+
+
+def to_counter(matches: list[Transform2BQMatch]) -> Counter:
+    return Counter((m.leader_id, m.opponent_id, m.result) for m in matches)
+
+
+@pytest.mark.parametrize("distribute_fn", [distribute_matches, distribute_matches_legacy])
+def test_every_match_is_followed_by_its_reverse_match(distribute_fn):
+    match_pool = make_match_pool(300)
+    distributed_matches = distribute_fn(copy.deepcopy(match_pool))
+
+    assert to_counter(distributed_matches) == to_counter(match_pool)
+    for match, reverse_match in zip(distributed_matches[::2], distributed_matches[1::2]):
+        assert match.id == reverse_match.id
+        assert not match.is_reverse and reverse_match.is_reverse
+        assert (reverse_match.leader_id, reverse_match.opponent_id) == (match.opponent_id, match.leader_id)
+        assert reverse_match.result == opposite_result(match.result)
+
+
+def test_results_of_picked_matches_alternate():
+    # leader has two wins and two losses only against itself, so every pick must alternate
+    match_pool = []
+    for result in [MatchResult.WIN, MatchResult.WIN, MatchResult.LOSE, MatchResult.LOSE]:
+        match_pool.append(Transform2BQMatch(id=uuid4().hex, leader_id="OP01-001", opponent_id="OP02-001", result=result))
+        match_pool.append(Transform2BQMatch(id=uuid4().hex, leader_id="OP02-001", opponent_id="OP01-001",
+                                            result=opposite_result(result)))
+    for seed in range(20):
+        distributed_matches = distribute_matches(copy.deepcopy(match_pool), seed=seed)
+        results = [m.result for m in distributed_matches if m.leader_id == "OP01-001"]
+        assert all(r1 != r2 for r1, r2 in zip(results, results[1:]))
+
+
+def test_seed_makes_distribution_reproducible():
+    match_pool = make_match_pool(200)
+    first = distribute_matches(copy.deepcopy(match_pool), seed=7)
+    second = distribute_matches(copy.deepcopy(match_pool), seed=7)
+    assert [(m.id, m.leader_id, m.result) for m in first] == [(m.id, m.leader_id, m.result) for m in second]
+
+
+def test_missing_reverse_match_raises():
+    match_pool = [Transform2BQMatch(id=uuid4().hex, leader_id="OP01-001", opponent_id="OP02-001", result=MatchResult.WIN)]
+    with pytest.raises(ValueError):
+        distribute_matches(match_pool)
+
+
+def test_indexed_bucket_remove_keeps_positions_consistent():
+    bucket = IndexedBucket()
+    for item in range(5):
+        bucket.add(item)
+    bucket.remove(1)
+    bucket.remove(4)
+    assert sorted(bucket.items) == [0, 2, 3]
+    assert all(bucket.items[position] == item for item, position in bucket.item2position.items())
@@ -0,0 +1,202 @@
+"""
+Tests of the per user Firestore subcollection cache and the user deletion against a fake Firestore client.
+"""
+import uuid
+
+import pytest
+
+from op_tcg.backend import db
+from op_tcg.backend.db import UserCollectionCache
+
+
+class FakeSnapshot:
+    def __init__(self, reference: "FakeDocument", data: dict | None):
+        self.id = reference.id
+        self.reference = reference
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self) -> dict | None:
+        return dict(self._data) if self._data is not None else None
+
+
+class FakeDocument:
+    def __init__(self, client: "FakeFirestore", path: str, doc_id: str):
+        self.client = client
+        self.path = path
+        self.id = doc_id
+
+    @property
+    def _documents(self) -> dict[str, dict]:
+        return self.client.collections.setdefault(self.path, {})
+
+    def collection(self, name: str) -> "FakeCollection":
+        return FakeCollection(self.client, f"{self.path}/{self.id}/{name}")
+
+    def get(self) -> FakeSnapshot:
+        return FakeSnapshot(self, self._documents.get(self.id))
+
+    def set(self, data: dict, merge: bool = False):
+        data = {field: "server timestamp" if value is db.firestore.SERVER_TIMESTAMP else value
+                for field, value in data.items()}
+        self._documents[self.id] = {**self._documents.get(self.id, {}), **data} if merge else data
+
+    def update(self, fields: dict):
+        if self.id not in self._documents:
+            raise KeyError(f"No document to update: {self.id}")
+        self.set(fields, merge=True)
+
+    def delete(self):
+        self._documents.pop(self.id, None)
+
+
+class FakeCollection:
+    def __init__(self, client: "FakeFirestore", path: str):
+        self.client = client
+        self.path = path
+
+    def document(self, doc_id: str | None = None) -> FakeDocument:
+        return FakeDocument(self.client, self.path, doc_id or uuid.uuid4().hex)
+
+    def add(self, data: dict):
+        document = self.document(uuid.uuid4().hex)
+        document.set(data)
+        return None, document
+
+    def stream(self):
+        self.client.streams.append(self.path)
+        documents = self.client.collections.get(self.path, {})
+        return [FakeSnapshot(self.document(doc_id), documents[doc_id]) for doc_id in sorted(documents)]
+
+
+class FakeFirestore:
+    def __init__(self):
+        self.collections: dict[str, dict[str, dict]] = {}
+        self.streams: list[str] = []
+
+    def collection(self, name: str) -> FakeCollection:
+        return FakeCollection(self, name)
+
+    def recursive_delete(self, reference: FakeDocument, chunk_size: int = 5000):
+        reference.delete()
+        prefix = f"{reference.path}/{reference.id}/"
+        for path in [path for path in self.collections if path.startswith(prefix)]:
+            del self.collections[path]
+
+
+@pytest.fixture
+def firestore_client(monkeypatch):
+    client = FakeFirestore()
+    monkeypatch.setattr(db, "_db", client)
+    monkeypatch.setattr(db, "_USER_COLLECTION_CACHE", UserCollectionCache(ttl=60))
+    return client
+
+
+def without_timestamps(rows: list[dict]) -> list[dict]:
+    return [{k: v for k, v in row.items() if not k.endswith("_at")} for row in rows]
+
+
+def uncached_reads(user_id: str) -> dict:
+    """Reads of all subcollections straight from the fake Firestore"""
+    db._USER_COLLECTION_CACHE.clear()
+    return {"watchlist": db.get_watchlist(user_id), "sealed": db.get_sealed_watchlist(user_id),
+            "decklists": db.get_decklist_watchlist(user_id), "custom": db.get_custom_decklists(user_id)}
+
+
+def cached_reads(user_id: str) -> dict:
+    return {"watchlist": db.get_watchlist(user_id), "sealed": db.get_sealed_watchlist(user_id),
+            "decklists": db.get_decklist_watchlist(user_id), "custom": db.get_custom_decklists(user_id)}
+
+
+def test_repeated_reads_are_served_from_cache(firestore_client):
+    db.add_to_watchlist("user-1", "OP01-001")
+    for _ in range(10):
+        assert [row["card_id"] for row in db.get_watchlist("user-1")] == ["OP01-001"]
+    assert firestore_client.streams == ["users/user-1/watchlist"]
+    assert db.get_user_collection_cache_stats() == {"hits": 9, "misses": 1, "size": 1}
+    # other users and subcollections are cached separately
+    assert db.get_watchlist("user-2") == []
+    assert db.get_sealed_watchlist("user-1") == []
+    assert len(firestore_client.streams) == 3
+
+
+def test_writes_update_the_cache(firestore_client):
+    user_id = "user-1"
+    db.add_to_watchlist(user_id, "OP01-001")
+    db.add_decklist_to_watchlist(user_id, "OP01-001", "tournament/1", "player-1")
+    custom_id = db.create_custom_decklist(user_id, "Red", "OP01-001", {"OP01-004": 4})
+    # fill the cache of every subcollection
+    cached_reads(user_id)
+    streams = len(firestore_client.streams)
+
+    db.add_to_watchlist(user_id, "OP01-002", tags=["trade"])
+    db.update_watchlist_quantity(user_id, "OP01-001", quantity=3)
+    db.update_watchlist_tags(user_id, "OP01-002", tags=["binder"])
+    db.remove_from_watchlist(user_id, "OP01-003")
+    db.add_to_sealed_watchlist(user_id, "OP01-booster-box", quantity=2)
+    db.update_sealed_watchlist_quantity(user_id, "OP01-booster-box", quantity=0)
+    db.add_decklist_to_watchlist(user_id, "OP02-001", "tournament-2", "player-2", decklist_id="decklist-2")
+    db.update_decklist_watchlist_tags(user_id, "OP01-001", "tournament/1", "player-1", tags=["meta"])
+    db.remove_decklist_from_watchlist(user_id, "OP02-001", "tournament-2", "player-2")
+    db.update_custom_decklist(user_id, custom_id, name="Red Zoro")
+    second_id = db.create_custom_decklist(user_id, "Blue", "OP01-060", {"OP01-077": 4})
+    db.delete_custom_decklist(user_id, second_id)
+
+    cached = cached_reads(user_id)
+    assert len(firestore_client.streams) == streams
+    uncached = uncached_reads(user_id)
+    assert {name: without_timestamps(rows) for name, rows in cached.items()} == \
+           {name: without_timestamps(rows) for name, rows in uncached.items()}
+    assert cached["custom"][0]["name"] == "Red Zoro"
+    assert cached["sealed"][0]["quantity"] == 1
+
+
+def test_returned_rows_do_not_change_the_cache(firestore_client):
+    db.add_to_watchlist("user-1", "OP01-001")
+    db.get_watchlist("user-1")[0]["tags"].append("modified")
+    assert db.get_watchlist("user-1")[0]["tags"] == [db.DEFAULT_WATCHLIST_TAG]
+
+
+def test_failed_write_keeps_the_cache(firestore_client):
+    db.add_to_watchlist("user-1", "OP01-001")
+    db.get_watchlist("user-1")
+    with pytest.raises(KeyError):
+        db.update_watchlist_quantity("user-1", "OP01-999", quantity=2)
+    assert [row["card_id"] for row in db.get_watchlist("user-1")] == ["OP01-001"]
+
+
+def test_entries_expire_after_ttl(firestore_client, monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(db, "_USER_COLLECTION_CACHE", UserCollectionCache(ttl=60, timer=lambda: now[0]))
+    db.get_watchlist("user-1")
+    # a write of another instance
+    firestore_client.collection("users").document("user-1").collection("watchlist").document("x").set({"card_id": "x"})
+    assert db.get_watchlist("user-1") == []
+    now[0] = 61.0
+    assert db.get_watchlist("user-1") == [{"card_id": "x"}]
+    assert len(firestore_client.streams) == 2
+
+
+def test_load_overlapping_with_write_is_not_stored():
+    cache = UserCollectionCache()
+
+    def load():
+        # a write of the same subcollection finishes while the stream is running
+        cache.delete_document("user-1", "watchlist", "a")
+        return {"a": {"card_id": "a"}}
+
+    assert cache.get_documents("user-1", "watchlist", load) == [("a", {"card_id": "a"})]
+    assert cache.get_documents("user-1", "watchlist", lambda: {}) == []
+    assert cache.get_stats()["misses"] == 2
+
+
+def test_delete_user_deletes_all_subcollections(firestore_client):
+    db.update_user_login({"sub": "user-1", "name": "User"})
+    db.add_to_watchlist("user-1", "OP01-001")
+    db.add_to_watchlist("user-2", "OP01-001")
+    db.create_custom_decklist("user-1", "Red", "OP01-001", {})
+    cached_reads("user-1")
+    db.delete_user("user-1")
+    assert db.get_user("user-1") is None
+    assert cached_reads("user-1") == {"watchlist": [], "sealed": [], "decklists": [], "custom": []}
+    assert len(db.get_watchlist("user-2")) == 1
@@ -0,0 +1,181 @@
+"""
+Parity tests of the array based elo engine with the row based reference implementation.
+"""
+import random
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from benchmarks.elo_benchmark import calculate_elo_ratings_legacy
+from op_tcg.backend.elo import EloCreator, encode_matches, get_k_factor
+
+LEADER_IDS = ["OP01-001", "OP01-060", "OP02-001", "OP03-099", "ST13-003", "OP05-041"]
+
+
+def make_matches(num_matches: int, matches_per_timestamp: int = 3, mirror_rate: float = 0.1,
+                 seed: int = 0) -> pd.DataFrame:
+    rnd = random.Random(seed)
+    rows = []
+    start = datetime(2024, 3, 8)
+    for i in range(num_matches):
+        leader_id = rnd.choice(LEADER_IDS)
+        opponent_id = leader_id if rnd.random() < mirror_rate else rnd.choice(LEADER_IDS)
+        result = rnd.choice([0, 1, 2, 2, 0])
+        match_timestamp = start + timedelta(minutes=i // matches_per_timestamp)
+        match_id = f"{rnd.getrandbits(64):016x}"
+        for is_reverse, (lid, oid, res) in enumerate([(leader_id, opponent_id, result),
+                                                      (opponent_id, leader_id, 2 - result)]):
+            rows.append(dict(id=match_id, leader_id=lid, opponent_id=oid, result=res, meta_format="OP06",
+                             official=True, is_reverse=bool(is_reverse), match_timestamp=match_timestamp))
+    rnd.shuffle(rows)
+    return pd.DataFrame(rows)
+
+
+@pytest.mark.filterwarnings("ignore::FutureWarning")
+@pytest.mark.parametrize("matches_per_timestamp", [1, 3, 25])
+def test_engine_matches_legacy_implementation(matches_per_timestamp):
+    df_matches = make_matches(600, matches_per_timestamp=matches_per_timestamp)
+    legacy_creator = EloCreator(df_matches)
+    engine_creator = EloCreator(df_matches)
+
+    calculate_elo_ratings_legacy(legacy_creator)
+    engine_creator.calculate_elo_ratings()
+
+    assert engine_creator.leader_id2elo == legacy_creator.leader_id2elo
+    assert list(engine_creator.leader_id2elo) == list(legacy_creator.leader_id2elo)
+
+
+@pytest.mark.filterwarnings("ignore::FutureWarning")
+def test_engine_matches_legacy_implementation_in_all_k_factor_bands():
+    df_matches = make_matches(400, seed=1)
+    start_elos = dict(zip(LEADER_IDS, [1000, 1499, 1500, 2399, 2400, 3000]))
+    legacy_creator = EloCreator(df_matches)
+    engine_creator = EloCreator(df_matches)
+    legacy_creator.leader_id2elo = dict(start_elos)
+    engine_creator.leader_id2elo = dict(start_elos)
+
+    calculate_elo_ratings_legacy(legacy_creator)
+    engine_creator.calculate_elo_ratings()
+
+    assert engine_creator.leader_id2elo == legacy_creator.leader_id2elo
+
+
+def test_encode_matches_groups_match_and_reverse_match():
+    df_matches = make_matches(50, matches_per_timestamp=5)
+    match_arrays = encode_matches(df_matches)
+
+    assert len(match_arrays) == len(df_matches)
+    assert match_arrays.group_offsets[-1] == len(df_matches)
+    assert (match_arrays.group_offsets[1:] - match_arrays.group_offsets[:-1] == 2).all()
+    assert match_arrays.leader_ids == df_matches.leader_id.unique().tolist()
+
+
+def test_encode_matches_rejects_unknown_opponent():
+    df_matches = make_matches(5)
+    df_matches = df_matches[~df_matches.is_reverse]
+    df_matches.loc[df_matches.index[0], "opponent_id"] = "EB01-001"
+    with pytest.raises(KeyError):
+        encode_matches(df_matches)
+
+
+@pytest.mark.parametrize("elo, k_factor", [(1000, 32), (1500, 20), (2400, 10), (3000, 5)])
+def test_k_factor_bands(elo, k_factor):
+    assert get_k_factor(elo) == k_factor
+
+
+class TestIncrementalEloUpdate:
+    """An incremental update from a checkpoint must equal a full recompute if matches arrive in timestamp order."""
+
+    @staticmethod
+    def to_bq_matches(df_matches: pd.DataFrame):
+        from op_tcg.backend.models.matches import BQMatches, Match
+        return BQMatches(matches=[Match(source="limitless_tcg", **row) for row in df_matches.to_dict("records")])
+
+    @staticmethod
+    def make_job(**kwargs):
+        from unittest.mock import patch
+        from op_tcg.backend.etl.classes import EloUpdateToBigQueryEtlJob
+        with patch("op_tcg.backend.etl.classes.bigquery.Client"):
+            return EloUpdateToBigQueryEtlJob(meta_formats=["OP06"], **kwargs)
+
+    def test_incremental_update_equals_full_recompute(self):
+        df_matches = make_matches(300, seed=2)
+        df_matches["official"] = df_matches.id.map(lambda match_id: int(match_id, 16) % 3 != 0)
+        cutoff = df_matches.match_timestamp.sort_values().iloc[len(df_matches) // 2]
+
+        full_job = self.make_job()
+        full_elos = full_job.transform(self.to_bq_matches(df_matches))
+
+        first_job = self.make_job()
+        first_job.transform(self.to_bq_matches(df_matches[df_matches.match_timestamp <= cutoff]))
+        incremental_job = self.make_job(incremental=True)
+        for checkpoint in first_job.new_checkpoints:
+            incremental_job.checkpoints.setdefault((checkpoint.meta_format, checkpoint.only_official), []).append(checkpoint)
+        incremental_elos = incremental_job.transform(self.to_bq_matches(df_matches[df_matches.match_timestamp > cutoff]))
+
+        def to_key2row(leader_elos):
+            return {(e.meta_format, e.leader_id, e.only_official): (e.elo, e.start_date, e.end_date) for e in leader_elos}
+
+        assert to_key2row(incremental_elos) == to_key2row(full_elos)
+        assert {c.last_match_timestamp for c in incremental_job.new_checkpoints} == {
+            c.last_match_timestamp for c in full_job.new_checkpoints}
+
+    def test_checkpoint_without_new_matches_is_kept(self):
+        df_matches = make_matches(50, seed=3)
+        first_job = self.make_job()
+        first_elos = first_job.transform(self.to_bq_matches(df_matches))
+        incremental_job = self.make_job(incremental=True)
+        for checkpoint in first_job.new_checkpoints:
+            incremental_job.checkpoints.setdefault((checkpoint.meta_format, checkpoint.only_official), []).append(checkpoint)
+
+        incremental_elos = incremental_job.transform(self.to_bq_matches(df_matches.iloc[:0]))
+
+        assert sorted((e.leader_id, e.only_official, e.elo) for e in incremental_elos) == sorted(
+            (e.leader_id, e.only_official, e.elo) for e in first_elos)
+        assert len(incremental_job.new_checkpoints) == len(first_job.new_checkpoints)
+
+    def test_matches_sharing_the_watermark_timestamp_are_not_dropped(self):
+        df_matches = make_matches(60, matches_per_timestamp=10, seed=8)
+        last_timestamp = df_matches.match_timestamp.max()
+        late_ids = set(df_matches[df_matches.match_timestamp == last_timestamp].id.unique()[:4])
+        df_first = df_matches[~df_matches.id.isin(late_ids)].assign(create_timestamp=datetime(2024, 3, 9))
+        # matches of the last tournament round which are loaded after the first elo update
+        df_late = df_matches[df_matches.id.isin(late_ids)].assign(create_timestamp=datetime(2024, 3, 10))
+
+        first_job = self.make_job()
+        first_job.transform(df_first)
+        incremental_job = self.make_job(incremental=True)
+        for checkpoint in first_job.new_checkpoints:
+            incremental_job.checkpoints.setdefault((checkpoint.meta_format, checkpoint.only_official), []).append(checkpoint)
+
+        assert "create_timestamp > TIMESTAMP('2024-03-09T00:00:00')" in incremental_job.get_matches_query()
+        elo_creator = incremental_job.create_elo_creator(pd.concat([df_first, df_late]), "OP06", only_official=False)
+        assert len(elo_creator.df_all_matches) == len(df_late) == 8
+        incremental_job.transform(df_late)
+        assert {c.last_create_timestamp for c in incremental_job.new_checkpoints} == {datetime(2024, 3, 10)}
+
+    def test_parallel_transform_equals_serial_transform(self):
+        df_matches = pd.concat([make_matches(200, seed=4).assign(meta_format="OP05"),
+                                make_matches(200, seed=5).assign(meta_format="OP06")])
+        df_matches["official"] = df_matches.id.map(lambda match_id: int(match_id, 16) % 2 == 0)
+
+        serial_elos = self.make_job().transform(self.to_bq_matches(df_matches))
+        parallel_elos = self.make_job(workers=2).transform(self.to_bq_matches(df_matches))
+
+        assert [(e.meta_format, e.only_official, e.leader_id, e.elo) for e in parallel_elos] == [
+            (e.meta_format, e.only_official, e.leader_id, e.elo) for e in serial_elos]
+
+    def test_validated_dataframe_transform_equals_bq_matches_transform(self, tmp_path):
+        df_matches = pd.concat([make_matches(200, seed=6).assign(meta_format="OP05"),
+                                make_matches(200, seed=7).assign(meta_format="OP06")], ignore_index=True)
+        df_matches["source"] = "limitless_tcg"
+        csv_file_path = tmp_path / "matches.csv"
+        df_matches.to_csv(csv_file_path, index=False)
+
+        bq_matches_elos = self.make_job().transform(self.to_bq_matches(df_matches.drop(columns="source")))
+        csv_job = self.make_job(matches_csv_file_path=csv_file_path)
+        dataframe_elos = csv_job.transform(csv_job.extract())
+
+        assert [(e.meta_format, e.only_official, e.leader_id, e.elo) for e in dataframe_elos] == [
+            (e.meta_format, e.only_official, e.leader_id, e.elo) for e in bq_matches_elos]
@@ -0,0 +1,88 @@
+"""
+Tests of the memoized MetaFormat registry behind MetaFormat.to_list and meta_format2release_datetime.
+"""
+import itertools
+from datetime import datetime
+
+import pytest
+
+from op_tcg.backend.models import input as input_module
+from op_tcg.backend.models.input import MetaFormat, MetaFormatRegion, MetaFormatRegistry, \
+    meta_format2release_datetime
+
+
+def fixed_now(now: datetime):
+    class FixedDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now
+    return FixedDatetime
+
+
+def to_list_legacy(only_after_release: bool = True, until_meta_format: str | None = None,
+                   region: MetaFormatRegion = MetaFormatRegion.ALL) -> list[str]:
+    """MetaFormat.to_list without the registry, filters all meta formats by their release datetime on every call"""
+    all_meta_formats = list(map(lambda c: c.value, MetaFormat))
+    if until_meta_format is not None:
+        until_meta_format_i = all_meta_formats.index(MetaFormat(until_meta_format))
+        all_meta_formats = all_meta_formats[:until_meta_format_i+1]
+    return_meta_formats = []
+    for meta_format in all_meta_formats:
+        if not only_after_release:
+            return_meta_formats.append(meta_format)
+        elif meta_format2release_datetime(meta_format, region) and (
+                meta_format2release_datetime(meta_format, region) <= datetime.now()):
+            return_meta_formats.append(meta_format)
+    return return_meta_formats
+
+
+def test_meta_format_values_are_unique():
+    assert len(MetaFormat.__members__) == len(MetaFormat)
+    assert MetaFormat.OP20 is not MetaFormat.OP18
+
+
+def test_to_list_equals_legacy():
+    for only_after_release, until_meta_format, region in itertools.product(
+            [True, False], [None, MetaFormat.OP01, "OP05", MetaFormat.OP20], MetaFormatRegion):
+        assert MetaFormat.to_list(only_after_release, until_meta_format, region) == \
+               to_list_legacy(only_after_release, until_meta_format, region)
+
+
+def test_to_list_returns_copies():
+    MetaFormat.to_list().append("OP99")
+    assert "OP99" not in MetaFormat.to_list()
+
+
+def test_index_of_and_is_before():
+    assert MetaFormat.index_of(MetaFormat.OP01) == 0
+    assert MetaFormat.index_of("OP20") == len(MetaFormat) - 1
+    assert MetaFormat.is_before(MetaFormat.OP09, "OP10")
+    assert not MetaFormat.is_before("OP10", MetaFormat.OP10)
+    with pytest.raises(ValueError):
+        MetaFormat.index_of("EB01")
+
+
+def test_release_datetimes():
+    assert meta_format2release_datetime(MetaFormat.OP01) == datetime(2022, 12, 2)
+    assert meta_format2release_datetime("OP01", MetaFormatRegion.ASIA) == datetime(2022, 9, 2)
+    assert meta_format2release_datetime(MetaFormat.OP01, MetaFormatRegion.ALL) == datetime(2022, 9, 2)
+    assert meta_format2release_datetime(MetaFormat.OP20) is None
+
+
+def test_memo_is_refreshed_after_next_release(monkeypatch):
+    registry = MetaFormatRegistry({MetaFormatRegion.ALL: {MetaFormat.OP01: datetime(2024, 1, 1),
+                                                          MetaFormat.OP02: datetime(2024, 4, 1)}})
+    monkeypatch.setattr(input_module, "datetime", fixed_now(datetime(2024, 3, 31)))
+    assert registry.to_tuple() == ("OP01",)
+    assert registry.to_tuple(only_after_release=False, until_meta_format="OP03") == ("OP01", "OP02", "OP03")
+    monkeypatch.setattr(input_module, "datetime", fixed_now(datetime(2024, 4, 1)))
+    assert registry.to_tuple() == ("OP01", "OP02")
+    assert registry.to_tuple(region=MetaFormatRegion.WEST) == ()
+
+
+def test_validate_rejects_inconsistent_release_datetimes():
+    with pytest.raises(ValueError, match="OP02 is released before OP01"):
+        MetaFormatRegistry({MetaFormatRegion.WEST: {MetaFormat.OP01: datetime(2024, 4, 1),
+                                                    MetaFormat.OP02: datetime(2024, 1, 1)}})
+    with pytest.raises(ValueError, match="unknown meta formats"):
+        MetaFormatRegistry({MetaFormatRegion.WEST: {"OP99": datetime(2024, 4, 1)}})
@@ -0,0 +1,56 @@
+"""
+Tests for /api/leader-similar: a selected similar leader outside of the 10 most similar leaders stays selectable.
+"""
+import asyncio
+import importlib
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+from fasthtml import ft
+from google.cloud import bigquery, firestore, storage
+from starlette.requests import Request
+
+LEADER_IDS = [f"OP01-{i:03d}" for i in range(1, 13)]
+
+
+@pytest.fixture
+def get_leader_similar(monkeypatch):
+    # the route module imports the frontend utils, which create their google cloud clients at import time
+    with mock.patch.object(bigquery, "Client"), mock.patch.object(storage, "Client"), \
+            mock.patch.object(firestore, "Client"):
+        module = importlib.import_module("op_tcg.frontend.api.routes.similar")
+    def get_most_similar_leader_data(leader_id, meta_formats, threshold_occurrence=0.4, top_k=None,
+                                     include_leader_ids=None):
+        leader_ids = LEADER_IDS[:top_k] + [lid for lid in include_leader_ids or [] if lid not in LEADER_IDS[:top_k]]
+        return {lid: module.SimilarLeaderData(similarity_score=1 - LEADER_IDS.index(lid) / 100, cards_intersection=[],
+                                              cards_missing=[], card_id2avg_count_card={})
+                for lid in leader_ids}
+
+    monkeypatch.setattr(module, "get_most_similar_leader_data", get_most_similar_leader_data)
+    monkeypatch.setattr(module, "get_card_id_card_data_lookup", lambda: {})
+    monkeypatch.setattr(module, "get_lid2ldata_dict_cached", lambda: {
+        lid: SimpleNamespace(name="Leader", aa_image_url=f"https://images/{lid}.png") for lid in LEADER_IDS})
+
+    routes = {}
+    module.setup_api_routes(lambda path: lambda fn: routes.setdefault(path, fn))
+    yield routes["/api/leader-similar"]
+
+
+def request(query_string: str) -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/api/leader-similar", "headers": [],
+                    "query_string": query_string.encode()})
+
+
+def test_similar_leader_outside_of_the_top_10_is_selected(get_leader_similar):
+    html = ft.to_xml(asyncio.run(get_leader_similar(request("lid=OP01-000&meta_format=OP10&similar_lid=OP01-012"))))
+    assert "https://images/OP01-012.png" in html
+    assert 'value="OP01-012" selected' in html
+    assert html.count("<option") == 11
+
+
+def test_dropdown_shows_the_10_most_similar_leaders(get_leader_similar):
+    html = ft.to_xml(asyncio.run(get_leader_similar(request("lid=OP01-000&meta_format=OP10"))))
+    assert "https://images/OP01-001.png" in html
+    assert html.count("<option") == 10
+    assert 'value="OP01-011"' not in html
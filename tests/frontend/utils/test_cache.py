@@ -0,0 +1,162 @@
+"""
+Tests for the stale-while-revalidate query caches and the single flight coalescing of concurrent cache misses.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from op_tcg.frontend.utils import cache as cache_module
+from op_tcg.frontend.utils.cache import SingleFlight, StaleWhileRevalidateCache, cache_key_hash
+
+
+def slow_query(calls: list, result: str = "rows", duration: float = 0.2):
+    def fn():
+        calls.append(threading.current_thread().name)
+        time.sleep(duration)
+        return [result]
+    return fn
+
+
+def test_concurrent_calls_are_coalesced():
+    single_flight = SingleFlight()
+    calls = []
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(single_flight.do, "query", slow_query(calls)) for _ in range(8)]
+        results = [future.result() for future in futures]
+
+    assert len(calls) == 1
+    # all callers share the result of the single execution
+    assert all(result is results[0] for result in results)
+    assert single_flight.get_stats() == {"executed_calls": 1, "coalesced_calls": 7, "in_flight": 0}
+
+
+def test_different_keys_and_sequential_calls_are_executed():
+    single_flight = SingleFlight()
+    calls = []
+    assert single_flight.do("a", slow_query(calls, "a", 0)) == ["a"]
+    assert single_flight.do("a", slow_query(calls, "a", 0)) == ["a"]
+    assert single_flight.do("b", slow_query(calls, "b", 0)) == ["b"]
+    assert len(calls) == 3
+    assert single_flight.coalesced_calls == 0
+
+
+def test_exception_is_shared_and_key_is_released():
+    single_flight = SingleFlight()
+    started = threading.Event()
+
+    def failing_query():
+        started.set()
+        time.sleep(0.2)
+        raise RuntimeError("query failed")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(single_flight.do, "query", failing_query)
+        started.wait()
+        follower = executor.submit(single_flight.do, "query", failing_query)
+        for future in (leader, follower):
+            with pytest.raises(RuntimeError, match="query failed"):
+                future.result()
+
+    assert single_flight.get_stats() == {"executed_calls": 1, "coalesced_calls": 1, "in_flight": 0}
+    assert single_flight.do("query", lambda: "retry") == "retry"
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class SyncExecutor:
+    """Runs submitted refreshes immediately"""
+
+    def __init__(self):
+        self.submitted = 0
+
+    def submit(self, fn):
+        self.submitted += 1
+        fn()
+
+
+@pytest.fixture
+def refresh_executor(monkeypatch):
+    executor = SyncExecutor()
+    monkeypatch.setattr(cache_module, "_refresh_executor", executor)
+    return executor
+
+
+def test_stale_entries_are_served_and_refreshed(refresh_executor):
+    timer = FakeTimer()
+    cache = StaleWhileRevalidateCache(maxsize=10, ttl=100, grace_seconds=50, timer=timer)
+    versions = iter(["v2", "v3"])
+    loader = lambda: cache.set("query", next(versions))
+    cache.set("query", "v1", loader=loader)
+
+    timer.now = 99
+    assert cache.get("query") == "v1"
+    assert refresh_executor.submitted == 0
+
+    # stale: old value is returned once, refresh replaces it and keeps the loader
+    timer.now = 120
+    assert cache.get_fresh("query") is None
+    assert cache.get("query") == "v1"
+    assert refresh_executor.submitted == 1
+    assert cache.get("query") == "v2"
+    assert cache.stale_hits == 1 and cache.refreshes == 1
+
+    # beyond the grace window the entry is a miss
+    timer.now = 120 + 151
+    assert "query" not in cache
+    assert cache.get("query") is None
+
+
+def test_entries_without_loader_are_not_refreshed(refresh_executor):
+    timer = FakeTimer()
+    cache = StaleWhileRevalidateCache(maxsize=10, ttl=100, grace_seconds=50, timer=timer)
+    cache["query"] = "v1"
+    timer.now = 110
+    assert cache["query"] == "v1"
+    assert refresh_executor.submitted == 0
+
+
+def test_failed_refresh_keeps_stale_value(refresh_executor):
+    timer = FakeTimer()
+    cache = StaleWhileRevalidateCache(maxsize=10, ttl=100, grace_seconds=50, timer=timer)
+
+    def failing_loader():
+        raise RuntimeError("bq unavailable")
+
+    cache.set("query", "v1", loader=failing_loader)
+    timer.now = 110
+    assert cache.get("query") == "v1"
+    assert cache.get("query") == "v1"
+    assert cache.failed_refreshes == 2
+    assert cache.get_entry_stats()[0]["refreshing"] is False
+
+
+def test_entry_stats():
+    timer = FakeTimer()
+    cache = StaleWhileRevalidateCache(maxsize=10, ttl=100, grace_seconds=50, timer=timer)
+    cache.set("fresh", 1)
+    timer.now = 60
+    cache.set("new", 2, loader=lambda: None)
+    timer.now = 120
+    entry_stats = cache.get_entry_stats()
+    stats = {e["key_hash"]: e for e in entry_stats}
+    fresh, new = stats[cache_key_hash("fresh")], stats[cache_key_hash("new")]
+    assert fresh["state"] == "stale" and fresh["expires_in_seconds"] == 30
+    assert new["state"] == "fresh" and new["age_seconds"] == 60
+    assert new["refreshable"] and not fresh["refreshable"]
+
+
+def test_entry_stats_do_not_expose_keys():
+    cache = StaleWhileRevalidateCache(maxsize=10, ttl=100)
+    query = "SELECT * FROM `project.matches.Match` WHERE player_id = 'secret'"
+    cache.set(query, 1)
+    [entry_stats] = cache.get_entry_stats()
+    assert entry_stats["key_hash"] == cache_key_hash(query) and len(entry_stats["key_hash"]) == 12
+    assert "secret" not in str(entry_stats)
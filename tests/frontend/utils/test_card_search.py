@@ -0,0 +1,109 @@
+"""
+Tests for the inverted CardSearchIndex used by the card search and the decklist builder.
+"""
+import random
+
+import pytest
+
+from op_tcg.backend.models.cards import ExtendedCardData, OPTcgColor, OPTcgAttribute, OPTcgCardCatagory, \
+    OPTcgCardRarity, OPTcgAbility, CardCurrency
+from op_tcg.backend.models.input import MetaFormat
+from op_tcg.frontend.api.models import CardPopularityParams
+from benchmarks.card_search_benchmark import filter_cards_legacy
+from op_tcg.frontend.utils.card_search import CardSearchIndex
+
+NAMES = ["Monkey.D.Luffy", "Roronoa Zoro", "Nami", "Charlotte Katakuri", "Trafalgar Law", "Yamato", "Ulti"]
+TYPES = ["Straw Hat Crew", "Big Mom Pirates", "Heart Pirates", "Land of Wano", "Animal Kingdom Pirates"]
+ABILITIES = ["[Rush]", "[Blocker]", "[Banish]", "[Trigger] Draw 1 card.", "[Double Attack]",
+             "[On Play] K.O. up to 1 of your opponent's Characters with a cost of 3 or less.",
+             "[Rush: Character]", ""]
+META_FORMATS = MetaFormat.to_list(only_after_release=False)[:6]
+
+
+def make_card(i: int, rng: random.Random) -> ExtendedCardData:
+    meta_format = rng.choice(META_FORMATS + [None])
+    return ExtendedCardData.from_default({
+        "id": f"{meta_format or 'P'}-{i:03d}",
+        "name": rng.choice(NAMES),
+        "colors": rng.sample(OPTcgColor.to_list(), rng.randint(1, 2)),
+        "attributes": rng.sample(OPTcgAttribute.to_list(), rng.randint(0, 2)),
+        "types": rng.sample(TYPES, rng.randint(1, 2)),
+        "ability": " ".join(rng.sample(ABILITIES, rng.randint(0, 2))),
+        "card_category": rng.choice(OPTcgCardCatagory.to_list()),
+        "rarity": rng.choice(OPTcgCardRarity.to_list()),
+        "cost": rng.choice([None, *range(11)]),
+        "power": rng.choice([None, *range(0, 13000, 1000)]),
+        "counter": rng.choice([None, 0, 1000, 2000]),
+        "meta_format": meta_format,
+        "release_set_name": f"Set {meta_format}",
+        "latest_eur_price": rng.choice([0.0, round(rng.uniform(0, 120), 2)]),
+        "latest_usd_price": rng.choice([0.0, round(rng.uniform(0, 120), 2)]),
+    })
+
+
+@pytest.fixture(scope="module")
+def cards() -> list[ExtendedCardData]:
+    rng = random.Random(1)
+    return [make_card(i, rng) for i in range(400)]
+
+
+@pytest.fixture(scope="module")
+def index(cards) -> CardSearchIndex:
+    return CardSearchIndex({card.id: card for card in cards})
+
+
+def random_params(rng: random.Random) -> CardPopularityParams:
+    params = {"meta_format": rng.choice(META_FORMATS),
+              "card_colors": rng.sample(OPTcgColor.to_list(), rng.randint(1, 6)),
+              "min_cost": rng.randint(0, 5), "max_cost": rng.randint(5, 10),
+              "min_power": rng.randint(0, 5), "max_power": rng.randint(5, 15),
+              "currency": rng.choice(CardCurrency.to_list()),
+              "min_price": rng.choice([0, 10]), "max_price": rng.choice([30, 80]),
+              "filter_operator": rng.choice(["OR", "AND"])}
+    if rng.random() < 0.3:
+        params["release_meta_format"] = rng.choice(META_FORMATS)
+    if rng.random() < 0.7:
+        params["search_term"] = rng.choice(["luffy", "op0 zoro", "pirates;wano", "l", "law", "katakuri 3",
+                                            "set", "heart crew", "xyz", "k.o."])
+    if rng.random() < 0.3:
+        params["card_attributes"] = rng.sample(OPTcgAttribute.to_list(), 2)
+    if rng.random() < 0.3:
+        params["card_category"] = rng.sample(OPTcgCardCatagory.to_list(), 2)
+    if rng.random() < 0.3:
+        params["card_rarity"] = rng.sample(OPTcgCardRarity.to_list(), 3)
+    if rng.random() < 0.3:
+        params["card_counter"] = rng.choice([0, 1000, 2000])
+    if rng.random() < 0.3:
+        params["card_types"] = rng.sample(TYPES, 2)
+    if rng.random() < 0.4:
+        params["card_abilities"] = rng.sample(OPTcgAbility.to_list(), rng.randint(1, 2))
+    if rng.random() < 0.4:
+        params["ability_text"] = rng.choice(["draw", "Rush", "cost of 3", "ko", "["])
+    return CardPopularityParams(**params)
+
+
+def test_filter_equals_legacy_scan(cards, index):
+    rng = random.Random(2)
+    num_non_empty = 0
+    for _ in range(200):
+        params = random_params(rng)
+        expected = filter_cards_legacy(cards, params)
+        assert [card.id for card in index.filter(params)] == [card.id for card in expected], params
+        num_non_empty += bool(expected)
+    # the random queries are not trivially empty
+    assert num_non_empty > 40
+
+
+def test_default_params_return_released_cards(cards, index):
+    params = CardPopularityParams(meta_format=META_FORMATS[0], card_category=OPTcgCardCatagory.to_list(),
+                                  max_price=1000)
+    result = index.filter(params)
+    assert result == filter_cards_legacy(cards, params)
+    assert {card.meta_format for card in result} <= {META_FORMATS[0], None}
+
+
+def test_search_terms_are_substrings(index):
+    params = CardPopularityParams(search_term="katak", card_category=OPTcgCardCatagory.to_list(), max_price=1000)
+    result = index.filter(params)
+    assert result and all("katakuri" in card.name.lower() for card in result)
+    assert index.filter(params.model_copy(update={"search_term": "katakx"})) == []
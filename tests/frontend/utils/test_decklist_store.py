@@ -0,0 +1,133 @@
+"""
+Tests for the columnar TournamentDecklistStore, which replaces the list of TournamentDecklist models.
+"""
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from op_tcg.backend.models.cards import CardCurrency
+from op_tcg.backend.models.input import MetaFormat, MetaFormatRegion
+from op_tcg.backend.models.tournaments import TournamentDecklist
+from op_tcg.frontend.utils.card_price import get_decklist_price
+from op_tcg.frontend.utils.decklist_store import TournamentDecklistStore
+
+CARD_ID2CARD_DATA = {
+    "OP01-001": SimpleNamespace(latest_eur_price=2.5, latest_usd_price=3.0),
+    "OP01-016": SimpleNamespace(latest_eur_price=0.1, latest_usd_price=None),
+    "OP05-119": SimpleNamespace(latest_eur_price=40.0, latest_usd_price=55.5),
+}
+
+
+def make_row(leader_id, tournament_id, player_id, placing, meta_format, region="west", decklist=None, day=1):
+    return dict(leader_id=leader_id, tournament_id=tournament_id, player_id=player_id, placing=placing,
+                meta_format=meta_format, meta_format_region=region, decklist_id=f"{tournament_id}-{player_id}",
+                tournament_timestamp=datetime(2024, 5, day, tzinfo=timezone.utc),
+                decklist=decklist or {leader_id: 1, "OP01-016": 4, "OP05-119": 2, "ST01-012": 4})
+
+
+ROWS = [
+    make_row("OP01-001", "t1", "p1", 1, "OP05"),
+    make_row("OP01-001", "t1", "p1", 1, "OP05"),  # duplicate standing
+    make_row("OP02-001", "t1", "p2", None, "OP05", decklist="{'OP02-001': 1, 'OP01-016': 3}"),
+    make_row("OP01-001", "t2", "p3", 4, "OP06", region="asia", day=20),
+    make_row("OP03-099", "t3", "p1", 2, "OP06", day=21),
+]
+
+
+@pytest.fixture
+def store():
+    return TournamentDecklistStore(ROWS, CARD_ID2CARD_DATA)
+
+
+def expected_decklists(meta_formats=None, leader_ids=None, region=MetaFormatRegion.ALL) -> list[TournamentDecklist]:
+    """Previous implementation based on one pydantic model per decklist"""
+    decklists, seen = [], set()
+    for row in ROWS:
+        key = (row['leader_id'], row['tournament_id'], row['player_id'], row['placing'])
+        if key not in seen:
+            seen.add(key)
+            td = TournamentDecklist(**row)
+            td.price_eur = get_decklist_price(td.decklist, CARD_ID2CARD_DATA, currency=CardCurrency.EURO)
+            td.price_usd = get_decklist_price(td.decklist, CARD_ID2CARD_DATA, currency=CardCurrency.US_DOLLAR)
+            decklists.append(td)
+    if leader_ids:
+        decklists = [td for td in decklists if td.leader_id in leader_ids]
+    if meta_formats:
+        decklists = [td for td in decklists if td.meta_format in meta_formats]
+    if region != MetaFormatRegion.ALL:
+        decklists = [td for td in decklists if td.meta_format_region == region]
+    return decklists
+
+
+ATTRIBUTES = ["leader_id", "tournament_id", "player_id", "placing", "meta_format", "meta_format_region",
+              "tournament_timestamp", "decklist_id", "decklist"]
+
+
+@pytest.mark.parametrize("meta_formats, leader_ids, region", [
+    (None, None, MetaFormatRegion.ALL),
+    ([MetaFormat.OP05], None, MetaFormatRegion.ALL),
+    (["OP06"], ["OP01-001"], MetaFormatRegion.ALL),
+    (["OP05", "OP06"], None, MetaFormatRegion.WEST),
+    (["OP06"], ["unknown"], MetaFormatRegion.ALL),
+])
+def test_select_matches_model_based_filtering(store, meta_formats, leader_ids, region):
+    views = store.select(meta_formats=meta_formats, leader_ids=leader_ids, meta_format_region=region)
+    expected = expected_decklists(meta_formats, leader_ids, region)
+
+    assert len(views) == len(expected)
+    for view, td in zip(views, expected):
+        for attribute in ATTRIBUTES:
+            assert getattr(view, attribute) == getattr(td, attribute), attribute
+        assert view.price_eur == pytest.approx(td.price_eur)
+        assert view.price_usd == pytest.approx(td.price_usd)
+
+
+def test_store_behaves_like_a_sequence(store):
+    assert len(store) == 4
+    assert [td.player_id for td in store] == ["p1", "p2", "p3", "p1"]
+    assert store[-1].leader_id == "OP03-099"
+    with pytest.raises(IndexError):
+        store[4]
+
+
+def test_find_and_meta_format_counts(store):
+    assert store.find("t2", "p3").leader_id == "OP01-001"
+    assert store.find("t2", "p1") is None
+    assert store.find("unknown", "p1") is None
+    assert store.meta_format_counts() == {MetaFormat.OP05: 2, MetaFormat.OP06: 2}
+
+
+@pytest.mark.parametrize("leader_id, meta_formats, region", [
+    ("OP01-001", None, MetaFormatRegion.ALL),
+    ("OP01-001", ["OP05"], MetaFormatRegion.ALL),
+    ("OP01-001", ["OP05", "OP06"], MetaFormatRegion.WEST),
+    ("OP02-001", ["OP05"], MetaFormatRegion.ALL),
+])
+def test_aggregates_match_decklist_sums(store, leader_id, meta_formats, region):
+    decklists = store.select(meta_formats=meta_formats, leader_ids=[leader_id], meta_format_region=region)
+    aggregate = store.aggregates.get(leader_id, meta_formats=meta_formats, meta_format_region=region)
+
+    card_id2occurrences, card_id2total_count = {}, {}
+    for td in decklists:
+        for card_id, count in td.decklist.items():
+            card_id2occurrences[card_id] = card_id2occurrences.get(card_id, 0) + 1
+            card_id2total_count[card_id] = card_id2total_count.get(card_id, 0) + count
+
+    assert aggregate.num_decklists == len(decklists)
+    # same card order as iterating over the decklists
+    assert aggregate.card_ids == list(card_id2occurrences)
+    assert aggregate.card_occurrences.tolist() == list(card_id2occurrences.values())
+    assert aggregate.card_total_counts.tolist() == list(card_id2total_count.values())
+    assert aggregate.price_eur_sum == pytest.approx(sum(td.price_eur for td in decklists))
+    assert aggregate.price_usd_sum == pytest.approx(sum(td.price_usd for td in decklists))
+    assert aggregate.min_tournament_timestamp == min(td.tournament_timestamp for td in decklists)
+    assert aggregate.max_tournament_timestamp == max(td.tournament_timestamp for td in decklists)
+    assert set(aggregate.meta_formats) == {td.meta_format for td in decklists}
+
+
+def test_aggregates_without_decklists(store):
+    assert store.aggregates.get("OP02-001", meta_formats=["OP06"]) is None
+    assert store.aggregates.get("unknown") is None
+    assert store.aggregates.get_leader_ids() == ["OP01-001", "OP02-001", "OP03-099"]
+    assert store.aggregates.get_leader_ids(meta_formats=["OP06"], meta_format_region=MetaFormatRegion.WEST) == ["OP03-099"]
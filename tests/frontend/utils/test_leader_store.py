@@ -0,0 +1,77 @@
+"""
+Tests for the indexed LeaderExtendedStore used by get_leader_extended.
+"""
+import itertools
+
+import pytest
+
+from op_tcg.backend.models.input import MetaFormat, MetaFormatRegion
+from op_tcg.backend.models.leader import LeaderExtended
+from op_tcg.frontend.utils.leader_store import LeaderExtendedStore
+
+
+def make_row(leader_id, meta_format, region, only_official):
+    return dict(id=leader_id, aa_version=0, name=leader_id, image_url="", colors=["Red"], ability="",
+                tournament_status=None, types=[], rarity="Leader", card_category="Leader", release_set_id="OP01",
+                attributes=[], power=5000, cost=None, counter=None, life=5, aa_image_url="", meta_format=meta_format,
+                release_meta_format="OP01", tournament_wins=1, win_rate=0.5, total_matches=10, elo=1000, d_score=0.1,
+                only_official=only_official, meta_format_region=region)
+
+
+ROWS = [make_row(leader_id, meta_format, region, only_official)
+        for leader_id, meta_format, region, only_official in itertools.product(
+            ["OP01-001", "OP05-060", "ST13-003"], ["OP05", "OP06", "OP07"], ["all", "west", "asia"], [True, False])]
+ROWS.append(make_row("OP09-001", None, None, None))
+
+
+def filter_legacy(leaders: list[LeaderExtended], meta_formats=None, leader_ids=None,
+                  meta_format_region=MetaFormatRegion.ALL, only_official=None) -> list[LeaderExtended]:
+    """Previous linear list filters of get_leader_extended"""
+    if leader_ids:
+        leaders = [bql for bql in leaders if (bql.id in leader_ids)]
+    if meta_format_region:
+        leaders = [bql for bql in leaders if (bql.meta_format_region == meta_format_region)]
+    if meta_formats:
+        leaders = [bql for bql in leaders if (bql.meta_format in meta_formats)]
+    if only_official is not None:
+        leaders = [l for l in leaders if l.only_official == only_official]
+    return leaders
+
+
+@pytest.mark.parametrize("meta_formats, leader_ids, meta_format_region, only_official", [
+    (None, None, MetaFormatRegion.ALL, None),
+    (None, None, None, None),
+    ([MetaFormat.OP05], None, MetaFormatRegion.WEST, True),
+    (["OP06", "OP05"], ["ST13-003", "OP01-001"], MetaFormatRegion.ALL, None),
+    (["OP07"], ["OP01-001"], None, False),
+    (["OP07"], ["unknown"], MetaFormatRegion.ASIA, None),
+    ([MetaFormat.OP01], None, MetaFormatRegion.ALL, None),
+])
+def test_filter_matches_linear_filters(meta_formats, leader_ids, meta_format_region, only_official):
+    store = LeaderExtendedStore(ROWS)
+    expected = filter_legacy(store.leaders, meta_formats, leader_ids, meta_format_region, only_official)
+    result = store.filter(meta_formats, leader_ids, meta_format_region, only_official)
+    assert [id(l) for l in result] == [id(l) for l in expected]
+
+
+def test_filter_results_are_memoized_copies():
+    store = LeaderExtendedStore(ROWS)
+    first = store.filter(meta_formats=["OP05"], leader_ids=["OP01-001"])
+    first.clear()
+    assert len(store.filter(meta_formats=["OP05"], leader_ids=["OP01-001"])) == 2
+    assert len(store._filter_cache) == 1
+
+
+def test_filter_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(LeaderExtendedStore, "FILTER_CACHE_SIZE", 2)
+    store = LeaderExtendedStore(ROWS)
+    for leader_ids in [["OP01-001"], ["OP05-060"], ["ST13-003"], ["OP01-001", "OP05-060"]]:
+        store.filter(leader_ids=leader_ids)
+    assert len(store._filter_cache) == 2
+    assert len(store.filter(leader_ids=["OP01-001"])) == 6
+
+
+def test_get_by_leader_id():
+    store = LeaderExtendedStore(ROWS)
+    assert len(store.get_by_leader_id("OP05-060")) == 18
+    assert store.get_by_leader_id("unknown") == []
@@ -0,0 +1,150 @@
+"""
+Tests for the background OG image rendering with atomic swaps, the on disk leader image LRU and conditional GETs.
+"""
+import email.utils
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from op_tcg.frontend.utils.og_images import OGImageRenderer, og_image_response, _plot_leader_chart
+
+
+class FakeCharts:
+    def __init__(self):
+        self.version = 0
+        self.fail = False
+        self.release = threading.Event()
+        self.release.set()
+
+    def data(self, *args):
+        self.release.wait(timeout=5)
+        if self.fail:
+            raise RuntimeError("query failed")
+        self.version += 1
+        return {"args": args, "version": self.version}
+
+    @staticmethod
+    def plot(data) -> bytes:
+        return f"png {data['args']} {data['version']}".encode()
+
+
+@pytest.fixture
+def charts():
+    return FakeCharts()
+
+
+@pytest.fixture
+def renderer(tmp_path, charts):
+    renderer = OGImageRenderer(directory=tmp_path, max_leader_images=2, process_executor=ThreadPoolExecutor(1),
+                               site_images={"meta": ("og-meta.png", charts.data, charts.plot)},
+                               leader_image=(charts.data, charts.plot))
+    yield renderer
+    renderer.stop()
+
+
+def wait_for(condition, timeout: float = 5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "condition was not met in time"
+        time.sleep(0.01)
+
+
+def test_missing_image_is_rendered_in_background(renderer, charts):
+    charts.release.clear()
+    # the request returns immediately without an image
+    assert renderer.get_image("meta") is None
+    charts.release.set()
+    wait_for(lambda: renderer.get_image("meta") is not None)
+    assert renderer.get_image("meta").read() == b"png () 1"
+
+
+def test_failed_render_keeps_last_good_image(renderer, charts, tmp_path):
+    image = renderer.render_site_image("meta")
+    charts.fail = True
+    renderer.render_site_images()
+    assert renderer.get_image("meta") is image
+    assert (tmp_path / "og-meta.png").read_bytes() == b"png () 1"
+    # no temporary files are left behind
+    assert [path.name for path in tmp_path.iterdir()] == ["og-meta.png"]
+
+
+def test_images_of_previous_process_are_served(renderer, charts, tmp_path):
+    renderer.render_site_image("meta")
+    renderer.render_leader_image("OP01-001")
+    restarted = OGImageRenderer(directory=tmp_path, site_images={"meta": ("og-meta.png", charts.data, charts.plot)},
+                                leader_image=(charts.data, charts.plot), process_executor=ThreadPoolExecutor(1))
+    assert restarted.get_image("meta").read() == b"png () 1"
+    assert restarted.get_leader_image("OP01-001").read() == b"png ('OP01-001',) 2"
+    restarted.stop()
+
+
+def test_leader_images_are_rendered_lazily_into_lru(renderer, tmp_path):
+    for leader_id in ["OP01-001", "OP01-060", "OP02-001"]:
+        assert renderer.get_leader_image(leader_id) is None
+        wait_for(lambda: renderer.get_leader_image(leader_id) is not None)
+        if leader_id == "OP01-060":
+            # OP01-001 becomes the most recently used image
+            assert renderer.get_leader_image("OP01-001") is not None
+    assert sorted(path.stem for path in (tmp_path / "og-leaders").iterdir()) == ["OP01-001", "OP02-001"]
+    # invalid ids never touch the file system
+    assert renderer.get_leader_image("../og-meta") is None
+
+
+def test_leader_ids_without_data_are_not_rendered_again(tmp_path, charts):
+    prepared = []
+
+    def leader_data(leader_id):
+        prepared.append(leader_id)
+        return None
+
+    renderer = OGImageRenderer(directory=tmp_path, process_executor=ThreadPoolExecutor(1), site_images={},
+                               leader_image=(leader_data, charts.plot))
+    try:
+        assert renderer.get_leader_image("OP99-999") is None
+        wait_for(lambda: not renderer._in_flight)
+        for _ in range(3):
+            assert renderer.get_leader_image("OP99-999") is None
+        assert prepared == ["OP99-999"]
+    finally:
+        renderer.stop()
+
+
+def test_evicted_leader_image_falls_back_to_site_image(renderer):
+    site_image = renderer.render_site_image("meta")
+    leader_image = renderer.render_leader_image("OP01-001")
+    # evicted by another request after the lookup of this request
+    leader_image.path.unlink()
+    response = og_image_response({}, leader_image, fallback=site_image)
+    assert response.status_code == 200
+    assert response.body == site_image.read()
+    assert response.headers["etag"] == site_image.etag
+
+
+def test_og_image_response_supports_conditional_get(renderer):
+    image = renderer.render_site_image("meta")
+    response = og_image_response({}, image)
+    assert response.status_code == 200
+    assert response.body == b"png () 1"
+    assert response.headers["etag"] == image.etag
+
+    assert og_image_response({"if-none-match": f'W/"x", {image.etag}'}, image).status_code == 304
+    assert og_image_response({"if-none-match": '"other"'}, image).status_code == 200
+    last_modified = response.headers["last-modified"]
+    assert og_image_response({"if-modified-since": last_modified}, image).status_code == 304
+    earlier = email.utils.formatdate(image.last_modified - 60, usegmt=True)
+    assert og_image_response({"if-modified-since": earlier}, image).status_code == 200
+    assert og_image_response({"if-modified-since": "not a date"}, image).status_code == 200
+
+
+def test_chart_is_plotted_in_separate_process(tmp_path):
+    pytest.importorskip("matplotlib")
+    data = {"latest": "OP01", "labels": ["Leader (OP01-001)"], "values": [3], "colors": ["#FF0000"]}
+    renderer = OGImageRenderer(directory=tmp_path, site_images={"leader": ("og-leader.png", lambda: data,
+                                                                          _plot_leader_chart)})
+    try:
+        image = renderer.render_site_image("leader")
+    finally:
+        renderer.stop()
+    assert image.read().startswith(b"\x89PNG")
@@ -0,0 +1,54 @@
+"""
+Tests for the cached similarity engines and the similar leader data of the leader page.
+"""
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+from google.cloud import bigquery, firestore, storage
+
+from tests.frontend.utils.test_similarity_engine import create_store
+
+
+@pytest.fixture
+def similar(monkeypatch):
+    # the module imports the frontend utils, which create their google cloud clients at import time
+    with mock.patch.object(bigquery, "Client"), mock.patch.object(storage, "Client"), \
+            mock.patch.object(firestore, "Client"):
+        module = importlib.import_module("op_tcg.frontend.utils.similar")
+    store = create_store()
+    monkeypatch.setattr(module, "get_all_tournament_decklist_data",
+                        lambda: SimpleNamespace(aggregates=store.aggregates))
+    module._similarity_engines.clear()
+    yield module
+    module._similarity_engines.clear()
+
+
+def test_selected_leader_outside_of_the_top_k_is_included(similar):
+    engine = similar.get_leader_similarity_engine(["OP05", "OP06"], threshold_occurrence=0.3)
+    leader_id = engine.leader_ids[0]
+    ranking = engine.get_top_k(leader_id)
+    least_similar_leader_id = ranking[-1][0]
+
+    result = similar.get_most_similar_leader_data(leader_id, ["OP05", "OP06"], threshold_occurrence=0.3, top_k=2,
+                                                  include_leader_ids=[least_similar_leader_id, ranking[0][0]])
+    assert list(result) == [ranking[0][0], ranking[1][0], least_similar_leader_id]
+    assert result[least_similar_leader_id].similarity_score == pytest.approx(ranking[-1][1])
+    assert similar.get_most_similar_leader_data(leader_id, ["OP05", "OP06"], threshold_occurrence=0.3, top_k=2,
+                                                include_leader_ids=[leader_id, "unknown"]).keys() == \
+           {ranking[0][0], ranking[1][0]}
+
+
+def test_engine_cache_is_bounded_and_thread_safe(similar, monkeypatch):
+    monkeypatch.setattr(similar, "_similarity_engines", similar.LRUCache(maxsize=2))
+    meta_format_selections = [["OP05"], ["OP06"], ["OP05", "OP06"]] * 4
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        engines = list(executor.map(lambda mfs: similar.get_leader_similarity_engine(mfs, 0.3),
+                                    meta_format_selections))
+    assert all(engine.leader_ids for engine in engines)
+    assert len(similar._similarity_engines) == 2
+    # a cached engine is reused as long as the decklist aggregates are not refreshed
+    assert similar.get_leader_similarity_engine(["OP06", "OP05"], 0.3) is \
+           similar.get_leader_similarity_engine(["OP05", "OP06"], 0.3)
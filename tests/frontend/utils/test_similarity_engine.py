@@ -0,0 +1,90 @@
+"""
+Tests for the matrix based LeaderSimilarityEngine.
+"""
+import random
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from op_tcg.frontend.utils.decklist_store import TournamentDecklistStore
+from op_tcg.frontend.utils.similarity_engine import LeaderSimilarityEngine, SimilarityMetric
+
+LEADER_IDS = [f"OP0{i}-001" for i in range(1, 9)]
+CARD_IDS = [f"ST01-{i:03d}" for i in range(40)]
+
+
+def create_store(seed: int = 0) -> TournamentDecklistStore:
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(300):
+        leader_id = rnd.choice(LEADER_IDS)
+        # leaders share a card pool depending on their index, so some leaders are more similar than others
+        pool = CARD_IDS[LEADER_IDS.index(leader_id) * 3:LEADER_IDS.index(leader_id) * 3 + 20]
+        decklist = {leader_id: 1, **{card_id: rnd.randint(1, 4) for card_id in rnd.sample(pool, 12)}}
+        rows.append(dict(leader_id=leader_id, tournament_id=f"t{i // 10}", player_id=f"p{i}", placing=i % 10,
+                         meta_format=rnd.choice(["OP05", "OP06"]), meta_format_region=rnd.choice(["west", "asia"]),
+                         decklist_id=None, tournament_timestamp=datetime(2024, 5, 1 + i // 10, tzinfo=timezone.utc),
+                         decklist=decklist))
+    return TournamentDecklistStore(rows, {})
+
+
+def common_card_ids_legacy(decklists, leader_id: str, threshold: float) -> set[str]:
+    card_id2occurrences = {}
+    for td in decklists:
+        for card_id in td.decklist:
+            card_id2occurrences[card_id] = card_id2occurrences.get(card_id, 0) + 1
+    return {card_id for card_id, occurrences in card_id2occurrences.items()
+            if card_id != leader_id and occurrences / len(decklists) >= threshold}
+
+
+@pytest.mark.parametrize("meta_formats, threshold", [(["OP05"], 0.4), (["OP05", "OP06"], 0.1), (["OP06"], 0.6)])
+def test_intersection_scores_match_set_based_similarity(meta_formats, threshold):
+    store = create_store()
+    engine = LeaderSimilarityEngine(store.aggregates, meta_formats=meta_formats, threshold_occurrence=threshold)
+
+    leader2card_ids = {lid: common_card_ids_legacy(store.select(meta_formats, [lid]), lid, threshold)
+                       for lid in LEADER_IDS if store.select(meta_formats, [lid])}
+    for leader_id, target_card_ids in leader2card_ids.items():
+        expected = {other_lid: len(target_card_ids & card_ids) / len(target_card_ids)
+                    for other_lid, card_ids in leader2card_ids.items()
+                    if other_lid != leader_id and card_ids and target_card_ids}
+        result = dict(engine.get_top_k(leader_id))
+        assert result.keys() == expected.keys()
+        for other_lid, score in expected.items():
+            assert result[other_lid] == pytest.approx(score)
+        assert set(engine.get_common_card_ids(leader_id)) == target_card_ids
+
+
+def test_top_k_is_sorted_and_precomputed():
+    engine = LeaderSimilarityEngine(create_store().aggregates, threshold_occurrence=0.3, top_k=3)
+    for leader_id in engine.leader_ids:
+        top_k = engine.get_top_k(leader_id, k=3)
+        assert top_k == engine.leader_id2top_k[leader_id]
+        assert top_k == engine.get_top_k(leader_id)[:3]
+        assert [score for _, score in top_k] == sorted([score for _, score in top_k], reverse=True)
+        assert leader_id not in dict(top_k)
+    assert engine.get_top_k("unknown") == []
+
+
+def test_alternative_metrics():
+    engine = LeaderSimilarityEngine(create_store().aggregates, threshold_occurrence=0.3)
+    cosine = engine.scores(SimilarityMetric.COSINE)
+    jaccard = engine.scores(SimilarityMetric.JACCARD)
+    np.testing.assert_allclose(np.diag(cosine), 1.0, rtol=1e-6)
+    np.testing.assert_allclose(cosine, cosine.T, rtol=1e-6)
+    np.testing.assert_allclose(jaccard, jaccard.T)
+    assert ((0 <= jaccard) & (jaccard <= 1)).all()
+    leader_id = engine.leader_ids[0]
+    row = engine.leader_id2row[leader_id]
+    for other_leader_id, score in engine.get_top_k(leader_id, metric=SimilarityMetric.JACCARD):
+        assert score == pytest.approx(jaccard[row, engine.leader_id2row[other_leader_id]])
+
+
+def test_score_of_one_pair_equals_the_full_ranking():
+    engine = LeaderSimilarityEngine(create_store().aggregates, threshold_occurrence=0.3, top_k=2)
+    for leader_id in engine.leader_ids:
+        for other_leader_id, score in engine.get_top_k(leader_id):
+            assert engine.get_score(leader_id, other_leader_id) == pytest.approx(score)
+        assert engine.get_score(leader_id, leader_id) is None
+    assert engine.get_score(engine.leader_ids[0], "unknown") is None
@@ -0,0 +1,58 @@
+"""
+Tests for run_bq_query: concurrent misses of the same query share one BigQuery job and repeated queries are cached.
+"""
+import importlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import pytest
+from google.cloud import bigquery, firestore, storage
+
+
+class FakeQueryJob:
+    def __init__(self, rows: list[dict]):
+        self.rows = rows
+
+    def result(self):
+        time.sleep(0.2)
+        return self.rows
+
+
+class FakeBigQueryClient:
+    def __init__(self):
+        self.queries = []
+        self._lock = threading.Lock()
+
+    def query(self, query: str, location: str):
+        with self._lock:
+            self.queries.append(query)
+        return FakeQueryJob([{"id": "OP01-001"}])
+
+
+@pytest.fixture
+def utils(monkeypatch):
+    # the module creates its google cloud clients at import time
+    with mock.patch.object(bigquery, "Client"), mock.patch.object(storage, "Client"), \
+            mock.patch.object(firestore, "Client"):
+        module = importlib.import_module("op_tcg.frontend.utils.utils")
+    monkeypatch.setattr(module, "bq_client", FakeBigQueryClient())
+    yield module
+    module._get_query_cache(24.0).clear()
+
+
+def test_concurrent_misses_share_one_query(utils):
+    query = "SELECT * FROM leaders -- uncached"
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        results = list(executor.map(lambda _: utils.run_bq_query(query), range(6)))
+
+    assert utils.bq_client.queries == [query]
+    assert results == [[{"id": "OP01-001"}]] * 6
+
+
+def test_repeated_query_is_served_from_cache(utils):
+    query = "SELECT * FROM leaders -- cached"
+    assert utils.run_bq_query(query, ttl_hours=24.0) == [{"id": "OP01-001"}]
+    assert utils.run_bq_query(query, ttl_hours=24.0) == [{"id": "OP01-001"}]
+    assert utils.bq_client.queries == [query]